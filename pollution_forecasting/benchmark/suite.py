@@ -0,0 +1,541 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pollution_forecasting.benchmark.synthetic_data import POLLUTANT_COLUMNS, load_synthetic_collection, write_synthetic_split
+from pollution_forecasting.constant.training_pipeline import TRAIN_FILE_NAME, TEST_FILE_NAME
+from pollution_forecasting.entity.artifact_entity import (
+    DataIngestionArtifact,
+    DataValidationArtifact,
+)
+from pollution_forecasting.entity.config_entity import (
+    BenchmarkConfig,
+    TrainingPipelineConfig,
+    InstrumentationConfig,
+    DataIngestionConfig,
+    DataValidationConfig,
+    FeatureEngineeringConfig,
+    DataTransformationConfig,
+)
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.pipeline.instrumentation import PipelineInstrumentation
+
+# a benchmark is a list of (case name, callable, input paths), timed in this order on every repeat
+Cases = List[Tuple[str, Callable, List[str]]]
+
+BENCHMARK_DATABASE_NAME = "delhi_pollution_benchmark"
+
+
+def benchmark_pipeline_config(case_dir: str) -> TrainingPipelineConfig:
+    """
+    Pipeline config whose artifacts, feature store and model store all live under
+    `case_dir`, so benchmarks never touch the real Artifacts/ and final_model/.
+    """
+    config = TrainingPipelineConfig(datetime.now())
+    config.artifact_name = config.run_dir = config.artifact_dir = case_dir
+    config.model_dir = os.path.join(case_dir, "final_model")
+    return config
+
+
+def split_file_paths(data_dir: str) -> Tuple[str, str]:
+    return os.path.join(data_dir, TRAIN_FILE_NAME), os.path.join(data_dir, TEST_FILE_NAME)
+
+
+def _import_time_cases(task: dict, pipeline_config: TrainingPipelineConfig) -> Cases:
+    def cold_import(module: str) -> Callable:
+        # a fresh interpreter each time, the wall time is what a short-lived job pays to start
+        def run():
+            subprocess.run([sys.executable, "-c", f"import {module}" if module else "pass"], check=True)
+        return run
+    return [(f"import.{module or 'interpreter'}", cold_import(module), []) for module in task["import_modules"]]
+
+
+def _data_ingestion_cases(task: dict, pipeline_config: TrainingPipelineConfig) -> Cases:
+    from pollution_forecasting.components.data_ingestion import DataIngestion
+
+    if task["mongo_url"]:
+        from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
+        client = get_mongo_client(task["mongo_url"])
+    else:
+        try:
+            import mongomock
+        except ImportError as e:
+            raise ImportError("the data_ingestion benchmark needs mongomock or --mongo-url") from e
+        client = mongomock.MongoClient()
+    config = DataIngestionConfig(pipeline_config)
+    # a database of its own, a benchmark never drops the real collection
+    config.database_name = BENCHMARK_DATABASE_NAME
+    config.incremental = False
+    collection = client[config.database_name][config.collection_name]
+    collection.drop()
+    load_synthetic_collection(collection, task["rows"], stations=task["stations"], seed=task["seed"])
+    data_ingestion = DataIngestion(config)
+    data_ingestion.mongo_client = client
+
+    def daily_aggregate():
+        return data_ingestion.get_query().resample(POLLUTANT_COLUMNS, unit="day")
+
+    cases = [("data_ingestion", data_ingestion.initiate_data_ingestion, [])]
+    if task["mongo_url"]:
+        # the server-side counterpart of exporting every hourly reading; mongomock evaluates
+        # pipelines document by document in Python, so it is only timed against a real server
+        cases.append(("data_ingestion.daily_aggregate", daily_aggregate, []))
+    return cases
+
+
+def _data_validation_cases(task: dict, pipeline_config: TrainingPipelineConfig) -> Cases:
+    from pollution_forecasting.components.data_validation import DataValidation
+
+    train_file_path, test_file_path = split_file_paths(task["data_dir"])
+    data_validation = DataValidation(
+        DataIngestionArtifact(trained_file_path=train_file_path, test_file_path=test_file_path),
+        DataValidationConfig(pipeline_config),
+    )
+    return [("data_validation", data_validation.initiate_data_validation, [train_file_path, test_file_path])]
+
+
+def _feature_engineering(task: dict, pipeline_config: TrainingPipelineConfig):
+    from pollution_forecasting.components.feature_engineering import FeatureEngineering
+
+    # the generated split stands in for the validated one
+    train_file_path, test_file_path = split_file_paths(task["data_dir"])
+    validation_artifact = DataValidationArtifact(
+        validation_status=True,
+        valid_train_file_path=train_file_path,
+        valid_test_file_path=test_file_path,
+        invalid_train_file_path=None,
+        invalid_test_file_path=None,
+        drift_report_file_path=None,
+    )
+    return FeatureEngineering(validation_artifact, FeatureEngineeringConfig(pipeline_config)), [train_file_path, test_file_path]
+
+
+def _feature_engineering_cases(task: dict, pipeline_config: TrainingPipelineConfig) -> Cases:
+    feature_engineering, input_paths = _feature_engineering(task, pipeline_config)
+    return [("feature_engineering", feature_engineering.initiate_feature_engineering, input_paths)]
+
+
+def _data_transformation_cases(task: dict, pipeline_config: TrainingPipelineConfig) -> Cases:
+    from pollution_forecasting.components.data_transformation import DataTransformation
+
+    feature_engineering, _ = _feature_engineering(task, pipeline_config)
+    feature_engineering_artifact = feature_engineering.initiate_feature_engineering()
+    data_transformation = DataTransformation(feature_engineering_artifact, DataTransformationConfig(pipeline_config))
+    return [(
+        "data_transformation",
+        data_transformation.initiate_data_transformation,
+        [feature_engineering_artifact.engineered_train_file_path, feature_engineering_artifact.engineered_test_file_path],
+    )] + _imputation_cases(task, pipeline_config, feature_engineering_artifact.engineered_train_file_path)
+
+
+def _imputation_cases(task: dict, pipeline_config: TrainingPipelineConfig, engineered_file_path: str) -> Cases:
+    """
+    The seasonal imputer in both strategies against sklearn's KNNImputer, each fitted and
+    applied to the engineered train split and pickled, so `bytes_out` is the fitted size.
+    """
+    from sklearn.impute import KNNImputer
+    from pollution_forecasting.components.data_transformation import DataTransformation
+    from pollution_forecasting.constant.training_pipeline import TARGET_COLUMN
+    from pollution_forecasting.utils.main.utils import read_dataframe, save_object
+    from pollution_forecasting.utils.ml_utils.imputation.imputer import SeasonalInterpolationImputer
+
+    frame = DataTransformation.prepare_frame(read_dataframe(engineered_file_path))
+    stations = DataTransformation.pop_station_codes(frame)
+    frame = frame.drop(columns=[TARGET_COLUMN])
+    imputation_dir = os.path.join(pipeline_config.artifact_dir, "imputation")
+
+    def fitted(name: str, imputer) -> Callable:
+        file_path = os.path.join(imputation_dir, f"{name}.pkl")
+
+        def run():
+            if isinstance(imputer, SeasonalInterpolationImputer):
+                imputer.fit(frame).transform_rows(frame, frame.index, stations)
+            else:
+                imputer.fit_transform(frame.to_numpy())
+            save_object(file_path, imputer)
+            return SimpleNamespace(file_path=file_path)
+        return run
+
+    cases = [
+        ("imputation.carry_forward", fitted("carry_forward", SeasonalInterpolationImputer(strategy="carry_forward")), [engineered_file_path]),
+        ("imputation.knn_window", fitted("knn_window", SeasonalInterpolationImputer(strategy="knn_window")), [engineered_file_path]),
+    ]
+    # every incomplete row is compared with every fitted row, quadratic in the rows
+    if task["rows"] <= task["sklearn_knn_max_rows"]:
+        cases.append(("imputation.sklearn_knn", fitted("sklearn_knn", KNNImputer(n_neighbors=3)), [engineered_file_path]))
+    else:
+        logging.info(f"imputation.sklearn_knn left out at {task['rows']} rows, above {task['sklearn_knn_max_rows']}")
+    return cases
+
+
+def _utils_cases(task: dict, pipeline_config: TrainingPipelineConfig) -> Cases:
+    from pollution_forecasting.utils.main.utils import (
+        NumpyArrayWriter,
+        iter_row_blocks,
+        load_numpy_array_data,
+        load_object,
+        read_dataframe,
+        save_numpy_array_data,
+        save_object,
+        write_dataframe,
+    )
+
+    train_file_path, _ = split_file_paths(task["data_dir"])
+    frame = read_dataframe(train_file_path)
+    array = frame.select_dtypes(include="number").to_numpy(dtype=np.float64)
+    utils_dir = os.path.join(pipeline_config.artifact_dir, "utils")
+    parquet_file_path = os.path.join(utils_dir, "frame.parquet")
+    npy_file_path = os.path.join(utils_dir, "array.npy")
+    streamed_file_path = os.path.join(utils_dir, "streamed.npy")
+    pickle_file_path = os.path.join(utils_dir, "array.pkl")
+
+    def written(file_path: str):
+        # an artifact-like result, so the instrumentation counts the file it wrote
+        return SimpleNamespace(file_path=file_path)
+
+    def write_frame():
+        write_dataframe(parquet_file_path, frame)
+        return written(parquet_file_path)
+
+    def save_array():
+        save_numpy_array_data(npy_file_path, array)
+        return written(npy_file_path)
+
+    def stream_array():
+        with NumpyArrayWriter(streamed_file_path, array.shape[1], array.dtype) as writer:
+            for _, block in iter_row_blocks(array, 65_536):
+                writer.append(block)
+        return written(streamed_file_path)
+
+    def scan_mmap_array():
+        # touches every page, so the mapped read is not free just because it is lazy
+        mapped = load_numpy_array_data(npy_file_path, mmap_mode="r")
+        return float(sum(block.sum() for _, block in iter_row_blocks(mapped, 65_536)))
+
+    def save_pickle():
+        save_object(pickle_file_path, array)
+        return written(pickle_file_path)
+
+    return [
+        ("utils.write_dataframe", write_frame, []),
+        ("utils.read_dataframe", lambda: read_dataframe(parquet_file_path), [parquet_file_path]),
+        ("utils.save_numpy_array_data", save_array, []),
+        ("utils.load_numpy_array_data", lambda: load_numpy_array_data(npy_file_path), [npy_file_path]),
+        ("utils.load_numpy_array_data_mmap", scan_mmap_array, [npy_file_path]),
+        ("utils.numpy_array_writer", stream_array, []),
+        ("utils.save_object", save_pickle, []),
+        ("utils.load_object", lambda: load_object(pickle_file_path), [pickle_file_path]),
+    ]
+
+
+BENCHMARKS: Dict[str, Callable[[dict, TrainingPipelineConfig], Cases]] = {
+    "import_time": _import_time_cases,
+    "data_ingestion": _data_ingestion_cases,
+    "data_validation": _data_validation_cases,
+    "feature_engineering": _feature_engineering_cases,
+    "data_transformation": _data_transformation_cases,
+    "utils": _utils_cases,
+}
+# benchmarks that do not read the synthetic data run once, as size 0
+SIZE_INDEPENDENT_BENCHMARKS = {"import_time"}
+
+
+def summarize_case(stages: List[dict], rows: int) -> dict:
+    """
+    One result per case from its repeats: median times, worst memory, throughput at the median.
+    """
+    wall = float(np.median([stage["wall_s"] for stage in stages]))
+    last = stages[-1]
+    moved_mb = (last["bytes_in"] + last["bytes_out"]) / 1024 ** 2
+    rows_processed = last["rows_in"] if last["rows_in"] is not None else last["rows_out"]
+    return {
+        "case": last["stage"],
+        "rows": rows,
+        "status": "succeeded",
+        "repeats": len(stages),
+        "wall_s": round(wall, 4),
+        "wall_s_min": min(stage["wall_s"] for stage in stages),
+        "cpu_s": round(float(np.median([stage["cpu_s"] for stage in stages])), 4),
+        "peak_rss_mb": max(stage["peak_rss_mb"] for stage in stages),
+        "peak_rss_growth_mb": round(max(stage["peak_rss_mb"] - stage["rss_start_mb"] for stage in stages), 1),
+        "rows_processed": rows_processed,
+        "rows_per_s": round(rows_processed / wall, 1) if rows_processed and wall > 0 else None,
+        "mb_per_s": round(moved_mb / wall, 2) if wall > 0 else None,
+        "bytes_out": last["bytes_out"],
+        "io_read_bytes": last["io_read_bytes"],
+        "io_write_bytes": last["io_write_bytes"],
+    }
+
+
+def run_benchmark_case(task: dict) -> List[dict]:
+    """
+    Set up and time one benchmark at one size, in a fresh worker process.
+
+    Each case is timed `repeats` times through `PipelineInstrumentation`, so the numbers are
+    the same wall/CPU/peak RSS measurements as the pipeline's run report. Failures are
+    returned as results rather than raised, one broken case does not stop the suite.
+    """
+    name, rows = task["benchmark"], task["rows"]
+    try:
+        shutil.rmtree(task["case_dir"], ignore_errors=True)
+        pipeline_config = benchmark_pipeline_config(task["case_dir"])
+        cases = BENCHMARKS[name](task, pipeline_config)
+        instrumentation = PipelineInstrumentation(InstrumentationConfig(pipeline_config), {"benchmark": name, "rows": rows})
+        for _ in range(task["repeats"]):
+            for case_name, build, input_paths in cases:
+                with instrumentation.stage(case_name, input_paths) as record:
+                    record.finish(build())
+        return [
+            summarize_case([stage for stage in instrumentation.stages if stage["stage"] == case_name], rows)
+            for case_name, _, _ in cases
+        ]
+    except Exception as e:
+        logging.error(f"Benchmark {name} at {rows} rows failed: {e}")
+        return [{"case": name, "rows": rows, "status": "failed", "error": str(e)}]
+
+
+def scaling_curves(results: List[dict]) -> Dict[str, dict]:
+    """
+    Log-log slope of wall time and of memory growth against rows, per case: 1.0 is linear,
+    above it the case scales worse than the data.
+    """
+    curves = {}
+    for case in sorted({result["case"] for result in results if result["status"] == "succeeded"}):
+        points = sorted(
+            (result["rows"], result["wall_s"], result["peak_rss_growth_mb"])
+            for result in results if result["case"] == case and result["status"] == "succeeded"
+        )
+        curve = {"points": [{"rows": rows, "wall_s": wall, "peak_rss_growth_mb": growth} for rows, wall, growth in points]}
+        if len(points) >= 2:
+            rows = np.log([point[0] for point in points])
+            curve["wall_exponent"] = round(float(np.polyfit(rows, np.log([max(point[1], 1e-4) for point in points]), 1)[0]), 3)
+            curve["memory_exponent"] = round(float(np.polyfit(rows, np.log([max(point[2], 1.0) for point in points]), 1)[0]), 3)
+        curves[case] = curve
+    return curves
+
+
+def compare_to_baseline(results: List[dict], baseline: dict, config: BenchmarkConfig) -> List[dict]:
+    """
+    Cases slower or hungrier than the baseline by more than the tolerance.
+
+    A case regresses when its median wall time exceeds the baseline's by more than
+    `tolerance` and by at least `min_wall_delta_s`, or likewise its peak memory growth with
+    `min_rss_delta_mb`. Cases missing from either side are not compared.
+    """
+    baseline_results = {
+        (result["case"], result["rows"]): result
+        for result in baseline.get("results", []) if result.get("status") == "succeeded"
+    }
+    checks = (("wall_s", config.min_wall_delta_s), ("peak_rss_growth_mb", config.min_rss_delta_mb))
+    regressions = []
+    for result in results:
+        reference = baseline_results.get((result["case"], result["rows"]))
+        if reference is None or result["status"] != "succeeded":
+            continue
+        for metric, min_delta in checks:
+            current, previous = result[metric], reference[metric]
+            if current > previous * (1.0 + config.tolerance) and current - previous >= min_delta:
+                regressions.append({
+                    "case": result["case"],
+                    "rows": result["rows"],
+                    "metric": metric,
+                    "baseline": previous,
+                    "current": current,
+                    "change": round(current / previous - 1.0, 3) if previous else None,
+                })
+    return regressions
+
+
+def environment() -> dict:
+    import pandas as pd
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+class BenchmarkSuite:
+    """
+    Times the pipeline components on synthetic data at several sizes and checks the
+    results against a stored baseline.
+
+    The synthetic train/test split of every size is generated once and reused. Every
+    (benchmark, size) runs in its own spawned process, so peak memory is not inflated by
+    earlier cases and imports or caches warmed by one case do not speed up the next.
+    """
+
+    def __init__(self, benchmark_config: BenchmarkConfig):
+        self.benchmark_config = benchmark_config
+
+    def prepare_data(self, rows: int) -> str:
+        config = self.benchmark_config
+        data_dir = os.path.join(config.work_dir, "data", f"rows_{rows}_stations_{config.stations}_seed_{config.seed}")
+        train_file_path, test_file_path = split_file_paths(data_dir)
+        if not (os.path.exists(train_file_path) and os.path.exists(test_file_path)):
+            started = time.perf_counter()
+            write_synthetic_split(train_file_path, test_file_path, rows, stations=config.stations, seed=config.seed)
+            logging.info(f"Generated {rows} synthetic rows in {time.perf_counter() - started:.1f}s")
+        return data_dir
+
+    def tasks(self) -> List[dict]:
+        config = self.benchmark_config
+        unknown = [name for name in config.benchmarks if name not in BENCHMARKS]
+        if unknown:
+            raise ValueError(f"Unknown benchmarks {unknown}, expected some of {list(BENCHMARKS)}")
+        size_independent = [name for name in config.benchmarks if name in SIZE_INDEPENDENT_BENCHMARKS]
+        sized = [name for name in config.benchmarks if name not in SIZE_INDEPENDENT_BENCHMARKS]
+        tasks = []
+        for rows, names in [(0, size_independent)] + [(rows, sized) for rows in config.sizes]:
+            if not names:
+                continue
+            data_dir = self.prepare_data(rows) if rows else None
+            for name in names:
+                task = {
+                    "benchmark": name,
+                    "rows": rows,
+                    "repeats": config.repeats,
+                    "stations": config.stations,
+                    "seed": config.seed,
+                    "data_dir": data_dir,
+                    "case_dir": os.path.join(config.work_dir, f"{name}_{rows}"),
+                    "mongo_url": config.mongo_url,
+                    "import_modules": config.import_modules,
+                    "sklearn_knn_max_rows": config.sklearn_knn_max_rows,
+                }
+                if name == "data_ingestion" and not config.mongo_url and rows > config.mongo_max_rows:
+                    task["skip"] = f"more than {config.mongo_max_rows} rows needs --mongo-url"
+                tasks.append(task)
+        return tasks
+
+    def run(self) -> dict:
+        """
+        Run every benchmark at every size and write the results file.
+
+        Returns:
+            dict: Environment, per-case results, scaling curves and, when a baseline exists,
+            the regressions against it.
+
+        Raises:
+            PollutionException: If the data cannot be generated or the results written.
+        """
+        try:
+            config = self.benchmark_config
+            results = []
+            context = multiprocessing.get_context("spawn")
+            for task in self.tasks():
+                if "skip" in task:
+                    results.append({"case": task["benchmark"], "rows": task["rows"], "status": "skipped", "reason": task["skip"]})
+                    continue
+                logging.info(f"Benchmark {task['benchmark']} at {task['rows']} rows")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    results.extend(executor.submit(run_benchmark_case, task).result())
+
+            report = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "environment": environment(),
+                "settings": {"stations": config.stations, "seed": config.seed, "repeats": config.repeats},
+                "results": results,
+                "scaling": scaling_curves(results),
+            }
+            if os.path.exists(config.baseline_file_path):
+                with open(config.baseline_file_path) as file:
+                    baseline = json.load(file)
+                report["baseline"] = {
+                    "file_path": config.baseline_file_path,
+                    "created_at": baseline.get("created_at"),
+                    "same_environment": baseline.get("environment") == report["environment"],
+                    "tolerance": config.tolerance,
+                    "regressions": compare_to_baseline(results, baseline, config),
+                }
+            os.makedirs(os.path.dirname(config.results_file_path) or ".", exist_ok=True)
+            with open(config.results_file_path, "w") as file:
+                json.dump(report, file, indent=2)
+            return report
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def save_baseline(self, report: dict) -> None:
+        with open(self.benchmark_config.baseline_file_path, "w") as file:
+            json.dump({name: value for name, value in report.items() if name != "baseline"}, file, indent=2)
+
+
+def format_report(report: dict) -> str:
+    width = max([len(result["case"]) for result in report["results"]] + [4])
+    lines = [f"{'case':{width}} {'rows':>11} {'wall s':>9} {'rows/s':>12} {'MB/s':>8} {'peak MB':>8} {'+MB':>7} {'out MB':>8}"]
+    for result in report["results"]:
+        if result["status"] != "succeeded":
+            lines.append(f"{result['case']:{width}} {result['rows']:>11} {result['status']}: {result.get('reason') or result.get('error')}")
+            continue
+        lines.append(
+            f"{result['case']:{width}} {result['rows']:>11} {result['wall_s']:>9.3f} {result['rows_per_s'] or 0:>12.0f} "
+            f"{result['mb_per_s'] or 0:>8.1f} {result['peak_rss_mb']:>8.1f} {result['peak_rss_growth_mb']:>7.1f} "
+            f"{result.get('bytes_out', 0) / 1024 ** 2:>8.3f}"
+        )
+    for case, curve in report["scaling"].items():
+        if "wall_exponent" in curve:
+            lines.append(f"scaling {case}: time ~ rows^{curve['wall_exponent']}, memory ~ rows^{curve['memory_exponent']}")
+    baseline = report.get("baseline")
+    if baseline is not None:
+        if not baseline["same_environment"]:
+            lines.append("warning: the baseline was recorded in a different environment")
+        for regression in baseline["regressions"]:
+            lines.append(
+                f"REGRESSION {regression['case']} at {regression['rows']} rows: {regression['metric']} "
+                f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.0%})"
+            )
+        if not baseline["regressions"]:
+            lines.append(f"no regressions beyond {baseline['tolerance']:.0%} against {baseline['file_path']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    config = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline components on synthetic data.")
+    parser.add_argument("--benchmarks", nargs="+", default=config.benchmarks, choices=list(BENCHMARKS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=config.sizes, help="rows per scaling point")
+    parser.add_argument("--repeats", type=int, default=config.repeats)
+    parser.add_argument("--stations", type=int, default=config.stations)
+    parser.add_argument("--seed", type=int, default=config.seed)
+    parser.add_argument("--tolerance", type=float, default=config.tolerance)
+    parser.add_argument("--mongo-url", default=None, help="local MongoDB for the ingestion benchmark instead of mongomock")
+    parser.add_argument("--sklearn-knn-max-rows", type=int, default=config.sklearn_knn_max_rows,
+                        help="largest size sklearn's KNNImputer is timed at")
+    parser.add_argument("--baseline", default=config.baseline_file_path)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    config.benchmarks, config.sizes, config.repeats = args.benchmarks, args.sizes, args.repeats
+    config.stations, config.seed, config.tolerance = args.stations, args.seed, args.tolerance
+    config.mongo_url, config.baseline_file_path = args.mongo_url, args.baseline
+    config.sklearn_knn_max_rows = args.sklearn_knn_max_rows
+
+    suite = BenchmarkSuite(config)
+    report = suite.run()
+    print(format_report(report))
+    if args.save_baseline:
+        suite.save_baseline(report)
+        print(f"Baseline saved to {config.baseline_file_path}")
+    elif report.get("baseline", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
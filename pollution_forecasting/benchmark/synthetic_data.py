@@ -0,0 +1,283 @@
+import os
+import sys
+import argparse
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.constant.training_pipeline import (
+    DATA_INGESTION_DATETIME_FORMAT,
+    DATA_INGESTION_STATION_COLUMN,
+    DATA_INGESTION_WATERMARK_COLUMN,
+)
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+TO_DATE_COLUMN = "To Date"
+
+# per pollutant: median level, log amplitude of the yearly cycle (positive peaks in
+# winter, negative in summer), log amplitude of the daily cycle and its peak hour,
+# AR(1) persistence and innovation scale of the log noise, and the analyser's upper range
+POLLUTANT_PROFILES = {
+    "PM2.5": {"level": 95.0, "yearly": 0.75, "daily": 0.25, "peak_hour": 22, "phi": 0.97, "sigma": 0.12, "upper": 1000.0},
+    "PM10": {"level": 190.0, "yearly": 0.55, "daily": 0.20, "peak_hour": 21, "phi": 0.96, "sigma": 0.12, "upper": 2000.0},
+    "NO2": {"level": 45.0, "yearly": 0.30, "daily": 0.35, "peak_hour": 20, "phi": 0.90, "sigma": 0.15, "upper": 1000.0},
+    "NOx": {"level": 60.0, "yearly": 0.45, "daily": 0.45, "peak_hour": 20, "phi": 0.90, "sigma": 0.18, "upper": 2000.0},
+    "SO2": {"level": 14.0, "yearly": 0.20, "daily": 0.15, "peak_hour": 11, "phi": 0.93, "sigma": 0.15, "upper": 1000.0},
+    "CO": {"level": 1.3, "yearly": 0.45, "daily": 0.30, "peak_hour": 21, "phi": 0.94, "sigma": 0.14, "upper": 50.0},
+    "Ozone": {"level": 32.0, "yearly": -0.35, "daily": 0.60, "peak_hour": 14, "phi": 0.88, "sigma": 0.18, "upper": 1000.0},
+    "NH3": {"level": 38.0, "yearly": 0.20, "daily": 0.10, "peak_hour": 6, "phi": 0.95, "sigma": 0.12, "upper": 1000.0},
+}
+POLLUTANT_COLUMNS = list(POLLUTANT_PROFILES)
+
+# the yearly cycle peaks in early January
+_YEARLY_PEAK_DAY = 5.0
+_HOURS_PER_YEAR = 24 * 365.25
+_ROWS_PER_CHUNK = 250_000
+
+
+def station_names(stations: int) -> List[str]:
+    return [f"Synthetic Station {index + 1:03d}" for index in range(stations)]
+
+
+def _outage_mask(rng: np.random.Generator, hours: int, stations: int,
+                 gap_fraction: float, mean_gap_hours: float) -> np.ndarray:
+    """
+    True for the station-hours lost to analyser outages, runs of geometric length.
+    """
+    mask = np.zeros((hours + 1, stations), dtype=np.int32)
+    if gap_fraction <= 0:
+        return np.zeros((hours, stations), dtype=bool)
+    for station in range(stations):
+        outages = rng.poisson(gap_fraction * hours / mean_gap_hours)
+        starts = rng.integers(0, hours, outages)
+        ends = np.minimum(starts + rng.geometric(1.0 / mean_gap_hours, outages), hours)
+        np.add.at(mask[:, station], starts, 1)
+        np.add.at(mask[:, station], ends, -1)
+    return np.cumsum(mask[:-1], axis=0) > 0
+
+
+def iter_synthetic_chunks(rows: int, stations: int = 4, start: str = "2021-01-01 00:00",
+                          gap_fraction: float = 0.03, mean_gap_hours: float = 6.0,
+                          none_fraction: float = 0.01, none_strings: bool = True,
+                          seed: int = 0, chunk_rows: int = _ROWS_PER_CHUNK) -> Iterator[pd.DataFrame]:
+    """
+    Stream realistic hourly readings of several stations in chronological order.
+
+    Every pollutant is a log-normal level with a yearly cycle (winter smog, summer ozone), a
+    daily cycle and AR(1) persistence, scaled by a per-station factor. About `gap_fraction`
+    of the station-hours are missing as whole rows, in outages of `mean_gap_hours` on
+    average, and `none_fraction` of the remaining readings are blank, written as the
+    string 'None' like the CPCB exports when `none_strings` is set, else as NaN.
+
+    The generator state (noise, calendar) is carried from chunk to chunk, so any size up to
+    hundreds of millions of rows is produced in constant memory, and the same arguments
+    always give the same data.
+
+    Args:
+        rows (int): Station-hours to generate, before outages are removed.
+        stations (int): Number of stations sharing the timeline.
+        start (str): First hour.
+        gap_fraction (float): Share of station-hours missing as outages.
+        mean_gap_hours (float): Mean outage length in hours.
+        none_fraction (float): Share of the remaining readings left blank.
+        none_strings (bool): Blank readings as the string 'None' (object columns) or NaN.
+        seed (int): Random seed.
+        chunk_rows (int): Approximate rows per yielded frame.
+
+    Yields:
+        pd.DataFrame: Readings with the From Date/To Date, pollutant and station columns.
+
+    Raises:
+        PollutionException: If the arguments are invalid.
+    """
+    try:
+        from scipy.signal import lfilter
+
+        if rows <= 0 or stations <= 0:
+            raise ValueError(f"rows and stations must be positive, got {rows} and {stations}")
+        total_hours = -(-rows // stations)
+        chunk_hours = max(1, chunk_rows // stations)
+        first_hour = np.datetime64(pd.Timestamp(start).to_datetime64(), "h")
+        names = np.array(station_names(stations), dtype=object)
+        rng = np.random.default_rng(seed)
+        station_scale = np.exp(rng.normal(0.0, 0.25, stations))
+        noise_state = np.zeros((len(POLLUTANT_COLUMNS), stations))
+
+        for chunk_start in range(0, total_hours, chunk_hours):
+            hours = min(chunk_hours, total_hours - chunk_start)
+            chunk_rng = np.random.default_rng([seed, chunk_start])
+            hour_index = np.arange(chunk_start, chunk_start + hours)
+            timestamps = first_hour + hour_index.astype("timedelta64[h]")
+            hours_since_start = hour_index.astype(np.float64)
+            start_offset = (first_hour - first_hour.astype("datetime64[Y]")).astype(np.float64)
+            day_of_year = ((hours_since_start + start_offset) % _HOURS_PER_YEAR) / 24.0
+            hour_of_day = (hour_index + int(first_hour.astype(object).hour)) % 24
+
+            keep = ~_outage_mask(chunk_rng, hours, stations, gap_fraction, mean_gap_hours)
+            # the rows of this chunk, hour-major so the frame is in chronological order
+            row_hours, row_stations = np.nonzero(keep)
+            frame = {
+                DATA_INGESTION_WATERMARK_COLUMN: timestamps[row_hours].astype("datetime64[ns]"),
+                TO_DATE_COLUMN: (timestamps[row_hours] + np.timedelta64(1, "h")).astype("datetime64[ns]"),
+            }
+            for index, (column, profile) in enumerate(POLLUTANT_PROFILES.items()):
+                # AR(1) log noise, continued from the last hour of the previous chunk
+                innovations = chunk_rng.normal(0.0, profile["sigma"], (hours, stations))
+                noise, _ = lfilter(
+                    [1.0], [1.0, -profile["phi"]], innovations, axis=0, zi=profile["phi"] * noise_state[index][None, :]
+                )
+                noise_state[index] = noise[-1]
+
+                log_level = (
+                    profile["yearly"] * np.cos(2.0 * np.pi * (day_of_year - _YEARLY_PEAK_DAY) / 365.25)
+                    + profile["daily"] * np.cos(2.0 * np.pi * (hour_of_day - profile["peak_hour"]) / 24.0)
+                )[:, None] + noise
+                values = profile["level"] * station_scale[None, :] * np.exp(log_level)
+                values = np.round(np.minimum(values, profile["upper"])[row_hours, row_stations], 2)
+
+                blank = chunk_rng.random(len(values)) < none_fraction
+                if none_strings:
+                    values = values.astype(object)
+                    values[blank] = "None"
+                else:
+                    values[blank] = np.nan
+                frame[column] = values
+            frame[DATA_INGESTION_STATION_COLUMN] = names[row_stations]
+            yield pd.DataFrame(frame)
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def synthetic_frame(rows: int, **kwargs) -> pd.DataFrame:
+    """
+    Whole synthetic dataset as one frame, for sizes that fit in memory.
+    See `iter_synthetic_chunks` for the arguments.
+    """
+    return pd.concat(list(iter_synthetic_chunks(rows, **kwargs)), ignore_index=True)
+
+
+def to_documents(chunk: pd.DataFrame) -> List[dict]:
+    """
+    MongoDB documents of a chunk, shaped like the ones `push_data.py` loads: native
+    datetimes, float readings, 'None' strings left as they are.
+    """
+    # Timestamps are datetime subclasses, so bson encodes them as native dates
+    columns = {column: chunk[column].to_numpy(dtype=object) for column in chunk.columns}
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def load_synthetic_collection(collection, rows: int, batch_size: int = 10_000, **kwargs) -> int:
+    """
+    Insert a synthetic dataset into a MongoDB (or mongomock) collection.
+
+    Returns:
+        int: Documents inserted.
+
+    Raises:
+        PollutionException: If the inserts fail.
+    """
+    try:
+        inserted = 0
+        for chunk in iter_synthetic_chunks(rows, chunk_rows=batch_size, **kwargs):
+            documents = to_documents(chunk)
+            if documents:
+                collection.insert_many(documents, ordered=False)
+                inserted += len(documents)
+        logging.info(f"Inserted {inserted} synthetic documents into {collection.name}")
+        return inserted
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def write_synthetic_csv(file_path: str, rows: int, **kwargs) -> int:
+    """
+    Write a synthetic dataset in the CPCB CSV layout of `Pollution_Data/` (dd-mm-YYYY HH:MM
+    dates, 'None' for blanks, plus a station column), loadable with `push_data.py`.
+
+    Returns:
+        int: Rows written.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        written = 0
+        for chunk in iter_synthetic_chunks(rows, **kwargs):
+            for column in (DATA_INGESTION_WATERMARK_COLUMN, TO_DATE_COLUMN):
+                chunk[column] = chunk[column].dt.strftime(DATA_INGESTION_DATETIME_FORMAT)
+            chunk.to_csv(file_path, mode="a" if written else "w", header=not written, index=False)
+            written += len(chunk)
+        return written
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def write_synthetic_split(train_file_path: str, test_file_path: str, rows: int,
+                          test_ratio: float = 0.2, **kwargs) -> dict:
+    """
+    Write a synthetic dataset as the parquet train/test split `DataIngestion` produces,
+    with typed float64 readings and the last `test_ratio` of the hours as the test split.
+    Streams chunk by chunk, so it also produces datasets far larger than memory.
+
+    Returns:
+        dict: Rows written to each split.
+
+    Raises:
+        PollutionException: If the files cannot be written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        kwargs["none_strings"] = False
+        stations = kwargs.get("stations", 4)
+        cutoff_hour = int(-(-rows // stations) * (1.0 - test_ratio))
+        first_hour = pd.Timestamp(kwargs.get("start", "2021-01-01 00:00"))
+        cutoff = (first_hour + pd.Timedelta(hours=cutoff_hour)).to_datetime64()
+        writers = {}
+        counts = {"train": 0, "test": 0}
+        try:
+            for chunk in iter_synthetic_chunks(rows, **kwargs):
+                split_at = int(np.searchsorted(chunk[DATA_INGESTION_WATERMARK_COLUMN].to_numpy(), cutoff))
+                for split, part in (("train", chunk.iloc[:split_at]), ("test", chunk.iloc[split_at:])):
+                    if part.empty:
+                        continue
+                    table = pa.Table.from_pandas(part, preserve_index=False)
+                    if split not in writers:
+                        file_path = train_file_path if split == "train" else test_file_path
+                        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                        writers[split] = pq.ParquetWriter(file_path, table.schema)
+                    writers[split].write_table(table)
+                    counts[split] += len(part)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        logging.info(f"Wrote synthetic split of {counts['train']} train and {counts['test']} test rows")
+        return counts
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic hourly Delhi pollution data.")
+    parser.add_argument("--rows", type=int, default=100_000, help="station-hours before outages")
+    parser.add_argument("--stations", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gap-fraction", type=float, default=0.03)
+    parser.add_argument("--none-fraction", type=float, default=0.01)
+    parser.add_argument("--csv", help="write a CPCB style CSV, loadable with push_data.py")
+    parser.add_argument("--split-dir", help="write train.parquet and test.parquet as DataIngestion does")
+    args = parser.parse_args(argv)
+    options = dict(stations=args.stations, seed=args.seed, gap_fraction=args.gap_fraction, none_fraction=args.none_fraction)
+    if args.csv:
+        print(f"{write_synthetic_csv(args.csv, args.rows, **options)} rows written to {args.csv}")
+    if args.split_dir:
+        counts = write_synthetic_split(
+            os.path.join(args.split_dir, "train.parquet"), os.path.join(args.split_dir, "test.parquet"), args.rows, **options
+        )
+        print(f"{counts} rows written to {args.split_dir}")
+
+
+if __name__ == "__main__":
+    main()
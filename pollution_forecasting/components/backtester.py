@@ -0,0 +1,320 @@
+import os
+import sys
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+from threadpoolctl import threadpool_limits
+
+from pollution_forecasting.components.model_trainer import horizon_pairs
+from pollution_forecasting.entity.artifact_entity import BacktestArtifact, DataTransformationArtifact
+from pollution_forecasting.entity.config_entity import BacktestConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import (
+    NumpyArrayWriter,
+    iter_row_blocks,
+    load_numpy_array_data,
+    read_yaml_file,
+    save_numpy_array_data,
+    write_yaml_file,
+)
+
+# cutoffs with fewer labelled training pairs than this are skipped
+_MIN_TRAIN_ROWS = 100
+
+
+def rolling_origin_cutoffs(timestamps: np.ndarray, initial_hours: int, step_hours: int,
+                           train_window_hours: int = 0) -> np.ndarray:
+    """
+    Rolling-origin cutoffs as row ranges over one chronologically sorted array.
+
+    The first origin lies `initial_hours` after the first reading and the others follow every
+    `step_hours`. Each cutoff trains on the rows before its origin (only the last
+    `train_window_hours` of them when set) and forecasts from the rows of the `step_hours`
+    after it.
+
+    Returns:
+        np.ndarray: (n_cutoffs, 3) array of train start, cutoff and test stop rows.
+    """
+    hours = timestamps.astype("datetime64[h]").astype(np.int64)
+    if not len(hours):
+        return np.empty((0, 3), dtype=np.int64)
+    origins = np.arange(hours[0] + initial_hours, hours[-1] + 1, step_hours)
+    cutoffs = np.searchsorted(hours, origins, side="left")
+    stops = np.searchsorted(hours, origins + step_hours, side="left")
+    if train_window_hours:
+        starts = np.searchsorted(hours, origins - train_window_hours, side="left")
+    else:
+        starts = np.zeros_like(cutoffs)
+    ranges = np.stack([starts, cutoffs, stops], axis=1).astype(np.int64)
+    return ranges[stops > cutoffs]
+
+
+def _take_rows(array: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    # gap-free runs of rows are plain slices, i.e. views of the memory-mapped history
+    if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+        return array[rows[0]:rows[-1] + 1]
+    return array[rows]
+
+
+class ResidualChain:
+    """
+    A fitted booster plus the small boosters warm-started on top of it.
+
+    Each warm start fits a few more boosting rounds to the residuals of the chain so far on
+    the grown training window, which continues the squared-error boosting of the first
+    model. sklearn's own `warm_start` re-bins the new data but keeps the old trees' bin
+    thresholds, so it is not used here.
+    """
+
+    def __init__(self, model: HistGradientBoostingRegressor):
+        self.models = [model]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        predictions = self.models[0].predict(X)
+        for model in self.models[1:]:
+            predictions += model.predict(X)
+        return predictions
+
+    def warm_start(self, X: np.ndarray, y: np.ndarray, weight: np.ndarray, params: dict) -> None:
+        residual = np.where(weight > 0, y - self.predict(X), 0.0)
+        model = HistGradientBoostingRegressor(**params)
+        model.fit(X, residual, sample_weight=weight)
+        self.models.append(model)
+
+
+def backtest_chunk(task: dict) -> List[dict]:
+    """
+    Backtest consecutive cutoffs of one (pollutant, horizon) model. Runs inside a worker process.
+
+    The first cutoff of the chunk is a full refit, every following one warm-starts the model
+    of the cutoff before it. Training and test rows are index ranges into the shared
+    memory-mapped history, so no cutoff copies the stored data.
+    """
+    history = load_numpy_array_data(task["history_file_path"], mmap_mode="r")
+    timestamps = load_numpy_array_data(task["history_timestamps_file_path"])
+    # targets are paired within a station; the label hours still ascend with the rows, so
+    # the searches against the cutoffs, which fall on hour boundaries, stay valid
+    rows, future = horizon_pairs(timestamps, task["horizon"], load_numpy_array_data(task["history_stations_file_path"]))
+    labels = np.asarray(history[future, task["target_index"]], dtype=np.float64)
+    known = ~np.isnan(labels)
+    labels = np.where(known, labels, 0.0)
+    weights = known.astype(np.float64)
+    warm_params = {**task["model_params"], "max_iter": task["warm_start_iter"], "early_stopping": False}
+
+    results, chain = [], None
+    with threadpool_limits(limits=task["threads"]):
+        for start, cutoff, stop in task["cutoffs"]:
+            started = time.perf_counter()
+            # training pairs start inside the window and have their label before the cutoff
+            train = slice(np.searchsorted(rows, start), max(np.searchsorted(rows, start), np.searchsorted(future, cutoff)))
+            test = slice(np.searchsorted(rows, cutoff), np.searchsorted(rows, stop))
+            if weights[train].sum() < _MIN_TRAIN_ROWS or not known[test].any():
+                continue
+
+            x_train = _take_rows(history, rows[train])
+            refit = chain is None
+            if refit:
+                model = HistGradientBoostingRegressor(**task["model_params"])
+                model.fit(x_train, labels[train], sample_weight=weights[train])
+                chain = ResidualChain(model)
+            else:
+                chain.warm_start(x_train, labels[train], weights[train], warm_params)
+
+            test_known = known[test]
+            actual = labels[test][test_known]
+            predicted = chain.predict(_take_rows(history, rows[test]))[test_known]
+            error = predicted - actual
+            denominator = np.abs(actual) + np.abs(predicted)
+            scaled = denominator > 0
+            results.append({
+                "pollutant": task["pollutant"],
+                "horizon": task["horizon"],
+                "cutoff": pd.Timestamp(timestamps[cutoff]).isoformat(),
+                "refit": refit,
+                "train_rows": int(weights[train].sum()),
+                "test_rows": int(len(actual)),
+                "abs_error_sum": float(np.abs(error).sum()),
+                "squared_error_sum": float((error ** 2).sum()),
+                "smape_sum": float((2.0 * np.abs(error[scaled]) / denominator[scaled]).sum()),
+                "smape_rows": int(scaled.sum()),
+                "seconds": round(time.perf_counter() - started, 3),
+            })
+    return results
+
+
+class Backtester:
+    """
+    Rolling-origin backtest of the direct (pollutant, horizon) models.
+
+    The transformed train and test arrays are written once, in time order, into one history
+    array that every worker memory-maps. Cutoffs are row ranges over it. The cutoffs of each
+    model are cut into runs of `refit_every`, which run in parallel over a process pool;
+    inside a run every cutoff warm-starts the model of the previous one, so hundreds of
+    cutoffs cost a fraction of as many full refits.
+    """
+
+    def __init__(self, data_transformation_artifact: DataTransformationArtifact, backtest_config: BacktestConfig):
+        try:
+            self.data_transformation_artifact = data_transformation_artifact
+            self.backtest_config = backtest_config
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def build_history(self) -> np.ndarray:
+        """
+        Write the train and test arrays as one chronologically ordered history, block by block,
+        with the station codes of its rows alongside.
+
+        Returns:
+            np.ndarray: Timestamps of the history rows.
+        """
+        try:
+            artifact, config = self.data_transformation_artifact, self.backtest_config
+            parts = [
+                load_numpy_array_data(artifact.transformed_train_file_path, mmap_mode="r"),
+                load_numpy_array_data(artifact.transformed_test_file_path, mmap_mode="r"),
+            ]
+            timestamps = np.concatenate([
+                load_numpy_array_data(artifact.transformed_train_timestamps_file_path),
+                load_numpy_array_data(artifact.transformed_test_timestamps_file_path),
+            ])
+            stations = np.concatenate([
+                load_numpy_array_data(artifact.transformed_train_stations_file_path),
+                load_numpy_array_data(artifact.transformed_test_stations_file_path),
+            ])
+            order = np.argsort(timestamps, kind="stable")
+            train_rows = len(parts[0])
+            with NumpyArrayWriter(config.history_file_path, parts[0].shape[1], parts[0].dtype, rows=len(timestamps)) as writer:
+                if np.array_equal(order, np.arange(len(order))):
+                    for part in parts:
+                        for _, block in iter_row_blocks(part, config.block_rows):
+                            writer.append(block)
+                else:
+                    # splits that overlap in time are interleaved row by row
+                    for _, block_order in iter_row_blocks(order, config.block_rows):
+                        from_train = block_order < train_rows
+                        block = np.empty((len(block_order), parts[0].shape[1]), dtype=parts[0].dtype)
+                        block[from_train] = parts[0][block_order[from_train]]
+                        block[~from_train] = parts[1][block_order[~from_train] - train_rows]
+                        writer.append(block)
+            timestamps = timestamps[order]
+            save_numpy_array_data(config.history_timestamps_file_path, timestamps)
+            save_numpy_array_data(config.history_stations_file_path, stations[order])
+            return timestamps
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def initiate_backtest(self) -> BacktestArtifact:
+        """
+        Backtest every (pollutant, horizon) model over the rolling-origin cutoffs and write the
+        per-cutoff and per-horizon metric tables.
+
+        Returns:
+            BacktestArtifact: Paths of the metric tables and the report.
+
+        Raises:
+            PollutionException: If the history cannot be built or a cutoff fails.
+        """
+        try:
+            logging.info("Starting backtest.")
+            started = time.perf_counter()
+            config = self.backtest_config
+            columns = read_yaml_file(self.data_transformation_artifact.transformed_columns_file_path)["columns"]
+            timestamps = self.build_history()
+            cutoffs = rolling_origin_cutoffs(timestamps, config.initial_hours, config.step_hours, config.train_window_hours)
+            if not len(cutoffs):
+                raise ValueError(f"No cutoffs: the history spans less than {config.initial_hours} hours")
+
+            runs = [cutoffs[i:i + config.refit_every].tolist() for i in range(0, len(cutoffs), max(1, config.refit_every))]
+            tasks = [
+                {
+                    "pollutant": pollutant,
+                    "horizon": int(horizon),
+                    "target_index": columns.index(pollutant),
+                    "cutoffs": run,
+                    "history_file_path": config.history_file_path,
+                    "history_timestamps_file_path": config.history_timestamps_file_path,
+                    "history_stations_file_path": config.history_stations_file_path,
+                    "model_params": config.model_params,
+                    "warm_start_iter": config.warm_start_iter,
+                }
+                for pollutant in config.target_pollutants if pollutant in columns
+                for horizon in config.horizons
+                for run in runs
+            ]
+            workers = max(1, min(config.workers, len(tasks)))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            for task in tasks:
+                task["threads"] = threads
+            logging.info(f"Backtesting {len(cutoffs)} cutoffs in {len(tasks)} warm-started runs with {workers} workers")
+
+            if workers == 1:
+                results = [result for task in tasks for result in backtest_chunk(task)]
+            else:
+                results = []
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(backtest_chunk, task) for task in tasks]
+                    for future in as_completed(futures):
+                        results.extend(future.result())
+            if not results:
+                raise ValueError("No cutoff had enough labelled rows to backtest")
+
+            cutoff_metrics = pd.DataFrame(results).sort_values(["pollutant", "horizon", "cutoff"], ignore_index=True)
+            cutoff_metrics["mae"] = cutoff_metrics["abs_error_sum"] / cutoff_metrics["test_rows"]
+            cutoff_metrics["rmse"] = np.sqrt(cutoff_metrics["squared_error_sum"] / cutoff_metrics["test_rows"])
+            cutoff_metrics["smape"] = 100.0 * cutoff_metrics["smape_sum"] / cutoff_metrics["smape_rows"].where(cutoff_metrics["smape_rows"] > 0)
+
+            # pooled over every test row of every cutoff, not averaged per cutoff
+            totals = cutoff_metrics.groupby(["pollutant", "horizon"]).agg(
+                cutoffs=("cutoff", "size"),
+                refits=("refit", "sum"),
+                test_rows=("test_rows", "sum"),
+                abs_error_sum=("abs_error_sum", "sum"),
+                squared_error_sum=("squared_error_sum", "sum"),
+                smape_sum=("smape_sum", "sum"),
+                smape_rows=("smape_rows", "sum"),
+            ).reset_index()
+            metrics = totals[["pollutant", "horizon", "cutoffs", "refits", "test_rows"]].copy()
+            metrics["mae"] = totals["abs_error_sum"] / totals["test_rows"]
+            metrics["rmse"] = np.sqrt(totals["squared_error_sum"] / totals["test_rows"])
+            metrics["smape"] = 100.0 * totals["smape_sum"] / totals["smape_rows"].where(totals["smape_rows"] > 0)
+
+            os.makedirs(config.backtest_dir, exist_ok=True)
+            metrics.to_csv(config.metrics_file_path, index=False)
+            cutoff_metrics.to_csv(config.cutoff_metrics_file_path, index=False)
+            write_yaml_file(config.report_file_path, {
+                "cutoffs": int(len(cutoffs)),
+                "first_cutoff": pd.Timestamp(timestamps[cutoffs[0, 1]]).isoformat(),
+                "last_cutoff": pd.Timestamp(timestamps[cutoffs[-1, 1]]).isoformat(),
+                "step_hours": config.step_hours,
+                "train_window_hours": config.train_window_hours,
+                "refit_every": config.refit_every,
+                "warm_start_iter": config.warm_start_iter,
+                "workers": workers,
+                "seconds": round(time.perf_counter() - started, 3),
+                "metrics": {
+                    f"{row.pollutant}_{row.horizon}h": {
+                        "mae": float(row.mae),
+                        "rmse": float(row.rmse),
+                        "smape": None if math.isnan(row.smape) else float(row.smape),
+                    }
+                    for row in metrics.itertuples()
+                },
+            }, replace=True)
+
+            backtest_artifact = BacktestArtifact(
+                metrics_file_path=config.metrics_file_path,
+                cutoff_metrics_file_path=config.cutoff_metrics_file_path,
+                report_file_path=config.report_file_path,
+            )
+            logging.info(f"Backtest artifact: {backtest_artifact}")
+            return backtest_artifact
+
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -5,19 +5,30 @@ from pollution_forecasting.logging.logger import logging
 
 from pollution_forecasting.entity.config_entity import DataIngestionConfig
 from pollution_forecasting.entity.artifact_entity import DataIngestionArtifact
+from pollution_forecasting.constant.training_pipeline import SCHEMA_FILE_PATH, DATA_INGESTION_DATETIME_FORMAT
+from pollution_forecasting.utils.main.utils import (
+    apply_dtypes,
+    log_memory_savings,
+    read_yaml_file,
+    schema_dtypes,
+    write_dataframe,
+    write_yaml_file,
+)
+from pollution_forecasting.utils.feature_store.feature_store import FeatureStore
+from pollution_forecasting.utils.mongo.aggregation import AirQualityQuery
+from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
 
 import os
 import sys
+import time
+import itertools
 import numpy as np
 import pandas as pd
-import pymongo
-from typing import List
-from sklearn.model_selection import train_test_split
+from typing import Dict, Iterator, List, Optional
 
-from dotenv import load_dotenv
-load_dotenv()
 
-MONGO_DB_URL = os.getenv("MONGO_DB_URL")
+# pymongo.ASCENDING and pymongo.DESCENDING, without importing pymongo for them
+ASCENDING, DESCENDING = 1, -1
 
 
 class DataIngestion:
@@ -37,12 +48,314 @@ class DataIngestion:
         """
         try:
             self.data_ingestion_config = data_ingestion_config
+            self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self.feature_store = FeatureStore(
+                root_dir=data_ingestion_config.feature_store_file_path,
+                schema_config=self._schema_config,
+                timestamp_column=data_ingestion_config.watermark_column,
+                datetime_format=data_ingestion_config.datetime_format,
+            )
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def get_collection(self):
+        """
+        Return the configured MongoDB collection, from the process-wide shared client.
+
+        Returns:
+            pymongo.collection.Collection: The air quality collection.
+        """
+        if getattr(self, "mongo_client", None) is None:
+            self.mongo_client = get_mongo_client()
+        database_name = self.data_ingestion_config.database_name
+        collection_name = self.data_ingestion_config.collection_name
+        return self.mongo_client[database_name][collection_name]
+
+    def get_query(self) -> AirQualityQuery:
+        """
+        Aggregation query layer over the configured collection.
+
+        Returns:
+            AirQualityQuery: Query layer with this ingestion's timestamp and station columns.
+        """
+        if getattr(self, "_query", None) is None:
+            self._query = AirQualityQuery(
+                self.get_collection(),
+                timestamp_column=self.data_ingestion_config.watermark_column,
+                station_column=self.data_ingestion_config.station_column,
+                datetime_format=self.data_ingestion_config.datetime_format,
+                batch_size=self.data_ingestion_config.batch_size,
+            )
+        return self._query
+
+    def station_filter(self) -> dict:
+        """
+        MongoDB filter restricting every query to the configured station shard.
+
+        Returns:
+            dict: `{station_column: station}`, or an empty filter when not sharded by station.
+        """
+        if self.data_ingestion_config.station is None:
+            return {}
+        return {self.data_ingestion_config.station_column: self.data_ingestion_config.station}
+
+    def list_stations(self) -> List[str]:
+        """
+        Distinct station keys of the collection, read from the station index.
+
+        Returns:
+            List[str]: Sorted station names, empty when the documents carry no station key.
+
+        Raises:
+            PollutionException: If MongoDB cannot be queried.
+        """
+        try:
+            collection = self.get_collection()
+            station_column = self.data_ingestion_config.station_column
+            collection.create_index([
+                (station_column, ASCENDING), (self.data_ingestion_config.watermark_column, ASCENDING)
+            ])
+            return sorted(str(station) for station in collection.distinct(station_column) if station is not None)
+
         except Exception as e:
             raise PollutionException(e, sys)
 
-    def export_collection_as_dataframe(self):
+    def collection_fingerprint(self) -> dict:
+        """
+        Cheap summary of the collection state used to key the stage cache.
+
+        Uses the collection metadata count and the newest `watermark_column` value (an
+        index lookup), so it detects appended readings without scanning the collection.
+        In-place edits of existing documents are not detected.
+
+        Returns:
+            dict: Document count and latest timestamp of the collection.
+
+        Raises:
+            PollutionException: If MongoDB cannot be queried.
+        """
+        try:
+            collection = self.get_collection()
+            watermark_column = self.data_ingestion_config.watermark_column
+            station_filter = self.station_filter()
+            latest = collection.find_one(
+                station_filter, projection={"_id": 0, watermark_column: 1}, sort=[(watermark_column, DESCENDING)]
+            )
+            # a station shard counts through the (station, timestamp) index instead of the metadata
+            documents = collection.count_documents(station_filter) if station_filter else collection.estimated_document_count()
+            return {
+                "documents": documents,
+                "latest": str(latest.get(watermark_column)) if latest else None,
+            }
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _documents_to_columns(self, documents: List[dict]) -> Dict[str, np.ndarray]:
+        """
+        Convert one cursor batch of documents into typed column buffers.
+
+        Numerical schema columns become float64 arrays (with "na"/"None" coerced to NaN),
+        every other column is kept as an object array with "na" replaced by NaN.
+
+        Args:
+            documents (List[dict]): Documents fetched in a single cursor batch.
+
+        Returns:
+            Dict[str, np.ndarray]: Mapping of column name to a 1-D array of length len(documents).
+        """
+        numerical_columns = set(self._schema_config["numerical_columns"])
+        columns: Dict[str, np.ndarray] = {}
+        for document in documents:
+            for key in document:
+                if key not in columns:
+                    columns[key] = None
+
+        for column in columns:
+            values = [document.get(column, np.nan) for document in documents]
+            if column in numerical_columns:
+                columns[column] = pd.to_numeric(
+                    pd.Series(values, dtype=object), errors="coerce"
+                ).to_numpy(dtype=np.float64)
+            else:
+                array = np.array(values, dtype=object)
+                array[array == "na"] = np.nan
+                columns[column] = array
+        return columns
+
+    def iter_collection_batches(self, query: Optional[dict] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Stream the MongoDB collection as typed column buffers, one cursor batch at a time.
+
+        The `_id` field is excluded by a server-side projection and at most
+        `batch_size` documents are held as Python dicts at any moment.
+
+        Args:
+            query (Optional[dict]): MongoDB filter document. Defaults to the whole collection.
+
+        Yields:
+            Dict[str, np.ndarray]: Typed column buffers for one batch of documents.
+
+        Raises:
+            PollutionException: If reading from MongoDB fails.
+        """
+        try:
+            batch_size = self.data_ingestion_config.batch_size
+            collection = self.get_collection()
+
+            cursor = collection.find(query or {}, projection={"_id": 0}, batch_size=batch_size)
+            while True:
+                documents = list(itertools.islice(cursor, batch_size))
+                if not documents:
+                    break
+                yield self._documents_to_columns(documents)
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def read_watermark(self) -> Optional[pd.Timestamp]:
+        """
+        Read the persisted high-water mark of the feature store.
+
+        Returns:
+            Optional[pd.Timestamp]: Latest `watermark_column` value already in the feature store,
+            or None when there is no watermark or no feature store to append to.
+
+        Raises:
+            PollutionException: If the watermark file cannot be read.
+        """
+        try:
+            watermark_file_path = self.data_ingestion_config.watermark_file_path
+            if not (os.path.exists(watermark_file_path) and self.feature_store.exists()):
+                return None
+            content = read_yaml_file(watermark_file_path) or {}
+            if content.get("column") != self.data_ingestion_config.watermark_column or not content.get("watermark"):
+                return None
+            return pd.Timestamp(content["watermark"])
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def write_watermark(self, dataframe: pd.DataFrame) -> None:
+        """
+        Persist the latest `watermark_column` value of the given rows as the new high-water mark.
+
+        Args:
+            dataframe (pd.DataFrame): Rows that were just written to the feature store.
+
+        Raises:
+            PollutionException: If the watermark cannot be written.
+        """
+        try:
+            watermark_column = self.data_ingestion_config.watermark_column
+            if dataframe.empty or watermark_column not in dataframe.columns:
+                return
+            timestamps = pd.to_datetime(
+                dataframe[watermark_column], format=self.data_ingestion_config.datetime_format, errors="coerce"
+            )
+            watermark = timestamps.max()
+            if pd.isna(watermark):
+                return
+            previous = self.read_watermark()
+            if previous is not None and previous >= watermark:
+                return
+            write_yaml_file(
+                file_path=self.data_ingestion_config.watermark_file_path,
+                content={"column": watermark_column, "watermark": watermark.isoformat()},
+                replace=True,
+            )
+            logging.info(f"Feature store watermark moved to {watermark}")
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def build_delta_query(self, watermark: Optional[pd.Timestamp]) -> dict:
+        """
+        Build the MongoDB filter selecting documents newer than the watermark.
+
+        Documents loaded with a native BSON date are matched with a plain range
+        query backed by an index on `watermark_column`. Documents that still carry
+        the CPCB `dd-mm-YYYY HH:MM` string are parsed on the server instead, so only
+        the delta is transferred even though the comparison cannot use the index.
+
+        The configured `start_date`/`end_date` history window is pushed into the same
+        filter, and in a station shard the filter is also restricted to the station,
+        backed by a (station, timestamp) index.
+
+        Args:
+            watermark (Optional[pd.Timestamp]): Current high-water mark, or None for a full export.
+
+        Returns:
+            dict: Filter document for `collection.find`.
+
+        Raises:
+            PollutionException: If the collection cannot be inspected.
+        """
+        try:
+            watermark_column = self.data_ingestion_config.watermark_column
+            collection = self.get_collection()
+            if self.data_ingestion_config.station is not None:
+                collection.create_index([
+                    (self.data_ingestion_config.station_column, ASCENDING), (watermark_column, ASCENDING)
+                ])
+            if watermark is not None or self.data_ingestion_config.start_date or self.data_ingestion_config.end_date:
+                collection.create_index([(watermark_column, ASCENDING)])
+
+            return self.get_query().match_filter(
+                start=self.data_ingestion_config.start_date,
+                end=self.data_ingestion_config.end_date,
+                station=self.data_ingestion_config.station,
+                after=watermark,
+            )
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def drop_stored_rows(self, dataframe: pd.DataFrame, since: pd.Timestamp) -> pd.DataFrame:
+        """
+        Drop the rows of a delta that the feature store already holds.
+
+        An incremental export re-reads the `lookback_hours` before the watermark, so the
+        delta overlaps the store. Rows are matched on (station, `watermark_column`), or on
+        the timestamp alone when the documents carry no station key; a stored row is kept
+        as it is.
+
+        Args:
+            dataframe (pd.DataFrame): Rows exported from MongoDB after `since`.
+            since (pd.Timestamp): Start of the re-read window.
+
+        Returns:
+            pd.DataFrame: The rows that are not in the feature store yet.
+
+        Raises:
+            PollutionException: If the feature store cannot be read.
+        """
+        try:
+            config = self.data_ingestion_config
+            keys = [column for column in (config.station_column, config.watermark_column) if column in dataframe.columns]
+            if dataframe.empty or config.watermark_column not in keys:
+                return dataframe
+            dataframe = self.feature_store.coerce_schema(dataframe)
+            stored = self.feature_store.read(columns=keys, start=since)
+            if stored.empty:
+                return dataframe
+            new = ~pd.MultiIndex.from_frame(dataframe[keys]).isin(pd.MultiIndex.from_frame(stored[keys]))
+            logging.info(f"Dropped {int((~new).sum())} re-read rows already in the feature store")
+            return dataframe[new].reset_index(drop=True)
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def export_collection_as_dataframe(self, query: Optional[dict] = None):
         """
         Fetch data from MongoDB collection and convert it to a pandas DataFrame.
+
+        Documents are streamed in batches of `batch_size` and accumulated as typed
+        column chunks, so the transient overhead on top of the final DataFrame is
+        bounded by one batch rather than by the size of the whole collection.
+
+        Args:
+            query (Optional[dict]): MongoDB filter document. Defaults to the whole collection.
         
         Returns:
             pd.DataFrame: DataFrame containing the data from MongoDB collection.
@@ -51,43 +364,65 @@ class DataIngestion:
             PollutionException: If data export fails.
         """
         try:
-            database_name = self.data_ingestion_config.database_name
-            collection_name = self.data_ingestion_config.collection_name
-            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
-            collection = self.mongo_client[database_name][collection_name]
-            
-            df = pd.DataFrame(list(collection.find()))
+            start_time = time.perf_counter()
+            chunks: Dict[str, List[np.ndarray]] = {}
+            number_of_rows = 0
 
-            if "_id" in df.columns.to_list():
-                df.drop(columns=["_id"], axis=1, inplace=True)
+            for batch in self.iter_collection_batches(query):
+                batch_rows = len(next(iter(batch.values())))
+                for column in batch:
+                    if column not in chunks:
+                        # column first seen in this batch, pad the rows read so far
+                        chunks[column] = [np.full(number_of_rows, np.nan)] if number_of_rows else []
+                for column, column_chunks in chunks.items():
+                    column_chunks.append(batch.get(column, np.full(batch_rows, np.nan)))
+                number_of_rows += batch_rows
 
-            df.replace({"na": np.nan}, inplace=True)
+            data = {}
+            for column in list(chunks):
+                column_chunks = chunks.pop(column)
+                data[column] = np.concatenate(column_chunks) if column_chunks else np.array([])
+                del column_chunks
+            df = pd.DataFrame(data, copy=False)
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(
+                f"Exported {number_of_rows} rows from MongoDB in {elapsed:.2f}s "
+                f"({number_of_rows / elapsed if elapsed else 0:.0f} rows/sec)"
+            )
 
             return df
 
         except Exception as e:
             raise PollutionException(e, sys)
 
-    def export_data_into_feature_store(self, dataframe: pd.DataFrame):
+    def export_data_into_feature_store(self, dataframe: pd.DataFrame, append: bool = False):
         """
-        Save the DataFrame to a CSV file in the feature store location.
+        Save the DataFrame to the partitioned Parquet feature store.
+
+        Columns are cast to the types declared in the schema before writing. In append
+        mode only the given rows are added as new part files and the merged feature
+        store is returned.
         
         Args:
             dataframe (pd.DataFrame): DataFrame to be saved to the feature store.
+            append (bool, optional): Append to the existing feature store instead of overwriting it. Defaults to False.
             
         Returns:
-            pd.DataFrame: The input DataFrame (unchanged).
+            pd.DataFrame: The typed input DataFrame, or the merged feature store in append mode.
             
         Raises:
             PollutionException: If saving to feature store fails.
         """
         try:
-            feature_store_file_path = self.data_ingestion_config.feature_store_file_path
-            # Creating folder
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            dataframe.to_csv(feature_store_file_path, index=False, header=True)
-            
+            append = append and self.feature_store.exists()
+            self.feature_store.write(dataframe, append=append)
+            self.write_watermark(dataframe)
+
+            if append:
+                logging.info(f"Appended {len(dataframe)} rows to the feature store")
+                return self.feature_store.read()
+
             return dataframe
             
         except Exception as e:
@@ -95,19 +430,36 @@ class DataIngestion:
         
     def split_data_as_train_test(self, dataframe: pd.DataFrame):
         """
-        Split the input DataFrame into training and testing sets and save them as CSV files.
-        
+        Split the input DataFrame chronologically into training and testing sets and save them as Parquet files.
+
+        Every reading at or after the cutoff hour goes to the test set, so the test set holds
+        the most recent `train_test_split_ratio` of the hours and no training row lies in its
+        future. Both halves are row slices of the time-ordered frame, not shuffled copies.
+
         Args:
             dataframe (pd.DataFrame): DataFrame to be split into training and testing sets.
-            
+
         Raises:
             PollutionException: If splitting or saving the data fails.
         """
         try:
-            train_set, test_set = train_test_split(
-                dataframe, test_size=self.data_ingestion_config.train_test_split_ratio
-            )
-            logging.info("Performed train test split on the dataframe")
+            timestamp_column = self.data_ingestion_config.watermark_column
+            timestamps = dataframe[timestamp_column]
+            if not pd.api.types.is_datetime64_any_dtype(timestamps):
+                timestamps = pd.to_datetime(timestamps, format=DATA_INGESTION_DATETIME_FORMAT, errors="coerce")
+            if not timestamps.is_monotonic_increasing:
+                order = np.argsort(timestamps.to_numpy(), kind="stable")
+                dataframe, timestamps = dataframe.iloc[order], timestamps.iloc[order]
+
+            # cut on distinct hours, so all stations' readings of one hour land on the same side
+            values = timestamps.to_numpy()
+            hours = np.unique(values[~np.isnat(values)])
+            cutoff, split_at = None, len(dataframe)
+            if len(hours):
+                cutoff = hours[min(len(hours) - 1, int(len(hours) * (1 - self.data_ingestion_config.train_test_split_ratio)))]
+                split_at = int(np.searchsorted(values, cutoff))
+            train_set, test_set = dataframe.iloc[:split_at], dataframe.iloc[split_at:]
+            logging.info(f"Performed chronological train test split at {cutoff}: {len(train_set)} train and {len(test_set)} test rows")
 
             logging.info(
                 "Exited split_data_as_train_test method of Data_Ingestion class"
@@ -119,13 +471,8 @@ class DataIngestion:
             
             logging.info("Exporting train and test file path.")
             
-            train_set.to_csv(
-                self.data_ingestion_config.training_file_path, index=False, header=True
-            )
-
-            test_set.to_csv(
-                self.data_ingestion_config.testing_file_path, index=False, header=True
-            )
+            write_dataframe(self.data_ingestion_config.training_file_path, train_set)
+            write_dataframe(self.data_ingestion_config.testing_file_path, test_set)
             logging.info("Exported train and test file path.")
             
         except Exception as e:
@@ -136,9 +483,11 @@ class DataIngestion:
         Orchestrate the complete data ingestion process.
         
         This method coordinates the workflow of:
-        1. Exporting data from MongoDB to a DataFrame
-        2. Saving the data to the feature store
-        3. Splitting the data into training and testing sets
+        1. Exporting data from MongoDB to a DataFrame (only documents newer than the
+           feature store watermark minus `lookback_hours` when incremental ingestion is
+           enabled, without the rows the feature store already holds)
+        2. Saving or appending the data to the feature store
+        3. Splitting the merged feature store into training and testing sets
         
         Returns:
             Tuple[str, str]: Paths to the training and testing files.
@@ -147,9 +496,24 @@ class DataIngestion:
             PollutionException: If any part of the data ingestion process fails.
         """
         try:
-            dataframe = self.export_collection_as_dataframe()
-            # Complete this method with feature store export and train/test split
-            dataframe = self.export_data_into_feature_store(dataframe)
+            watermark = self.read_watermark() if self.data_ingestion_config.incremental else None
+            since = None
+            if watermark is not None:
+                # the watermark is the latest reading of any station, so other stations' readings of
+                # the same hours, and late uploads, would be lost behind a strict watermark
+                since = watermark - pd.Timedelta(hours=self.data_ingestion_config.lookback_hours)
+                logging.info(f"Incremental ingestion of documents newer than {since} (watermark {watermark})")
+            query = self.build_delta_query(since)
+            dataframe = self.export_collection_as_dataframe(query)
+            if since is not None:
+                dataframe = self.drop_stored_rows(dataframe, since)
+            dataframe = self.export_data_into_feature_store(dataframe, append=watermark is not None)
+            if self.data_ingestion_config.compact_dtypes:
+                # the feature store keeps float64, the compact dtypes start with the split handed downstream
+                dataframe = apply_dtypes(dataframe, schema_dtypes(
+                    self._schema_config, compact=True, key_columns=(self.data_ingestion_config.station_column,)
+                ))
+                log_memory_savings("data_ingestion", dataframe)
             self.split_data_as_train_test(dataframe)
             
             dataingestionartifact = DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path, test_file_path=self.data_ingestion_config.testing_file_path)
@@ -1,48 +1,120 @@
 import sys
-import os
+import hashlib
+from typing import Optional
 import numpy as np
 import pandas as pd
-from sklearn.impute import KNNImputer
 from sklearn.pipeline import Pipeline
 
-from pollution_forecasting.constant.training_pipeline import (
-    TARGET_COLUMN,
-    DATA_TRANSFORMATION_IMPUTER_PARAMS
-)
+from pollution_forecasting.constant.training_pipeline import DATA_INGESTION_STATION_COLUMN, TARGET_COLUMN
 from pollution_forecasting.entity.artifact_entity import (
     DataTransformationArtifact,
-    DataValidationArtifact
+    FeatureEngineeringArtifact
 )
 from pollution_forecasting.entity.config_entity import DataTransformationConfig
 from pollution_forecasting.exception.exception import PollutionException
 from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.ml_utils.drift.drift_engine import ReservoirSampler
+from pollution_forecasting.utils.ml_utils.imputation.imputer import SeasonalInterpolationImputer
+from pollution_forecasting.utils.ml_utils.model.model_store import ModelStore, file_hash
 from pollution_forecasting.utils.main.utils import (
+    NumpyArrayWriter,
+    dataframe_row_count,
+    iter_dataframe_chunks,
+    iter_row_blocks,
+    load_object,
+    log_memory_savings,
+    peak_rss_bytes,
+    read_dataframe,
     save_numpy_array_data,
-    save_object
+    save_object,
+    write_yaml_file
 )
 
+POLLUTANT_COLUMNS = ['PM2.5', 'PM10', 'NO2', 'NOx', 'SO2', 'CO', 'Ozone', 'NH3']
+_NANOSECONDS_PER_HOUR = 3_600_000_000_000
+
+
+def station_codes(stations) -> np.ndarray:
+    """
+    Int64 code of every row's station, derived from the station name alone, so a station
+    has the same code in every split, chunk and run.
+    """
+    labels, names = pd.factorize(pd.Series(stations).astype(str), use_na_sentinel=False)
+    codes = np.array(
+        [int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little", signed=True) for name in names],
+        dtype=np.int64,
+    )
+    return codes[labels]
+
 
 class DataTransformation:
-    def __init__(self, data_validation_artifact: DataValidationArtifact,
+    def __init__(self, feature_engineering_artifact: FeatureEngineeringArtifact,
                  data_transformation_config: DataTransformationConfig):
         try:
-            self.data_validation_artifact = data_validation_artifact
+            self.feature_engineering_artifact = feature_engineering_artifact
             self.data_transformation_config = data_transformation_config
         except Exception as e:
             raise PollutionException(e, sys)
 
     @staticmethod
-    def read_data(file_path: str) -> pd.DataFrame:
+    def read_data(file_path: str, columns: list = None) -> pd.DataFrame:
+        try:
+            return read_dataframe(file_path, columns=columns)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    @staticmethod
+    def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Numeric model inputs of an engineered split, indexed by timestamp in chronological order.
+
+        The station column is kept when the split has one, so rows of different stations can
+        be told apart; `pop_station_codes` takes it off before the frame is a model input.
+        """
         try:
-            return pd.read_csv(file_path)
+            if not pd.api.types.is_datetime64_any_dtype(df['From Date']):
+                df['From Date'] = pd.to_datetime(df['From Date'], format='%d-%m-%Y %H:%M')
+            df.set_index('From Date', inplace=True)
+            df.drop(columns=['To Date'], inplace=True, errors='ignore')
+            # only legacy text columns need coercing, typed (e.g. compact float32) columns are kept as they are
+            text_columns = [column for column in POLLUTANT_COLUMNS if not pd.api.types.is_numeric_dtype(df[column])]
+            if text_columns:
+                df[text_columns] = df[text_columns].replace('None', np.nan).apply(pd.to_numeric, errors='coerce')
+            # pollutants plus the engineered features, and the station tag that keys the series
+            stations = df[DATA_INGESTION_STATION_COLUMN] if DATA_INGESTION_STATION_COLUMN in df.columns else None
+            df = df.select_dtypes(include='number')
+            if stations is not None:
+                df[DATA_INGESTION_STATION_COLUMN] = stations
+            # chronological rows, so the model trainer can align each row with the reading h hours later
+            return df if df.index.is_monotonic_increasing else df.sort_index(kind='stable')
         except Exception as e:
             raise PollutionException(e, sys)
 
+    @staticmethod
+    def pop_station_codes(df: pd.DataFrame):
+        """
+        Remove the station column of a prepared frame and return the `station_codes` of its
+        rows, or None for a split without a station column (one series).
+        """
+        if DATA_INGESTION_STATION_COLUMN not in df.columns:
+            return None
+        return station_codes(df.pop(DATA_INGESTION_STATION_COLUMN))
+
+    @staticmethod
+    def impute(preprocessor: Pipeline, df: pd.DataFrame, stations=None) -> np.ndarray:
+        """
+        Imputed features of a prepared frame. Readings are only carried forward within a
+        station, never from one station's series into another's gaps.
+        """
+        if stations is None:
+            return preprocessor.transform(df)
+        return preprocessor[-1].transform_rows(df, df.index, groups=stations)
+
     def get_data_transformer_object(self) -> Pipeline:
         logging.info("Entered the get_data_transformer_object method of Data Transformation class")
         try:
-            imputer = KNNImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
-            logging.info("Data transformation object (KNNImputer) created successfully.")
+            imputer = SeasonalInterpolationImputer(**self.data_transformation_config.imputer_params)
+            logging.info("Data transformation object (SeasonalInterpolationImputer) created successfully.")
             processor = Pipeline([
                 ("imputer", imputer)
             ])
@@ -51,53 +123,251 @@ class DataTransformation:
         except Exception as e:
             raise PollutionException(e, sys)
 
+    def fit_on_sample(self, file_path: str):
+        """
+        Fit the preprocessor on a uniform sample of at most `fit_sample_rows` rows of an
+        engineered split, drawn in one streaming pass, for the chunked mode.
+
+        The imputer only learns the column medians and the hour-of-week means, which a sample
+        of a few hundred thousand rows estimates closely, so memory is bounded by the sample
+        and one chunk. The hour of every sampled row travels along as an extra column, so the
+        sample keeps its hour of week.
+
+        Args:
+            file_path (str): Engineered train split.
+
+        Returns:
+            Tuple[Pipeline, list]: The fitted preprocessor and the feature columns, in model input order.
+
+        Raises:
+            PollutionException: If reading or fitting fails.
+        """
+        try:
+            config = self.data_transformation_config
+            sampler = ReservoirSampler(config.fit_sample_rows, random_state=0)
+            feature_columns = None
+            for chunk in iter_dataframe_chunks(file_path, config.chunk_rows):
+                frame = self.prepare_frame(chunk)
+                # the profile and medians are learned over all stations, the fit needs no grouping
+                frame.drop(columns=[DATA_INGESTION_STATION_COLUMN], inplace=True, errors='ignore')
+                if feature_columns is None:
+                    feature_columns = [column for column in frame.columns if column != TARGET_COLUMN]
+                    # float32 holds every hour since 1970 exactly, so compact samples stay float32
+                    dtype = np.float32 if (frame.dtypes[feature_columns] == np.float32).all() else np.float64
+                block = np.empty((len(frame), len(feature_columns) + 1), dtype=dtype)
+                block[:, 0] = frame.index.asi8 // _NANOSECONDS_PER_HOUR
+                block[:, 1:] = frame[feature_columns].to_numpy()
+                sampler.update(block)
+                del chunk, frame, block
+
+            sample = sampler.sample
+            index = pd.DatetimeIndex(sample[:, 0].astype(np.int64) * _NANOSECONDS_PER_HOUR, name='From Date')
+            sample_frame = pd.DataFrame(sample[:, 1:], index=index, columns=feature_columns)
+            logging.info(f"Fitting the preprocessor on a sample of {len(sample_frame)} of {sampler.seen} training rows")
+            return self.get_data_transformer_object().fit(sample_frame), feature_columns
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def transform_in_chunks(self, preprocessor: Pipeline, feature_columns: list, file_path: str,
+                            array_file_path: str, timestamps_file_path: str, stations_file_path: str) -> int:
+        """
+        Transform an engineered split chunk by chunk, writing the imputed features, the target,
+        the timestamps and the station codes straight into their .npy files.
+
+        The imputer carries readings forward from earlier hours, so every chunk is transformed
+        together with the rows of the `context_hours` hours before it. The result is the same
+        as transforming the whole split at once, with memory bounded by a chunk plus that
+        context. The split has to be in chronological order, as feature engineering writes it.
+
+        Args:
+            preprocessor (Pipeline): Fitted preprocessor.
+            feature_columns (list): Feature columns, in model input order.
+            file_path (str): Engineered split.
+            array_file_path (str): Destination of the features plus target matrix.
+            timestamps_file_path (str): Destination of the row timestamps.
+            stations_file_path (str): Destination of the row station codes.
+
+        Returns:
+            int: Number of rows written.
+
+        Raises:
+            PollutionException: If the split is not chronological, or reading or writing fails.
+        """
+        try:
+            config = self.data_transformation_config
+            imputer = preprocessor.named_steps["imputer"]
+            context_hours = max(imputer.max_gap_hours, imputer.knn_window_hours)
+            dtype = np.float32 if config.compact_dtypes else np.float64
+            rows = dataframe_row_count(file_path)
+
+            with NumpyArrayWriter(array_file_path, len(feature_columns) + 1, dtype, rows=rows) as writer, \
+                    NumpyArrayWriter(timestamps_file_path, None, "datetime64[ns]", rows=rows) as timestamps_writer, \
+                    NumpyArrayWriter(stations_file_path, None, np.int64, rows=rows) as stations_writer:
+                context = None
+                for chunk in iter_dataframe_chunks(file_path, config.chunk_rows):
+                    frame = self.prepare_frame(chunk)
+                    del chunk
+                    start = 0 if context is None else len(context)
+                    buffer = frame if context is None else pd.concat([context, frame])
+                    del frame
+                    if not buffer.index.is_monotonic_increasing:
+                        raise ValueError(f"Chunked transformation needs the rows of {file_path} in chronological order")
+                    if len(buffer) > start:
+                        stations = (
+                            station_codes(buffer[DATA_INGESTION_STATION_COLUMN])
+                            if DATA_INGESTION_STATION_COLUMN in buffer.columns else None
+                        )
+                        features = self.impute(preprocessor, buffer[feature_columns], stations)
+                        stations_writer.append(
+                            np.zeros(len(buffer) - start, dtype=np.int64) if stations is None else stations[start:]
+                        )
+                        block = np.empty((len(buffer) - start, len(feature_columns) + 1), dtype=dtype)
+                        block[:, :-1] = features[start:]
+                        block[:, -1] = buffer[TARGET_COLUMN].to_numpy()[start:]
+                        writer.append(block)
+                        timestamps_writer.append(buffer.index.to_numpy()[start:])
+                        del features, block
+                    # the next chunk starts at or after the last hour read, so older rows are no longer context
+                    hours = buffer.index.asi8 // _NANOSECONDS_PER_HOUR
+                    context = buffer.iloc[int(np.searchsorted(hours, hours[-1] - context_hours, side='left')):] if len(buffer) else context
+            logging.info(
+                f"Transformed {writer.rows_written} rows of {file_path} in chunks of {config.chunk_rows}, "
+                f"peak RSS {round(peak_rss_bytes() / 2 ** 20, 1)} MB"
+            )
+            return writer.rows_written
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         try:
             logging.info("Starting data transformation.")
+            if self.data_transformation_config.chunked:
+                return self.initiate_chunked_data_transformation()
 
-            train_df = self.read_data(self.data_validation_artifact.valid_train_file_path)
-            test_df = self.read_data(self.data_validation_artifact.valid_test_file_path)
+            train_df = self.prepare_frame(self.read_data(self.feature_engineering_artifact.engineered_train_file_path))
+            test_df = self.prepare_frame(self.read_data(self.feature_engineering_artifact.engineered_test_file_path))
 
-            def preprocess(df: pd.DataFrame) -> pd.DataFrame:
-                df['From Date'] = pd.to_datetime(df['From Date'], format='%d-%m-%Y %H:%M')
-                df.set_index('From Date', inplace=True)
-                df.drop(columns=['To Date'], inplace=True)
-                df.replace('None', np.nan, inplace=True)
+            compact = self.data_transformation_config.compact_dtypes
+            if compact:
+                log_memory_savings("data_transformation", train_df)
+            # popping the target leaves the features frame without copying it
+            train_target = train_df.pop(TARGET_COLUMN).to_numpy()
+            test_target = test_df.pop(TARGET_COLUMN).to_numpy()
+            train_stations = self.pop_station_codes(train_df)
+            test_stations = self.pop_station_codes(test_df)
+            feature_columns = list(train_df.columns)
 
-                pollutant_cols = ['PM2.5', 'PM10', 'NO2', 'NOx', 'SO2', 'CO', 'Ozone', 'NH3']
-                df[pollutant_cols] = df[pollutant_cols].apply(pd.to_numeric, errors='coerce')
-                return df
+            preprocessor = self.get_data_transformer_object()
+            preprocessor_object = preprocessor.fit(train_df)
 
-            train_df = preprocess(train_df)
-            test_df = preprocess(test_df)
+            def transform(df: pd.DataFrame, target: np.ndarray, stations, file_path: str) -> None:
+                # imputed features and the target are written block by block into the
+                # preallocated .npy instead of being stacked with np.c_, and float32 stays float32
+                features = self.impute(preprocessor_object, df, stations)
+                block_rows = self.data_transformation_config.block_rows
+                dtype = np.float32 if compact else np.float64
+                with NumpyArrayWriter(file_path, len(feature_columns) + 1, dtype, rows=len(df)) as writer:
+                    block = np.empty((min(block_rows, len(df)), len(feature_columns) + 1), dtype=dtype)
+                    for start, feature_block in iter_row_blocks(features, block_rows):
+                        rows = len(feature_block)
+                        block[:rows, :-1] = feature_block
+                        block[:rows, -1] = target[start:start + rows]
+                        writer.append(block[:rows])
 
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
-            target_feature_train_df = train_df[TARGET_COLUMN]
+            transform(train_df, train_target, train_stations, self.data_transformation_config.transformed_train_file_path)
+            transform(test_df, test_target, test_stations, self.data_transformation_config.transformed_test_file_path)
+            save_numpy_array_data(self.data_transformation_config.transformed_train_timestamps_file_path, train_df.index.to_numpy())
+            save_numpy_array_data(self.data_transformation_config.transformed_test_timestamps_file_path, test_df.index.to_numpy())
+            # a split without a station column is one series
+            for stations, df, file_path in (
+                (train_stations, train_df, self.data_transformation_config.transformed_train_stations_file_path),
+                (test_stations, test_df, self.data_transformation_config.transformed_test_stations_file_path),
+            ):
+                save_numpy_array_data(file_path, np.zeros(len(df), dtype=np.int64) if stations is None else stations)
+            return self.save_preprocessor(preprocessor_object, feature_columns)
 
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
-            target_feature_test_df = test_df[TARGET_COLUMN]
+        except Exception as e:
+            raise PollutionException(e, sys)
 
-            preprocessor = self.get_data_transformer_object()
+    def initiate_chunked_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Out-of-core data transformation: the preprocessor is fitted on a bounded sample of the
+        train split and both splits are transformed chunk by chunk straight into the .npy
+        artifacts, so neither split is ever loaded whole.
 
-            preprocessor_object = preprocessor.fit(input_feature_train_df)
-            transformed_input_train_feature = preprocessor_object.transform(input_feature_train_df)
-            transformed_input_test_feature = preprocessor_object.transform(input_feature_test_df)
+        Returns:
+            DataTransformationArtifact: The same artifact as the in-memory transformation.
 
-            train_arr = np.c_[transformed_input_train_feature, np.array(target_feature_train_df)]
-            test_arr = np.c_[transformed_input_test_feature, np.array(target_feature_test_df)]
+        Raises:
+            PollutionException: If fitting, transforming or saving fails.
+        """
+        try:
+            config = self.data_transformation_config
+            train_file_path = self.feature_engineering_artifact.engineered_train_file_path
+            preprocessor_object, feature_columns = self.fit_on_sample(train_file_path)
+            self.transform_in_chunks(
+                preprocessor_object, feature_columns, train_file_path,
+                config.transformed_train_file_path, config.transformed_train_timestamps_file_path,
+                config.transformed_train_stations_file_path,
+            )
+            self.transform_in_chunks(
+                preprocessor_object, feature_columns, self.feature_engineering_artifact.engineered_test_file_path,
+                config.transformed_test_file_path, config.transformed_test_timestamps_file_path,
+                config.transformed_test_stations_file_path,
+            )
+            return self.save_preprocessor(preprocessor_object, feature_columns)
 
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, test_arr)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def publish_preprocessor(self, data_transformation_artifact: DataTransformationArtifact,
+                             preprocessor_object: Optional[Pipeline] = None) -> None:
+        """
+        Publish the fitted preprocessor to the model store for serving. The stage cache calls
+        it again when it restores the artifact instead of fitting, so a cache hit still
+        publishes; the preprocessor is then loaded from the artifact.
+        """
+        try:
+            config = self.data_transformation_config
+            if preprocessor_object is None:
+                preprocessor_object = load_object(data_transformation_artifact.transformed_object_file_path)
+            ModelStore(config.final_model_store_dir, config.model_store_compress, config.model_store_keep_versions).save(
+                config.preprocessor_name,
+                preprocessor_object,
+                data_hash=file_hash(self.feature_engineering_artifact.engineered_train_file_path),
+                params=config.imputer_params,
+            )
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def save_preprocessor(self, preprocessor_object: Pipeline, feature_columns: list) -> DataTransformationArtifact:
+        """
+        Write the column list and the fitted preprocessor, publish it to the model store and
+        build the stage artifact.
+        """
+        try:
+            write_yaml_file(
+                self.data_transformation_config.transformed_columns_file_path,
+                {"columns": feature_columns + [TARGET_COLUMN], "target": TARGET_COLUMN},
+                replace=True,
+            )
 
             save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_object)
-            save_object("final_model/preprocessor.pkl", preprocessor_object)
 
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                transformed_train_timestamps_file_path=self.data_transformation_config.transformed_train_timestamps_file_path,
+                transformed_test_timestamps_file_path=self.data_transformation_config.transformed_test_timestamps_file_path,
+                transformed_train_stations_file_path=self.data_transformation_config.transformed_train_stations_file_path,
+                transformed_test_stations_file_path=self.data_transformation_config.transformed_test_stations_file_path,
+                transformed_columns_file_path=self.data_transformation_config.transformed_columns_file_path,
             )
 
+            self.publish_preprocessor(data_transformation_artifact, preprocessor_object)
             logging.info("Data transformation completed and artifact created.")
             return data_transformation_artifact
 
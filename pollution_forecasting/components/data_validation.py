@@ -1,14 +1,39 @@
 from pollution_forecasting.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 
-from scipy.stats import ks_2samp
- 
+from pollution_forecasting.utils.ml_utils.drift.drift_engine import (
+    ReservoirSampler,
+    StreamingHistogram,
+    detect_drift,
+    detect_histogram_drift,
+    sample_size_for_error,
+    stratified_sample_indices,
+)
 from pollution_forecasting.entity.config_entity import DataValidationConfig
 from pollution_forecasting.exception.exception import PollutionException 
 from pollution_forecasting.logging.logger import logging 
-from pollution_forecasting.constant.training_pipeline import SCHEMA_FILE_PATH
+from pollution_forecasting.constant.training_pipeline import (
+    SCHEMA_FILE_PATH,
+    DATA_INGESTION_STATION_COLUMN,
+    DATA_INGESTION_WATERMARK_COLUMN,
+)
+from pollution_forecasting.utils.schema.schema_validator import (
+    ChunkedSchemaValidator,
+    CompiledSchema,
+    load_compiled_schema,
+)
+import numpy as np
 import pandas as pd
 import os,sys
-from pollution_forecasting.utils.main.utils import read_yaml_file, write_yaml_file
+from pollution_forecasting.utils.main.utils import (
+    DataFrameChunkWriter,
+    iter_dataframe_chunks,
+    log_memory_savings,
+    peak_rss_bytes,
+    read_dataframe,
+    read_yaml_file,
+    write_dataframe,
+    write_yaml_file,
+)
 
 class DataValidation:
     """
@@ -31,6 +56,7 @@ class DataValidation:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self._compiled_schema = load_compiled_schema(SCHEMA_FILE_PATH, (DATA_INGESTION_STATION_COLUMN,))
         
         except Exception as e:
             raise PollutionException(e, sys)
@@ -39,10 +65,10 @@ class DataValidation:
     @staticmethod
     def read_data(file_path)->pd.DataFrame:
         """
-        Read CSV data from the given file path.
+        Read a Parquet (or legacy CSV) artifact from the given file path.
         
         Args:
-            file_path (str): Path to the CSV file
+            file_path (str): Path to the data file
             
         Returns:
             pd.DataFrame: DataFrame containing the file data
@@ -51,44 +77,221 @@ class DataValidation:
             PollutionException: If reading the file fails
         """
         try:
-            return pd.read_csv(file_path)
+            return read_dataframe(file_path)
         
         except Exception as e:
             raise PollutionException(e,sys)
         
     def validate_number_of_columns(self,dataframe:pd.DataFrame)->bool:
         """
-        Validate that the DataFrame has the expected number of columns based on schema.
+        Validate that the DataFrame has every column declared in the schema.
         
         Args:
             dataframe (pd.DataFrame): DataFrame to validate
             
         Returns:
-            bool: True if the number of columns matches the schema, False otherwise
+            bool: True if no schema column is missing, False otherwise
             
         Raises:
             PollutionException: If validation process fails
         """
         try:
-            number_of_columns=len(self._schema_config)
+            number_of_columns=len(self._compiled_schema.column_types)
             logging.info(f"Required number of columns:{number_of_columns}")
             logging.info(f"Dataframe has columns:{len(dataframe.columns)}")
-            if len(dataframe.columns)==number_of_columns:
-                return True
-            return False
+            missing_columns=[column for column in self._compiled_schema.column_types if column not in dataframe.columns]
+            if missing_columns:
+                logging.info(f"Missing columns:{missing_columns}")
+                return False
+            return True
         
         except Exception as e:
             raise PollutionException(e,sys)
+
+    def validate_rows(self, dataframe: pd.DataFrame, valid_file_path: str, invalid_file_path: str):
+        """
+        Validate every row against the compiled schema in a single vectorized pass and
+        quarantine the failing rows.
+
+        Valid rows are written to `valid_file_path` with schema types applied; failing rows
+        are written to `invalid_file_path` together with their `validation_errors` bit flags.
+
+        Args:
+            dataframe (pd.DataFrame): DataFrame to validate
+            valid_file_path (str): Destination of the valid rows
+            invalid_file_path (str): Destination of the quarantined rows
+
+        Returns:
+            Tuple[pd.DataFrame, SchemaValidationResult, Optional[str]]: Valid rows, the validation
+            result and the invalid file path (None when no row was quarantined).
+
+        Raises:
+            PollutionException: If validation process fails
+        """
+        try:
+            dataframe, result = self._compiled_schema.validate(dataframe)
+            valid_dataframe, invalid_dataframe = CompiledSchema.split(dataframe, result)
+            logging.info(
+                f"Row validation: {len(valid_dataframe)} valid, {len(invalid_dataframe)} quarantined, "
+                f"errors={result.error_counts}, dtype_mismatches={result.dtype_mismatches}, "
+                f"monotonic={result.is_monotonic}"
+            )
+
+            write_dataframe(valid_file_path, valid_dataframe)
+            if len(invalid_dataframe):
+                write_dataframe(invalid_file_path, invalid_dataframe)
+            else:
+                invalid_file_path = None
+            return valid_dataframe, result, invalid_file_path
+
+        except Exception as e:
+            raise PollutionException(e,sys)
         
-    def detect_dataset_drift(self,base_df: pd.DataFrame, current_df: pd.DataFrame, threshold=0.05) -> bool:
+    def validate_rows_in_chunks(self, file_path: str, valid_file_path: str, invalid_file_path: str,
+                                bins_like: StreamingHistogram = None):
+        """
+        Out-of-core counterpart of `validate_number_of_columns` and `validate_rows` for one
+        split, in a single streaming pass that also accumulates the drift statistics.
+
+        The split is read `chunk_rows` rows at a time. Every chunk is validated against the
+        compiled schema, with duplicate hours and monotonicity tracked across chunks, and its
+        valid and quarantined rows are appended to their files right away. Every valid row of
+        the numerical columns is counted into a `StreamingHistogram` on `drift_histogram_bins`
+        bins over the schema range of the column (the first chunk's range for columns without
+        one), so memory stays bounded by the chunk and the bins whatever the size of the split.
+
+        Args:
+            file_path (str): Ingested split to validate
+            valid_file_path (str): Destination of the valid rows
+            invalid_file_path (str): Destination of the quarantined rows
+            bins_like (StreamingHistogram, optional): Histogram of the other split, whose bins
+                this one reuses so the two can be compared. Defaults to new bins.
+
+        Returns:
+            Tuple[bool, bool, StreamingHistogram, Optional[str]]: Whether every schema column is
+            present, whether the readings are in chronological order, the histogram of the valid
+            rows and the invalid file path (None when no row was quarantined).
+
+        Raises:
+            PollutionException: If reading, validation or writing fails
+        """
+        try:
+            config = self.data_validation_config
+            validator = ChunkedSchemaValidator(self._compiled_schema)
+            histogram = None
+            status, columns = True, None
+
+            with DataFrameChunkWriter(valid_file_path) as valid_writer, DataFrameChunkWriter(invalid_file_path) as invalid_writer:
+                for chunk in iter_dataframe_chunks(file_path, config.chunk_rows):
+                    if columns is None:
+                        status = self.validate_number_of_columns(dataframe=chunk)
+                        columns = bins_like.columns if bins_like is not None else [
+                            column for column in self._schema_config["numerical_columns"] if column in chunk.columns
+                        ]
+                    chunk, result = validator.validate(chunk)
+                    valid_chunk, invalid_chunk = CompiledSchema.split(chunk, result)
+                    valid_writer.append(valid_chunk)
+                    if len(invalid_chunk):
+                        invalid_writer.append(invalid_chunk)
+                    # a column the other split has and this one lacks counts no rows
+                    values = valid_chunk.reindex(columns=columns).to_numpy(dtype=np.float64)
+                    if histogram is None:
+                        histogram = self.drift_histogram(columns, values, bins_like)
+                    histogram.update(values)
+                    del chunk, valid_chunk, invalid_chunk
+            invalid_rows = invalid_writer.rows_written
+
+            result = validator.result
+            logging.info(
+                f"Row validation of {file_path} in chunks of {config.chunk_rows}: {validator.valid_rows} valid, "
+                f"{validator.rows - validator.valid_rows} quarantined, errors={result.error_counts}, "
+                f"dtype_mismatches={result.dtype_mismatches}, monotonic={result.is_monotonic}, "
+                f"peak RSS {round(peak_rss_bytes() / 2 ** 20, 1)} MB"
+            )
+            if histogram is None:
+                histogram = self.drift_histogram(columns or [], np.empty((0, len(columns or []))), bins_like)
+            return status, result.is_monotonic, histogram, invalid_file_path if invalid_rows else None
+
+        except Exception as e:
+            raise PollutionException(e,sys)
+
+    def drift_histogram(self, columns: list, values: np.ndarray, bins_like: StreamingHistogram = None) -> StreamingHistogram:
+        """
+        Create the empty drift histogram of a split.
+
+        Args:
+            columns (list): Numerical columns of the histogram
+            values (np.ndarray): First valid rows of the split, which give the range of the
+                columns the schema has no range for
+            bins_like (StreamingHistogram, optional): Histogram whose bins are reused. Defaults to None.
+
+        Returns:
+            StreamingHistogram: Histogram with no rows counted yet
+        """
+        if bins_like is not None:
+            return StreamingHistogram(bins_like.columns, bins_like.lows, bins_like.highs, bins_like.bins)
+        ranges = self._compiled_schema.ranges
+        lows, highs = [], []
+        for j, column in enumerate(columns):
+            if column in ranges:
+                low, high = ranges[column]
+            else:
+                column_values = values[~np.isnan(values[:, j]), j]
+                low, high = (column_values.min(), column_values.max()) if len(column_values) else (0.0, 1.0)
+            lows.append(low)
+            highs.append(high)
+        return StreamingHistogram(columns, lows, highs, self.data_validation_config.drift_histogram_bins)
+
+    def sample_for_drift(self, dataframe: pd.DataFrame, columns: list) -> np.ndarray:
+        """
+        Draw the numeric sample used for drift detection.
+
+        The sample size follows from the configured error bound on the empirical CDF,
+        so the KS statistic on the sample is within `drift_sample_error` of the one on
+        the full data with `drift_sample_confidence` probability. Stratified sampling
+        keeps the month-of-year mix of the hourly data.
+
+        Args:
+            dataframe (pd.DataFrame): Full train or test DataFrame
+            columns (list): Numerical columns to keep
+
+        Returns:
+            np.ndarray: float64 array of shape (rows, len(columns))
+        """
+        try:
+            epsilon = self.data_validation_config.drift_sample_error
+            size = sample_size_for_error(epsilon, self.data_validation_config.drift_sample_confidence) if epsilon else len(dataframe)
+            if size >= len(dataframe):
+                return dataframe[columns].to_numpy(dtype=np.float64)
+
+            if (self.data_validation_config.drift_sampling == "stratified"
+                    and DATA_INGESTION_WATERMARK_COLUMN in dataframe.columns):
+                strata = pd.to_datetime(dataframe[DATA_INGESTION_WATERMARK_COLUMN]).dt.month.fillna(0).to_numpy()
+                # only the sampled rows are converted to float64
+                rows = stratified_sample_indices(strata, size, random_state=0)
+                return dataframe[columns].to_numpy()[rows].astype(np.float64)
+
+            values = dataframe[columns].to_numpy(dtype=np.float64)
+            sampler = ReservoirSampler(size, random_state=0)
+            sampler.update(values)
+            return sampler.sample
+
+        except Exception as e:
+            raise PollutionException(e,sys)
+
+    def detect_dataset_drift(self,base_df: pd.DataFrame, current_df: pd.DataFrame, threshold=None) -> bool:
         """
         Detect data drift between base DataFrame and current DataFrame using
-        Kolmogorov-Smirnov test.
+        Kolmogorov-Smirnov test, optionally with PSI and Wasserstein distance.
+
+        Only the numerical schema columns are compared. All columns are tested in one
+        batched NumPy pass, fanned out to a process pool for large data, and the YAML
+        report records the metrics of every column and the timing of the batched pass.
         
         Args:
             base_df (pd.DataFrame): Base DataFrame (typically training data)
             current_df (pd.DataFrame): Current DataFrame to check for drift (typically test data)
-            threshold (float, optional): p-value threshold for determining drift. Defaults to 0.05.
+            threshold (float, optional): p-value threshold for determining drift. Defaults to the configured threshold.
             
         Returns:
             bool: False if drift is detected in any column, True otherwise
@@ -97,21 +300,51 @@ class DataValidation:
             PollutionException: If drift detection fails
         """
         try:
-            status=True
-            report={}
-            for column in base_df.columns:
-                d1=base_df[column]
-                d2=current_df[column]
-                is_same_dist=ks_2samp(d1,d2)
-                if threshold <= is_same_dist.pvalue:
-                    is_found = False
-                else:
-                    is_found = True
-                    status = False
-                report.update({column: {
-                    "p_value": float(is_same_dist.pvalue),
-                    "drift_status": is_found
-                }})
+            columns = [
+                column for column in self._schema_config["numerical_columns"]
+                if column in base_df.columns and column in current_df.columns
+            ]
+            return self.detect_sample_drift(
+                self.sample_for_drift(base_df, columns),
+                self.sample_for_drift(current_df, columns),
+                columns,
+                threshold,
+            )
+
+        except Exception as e:
+            raise PollutionException(e,sys)
+
+    def detect_sample_drift(self, base: np.ndarray, current: np.ndarray, columns: list, threshold=None) -> bool:
+        """
+        Run the drift tests on samples already drawn from the base and current data and
+        write the YAML report.
+
+        Args:
+            base (np.ndarray): float64 sample of the base data, one column per entry of `columns`
+            current (np.ndarray): float64 sample of the current data
+            columns (list): Numerical columns of the samples
+            threshold (float, optional): p-value threshold for determining drift. Defaults to the configured threshold.
+
+        Returns:
+            bool: False if drift is detected in any column, True otherwise
+
+        Raises:
+            PollutionException: If drift detection fails
+        """
+        try:
+            config = self.data_validation_config
+            threshold = config.drift_threshold if threshold is None else threshold
+            report = detect_drift(
+                base=base,
+                current=current,
+                columns=columns,
+                threshold=threshold,
+                metrics=config.drift_metrics,
+                psi_bins=config.drift_psi_bins,
+                workers=config.drift_workers,
+                parallel_min_rows=config.drift_parallel_min_rows,
+            )
+            status = not any(entry["drift_status"] for entry in report.values())
             drift_report_file_path = self.data_validation_config.drift_report_file_path
 
             #Create directory
@@ -119,47 +352,131 @@ class DataValidation:
             os.makedirs(dir_path,exist_ok=True)
             write_yaml_file(file_path=drift_report_file_path,content=report)
 
+            return status
+
         except Exception as e:
             raise PollutionException(e,sys)
         
     
+    def detect_histogram_drift(self, base: StreamingHistogram, current: StreamingHistogram, threshold=None) -> bool:
+        """
+        Run the drift tests on the streaming histograms of the base and current data and
+        write the YAML report, in the format of `detect_sample_drift`.
+
+        Args:
+            base (StreamingHistogram): Histogram of the valid base rows
+            current (StreamingHistogram): Histogram of the valid current rows, on the bins of `base`
+            threshold (float, optional): p-value threshold for determining drift. Defaults to the configured threshold.
+
+        Returns:
+            bool: False if drift is detected in any column, True otherwise
+
+        Raises:
+            PollutionException: If drift detection fails
+        """
+        try:
+            config = self.data_validation_config
+            report = detect_histogram_drift(
+                base=base,
+                current=current,
+                threshold=config.drift_threshold if threshold is None else threshold,
+                metrics=config.drift_metrics,
+                psi_bins=config.drift_psi_bins,
+            )
+            status = not any(entry["drift_status"] for entry in report.values())
+            os.makedirs(os.path.dirname(config.drift_report_file_path), exist_ok=True)
+            write_yaml_file(file_path=config.drift_report_file_path, content=report)
+            return status
+
+        except Exception as e:
+            raise PollutionException(e,sys)
+
+    def report_column_status(self, train_status: bool, test_status: bool) -> bool:
+        """
+        Log which splits are missing schema columns.
+
+        Args:
+            train_status (bool): Whether the train split has all schema columns
+            test_status (bool): Whether the test split has all schema columns
+
+        Returns:
+            bool: True if both splits have all schema columns
+        """
+        error_message = ""
+        if not train_status:
+            error_message += "Train dataframe does not contain all columns.\n"
+        if not test_status:
+            error_message += "Test dataframe does not contain all columns.\n"
+        if error_message:
+            logging.info(error_message)
+        return train_status and test_status
+
+    def report_order_status(self, train_monotonic: bool, test_monotonic: bool) -> bool:
+        """
+        Log which splits have readings out of chronological order.
+
+        The lag and rolling features of the transformation assume time order, so a split
+        out of order fails validation in the in-memory and the chunked mode alike.
+
+        Args:
+            train_monotonic (bool): Whether the train timestamps never decrease
+            test_monotonic (bool): Whether the test timestamps never decrease
+
+        Returns:
+            bool: True if both splits are in chronological order
+        """
+        error_message = ""
+        if not train_monotonic:
+            error_message += "Train dataframe is not in chronological order.\n"
+        if not test_monotonic:
+            error_message += "Test dataframe is not in chronological order.\n"
+        if error_message:
+            logging.warning(error_message)
+        return train_monotonic and test_monotonic
+
     def initiate_data_validation(self)->DataValidationArtifact:
         try:
             train_file_path=self.data_ingestion_artifact.trained_file_path
             test_file_path=self.data_ingestion_artifact.test_file_path
 
+            if self.data_validation_config.chunked:
+                return self.initiate_chunked_data_validation(train_file_path, test_file_path)
+
             ## read the data from train and test
             train_dataframe=DataValidation.read_data(train_file_path)
             test_dataframe=DataValidation.read_data(test_file_path)
             
             ## validate number of columns
-
-            status=self.validate_number_of_columns(dataframe=train_dataframe)
-            if not status:
-                error_message=f"Train dataframe does not contain all columns.\n"
-            status = self.validate_number_of_columns(dataframe=test_dataframe)
-            if not status:
-                error_message=f"Test dataframe does not contain all columns.\n"   
-
-            ## lets check datadrift
-            status=self.detect_dataset_drift(base_df=train_dataframe,current_df=test_dataframe)
-            dir_path=os.path.dirname(self.data_validation_config.valid_train_file_path)
-            os.makedirs(dir_path,exist_ok=True)
-
-            train_dataframe.to_csv(
-                self.data_validation_config.valid_train_file_path, index=False, header=True
+            status = self.report_column_status(
+                self.validate_number_of_columns(dataframe=train_dataframe),
+                self.validate_number_of_columns(dataframe=test_dataframe),
             )
 
-            test_dataframe.to_csv(
-                self.data_validation_config.valid_test_file_path, index=False, header=True
+            ## validate rows and quarantine the invalid ones
+            train_dataframe, train_result, invalid_train_file_path = self.validate_rows(
+                train_dataframe,
+                self.data_validation_config.valid_train_file_path,
+                self.data_validation_config.invalid_train_file_path,
             )
+            test_dataframe, test_result, invalid_test_file_path = self.validate_rows(
+                test_dataframe,
+                self.data_validation_config.valid_test_file_path,
+                self.data_validation_config.invalid_test_file_path,
+            )
+            status = self.report_order_status(train_result.is_monotonic, test_result.is_monotonic) and status
+
+            if self.data_validation_config.compact_dtypes:
+                log_memory_savings("data_validation", train_dataframe)
+
+            ## lets check datadrift
+            drift_status=self.detect_dataset_drift(base_df=train_dataframe,current_df=test_dataframe)
             
             data_validation_artifact = DataValidationArtifact(
-                validation_status=status,
-                valid_train_file_path=self.data_ingestion_artifact.trained_file_path,
-                valid_test_file_path=self.data_ingestion_artifact.test_file_path,
-                invalid_train_file_path=None,
-                invalid_test_file_path=None,
+                validation_status=status and drift_status,
+                valid_train_file_path=self.data_validation_config.valid_train_file_path,
+                valid_test_file_path=self.data_validation_config.valid_test_file_path,
+                invalid_train_file_path=invalid_train_file_path,
+                invalid_test_file_path=invalid_test_file_path,
                 drift_report_file_path=self.data_validation_config.drift_report_file_path,
             )
             return data_validation_artifact
@@ -167,5 +484,41 @@ class DataValidation:
         except Exception as e:
             raise PollutionException(e, sys)
 
+    def initiate_chunked_data_validation(self, train_file_path: str, test_file_path: str) -> DataValidationArtifact:
+        """
+        Out-of-core data validation: both splits are streamed through `validate_rows_in_chunks`
+        and drift is tested on their histograms, so neither split is ever loaded whole.
+
+        Args:
+            train_file_path (str): Ingested train split
+            test_file_path (str): Ingested test split
+
+        Returns:
+            DataValidationArtifact: The same artifact as the in-memory validation.
+
+        Raises:
+            PollutionException: If validation fails
+        """
+        try:
+            config = self.data_validation_config
+            train_status, train_monotonic, train_histogram, invalid_train_file_path = self.validate_rows_in_chunks(
+                train_file_path, config.valid_train_file_path, config.invalid_train_file_path,
+            )
+            test_status, test_monotonic, test_histogram, invalid_test_file_path = self.validate_rows_in_chunks(
+                test_file_path, config.valid_test_file_path, config.invalid_test_file_path, bins_like=train_histogram,
+            )
+            status = self.report_column_status(train_status, test_status)
+            status = self.report_order_status(train_monotonic, test_monotonic) and status
 
+            drift_status = self.detect_histogram_drift(train_histogram, test_histogram)
+            return DataValidationArtifact(
+                validation_status=status and drift_status,
+                valid_train_file_path=config.valid_train_file_path,
+                valid_test_file_path=config.valid_test_file_path,
+                invalid_train_file_path=invalid_train_file_path,
+                invalid_test_file_path=invalid_test_file_path,
+                drift_report_file_path=config.drift_report_file_path,
+            )
 
+        except Exception as e:
+            raise PollutionException(e, sys)
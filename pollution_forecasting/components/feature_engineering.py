@@ -0,0 +1,111 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.entity.artifact_entity import DataValidationArtifact, FeatureEngineeringArtifact
+from pollution_forecasting.entity.config_entity import FeatureEngineeringConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.ml_utils.aqi.aqi_calculator import compute_aqi
+from pollution_forecasting.utils.ml_utils.features.feature_builder import FeatureBuilder
+from pollution_forecasting.utils.main.utils import (
+    compact_float_columns,
+    log_memory_savings,
+    read_dataframe,
+    read_yaml_file,
+    write_dataframe,
+)
+
+_SPLIT_COLUMN = "__is_test"
+
+
+class FeatureEngineering:
+    """
+    Adds lag, rolling-window, calendar, Fourier and holiday features to the validated data.
+    """
+
+    def __init__(self, data_validation_artifact: DataValidationArtifact,
+                 feature_engineering_config: FeatureEngineeringConfig):
+        try:
+            self.data_validation_artifact = data_validation_artifact
+            self.feature_engineering_config = feature_engineering_config
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def get_feature_builder(self) -> FeatureBuilder:
+        return self.feature_builder_from_config(self.feature_engineering_config)
+
+    @staticmethod
+    def feature_builder_from_config(config: FeatureEngineeringConfig) -> FeatureBuilder:
+        """
+        The FeatureBuilder described by a feature engineering config, shared with the streaming mode.
+        """
+        try:
+            holidays = read_yaml_file(config.holidays_file_path) if os.path.exists(config.holidays_file_path) else {}
+            return FeatureBuilder(
+                timestamp_column=config.timestamp_column,
+                lags=config.lags,
+                rolling_columns=config.rolling_columns,
+                rolling_windows=config.rolling_windows,
+                rolling_stats=config.rolling_stats,
+                fourier_terms=config.fourier_terms,
+                holidays=holidays,
+                diwali_window_days=config.diwali_window_days,
+                station_column=config.station_column,
+                dtype=np.float32 if config.compact_dtypes else np.float64,
+            )
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def initiate_feature_engineering(self) -> FeatureEngineeringArtifact:
+        """
+        Build features over train and test together so the first test hours see the end of the
+        training history in their lags and windows, then write them back out separately.
+
+        Returns:
+            FeatureEngineeringArtifact: Paths of the engineered train and test files.
+
+        Raises:
+            PollutionException: If reading, feature generation or writing fails.
+        """
+        try:
+            logging.info("Starting feature engineering.")
+            train_df = read_dataframe(self.data_validation_artifact.valid_train_file_path)
+            test_df = read_dataframe(self.data_validation_artifact.valid_test_file_path)
+
+            input_columns, train_rows = train_df.shape[1], len(train_df)
+            combined = pd.concat([train_df, test_df], ignore_index=True)
+            combined[_SPLIT_COLUMN] = np.arange(len(combined)) >= train_rows
+            del train_df, test_df
+            station_column = self.feature_engineering_config.station_column
+            if self.feature_engineering_config.compact_dtypes and station_column in combined.columns:
+                # train and test may carry different category sets, which concat turns back into objects
+                combined[station_column] = combined[station_column].astype("category")
+            engineered = self.get_feature_builder().build(combined)
+            config = self.feature_engineering_config
+            for lag in config.aqi_lags:
+                aqi = compute_aqi(combined, config.timestamp_column, config.station_column, lag_hours=lag)
+                engineered[f"AQI_lag_{lag}h"] = aqi["AQI"].to_numpy()
+            is_test = engineered.pop(_SPLIT_COLUMN).to_numpy(dtype=bool)
+            if config.compact_dtypes:
+                engineered = compact_float_columns(engineered)
+                log_memory_savings("feature_engineering", engineered)
+            logging.info(f"Built {engineered.shape[1] - input_columns} features for {len(engineered)} rows")
+
+            for file_path, rows in ((self.feature_engineering_config.engineered_train_file_path, ~is_test),
+                                    (self.feature_engineering_config.engineered_test_file_path, is_test)):
+                split = engineered[rows]
+                split.reset_index(drop=True, inplace=True)
+                write_dataframe(file_path, split)
+                del split
+
+            feature_engineering_artifact = FeatureEngineeringArtifact(
+                engineered_train_file_path=self.feature_engineering_config.engineered_train_file_path,
+                engineered_test_file_path=self.feature_engineering_config.engineered_test_file_path,
+            )
+            logging.info(f"Feature engineering artifact: {feature_engineering_artifact}")
+            return feature_engineering_artifact
+
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from threadpoolctl import threadpool_limits
+
+from pollution_forecasting.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from pollution_forecasting.entity.config_entity import ModelTrainerConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import (
+    iter_row_blocks,
+    load_numpy_array_data,
+    load_object,
+    read_yaml_file,
+    save_object,
+    write_yaml_file,
+)
+from pollution_forecasting.utils.ml_utils.model.model_store import ModelStore, file_hash
+
+
+def horizon_pairs(timestamps: np.ndarray, horizon: int, groups: np.ndarray = None):
+    """
+    Rows that have a reading of the same group (station) exactly `horizon` hours later, and
+    the row holding that later reading.
+
+    Args:
+        timestamps (np.ndarray): Timestamp of every row.
+        horizon (int): Hours ahead.
+        groups (np.ndarray): Group key of every row, e.g. its station code; all rows are
+            one series when None.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Ascending rows that have a target, and the row of each target.
+    """
+    hours = timestamps.astype("datetime64[h]").astype(np.int64)
+    if not len(hours):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    codes = np.zeros(len(hours), dtype=np.int64) if groups is None else np.unique(groups, return_inverse=True)[1]
+    # one sortable key per (group, hour), the hours of a group never reach into the next group's range
+    span = int(hours.max() - hours.min()) + horizon + 1
+    keys = codes.astype(np.int64) * span + (hours - hours.min())
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    position = np.searchsorted(sorted_keys, keys + horizon)
+    found = position < len(keys)
+    found[found] = sorted_keys[position[found]] == keys[found] + horizon
+    return np.flatnonzero(found), order[position[found]]
+
+
+def _horizon_rows(array: np.ndarray, timestamps: np.ndarray, stations: np.ndarray, target_index: int, horizon: int):
+    rows, future = horizon_pairs(timestamps, horizon, stations)
+    target = np.asarray(array[future, target_index], dtype=np.float64)
+    known = ~np.isnan(target)
+    return rows[known], target[known]
+
+
+def _horizon_dataset(array: np.ndarray, timestamps: np.ndarray, stations: np.ndarray, target_index: int, horizon: int):
+    rows, target = _horizon_rows(array, timestamps, stations, target_index, horizon)
+    return np.asarray(array[rows]), target
+
+
+def train_horizon_model(task: dict) -> dict:
+    """
+    Train and evaluate the model of one (pollutant, horizon) pair.
+
+    Runs inside a worker process. The training and test arrays are opened memory-mapped from
+    the transformation artifacts, so every worker shares the page cache instead of receiving
+    a pickled copy.
+    """
+    started = time.perf_counter()
+    with threadpool_limits(limits=task["threads"]):
+        train_arr = load_numpy_array_data(task["train_file_path"], mmap_mode="r")
+        train_timestamps = load_numpy_array_data(task["train_timestamps_file_path"])
+        train_stations = load_numpy_array_data(task["train_stations_file_path"])
+        x_train, y_train = _horizon_dataset(
+            train_arr, train_timestamps, train_stations, task["target_index"], task["horizon"]
+        )
+
+        model = HistGradientBoostingRegressor(**task["model_params"])
+        model.fit(x_train, y_train)
+        save_object(task["model_file_path"], model)
+
+        test_arr = load_numpy_array_data(task["test_file_path"], mmap_mode="r")
+        test_timestamps = load_numpy_array_data(task["test_timestamps_file_path"])
+        test_stations = load_numpy_array_data(task["test_stations_file_path"])
+        test_rows, y_test = _horizon_rows(test_arr, test_timestamps, test_stations, task["target_index"], task["horizon"])
+        metrics = None
+        if len(y_test):
+            # the test rows are gathered from the memory map one block at a time
+            predicted = np.empty(len(y_test))
+            for start, x_block in iter_row_blocks(test_arr, task["block_rows"], test_rows):
+                predicted[start:start + len(x_block)] = model.predict(x_block)
+            metrics = {
+                "mae": float(mean_absolute_error(y_test, predicted)),
+                "rmse": float(np.sqrt(mean_squared_error(y_test, predicted))),
+                "r2": float(r2_score(y_test, predicted)) if len(y_test) > 1 else None,
+            }
+
+    return {
+        "pollutant": task["pollutant"],
+        "horizon": task["horizon"],
+        "model_file_path": task["model_file_path"],
+        "train_rows": int(len(y_train)),
+        "test_rows": int(len(y_test)),
+        "test_metrics": metrics,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class ModelTrainer:
+    """
+    Trains one direct forecasting model per (pollutant, horizon) from the transformed arrays,
+    spreading the models over a process pool.
+    """
+
+    def __init__(self, data_transformation_artifact: DataTransformationArtifact,
+                 model_trainer_config: ModelTrainerConfig):
+        try:
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_trainer_config = model_trainer_config
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def model_file_path(self, pollutant: str, horizon: int) -> str:
+        return os.path.join(self.model_trainer_config.trained_model_dir, f"{pollutant}_{horizon}h.pkl")
+
+    def build_tasks(self) -> list:
+        """
+        One task per (pollutant, horizon). Tasks only carry file paths and column positions.
+        """
+        try:
+            config = self.model_trainer_config
+            artifact = self.data_transformation_artifact
+            columns = read_yaml_file(artifact.transformed_columns_file_path)["columns"]
+            workers = max(1, min(config.workers, len(config.target_pollutants) * len(config.horizons)))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+
+            tasks = []
+            for pollutant in config.target_pollutants:
+                if pollutant not in columns:
+                    logging.warning(f"{pollutant} is not a transformed column, skipping its models")
+                    continue
+                for horizon in config.horizons:
+                    tasks.append({
+                        "pollutant": pollutant,
+                        "horizon": int(horizon),
+                        "target_index": columns.index(pollutant),
+                        "train_file_path": artifact.transformed_train_file_path,
+                        "test_file_path": artifact.transformed_test_file_path,
+                        "train_timestamps_file_path": artifact.transformed_train_timestamps_file_path,
+                        "test_timestamps_file_path": artifact.transformed_test_timestamps_file_path,
+                        "train_stations_file_path": artifact.transformed_train_stations_file_path,
+                        "test_stations_file_path": artifact.transformed_test_stations_file_path,
+                        "model_file_path": self.model_file_path(pollutant, horizon),
+                        "model_params": config.model_params,
+                        "threads": threads,
+                        "block_rows": config.block_rows,
+                    })
+            return tasks
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def publish_models(self, model_trainer_artifact: ModelTrainerArtifact) -> None:
+        """
+        Publish the models of a trainer artifact to the model store for serving, like
+        DataTransformation does with the preprocessor. The stage cache calls it again when it
+        restores the artifact instead of training, so a cache hit still publishes.
+
+        Args:
+            model_trainer_artifact (ModelTrainerArtifact): Trained models and their report.
+
+        Raises:
+            PollutionException: If a model cannot be loaded or stored.
+        """
+        try:
+            config = self.model_trainer_config
+            report = read_yaml_file(model_trainer_artifact.model_report_file_path)
+            model_store = ModelStore(config.final_model_dir, config.model_store_compress, config.model_store_keep_versions)
+            data_hash = file_hash(self.data_transformation_artifact.transformed_train_file_path)
+            for name, result in report["models"].items():
+                # the report of a restored artifact still names the files of the run that trained it
+                model_file_path = os.path.join(model_trainer_artifact.trained_model_dir, os.path.basename(result["model_file_path"]))
+                model_store.save(
+                    name,
+                    load_object(model_file_path),
+                    data_hash=data_hash,
+                    params=config.model_params,
+                    metrics=result["test_metrics"],
+                )
+            logging.info(f"Published models {sorted(report['models'])} to {config.final_model_dir}")
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        """
+        Train every (pollutant, horizon) model and write the training report.
+
+        Returns:
+            ModelTrainerArtifact: Directory of the trained models and path of the report.
+
+        Raises:
+            PollutionException: If any model fails to train.
+        """
+        try:
+            logging.info("Starting model training.")
+            started = time.perf_counter()
+            tasks = self.build_tasks()
+            workers = max(1, min(self.model_trainer_config.workers, len(tasks)))
+
+            if workers == 1:
+                results = [train_horizon_model(task) for task in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(train_horizon_model, task) for task in tasks]
+                    results = [future.result() for future in as_completed(futures)]
+            for result in results:
+                logging.info(
+                    f"Trained {result['pollutant']} +{result['horizon']}h on {result['train_rows']} rows "
+                    f"in {result['seconds']}s, test metrics {result['test_metrics']}"
+                )
+
+            results.sort(key=lambda result: (result["pollutant"], result["horizon"]))
+            report = {
+                "workers": workers,
+                "seconds": round(time.perf_counter() - started, 3),
+                "models": {f"{result['pollutant']}_{result['horizon']}h": result for result in results},
+            }
+            write_yaml_file(self.model_trainer_config.model_report_file_path, report, replace=True)
+
+            model_trainer_artifact = ModelTrainerArtifact(
+                trained_model_dir=self.model_trainer_config.trained_model_dir,
+                model_report_file_path=self.model_trainer_config.model_report_file_path,
+            )
+            self.publish_models(model_trainer_artifact)
+            logging.info(f"Model trainer artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error
+from threadpoolctl import threadpool_limits
+
+from pollution_forecasting.components.data_transformation import DataTransformation
+from pollution_forecasting.components.model_trainer import horizon_pairs
+from pollution_forecasting.constant.training_pipeline import TARGET_COLUMN
+from pollution_forecasting.entity.artifact_entity import FeatureEngineeringArtifact, ModelTunerArtifact
+from pollution_forecasting.entity.config_entity import ModelTunerConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import (
+    load_numpy_array_data,
+    read_yaml_file,
+    save_numpy_array_data,
+    write_yaml_file,
+)
+from pollution_forecasting.utils.ml_utils.imputation.imputer import SeasonalInterpolationImputer
+
+RAW_FILE_NAME = "raw.npy"
+TIMESTAMPS_FILE_NAME = "timestamps.npy"
+STATIONS_FILE_NAME = "stations.npy"
+COLUMNS_FILE_NAME = "columns.yaml"
+FOLD_CACHE_DIR_NAME = "fold_cache"
+
+
+def time_series_folds(timestamps: np.ndarray, n_splits: int, gap_hours: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Expanding-window folds over chronologically sorted rows.
+
+    The rows are cut into `n_splits + 1` consecutive blocks; fold k validates on block k + 1
+    and trains on every earlier row more than `gap_hours` before it, so no training label
+    `gap_hours` ahead reaches into the validation period.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray]]: (train rows, validation rows) of each fold.
+    """
+    hours = timestamps.astype("datetime64[h]").astype(np.int64)
+    bounds = np.linspace(0, len(hours), n_splits + 2).astype(np.int64)
+    folds = []
+    for start, stop in zip(bounds[1:-1], bounds[2:]):
+        if start >= stop:
+            continue
+        train_stop = np.searchsorted(hours, hours[start] - gap_hours, side="left")
+        if train_stop:
+            folds.append((np.arange(train_stop), np.arange(start, stop)))
+    return folds
+
+
+def _params_key(params: dict) -> str:
+    return hashlib.blake2b(json.dumps(params, sort_keys=True).encode(), digest_size=10).hexdigest()
+
+
+def _fold_cache_paths(work_dir: str, imputer_params: dict, fold: int) -> Tuple[str, str]:
+    prefix = os.path.join(work_dir, FOLD_CACHE_DIR_NAME, f"{_params_key(imputer_params)}_fold{fold}")
+    return f"{prefix}_train.npy", f"{prefix}_val.npy"
+
+
+def transform_fold(task: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Imputed train and validation rows of one fold under one imputer configuration.
+
+    The imputer is fitted on the fold's train rows only. Results are memoized on disk by
+    (imputer parameters, fold), so every candidate sharing the preprocessing reads the same
+    memory-mapped arrays instead of imputing again.
+    """
+    train_file_path, val_file_path = _fold_cache_paths(task["work_dir"], task["imputer_params"], task["fold"])
+    if not (os.path.exists(train_file_path) and os.path.exists(val_file_path)):
+        raw = load_numpy_array_data(os.path.join(task["work_dir"], RAW_FILE_NAME), mmap_mode="r")
+        timestamps = load_numpy_array_data(os.path.join(task["work_dir"], TIMESTAMPS_FILE_NAME))
+        columns = read_yaml_file(os.path.join(task["work_dir"], COLUMNS_FILE_NAME))["columns"][:-1]
+        folds = np.load(task["folds_file_path"])
+        train_rows, val_rows = folds[f"train_{task['fold']}"], folds[f"val_{task['fold']}"]
+        stations = load_numpy_array_data(os.path.join(task["work_dir"], STATIONS_FILE_NAME))
+
+        def frame(rows: np.ndarray) -> pd.DataFrame:
+            return pd.DataFrame(raw[rows, :-1], columns=columns, index=pd.DatetimeIndex(timestamps[rows]))
+
+        with threadpool_limits(limits=task.get("threads", 1)):
+            imputer = SeasonalInterpolationImputer(**task["imputer_params"]).fit(frame(train_rows))
+            for rows, file_path in ((train_rows, train_file_path), (val_rows, val_file_path)):
+                array = np.empty((len(rows), raw.shape[1]), dtype=raw.dtype)
+                # readings are carried forward within each station only
+                array[:, :-1] = imputer.transform_rows(raw[rows, :-1], timestamps[rows], stations[rows])
+                array[:, -1] = raw[rows, -1]
+                # concurrent writers of the same fold each rename a complete file into place
+                temporary_path = f"{file_path}.{os.getpid()}.tmp.npy"
+                save_numpy_array_data(temporary_path, array)
+                os.replace(temporary_path, file_path)
+    return (
+        load_numpy_array_data(train_file_path, mmap_mode="r"),
+        load_numpy_array_data(val_file_path, mmap_mode="r"),
+    )
+
+
+def _horizon_xy(array: np.ndarray, timestamps: np.ndarray, stations: np.ndarray, target_index: int, horizon: int):
+    rows, future = horizon_pairs(timestamps, horizon, stations)
+    target = np.asarray(array[future, target_index], dtype=np.float64)
+    known = ~np.isnan(target)
+    return np.asarray(array[rows[known]]), target[known]
+
+
+def evaluate_candidate(task: dict) -> dict:
+    """
+    Mean validation MAE of one candidate over every fold, trained with `resource` boosting
+    iterations. Runs inside a worker process.
+    """
+    started = time.perf_counter()
+    timestamps = load_numpy_array_data(os.path.join(task["work_dir"], TIMESTAMPS_FILE_NAME))
+    stations = load_numpy_array_data(os.path.join(task["work_dir"], STATIONS_FILE_NAME))
+    folds = np.load(task["folds_file_path"])
+    fold_mae = []
+    with threadpool_limits(limits=task["threads"]):
+        for fold in range(task["n_folds"]):
+            train_arr, val_arr = transform_fold({**task, "fold": fold})
+            train_rows, val_rows = folds[f"train_{fold}"], folds[f"val_{fold}"]
+            x_train, y_train = _horizon_xy(
+                train_arr, timestamps[train_rows], stations[train_rows], task["target_index"], task["horizon"]
+            )
+            x_val, y_val = _horizon_xy(val_arr, timestamps[val_rows], stations[val_rows], task["target_index"], task["horizon"])
+            if not (len(y_train) and len(y_val)):
+                continue
+            model = HistGradientBoostingRegressor(**{**task["model_params"], "max_iter": task["resource"]})
+            model.fit(x_train, y_train)
+            fold_mae.append(float(mean_absolute_error(y_val, model.predict(x_val))))
+    return {
+        "candidate": task["candidate"],
+        "resource": task["resource"],
+        "fold_mae": fold_mae,
+        "mae": float(np.mean(fold_mae)) if fold_mae else math.inf,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class ModelTuner:
+    """
+    Successive-halving random search over the imputer and model parameters.
+
+    Candidates are drawn at random from the search space and scored by validation MAE of the
+    target (pollutant, horizon) model over expanding-window time-series folds. Each rung keeps
+    the best 1 / eta of the candidates and trains the survivors with eta times more boosting
+    iterations, up to the trainer's max_iter. The fold indices are computed once and shared
+    by every candidate, each distinct imputer configuration is fitted once per fold, and the
+    candidates of a rung are evaluated in parallel over a process pool.
+    """
+
+    def __init__(self, feature_engineering_artifact: FeatureEngineeringArtifact,
+                 model_tuner_config: ModelTunerConfig):
+        try:
+            self.feature_engineering_artifact = feature_engineering_artifact
+            self.model_tuner_config = model_tuner_config
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def prepare_data(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Write the un-imputed train split as one matrix (features, then the current target
+        reading, like the transformed arrays) that the workers memory-map.
+
+        Returns:
+            Tuple[List[str], np.ndarray]: The matrix columns and the row timestamps.
+        """
+        try:
+            work_dir = self.model_tuner_config.work_dir
+            df = DataTransformation.prepare_frame(
+                DataTransformation.read_data(self.feature_engineering_artifact.engineered_train_file_path)
+            )
+            target = df.pop(TARGET_COLUMN).to_numpy()
+            stations = DataTransformation.pop_station_codes(df)
+            columns = list(df.columns) + [TARGET_COLUMN]
+            raw = np.empty((len(df), len(columns)), dtype=np.float64)
+            raw[:, :-1] = df.to_numpy(dtype=np.float64)
+            raw[:, -1] = target
+            timestamps = df.index.to_numpy()
+            save_numpy_array_data(os.path.join(work_dir, RAW_FILE_NAME), raw)
+            save_numpy_array_data(os.path.join(work_dir, TIMESTAMPS_FILE_NAME), timestamps)
+            # a split without a station column is one series
+            save_numpy_array_data(
+                os.path.join(work_dir, STATIONS_FILE_NAME),
+                np.zeros(len(df), dtype=np.int64) if stations is None else stations,
+            )
+            write_yaml_file(os.path.join(work_dir, COLUMNS_FILE_NAME), {"columns": columns}, replace=True)
+            return columns, timestamps
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def sample_candidates(self) -> List[Dict[str, dict]]:
+        """
+        Distinct random points of the search space, split into imputer and model parameters.
+        """
+        config = self.model_tuner_config
+        names = list(config.search_space)
+        grid = list(itertools.product(*(config.search_space[name] for name in names)))
+        rng = np.random.default_rng(config.random_state)
+        picks = rng.choice(len(grid), size=min(config.n_candidates, len(grid)), replace=False)
+        candidates = []
+        for pick in picks:
+            imputer_params, model_params = dict(config.imputer_params), dict(config.model_params)
+            for name, value in zip(names, grid[pick]):
+                group, _, param = name.partition("__")
+                (imputer_params if group == "imputer" else model_params)[param] = value
+            candidates.append({"imputer_params": imputer_params, "model_params": model_params})
+        return candidates
+
+    def initiate_model_tuner(self) -> ModelTunerArtifact:
+        """
+        Run the search and write the tuned parameters and the report of every rung.
+
+        Returns:
+            ModelTunerArtifact: Paths of the tuned parameters, the folds and the report.
+
+        Raises:
+            PollutionException: If the data cannot be prepared or a candidate fails.
+        """
+        try:
+            logging.info("Starting model tuning.")
+            started = time.perf_counter()
+            config = self.model_tuner_config
+            os.makedirs(config.model_tuner_dir, exist_ok=True)
+            shutil.rmtree(config.work_dir, ignore_errors=True)
+
+            columns, timestamps = self.prepare_data()
+            if config.target_pollutant not in columns:
+                raise ValueError(f"{config.target_pollutant} is not a model input column")
+            folds = time_series_folds(timestamps, config.n_splits, config.horizon)
+            if not folds:
+                raise ValueError(f"Too few rows ({len(timestamps)}) for {config.n_splits} time-series folds")
+            arrays = {}
+            for fold, (train_rows, val_rows) in enumerate(folds):
+                arrays[f"train_{fold}"], arrays[f"val_{fold}"] = train_rows, val_rows
+            np.savez(config.folds_file_path, **arrays)
+
+            candidates = self.sample_candidates()
+            max_resource = int(config.model_params.get("max_iter", 100))
+            workers = max(1, min(config.workers, len(candidates)))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            base_task = {
+                "work_dir": config.work_dir,
+                "folds_file_path": config.folds_file_path,
+                "n_folds": len(folds),
+                "target_index": columns.index(config.target_pollutant),
+                "horizon": int(config.horizon),
+                "threads": threads,
+            }
+            logging.info(
+                f"Tuning {len(candidates)} candidates over {len(folds)} folds with {workers} workers, "
+                f"{len({_params_key(c['imputer_params']) for c in candidates})} distinct imputer configurations"
+            )
+
+            executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+            run = executor.map if executor is not None else map
+            try:
+                # every distinct imputer configuration is fitted once per fold, before any candidate reads it
+                imputer_configs = list({_params_key(c["imputer_params"]): c["imputer_params"] for c in candidates}.values())
+                list(run(transform_fold, [
+                    {**base_task, "imputer_params": params, "fold": fold}
+                    for params in imputer_configs for fold in range(len(folds))
+                ]))
+
+                survivors, rungs, resource = list(range(len(candidates))), [], min(config.min_resource, max_resource)
+                while True:
+                    results = list(run(evaluate_candidate, [
+                        {**base_task, **candidates[index], "candidate": index, "resource": resource}
+                        for index in survivors
+                    ]))
+                    results.sort(key=lambda result: result["mae"])
+                    rungs.append({"resource": resource, "results": results})
+                    logging.info(f"Rung with {resource} iterations: best MAE {results[0]['mae']:.4f} of {len(results)}")
+                    if len(results) == 1 or resource >= max_resource:
+                        break
+                    survivors = [result["candidate"] for result in results[:max(1, math.ceil(len(results) / config.eta))]]
+                    resource = min(resource * config.eta, max_resource)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+            best = rungs[-1]["results"][0]
+            tuned = {
+                "imputer_params": candidates[best["candidate"]]["imputer_params"],
+                "model_params": {**candidates[best["candidate"]]["model_params"], "max_iter": best["resource"]},
+                "mae": best["mae"],
+            }
+            write_yaml_file(config.tuned_params_file_path, tuned, replace=True)
+            write_yaml_file(config.report_file_path, {
+                "target": f"{config.target_pollutant}_{config.horizon}h",
+                "folds": [{"train_rows": len(train), "val_rows": len(val)} for train, val in folds],
+                "workers": workers,
+                "seconds": round(time.perf_counter() - started, 3),
+                "candidates": candidates,
+                "rungs": rungs,
+                "best": tuned,
+            }, replace=True)
+            shutil.rmtree(config.work_dir, ignore_errors=True)
+
+            model_tuner_artifact = ModelTunerArtifact(
+                tuned_params_file_path=config.tuned_params_file_path,
+                folds_file_path=config.folds_file_path,
+                report_file_path=config.report_file_path,
+            )
+            logging.info(f"Model tuner artifact: {model_tuner_artifact}")
+            return model_tuner_artifact
+
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -1,7 +1,6 @@
 import os
 import sys
-import numpy as np
-import pandas as pd
+from typing import Optional
 
 '''
 Define the common constant variable for training pipeline.
@@ -9,13 +8,80 @@ Define the common constant variable for training pipeline.
 TARGET_COLUMN = "PM2.5"
 PIPELINE_NAME: str = "PollutionForecastingPipeline"
 ARTIFACT_DIR: str = "Artifacts"
-FILE_NAME: str = "delhi_pollution_data.csv"
+FILE_NAME: str = "delhi_pollution_data.parquet"
 
-TRAIN_FILE_NAME: str = "train.csv"
-TEST_FILE_NAME: str = "test.csv"
+TRAIN_FILE_NAME: str = "train.parquet"
+TEST_FILE_NAME: str = "test.parquet"
 
 SCHEMA_FILE_PATH = os.path.join("data_schema", "schema.yaml")
 
+## opt-in compact memory mode: float32 pollutants and a categorical station column from the
+## ingested split through to the .npy artifacts
+COMPACT_DTYPES: bool = False
+## rows per block when writing the transformed arrays and predicting over them
+ARRAY_BLOCK_ROWS: int = 65_536
+## opt-in out-of-core mode: data validation and data transformation stream the splits CHUNK_ROWS
+## rows at a time and write their outputs chunk by chunk, so their memory is bounded by the chunk
+## size instead of growing with the years and stations in the splits
+CHUNKED_MODE: bool = False
+CHUNK_ROWS: int = 250_000
+
+"""
+Stage cache related constant start with STAGE_CACHE VAR NAME
+"""
+STAGE_CACHE_ENABLED: bool = True
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+STAGE_CACHE_FILE_HASHES_FILE_NAME: str = "file_hashes.json"
+## size budget of all timestamped run dirs under ARTIFACT_DIR, least recently used runs are evicted first
+STAGE_CACHE_MAX_BYTES: int = 5 * 1024 ** 3
+## part of every cache key, bump it to invalidate all cached stages after a change the key cannot see,
+## e.g. in a module a stage only imports inside a function
+STAGE_CACHE_CODE_VERSION: str = "1"
+
+"""
+Instrumentation related constant start with INSTRUMENTATION VAR NAME
+"""
+## per-stage wall/CPU time, peak RSS, rows and bytes, written next to the run's artifacts
+INSTRUMENTATION_REPORT_FILE_NAME: str = "run_report.json"
+INSTRUMENTATION_PROFILE_DIR_NAME: str = "profiles"
+## log the run report to MLflow as well (tracking URI from MLFLOW_TRACKING_URI or ./mlruns)
+INSTRUMENTATION_MLFLOW: bool = False
+## stage to profile, e.g. "data_transformation"; empty profiles nothing
+INSTRUMENTATION_PROFILE_STAGE: str = ""
+## "cprofile" dumps a pstats .prof file, "sample" a py-spy style folded-stack file for flame graphs
+INSTRUMENTATION_PROFILE_MODE: str = "cprofile"
+INSTRUMENTATION_SAMPLE_INTERVAL_S: float = 0.005
+
+"""
+Station sharding related constant start with SHARDING VAR NAME
+"""
+## stations to train, an empty list means every station key found in the collection
+SHARDING_STATIONS: list = []
+## station shards running at once; the CPU cores are split between them
+SHARDING_WORKERS: int = os.cpu_count() or 1
+SHARDING_SUMMARY_FILE_NAME: str = "shard_summary.yaml"
+
+"""
+MongoDB client related constant start with MONGO VAR NAME
+"""
+MONGO_URL_ENV_VAR: str = "MONGO_DB_URL"
+MONGO_APP_NAME: str = "delhi_pollution_forecasting"
+## one client (and connection pool) per process, shared by ingestion, streaming and the bulk loader's threads
+MONGO_MAX_POOL_SIZE: int = 32
+MONGO_MIN_POOL_SIZE: int = 0
+MONGO_MAX_IDLE_TIME_MS: int = 5 * 60 * 1000
+MONGO_CONNECT_TIMEOUT_MS: int = 10 * 1000
+MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 15 * 1000
+## a long export or aggregation cursor may take minutes between batches on a busy cluster
+MONGO_SOCKET_TIMEOUT_MS: int = 5 * 60 * 1000
+MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 30 * 1000
+MONGO_RETRY_READS: bool = True
+MONGO_RETRY_WRITES: bool = True
+## wire compression, zlib needs no extra package
+MONGO_COMPRESSORS: str = "zlib"
+## documents per cursor batch of the aggregation query layer
+MONGO_QUERY_BATCH_SIZE: int = 10000
+
 '''
 Data Ingestion related constants start with DATA_INGESTION VAR NAME
 '''
@@ -26,6 +92,20 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.2
+DATA_INGESTION_BATCH_SIZE: int = 10000
+DATA_INGESTION_INCREMENTAL: bool = True
+DATA_INGESTION_WATERMARK_COLUMN: str = "From Date"
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
+## incremental runs re-read this many hours before the watermark, so another station's reading of
+## the watermark hour and late uploads are still picked up; rows already stored are dropped by
+## their (station, From Date) key
+DATA_INGESTION_LOOKBACK_HOURS: int = 48
+DATA_INGESTION_DATETIME_FORMAT: str = "%d-%m-%Y %H:%M"
+DATA_INGESTION_STATION_COLUMN: str = "station"
+DATA_INGESTION_DEFAULT_STATION: str = "delhi"
+## history window pushed into the MongoDB query, e.g. "2019-01-01"; None reads from the first / up to the last reading
+DATA_INGESTION_START_DATE: Optional[str] = None
+DATA_INGESTION_END_DATE: Optional[str] = None
 
 
 """
@@ -36,19 +116,249 @@ DATA_VALIDATION_VALID_DIR: str = "validated"
 DATA_VALIDATION_INVALID_DIR: str = "invalid"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_DRIFT_THRESHOLD: float = 0.05
+DATA_VALIDATION_DRIFT_METRICS: list = ["ks", "psi", "wasserstein"]
+DATA_VALIDATION_DRIFT_PSI_BINS: int = 10
+## sampling keeps every empirical CDF within this error of the full data (None disables sampling)
+DATA_VALIDATION_DRIFT_SAMPLE_ERROR: float = 0.005
+DATA_VALIDATION_DRIFT_SAMPLE_CONFIDENCE: float = 0.99
+DATA_VALIDATION_DRIFT_SAMPLING: str = "stratified"
+DATA_VALIDATION_DRIFT_WORKERS: int = os.cpu_count() or 1
+## compared with the rows drift is computed on, i.e. the two samples: the default error bound draws
+## about 106k rows a split, whose single pass takes 0.7s (12 columns) to 3s (75), well above the pool start-up
+DATA_VALIDATION_DRIFT_PARALLEL_MIN_ROWS: int = 100_000
+## chunked mode tests drift on histograms of every valid row on this many equal-width bins over the
+## schema range of each column, so KS is exact up to the share of readings in one bin (0.1 for PM2.5)
+DATA_VALIDATION_DRIFT_HISTOGRAM_BINS: int = 10_000
 PREPROCESSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 
 
+"""
+Feature Engineering related constant start with FEATURE_ENGINEERING VAR NAME
+"""
+FEATURE_ENGINEERING_DIR_NAME: str = "feature_engineering"
+FEATURE_ENGINEERING_ENGINEERED_DIR: str = "engineered"
+FEATURE_ENGINEERING_HOLIDAYS_FILE_PATH = os.path.join("data_schema", "holidays.yaml")
+## lags in hours per pollutant, every lag is looked up on the hourly grid so gaps never shift it
+FEATURE_ENGINEERING_LAGS: dict = {
+    "PM2.5": [1, 2, 3, 24, 168],
+    "PM10": [1, 24],
+    "NO2": [1, 24],
+    "CO": [1, 24],
+    "Ozone": [1, 24],
+}
+FEATURE_ENGINEERING_ROLLING_COLUMNS: list = ["PM2.5", "PM10", "NO2", "CO"]
+FEATURE_ENGINEERING_ROLLING_WINDOWS: dict = {"3h": 3, "24h": 24, "7d": 168}
+FEATURE_ENGINEERING_ROLLING_STATS: list = ["mean", "std", "max"]
+## period in hours -> number of sin/cos harmonics
+FEATURE_ENGINEERING_FOURIER_TERMS: dict = {24: 2, 168: 1, 8766: 2}
+FEATURE_ENGINEERING_DIWALI_WINDOW_DAYS: tuple = (-3, 3)
+## CPCB AQI of this many hours earlier, lagged so the current hour's target never leaks in
+FEATURE_ENGINEERING_AQI_LAGS: list = [1, 24]
+
+
 """
 Data Transformation related constant start with DATA_TRANSFORMATION VAR NAME
 """
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_TIMESTAMPS_SUFFIX: str = "_timestamps.npy"
+## int64 station code of every transformed row, so forecast targets are paired within a station
+DATA_TRANSFORMATION_STATIONS_SUFFIX: str = "_stations.npy"
+DATA_TRANSFORMATION_COLUMNS_FILE_NAME: str = "columns.yaml"
 
-## kkn imputer to replace nan values
+## causal time-aware imputer to replace nan values: the last reading carried forward for up to
+## max_gap_hours with hour-of-week fallback, or "knn_window" for k nearest neighbours among the
+## readings of the window before each gap; model inputs never see later hours
 DATA_TRANSFORMATION_IMPUTER_PARAMS: dict = {
-    "missing_values": np.nan,
+    "strategy": "carry_forward",
+    "max_gap_hours": 6,
     "n_neighbors": 3,
-    "weights": "uniform",
+    "knn_window_hours": 24,
+}
+## chunked mode fits the imputer on a uniform sample of this many training rows, drawn in one pass
+DATA_TRANSFORMATION_FIT_SAMPLE_ROWS: int = 200_000
+
+
+"""
+Model Trainer related constant start with MODEL_TRAINER VAR NAME
+"""
+MODEL_TRAINER_DIR_NAME: str = "model_trainer"
+MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
+## model store of the served models, next to the final_model/preprocessor entry
+MODEL_TRAINER_FINAL_MODEL_DIR: str = "models"
+MODEL_TRAINER_REPORT_FILE_NAME: str = "report.yaml"
+## one model per (pollutant, horizon in hours ahead)
+MODEL_TRAINER_TARGET_POLLUTANTS: list = ["PM2.5", "PM10", "NO2"]
+MODEL_TRAINER_HORIZONS: list = [1, 6, 24, 72]
+MODEL_TRAINER_WORKERS: int = os.cpu_count() or 1
+MODEL_TRAINER_MODEL_PARAMS: dict = {
+    "max_iter": 300,
+    "learning_rate": 0.05,
+    "max_leaf_nodes": 31,
+    "early_stopping": True,
+    "random_state": 42,
+}
+
+
+"""
+Model tuner related constant start with MODEL_TUNER VAR NAME
+"""
+## off by default; when on, the tuned imputer and model parameters replace the defaults above
+MODEL_TUNER_ENABLED: bool = False
+MODEL_TUNER_DIR_NAME: str = "model_tuner"
+MODEL_TUNER_FOLDS_FILE_NAME: str = "folds.npz"
+MODEL_TUNER_REPORT_FILE_NAME: str = "report.yaml"
+MODEL_TUNER_TUNED_PARAMS_FILE_NAME: str = "tuned_params.yaml"
+## the parameters are tuned on one (pollutant, horizon) model and used for all of them
+MODEL_TUNER_TARGET_POLLUTANT: str = "PM2.5"
+MODEL_TUNER_HORIZON: int = 24
+## expanding-window folds over the train split, `gap` = horizon hours between train and validation
+MODEL_TUNER_N_SPLITS: int = 3
+## random candidates, of which 1 / MODEL_TUNER_ETA survive each successive-halving rung while
+## their boosting iterations grow ETA-fold from MIN_RESOURCE up to the trainer's max_iter
+MODEL_TUNER_N_CANDIDATES: int = 18
+MODEL_TUNER_ETA: int = 3
+MODEL_TUNER_MIN_RESOURCE: int = 50
+MODEL_TUNER_WORKERS: int = os.cpu_count() or 1
+MODEL_TUNER_RANDOM_STATE: int = 42
+MODEL_TUNER_SEARCH_SPACE: dict = {
+    "imputer__max_gap_hours": [3, 6, 12],
+    "model__learning_rate": [0.03, 0.05, 0.1],
+    "model__max_leaf_nodes": [15, 31, 63],
+    "model__min_samples_leaf": [20, 50, 100],
+    "model__l2_regularization": [0.0, 0.1, 1.0],
 }
+
+
+"""
+Backtest related constant start with BACKTEST VAR NAME
+"""
+## off by default; when on, the pipeline backtests the trained model setup after training
+BACKTEST_ENABLED: bool = False
+BACKTEST_DIR_NAME: str = "backtest"
+BACKTEST_HISTORY_FILE_NAME: str = "history.npy"
+BACKTEST_METRICS_FILE_NAME: str = "metrics.csv"
+BACKTEST_CUTOFF_METRICS_FILE_NAME: str = "cutoff_metrics.csv"
+BACKTEST_REPORT_FILE_NAME: str = "report.yaml"
+BACKTEST_TARGET_POLLUTANTS: list = ["PM2.5"]
+BACKTEST_HORIZONS: list = [1, 6, 24, 72]
+## rolling origins: the first cutoff after INITIAL_HOURS of history, then one every STEP_HOURS,
+## each forecasting the STEP_HOURS after it; TRAIN_WINDOW_HOURS = 0 trains on all history so far
+BACKTEST_INITIAL_HOURS: int = 90 * 24
+BACKTEST_STEP_HOURS: int = 24
+BACKTEST_TRAIN_WINDOW_HOURS: int = 0
+## a full refit every REFIT_EVERY cutoffs; in between the previous model is warm-started with
+## WARM_START_ITER more boosting rounds on the grown window
+BACKTEST_REFIT_EVERY: int = 7
+BACKTEST_WARM_START_ITER: int = 20
+BACKTEST_WORKERS: int = os.cpu_count() or 1
+
+
+"""
+Model store related constant start with MODEL_STORE VAR NAME
+"""
+MODEL_STORE_PREPROCESSOR_NAME: str = "preprocessor"
+## zlib level of the stored array buffers; 0 keeps them uncompressed so they can be memory-mapped
+MODEL_STORE_COMPRESS: int = 0
+MODEL_STORE_KEEP_VERSIONS: int = 5
+
+
+"""
+Serving related constant start with SERVING VAR NAME
+"""
+SERVING_HOST: str = "127.0.0.1"
+SERVING_PORT: int = 8000
+## models loaded by the server, an empty list serves every stored model
+SERVING_MODEL_NAMES: list = []
+## requests arriving within SERVING_MAX_WAIT_MS of each other are predicted as one batch; at 0 a batch
+## is whatever queued while the previous one was predicted, which under load is as large and adds no wait
+SERVING_MAX_BATCH_SIZE: int = 256
+SERVING_MAX_WAIT_MS: float = 0.0
+SERVING_REQUEST_TIMEOUT_S: float = 5.0
+## batches up to this many rows go through the vectorised tree walk, larger ones through sklearn
+SERVING_COMPILED_MAX_ROWS: int = 64
+## latencies kept for the p50/p99 metrics
+SERVING_METRICS_WINDOW: int = 10000
+
+
+"""
+Streaming related constant start with STREAMING VAR NAME
+"""
+STREAMING_DIR_NAME: str = "streaming"
+STREAMING_FORECASTS_FILE_NAME: str = "forecasts.jsonl"
+STREAMING_RESUME_TOKEN_FILE_NAME: str = "resume_token.yaml"
+STREAMING_POLL_INTERVAL_S: float = 1.0
+## retrain when the PSI of any monitored pollutant crosses the threshold
+STREAMING_DRIFT_COLUMNS: list = ["PM2.5", "PM10", "NO2", "CO"]
+STREAMING_DRIFT_PSI_THRESHOLD: float = 0.2
+STREAMING_DRIFT_HALF_LIFE_HOURS: float = 168.0
+STREAMING_DRIFT_MIN_SAMPLES: float = 72.0
+STREAMING_DRIFT_CHECK_EVERY: int = 24
+STREAMING_RETRAIN_COOLDOWN_S: float = 6 * 3600.0
+
+
+"""
+Feed ingestion related constant start with FEED_INGESTION VAR NAME
+"""
+## YAML list of station feeds: name, url, and optionally poll_interval_s, rate_limit_per_s, since_param
+FEED_INGESTION_SOURCES_FILE_PATH: str = os.path.join("data_schema", "feeds.yaml")
+FEED_INGESTION_DIR_NAME: str = "feed_ingestion"
+FEED_INGESTION_METRICS_FILE_NAME: str = "metrics.json"
+## CPCB publishes hourly averages, a feed is polled a few times an hour
+FEED_INGESTION_POLL_INTERVAL_S: float = 300.0
+## requests per second to one feed, retries included
+FEED_INGESTION_RATE_LIMIT_PER_S: float = 1.0
+FEED_INGESTION_MAX_CONCURRENT_REQUESTS: int = 16
+FEED_INGESTION_REQUEST_TIMEOUT_S: float = 10.0
+## exponential backoff with full jitter: uniform(0, min(max, base * 2 ** attempt))
+FEED_INGESTION_MAX_RETRIES: int = 5
+FEED_INGESTION_BACKOFF_BASE_S: float = 0.5
+FEED_INGESTION_BACKOFF_MAX_S: float = 60.0
+## readings per bulk write, and the longest a partial batch waits
+FEED_INGESTION_BATCH_SIZE: int = 500
+FEED_INGESTION_FLUSH_INTERVAL_S: float = 1.0
+## readings waiting for the writer; pollers block when it is full
+FEED_INGESTION_QUEUE_SIZE: int = 10_000
+## (station, From Date) keys remembered to drop re-served readings before they reach MongoDB
+FEED_INGESTION_DEDUP_WINDOW: int = 200_000
+FEED_INGESTION_METRICS_INTERVAL_S: float = 60.0
+FEED_INGESTION_METRICS_WINDOW: int = 10000
+
+
+"""
+Benchmark related constant start with BENCHMARK VAR NAME
+"""
+BENCHMARK_DIR: str = "benchmarks"
+BENCHMARK_WORK_DIR_NAME: str = "work"
+BENCHMARK_RESULTS_FILE_NAME: str = "results.json"
+## written with --save-baseline on the reference machine, later runs are compared against it
+BENCHMARK_BASELINE_FILE_NAME: str = "baseline.json"
+BENCHMARK_NAMES: list = ["import_time", "data_ingestion", "data_validation", "feature_engineering", "data_transformation", "utils"]
+## cold start of a fresh interpreter importing each entry point, "" is the bare interpreter
+BENCHMARK_IMPORT_MODULES: list = [
+    "",
+    "pollution_forecasting.entity.config_entity",
+    "pollution_forecasting.pipeline.training_pipeline",
+    "pollution_forecasting.pipeline.stage_runner",
+    "pollution_forecasting.pipeline.sharded_pipeline",
+    "pollution_forecasting.serving.inference_server",
+    "pollution_forecasting.streaming.stream_service",
+    "pollution_forecasting.ingestion.feed_service",
+]
+## rows of synthetic data per scaling point, the generator itself scales to 100M+
+BENCHMARK_SIZES: list = [10_000, 100_000, 1_000_000]
+BENCHMARK_STATIONS: int = 4
+BENCHMARK_SEED: int = 0
+BENCHMARK_REPEATS: int = 3
+## a case regresses when its median wall time or peak memory growth exceeds the baseline by this share
+BENCHMARK_TOLERANCE: float = 0.2
+## and by at least this much, so millisecond cases do not flag on noise
+BENCHMARK_MIN_WALL_DELTA_S: float = 0.05
+BENCHMARK_MIN_RSS_DELTA_MB: float = 16.0
+## the in-process Mongo stand-in (mongomock) reads its cursor in quadratic time, larger ingestion cases need --mongo-url
+BENCHMARK_MONGO_MAX_ROWS: int = 50_000
+## sklearn's KNNImputer, timed against the seasonal imputer, compares each incomplete row with every
+## training row; 12 minutes at 100k rows, so larger sizes leave it out unless asked for
+BENCHMARK_SKLEARN_KNN_MAX_ROWS: int = 100_000
@@ -14,8 +14,41 @@ class DataValidationArtifact:
     invalid_test_file_path: str
     drift_report_file_path: str
 
+@dataclass
+class FeatureEngineeringArtifact:
+    engineered_train_file_path: str
+    engineered_test_file_path: str
+
 @dataclass
 class DataTransformationArtifact:
     transformed_object_file_path: str
     transformed_train_file_path: str
-    transformed_test_file_path: str
\ No newline at end of file
+    transformed_test_file_path: str
+    transformed_train_timestamps_file_path: str
+    transformed_test_timestamps_file_path: str
+    transformed_train_stations_file_path: str
+    transformed_test_stations_file_path: str
+    transformed_columns_file_path: str
+
+@dataclass
+class ModelTunerArtifact:
+    tuned_params_file_path: str
+    folds_file_path: str
+    report_file_path: str
+
+@dataclass
+class ModelTrainerArtifact:
+    trained_model_dir: str
+    model_report_file_path: str
+
+@dataclass
+class BacktestArtifact:
+    metrics_file_path: str
+    cutoff_metrics_file_path: str
+    report_file_path: str
+
+@dataclass
+class ShardedPipelineArtifact:
+    summary_file_path: str
+    succeeded_stations: list
+    failed_stations: list
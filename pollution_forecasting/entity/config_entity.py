@@ -2,19 +2,97 @@
 # It helps to maintain the folder structure and file paths for the training pipeline, data ingestion, data validation, and data transformation processes.
 from datetime import datetime
 import os
+import re
+from typing import Optional
 from pollution_forecasting.constant import training_pipeline
 
-print(training_pipeline.PIPELINE_NAME)
+
+def station_dir_name(station: str) -> str:
+    """
+    Directory-safe name of a station, e.g. "Anand Vihar, Delhi - DPCC" -> "Anand_Vihar_Delhi_-_DPCC".
+    """
+    return re.sub(r"[^A-Za-z0-9.-]+", "_", str(station)).strip("_") or training_pipeline.DATA_INGESTION_DEFAULT_STATION
+
 
 class TrainingPipelineConfig:
-    def __init__(self,timestamp=datetime.now()):
+    def __init__(self,timestamp=datetime.now(),station: Optional[str]=None):
         timestamp=timestamp.strftime("%m_%d_%Y_%H_%M_%S")
         self.pipeline_name=training_pipeline.PIPELINE_NAME
         self.artifact_name=training_pipeline.ARTIFACT_DIR
-        self.artifact_dir=os.path.join(self.artifact_name,timestamp)
+        self.run_dir=os.path.join(self.artifact_name,timestamp)
+        self.artifact_dir=self.run_dir
         self.model_dir=os.path.join("final_model")
         self.timestamp: str=timestamp
+        # a station shard keeps its artifacts, feature store and served models apart from the others
+        self.station: Optional[str]=station
+        if station is not None:
+            self.artifact_dir=os.path.join(self.run_dir,station_dir_name(station))
+            self.model_dir=os.path.join(self.model_dir,station_dir_name(station))
+
+
+
+class InstrumentationConfig:
+    """
+    Configuration of the per-stage instrumentation: the JSON run report, MLflow logging and
+    the optional profile of one stage.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.report_file_path: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.INSTRUMENTATION_REPORT_FILE_NAME)
+        self.profile_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.INSTRUMENTATION_PROFILE_DIR_NAME)
+        self.mlflow: bool = training_pipeline.INSTRUMENTATION_MLFLOW
+        self.experiment_name: str = training_pipeline_config.pipeline_name
+        self.profile_stage: str = training_pipeline.INSTRUMENTATION_PROFILE_STAGE
+        self.profile_mode: str = training_pipeline.INSTRUMENTATION_PROFILE_MODE
+        self.sample_interval_s: float = training_pipeline.INSTRUMENTATION_SAMPLE_INTERVAL_S
+
 
+class StageCacheConfig:
+    """
+    Configuration of the content-hash stage cache shared by all pipeline runs.
+    """
+    def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        self.enabled: bool = training_pipeline.STAGE_CACHE_ENABLED
+        self.artifact_root: str = training_pipeline_config.artifact_name
+        self.artifact_dir: str = training_pipeline_config.artifact_dir
+        # the whole timestamped run, which holds every station shard of a sharded run
+        self.run_dir: str = training_pipeline_config.run_dir
+        self.cache_dir: str = os.path.join(training_pipeline_config.artifact_name, training_pipeline.STAGE_CACHE_DIR_NAME)
+        self.file_hashes_file_path: str = os.path.join(self.cache_dir, training_pipeline.STAGE_CACHE_FILE_HASHES_FILE_NAME)
+        self.max_bytes: int = training_pipeline.STAGE_CACHE_MAX_BYTES
+        self.code_version: str = training_pipeline.STAGE_CACHE_CODE_VERSION
+
+
+class ShardingConfig:
+    """
+    Configuration of a sharded run: which stations to train, how many shards run at once
+    and where the summary over all shards goes.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.stations: list = training_pipeline.SHARDING_STATIONS
+        self.workers: int = training_pipeline.SHARDING_WORKERS
+        self.cpu_count: int = os.cpu_count() or 1
+        self.summary_file_path: str = os.path.join(training_pipeline_config.run_dir, training_pipeline.SHARDING_SUMMARY_FILE_NAME)
+
+
+class MongoConfig:
+    """
+    Configuration of the shared MongoDB client: where the URL comes from, the connection pool
+    and timeouts, and the cursor batch size of the aggregation query layer.
+    """
+    def __init__(self):
+        self.url_env_var: str = training_pipeline.MONGO_URL_ENV_VAR
+        self.app_name: str = training_pipeline.MONGO_APP_NAME
+        self.max_pool_size: int = training_pipeline.MONGO_MAX_POOL_SIZE
+        self.min_pool_size: int = training_pipeline.MONGO_MIN_POOL_SIZE
+        self.max_idle_time_ms: int = training_pipeline.MONGO_MAX_IDLE_TIME_MS
+        self.connect_timeout_ms: int = training_pipeline.MONGO_CONNECT_TIMEOUT_MS
+        self.server_selection_timeout_ms: int = training_pipeline.MONGO_SERVER_SELECTION_TIMEOUT_MS
+        self.socket_timeout_ms: int = training_pipeline.MONGO_SOCKET_TIMEOUT_MS
+        self.wait_queue_timeout_ms: int = training_pipeline.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        self.retry_reads: bool = training_pipeline.MONGO_RETRY_READS
+        self.retry_writes: bool = training_pipeline.MONGO_RETRY_WRITES
+        self.compressors: str = training_pipeline.MONGO_COMPRESSORS
+        self.query_batch_size: int = training_pipeline.MONGO_QUERY_BATCH_SIZE
 
 
 class DataIngestionConfig:
@@ -22,8 +100,17 @@ class DataIngestionConfig:
         self.data_ingestion_dir:str=os.path.join(
             training_pipeline_config.artifact_dir,training_pipeline.DATA_INGESTION_DIR_NAME
         )
+        # the feature store lives outside the timestamped run dir so that incremental runs can append to it
+        self.feature_store_dir: str = os.path.join(
+                training_pipeline_config.artifact_name, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR
+            )
+        if training_pipeline_config.station is not None:
+            self.feature_store_dir = os.path.join(self.feature_store_dir, station_dir_name(training_pipeline_config.station))
         self.feature_store_file_path: str = os.path.join(
-                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+                self.feature_store_dir, training_pipeline.FILE_NAME
+            )
+        self.watermark_file_path: str = os.path.join(
+                self.feature_store_dir, training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME
             )
         self.training_file_path: str = os.path.join(
                 self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TRAIN_FILE_NAME
@@ -34,6 +121,16 @@ class DataIngestionConfig:
         self.train_test_split_ratio: float = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
         self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
         self.database_name: str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.batch_size: int = training_pipeline.DATA_INGESTION_BATCH_SIZE
+        self.incremental: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.watermark_column: str = training_pipeline.DATA_INGESTION_WATERMARK_COLUMN
+        self.lookback_hours: int = training_pipeline.DATA_INGESTION_LOOKBACK_HOURS
+        self.datetime_format: str = training_pipeline.DATA_INGESTION_DATETIME_FORMAT
+        self.station_column: str = training_pipeline.DATA_INGESTION_STATION_COLUMN
+        self.station: Optional[str] = training_pipeline_config.station
+        self.start_date: Optional[str] = training_pipeline.DATA_INGESTION_START_DATE
+        self.end_date: Optional[str] = training_pipeline.DATA_INGESTION_END_DATE
+        self.compact_dtypes: bool = training_pipeline.COMPACT_DTYPES
 
 
 class DataValidationConfig:
@@ -62,6 +159,44 @@ class DataValidationConfig:
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME,
         )
+        self.drift_threshold: float = training_pipeline.DATA_VALIDATION_DRIFT_THRESHOLD
+        self.drift_metrics: list = training_pipeline.DATA_VALIDATION_DRIFT_METRICS
+        self.drift_psi_bins: int = training_pipeline.DATA_VALIDATION_DRIFT_PSI_BINS
+        self.drift_sample_error: float = training_pipeline.DATA_VALIDATION_DRIFT_SAMPLE_ERROR
+        self.drift_sample_confidence: float = training_pipeline.DATA_VALIDATION_DRIFT_SAMPLE_CONFIDENCE
+        self.drift_sampling: str = training_pipeline.DATA_VALIDATION_DRIFT_SAMPLING
+        self.drift_workers: int = training_pipeline.DATA_VALIDATION_DRIFT_WORKERS
+        self.drift_parallel_min_rows: int = training_pipeline.DATA_VALIDATION_DRIFT_PARALLEL_MIN_ROWS
+        self.drift_histogram_bins: int = training_pipeline.DATA_VALIDATION_DRIFT_HISTOGRAM_BINS
+        self.compact_dtypes: bool = training_pipeline.COMPACT_DTYPES
+        self.chunked: bool = training_pipeline.CHUNKED_MODE
+        self.chunk_rows: int = training_pipeline.CHUNK_ROWS
+
+class FeatureEngineeringConfig:
+    """
+    Configuration of the feature engineering stage: output paths and the lag, rolling-window,
+    seasonality and holiday feature settings.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.feature_engineering_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.FEATURE_ENGINEERING_DIR_NAME)
+        self.engineered_train_file_path: str = os.path.join(
+            self.feature_engineering_dir, training_pipeline.FEATURE_ENGINEERING_ENGINEERED_DIR, training_pipeline.TRAIN_FILE_NAME
+        )
+        self.engineered_test_file_path: str = os.path.join(
+            self.feature_engineering_dir, training_pipeline.FEATURE_ENGINEERING_ENGINEERED_DIR, training_pipeline.TEST_FILE_NAME
+        )
+        self.holidays_file_path: str = training_pipeline.FEATURE_ENGINEERING_HOLIDAYS_FILE_PATH
+        self.timestamp_column: str = training_pipeline.DATA_INGESTION_WATERMARK_COLUMN
+        self.station_column: str = training_pipeline.DATA_INGESTION_STATION_COLUMN
+        self.lags: dict = training_pipeline.FEATURE_ENGINEERING_LAGS
+        self.rolling_columns: list = training_pipeline.FEATURE_ENGINEERING_ROLLING_COLUMNS
+        self.rolling_windows: dict = training_pipeline.FEATURE_ENGINEERING_ROLLING_WINDOWS
+        self.rolling_stats: list = training_pipeline.FEATURE_ENGINEERING_ROLLING_STATS
+        self.fourier_terms: dict = training_pipeline.FEATURE_ENGINEERING_FOURIER_TERMS
+        self.diwali_window_days: tuple = training_pipeline.FEATURE_ENGINEERING_DIWALI_WINDOW_DAYS
+        self.aqi_lags: list = training_pipeline.FEATURE_ENGINEERING_AQI_LAGS
+        self.compact_dtypes: bool = training_pipeline.COMPACT_DTYPES
+
 
 class DataTransformationConfig:
     """
@@ -81,15 +216,229 @@ class DataTransformationConfig:
         self.transformed_train_file_path: str = os.path.join(
             self.data_transformation_dir,
             training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-            training_pipeline.TRAIN_FILE_NAME.replace("csv", "npy"),
+            os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + ".npy",
         )
         self.transformed_test_file_path: str = os.path.join(
             self.data_transformation_dir,
             training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-            training_pipeline.TEST_FILE_NAME.replace("csv", "npy"),
+            os.path.splitext(training_pipeline.TEST_FILE_NAME)[0] + ".npy",
         )
         self.transformed_object_file_path: str = os.path.join(
             self.data_transformation_dir,
             training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
             training_pipeline.PREPROCESSING_OBJECT_FILE_NAME,
         )
+        self.transformed_train_timestamps_file_path: str = os.path.join(
+            self.data_transformation_dir,
+            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_TIMESTAMPS_SUFFIX,
+        )
+        self.transformed_test_timestamps_file_path: str = os.path.join(
+            self.data_transformation_dir,
+            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            os.path.splitext(training_pipeline.TEST_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_TIMESTAMPS_SUFFIX,
+        )
+        self.transformed_train_stations_file_path: str = os.path.join(
+            self.data_transformation_dir,
+            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            os.path.splitext(training_pipeline.TRAIN_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_STATIONS_SUFFIX,
+        )
+        self.transformed_test_stations_file_path: str = os.path.join(
+            self.data_transformation_dir,
+            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            os.path.splitext(training_pipeline.TEST_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_STATIONS_SUFFIX,
+        )
+        self.transformed_columns_file_path: str = os.path.join(
+            self.data_transformation_dir,
+            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.DATA_TRANSFORMATION_COLUMNS_FILE_NAME,
+        )
+        # model store the preprocessor is published to for the inference server
+        self.final_model_store_dir: str = training_pipeline_config.model_dir
+        self.preprocessor_name: str = training_pipeline.MODEL_STORE_PREPROCESSOR_NAME
+        self.model_store_compress: int = training_pipeline.MODEL_STORE_COMPRESS
+        self.model_store_keep_versions: int = training_pipeline.MODEL_STORE_KEEP_VERSIONS
+        self.compact_dtypes: bool = training_pipeline.COMPACT_DTYPES
+        self.block_rows: int = training_pipeline.ARRAY_BLOCK_ROWS
+        self.imputer_params: dict = dict(training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS)
+        self.chunked: bool = training_pipeline.CHUNKED_MODE
+        self.chunk_rows: int = training_pipeline.CHUNK_ROWS
+        self.fit_sample_rows: int = training_pipeline.DATA_TRANSFORMATION_FIT_SAMPLE_ROWS
+
+
+class ModelTrainerConfig:
+    """
+    Configuration of the model trainer: where the per (pollutant, horizon) models and the
+    training report go, which models to train and how many worker processes to use.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.MODEL_TRAINER_DIR_NAME)
+        self.trained_model_dir: str = os.path.join(self.model_trainer_dir, training_pipeline.MODEL_TRAINER_TRAINED_MODEL_DIR)
+        self.final_model_dir: str = os.path.join(training_pipeline_config.model_dir, training_pipeline.MODEL_TRAINER_FINAL_MODEL_DIR)
+        self.model_report_file_path: str = os.path.join(self.model_trainer_dir, training_pipeline.MODEL_TRAINER_REPORT_FILE_NAME)
+        self.target_pollutants: list = training_pipeline.MODEL_TRAINER_TARGET_POLLUTANTS
+        self.horizons: list = training_pipeline.MODEL_TRAINER_HORIZONS
+        self.workers: int = training_pipeline.MODEL_TRAINER_WORKERS
+        self.model_params: dict = dict(training_pipeline.MODEL_TRAINER_MODEL_PARAMS)
+        self.block_rows: int = training_pipeline.ARRAY_BLOCK_ROWS
+        self.model_store_compress: int = training_pipeline.MODEL_STORE_COMPRESS
+        self.model_store_keep_versions: int = training_pipeline.MODEL_STORE_KEEP_VERSIONS
+
+
+class ModelTunerConfig:
+    """
+    Configuration of the hyperparameter search: the target model it is scored on, the
+    time-series folds, the successive-halving schedule and the search space.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.model_tuner_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.MODEL_TUNER_DIR_NAME)
+        # raw feature matrix and memoized fold transforms, removed once the search is done
+        self.work_dir: str = os.path.join(self.model_tuner_dir, "work")
+        self.folds_file_path: str = os.path.join(self.model_tuner_dir, training_pipeline.MODEL_TUNER_FOLDS_FILE_NAME)
+        self.report_file_path: str = os.path.join(self.model_tuner_dir, training_pipeline.MODEL_TUNER_REPORT_FILE_NAME)
+        self.tuned_params_file_path: str = os.path.join(self.model_tuner_dir, training_pipeline.MODEL_TUNER_TUNED_PARAMS_FILE_NAME)
+        self.enabled: bool = training_pipeline.MODEL_TUNER_ENABLED
+        self.target_pollutant: str = training_pipeline.MODEL_TUNER_TARGET_POLLUTANT
+        self.horizon: int = training_pipeline.MODEL_TUNER_HORIZON
+        self.n_splits: int = training_pipeline.MODEL_TUNER_N_SPLITS
+        self.n_candidates: int = training_pipeline.MODEL_TUNER_N_CANDIDATES
+        self.eta: int = training_pipeline.MODEL_TUNER_ETA
+        self.min_resource: int = training_pipeline.MODEL_TUNER_MIN_RESOURCE
+        self.workers: int = training_pipeline.MODEL_TUNER_WORKERS
+        self.random_state: int = training_pipeline.MODEL_TUNER_RANDOM_STATE
+        self.search_space: dict = training_pipeline.MODEL_TUNER_SEARCH_SPACE
+        self.imputer_params: dict = dict(training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS)
+        self.model_params: dict = dict(training_pipeline.MODEL_TRAINER_MODEL_PARAMS)
+
+
+class BacktestConfig:
+    """
+    Configuration of the rolling-origin backtest: the cutoff schedule, the warm-start cadence,
+    the models evaluated and where the metric tables go.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.backtest_dir: str = os.path.join(training_pipeline_config.artifact_dir, training_pipeline.BACKTEST_DIR_NAME)
+        self.history_file_path: str = os.path.join(self.backtest_dir, training_pipeline.BACKTEST_HISTORY_FILE_NAME)
+        self.history_timestamps_file_path: str = os.path.join(
+            self.backtest_dir,
+            os.path.splitext(training_pipeline.BACKTEST_HISTORY_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_TIMESTAMPS_SUFFIX,
+        )
+        self.history_stations_file_path: str = os.path.join(
+            self.backtest_dir,
+            os.path.splitext(training_pipeline.BACKTEST_HISTORY_FILE_NAME)[0] + training_pipeline.DATA_TRANSFORMATION_STATIONS_SUFFIX,
+        )
+        self.metrics_file_path: str = os.path.join(self.backtest_dir, training_pipeline.BACKTEST_METRICS_FILE_NAME)
+        self.cutoff_metrics_file_path: str = os.path.join(self.backtest_dir, training_pipeline.BACKTEST_CUTOFF_METRICS_FILE_NAME)
+        self.report_file_path: str = os.path.join(self.backtest_dir, training_pipeline.BACKTEST_REPORT_FILE_NAME)
+        self.enabled: bool = training_pipeline.BACKTEST_ENABLED
+        self.target_pollutants: list = training_pipeline.BACKTEST_TARGET_POLLUTANTS
+        self.horizons: list = training_pipeline.BACKTEST_HORIZONS
+        self.initial_hours: int = training_pipeline.BACKTEST_INITIAL_HOURS
+        self.step_hours: int = training_pipeline.BACKTEST_STEP_HOURS
+        self.train_window_hours: int = training_pipeline.BACKTEST_TRAIN_WINDOW_HOURS
+        self.refit_every: int = training_pipeline.BACKTEST_REFIT_EVERY
+        self.warm_start_iter: int = training_pipeline.BACKTEST_WARM_START_ITER
+        self.workers: int = training_pipeline.BACKTEST_WORKERS
+        self.block_rows: int = training_pipeline.ARRAY_BLOCK_ROWS
+        self.model_params: dict = dict(training_pipeline.MODEL_TRAINER_MODEL_PARAMS)
+
+
+class ServingConfig:
+    """
+    Configuration of the local inference server: the served model files, the listening address
+    and the micro-batching and metrics settings.
+    """
+    def __init__(self, model_dir: str = "final_model"):
+        self.model_store_dir: str = model_dir
+        self.preprocessor_name: str = training_pipeline.MODEL_STORE_PREPROCESSOR_NAME
+        self.model_dir: str = os.path.join(model_dir, training_pipeline.MODEL_TRAINER_FINAL_MODEL_DIR)
+        self.model_names: list = training_pipeline.SERVING_MODEL_NAMES
+        self.host: str = training_pipeline.SERVING_HOST
+        self.port: int = training_pipeline.SERVING_PORT
+        self.max_batch_size: int = training_pipeline.SERVING_MAX_BATCH_SIZE
+        self.max_wait_ms: float = training_pipeline.SERVING_MAX_WAIT_MS
+        self.request_timeout_s: float = training_pipeline.SERVING_REQUEST_TIMEOUT_S
+        self.compiled_max_rows: int = training_pipeline.SERVING_COMPILED_MAX_ROWS
+        self.metrics_window: int = training_pipeline.SERVING_METRICS_WINDOW
+
+
+class StreamingConfig:
+    """
+    Configuration of the streaming online-update mode: the served models and feature store it
+    starts from, where forecasts go, and when drift triggers a retrain.
+    """
+    def __init__(self, model_dir: str = "final_model"):
+        self.model_store_dir: str = model_dir
+        self.preprocessor_name: str = training_pipeline.MODEL_STORE_PREPROCESSOR_NAME
+        self.model_dir: str = os.path.join(model_dir, training_pipeline.MODEL_TRAINER_FINAL_MODEL_DIR)
+        self.model_names: list = training_pipeline.SERVING_MODEL_NAMES
+        self.compiled_max_rows: int = training_pipeline.SERVING_COMPILED_MAX_ROWS
+        self.feature_store_file_path: str = os.path.join(
+            training_pipeline.ARTIFACT_DIR, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+        )
+        self.streaming_dir: str = os.path.join(training_pipeline.ARTIFACT_DIR, training_pipeline.STREAMING_DIR_NAME)
+        self.forecasts_file_path: str = os.path.join(self.streaming_dir, training_pipeline.STREAMING_FORECASTS_FILE_NAME)
+        self.resume_token_file_path: str = os.path.join(self.streaming_dir, training_pipeline.STREAMING_RESUME_TOKEN_FILE_NAME)
+        self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        self.database_name: str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.poll_interval_s: float = training_pipeline.STREAMING_POLL_INTERVAL_S
+        self.drift_columns: list = training_pipeline.STREAMING_DRIFT_COLUMNS
+        self.drift_psi_threshold: float = training_pipeline.STREAMING_DRIFT_PSI_THRESHOLD
+        self.drift_bins: int = training_pipeline.DATA_VALIDATION_DRIFT_PSI_BINS
+        self.drift_half_life_hours: float = training_pipeline.STREAMING_DRIFT_HALF_LIFE_HOURS
+        self.drift_min_samples: float = training_pipeline.STREAMING_DRIFT_MIN_SAMPLES
+        self.drift_check_every: int = training_pipeline.STREAMING_DRIFT_CHECK_EVERY
+        self.retrain_cooldown_s: float = training_pipeline.STREAMING_RETRAIN_COOLDOWN_S
+
+
+class FeedIngestionConfig:
+    """
+    Configuration of the real-time feed ingestion service: the station feeds to poll, request
+    limits and retries, the batched writes into the air quality collection and its metrics.
+    """
+    def __init__(self, sources_file_path: str = training_pipeline.FEED_INGESTION_SOURCES_FILE_PATH):
+        self.sources_file_path: str = sources_file_path
+        self.feed_ingestion_dir: str = os.path.join(training_pipeline.ARTIFACT_DIR, training_pipeline.FEED_INGESTION_DIR_NAME)
+        self.metrics_file_path: str = os.path.join(self.feed_ingestion_dir, training_pipeline.FEED_INGESTION_METRICS_FILE_NAME)
+        self.database_name: str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        self.station_column: str = training_pipeline.DATA_INGESTION_STATION_COLUMN
+        self.timestamp_column: str = training_pipeline.DATA_INGESTION_WATERMARK_COLUMN
+        self.datetime_format: str = training_pipeline.DATA_INGESTION_DATETIME_FORMAT
+        self.poll_interval_s: float = training_pipeline.FEED_INGESTION_POLL_INTERVAL_S
+        self.rate_limit_per_s: float = training_pipeline.FEED_INGESTION_RATE_LIMIT_PER_S
+        self.max_concurrent_requests: int = training_pipeline.FEED_INGESTION_MAX_CONCURRENT_REQUESTS
+        self.request_timeout_s: float = training_pipeline.FEED_INGESTION_REQUEST_TIMEOUT_S
+        self.max_retries: int = training_pipeline.FEED_INGESTION_MAX_RETRIES
+        self.backoff_base_s: float = training_pipeline.FEED_INGESTION_BACKOFF_BASE_S
+        self.backoff_max_s: float = training_pipeline.FEED_INGESTION_BACKOFF_MAX_S
+        self.batch_size: int = training_pipeline.FEED_INGESTION_BATCH_SIZE
+        self.flush_interval_s: float = training_pipeline.FEED_INGESTION_FLUSH_INTERVAL_S
+        self.queue_size: int = training_pipeline.FEED_INGESTION_QUEUE_SIZE
+        self.dedup_window: int = training_pipeline.FEED_INGESTION_DEDUP_WINDOW
+        self.metrics_interval_s: float = training_pipeline.FEED_INGESTION_METRICS_INTERVAL_S
+        self.metrics_window: int = training_pipeline.FEED_INGESTION_METRICS_WINDOW
+
+
+class BenchmarkConfig:
+    """
+    Configuration of the benchmark suite: cases to run, synthetic data, and the baseline
+    results are compared against.
+    """
+    def __init__(self, benchmark_dir: str = training_pipeline.BENCHMARK_DIR):
+        self.benchmark_dir: str = benchmark_dir
+        self.work_dir: str = os.path.join(benchmark_dir, training_pipeline.BENCHMARK_WORK_DIR_NAME)
+        self.results_file_path: str = os.path.join(benchmark_dir, training_pipeline.BENCHMARK_RESULTS_FILE_NAME)
+        self.baseline_file_path: str = os.path.join(benchmark_dir, training_pipeline.BENCHMARK_BASELINE_FILE_NAME)
+        self.benchmarks: list = list(training_pipeline.BENCHMARK_NAMES)
+        self.import_modules: list = list(training_pipeline.BENCHMARK_IMPORT_MODULES)
+        self.sizes: list = list(training_pipeline.BENCHMARK_SIZES)
+        self.stations: int = training_pipeline.BENCHMARK_STATIONS
+        self.seed: int = training_pipeline.BENCHMARK_SEED
+        self.repeats: int = training_pipeline.BENCHMARK_REPEATS
+        self.tolerance: float = training_pipeline.BENCHMARK_TOLERANCE
+        self.min_wall_delta_s: float = training_pipeline.BENCHMARK_MIN_WALL_DELTA_S
+        self.min_rss_delta_mb: float = training_pipeline.BENCHMARK_MIN_RSS_DELTA_MB
+        self.mongo_max_rows: int = training_pipeline.BENCHMARK_MONGO_MAX_ROWS
+        self.sklearn_knn_max_rows: int = training_pipeline.BENCHMARK_SKLEARN_KNN_MAX_ROWS
+        self.mongo_url: Optional[str] = None
@@ -0,0 +1,591 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import signal
+import asyncio
+import argparse
+import urllib.error
+import urllib.request
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import numpy as np
+
+from pollution_forecasting.constant.training_pipeline import SCHEMA_FILE_PATH
+from pollution_forecasting.entity.config_entity import FeedIngestionConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import read_yaml_file
+
+# worth another try: timeouts, throttling and server-side failures
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# a reading covers the hour starting at its timestamp
+READING_PERIOD = timedelta(hours=1)
+# handed to the writer when a partial batch is due
+_FLUSH = object()
+
+
+@dataclass
+class FeedSource:
+    """
+    One station feed: the URL polled for its latest readings and how hard it may be polled.
+    Readings without a station key are tagged with `name`.
+    """
+    name: str
+    url: str
+    poll_interval_s: float
+    rate_limit_per_s: float
+    # query parameter carrying the newest timestamp already received, None if the feed has none
+    since_param: Optional[str] = "since"
+
+
+class FetchError(Exception):
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def load_sources(feed_ingestion_config: FeedIngestionConfig) -> List[FeedSource]:
+    """
+    Feeds listed in the `sources_file_path` YAML, either a list or a `feeds:` list of
+    `{name, url}` entries, each optionally overriding poll_interval_s, rate_limit_per_s
+    and since_param.
+
+    Raises:
+        PollutionException: If the file cannot be read or an entry lacks a name or URL.
+    """
+    try:
+        content = read_yaml_file(feed_ingestion_config.sources_file_path) or []
+        entries = content.get("feeds", []) if isinstance(content, dict) else content
+        sources = []
+        for entry in entries:
+            if not entry.get("name") or not entry.get("url"):
+                raise ValueError(f"A feed needs a name and a url, got {entry}")
+            sources.append(FeedSource(
+                name=str(entry["name"]),
+                url=entry["url"],
+                poll_interval_s=float(entry.get("poll_interval_s", feed_ingestion_config.poll_interval_s)),
+                rate_limit_per_s=float(entry.get("rate_limit_per_s", feed_ingestion_config.rate_limit_per_s)),
+                since_param=entry.get("since_param", "since"),
+            ))
+        return sources
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+class RateLimiter:
+    """
+    Spaces the requests to one feed at least `1 / rate_per_s` seconds apart.
+    """
+
+    def __init__(self, rate_per_s: float):
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class DedupWindow:
+    """
+    The most recently seen keys, oldest forgotten first once `size` are remembered.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._keys: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Returns:
+            bool: True if the key is new, False if it was seen within the window.
+        """
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.size:
+            self._keys.popitem(last=False)
+        return True
+
+
+class ReadingNormalizer:
+    """
+    Turns a raw feed record into the document stored in the air quality collection, the
+    same shape `push_data.py` loads: the schema's missing-value markers ('None', 'na', ...)
+    become null, pollutants floats, the CPCB `dd-mm-YYYY HH:MM` strings native datetimes,
+    and every reading carries its station.
+    """
+
+    def __init__(self, schema_config: dict, station_column: str, timestamp_column: str, datetime_format: str):
+        self.missing_values = {str(value).strip().lower() for value in schema_config.get("missing_values", [])}
+        self.numerical_columns = set(schema_config.get("numerical_columns", []))
+        self.datetime_columns = set(schema_config.get("datetime_columns", [])) | {timestamp_column}
+        self.station_column = station_column
+        self.timestamp_column = timestamp_column
+        self.datetime_format = datetime_format
+
+    def parse_datetime(self, value) -> Optional[datetime]:
+        if isinstance(value, datetime):
+            return value
+        if not isinstance(value, str):
+            return None
+        for parse in (lambda text: datetime.strptime(text, self.datetime_format), datetime.fromisoformat):
+            try:
+                return parse(value.strip())
+            except ValueError:
+                continue
+        return None
+
+    def parse_number(self, value) -> Optional[float]:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return number if math.isfinite(number) else None
+
+    def normalize(self, record: dict, station: str) -> Optional[dict]:
+        """
+        Returns:
+            Optional[dict]: The document, None if the record has no usable timestamp.
+        """
+        document = {}
+        for column, value in record.items():
+            if isinstance(value, str) and value.strip().lower() in self.missing_values:
+                value = None
+            if column in self.datetime_columns:
+                value = self.parse_datetime(value)
+            elif column in self.numerical_columns and value is not None:
+                value = self.parse_number(value)
+            document[column] = value
+        document[self.station_column] = document.get(self.station_column) or station
+        if document.get(self.timestamp_column) is None:
+            return None
+        return document
+
+
+def records_of(payload) -> List[dict]:
+    """
+    Readings of a feed response: a JSON list, or the list under "records" or "data".
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("records", payload.get("data", []))
+    if not isinstance(payload, list):
+        raise FetchError(f"Expected a list of readings, got {type(payload).__name__}", retryable=False)
+    return [record for record in payload if isinstance(record, dict)]
+
+
+class IngestMetrics:
+    """
+    Counters of the service and per feed, plus a ring buffer of ingest lags: the time from the
+    end of a reading's hour to its write into MongoDB.
+    """
+
+    COUNTERS = (
+        "polls", "poll_failures", "retries", "received", "invalid", "duplicates",
+        "written", "upserted", "batches", "write_retries", "write_failures",
+    )
+
+    def __init__(self, window: int):
+        self._lags = np.zeros(window)
+        self._lag_count = 0
+        self._started = time.perf_counter()
+        self.counters: Dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+        self.sources: Dict[str, Dict[str, object]] = {}
+
+    def count(self, name: str, value: int = 1, source: Optional[str] = None) -> None:
+        self.counters[name] += value
+        if source is not None:
+            counters = self.sources.setdefault(source, {})
+            counters[name] = counters.get(name, 0) + value
+
+    def mark(self, source: str, name: str, value) -> None:
+        self.sources.setdefault(source, {})[name] = value
+
+    def record_lags(self, seconds: np.ndarray) -> None:
+        for lag in seconds:
+            self._lags[self._lag_count % len(self._lags)] = lag
+            self._lag_count += 1
+
+    def snapshot(self, queue_depth: int = 0) -> dict:
+        uptime = time.perf_counter() - self._started
+        summary = {
+            **self.counters,
+            "queue_depth": queue_depth,
+            "uptime_s": round(uptime, 3),
+            "throughput_rps": round(self.counters["written"] / uptime, 1) if uptime > 0 else None,
+        }
+        filled = min(self._lag_count, len(self._lags))
+        if filled:
+            p50, p90, p99 = np.percentile(self._lags[:filled], [50, 90, 99])
+            summary["ingest_lag_s"] = {
+                "p50": round(float(p50), 3),
+                "p90": round(float(p90), 3),
+                "p99": round(float(p99), 3),
+                "max": round(float(self._lags[:filled].max()), 3),
+            }
+        summary["sources"] = self.sources
+        return summary
+
+
+class FeedIngestionService:
+    """
+    Polls many station feeds concurrently and writes their readings into the air quality
+    collection in batches.
+
+    Each feed has a poller coroutine: it requests the readings newer than the last one
+    received, at most `rate_limit_per_s` requests per second and `max_concurrent_requests`
+    across all feeds, retrying throttled or failed requests with exponential backoff. The
+    normalized readings go through a bounded queue to a single writer that upserts them
+    in unordered `bulk_write` batches keyed on (station, From Date), so re-served readings
+    are dropped in memory and can never be stored twice. When the writer falls behind the
+    queue fills up and the pollers wait, and while MongoDB is unreachable the writer keeps
+    retrying its batch.
+
+    The blocking `urllib` requests and pymongo writes run on thread pools of their own, so
+    the service needs nothing beyond the standard library and pymongo.
+    """
+
+    def __init__(self, feed_ingestion_config: FeedIngestionConfig, collection=None,
+                 sources: Optional[List[FeedSource]] = None):
+        """
+        Initialize the FeedIngestionService.
+
+        Args:
+            feed_ingestion_config (FeedIngestionConfig): Feeds, limits and batching settings.
+            collection (Optional[pymongo.collection.Collection]): Collection to write to, e.g. a
+                mongomock stand-in. Defaults to the configured one on the shared client.
+            sources (Optional[List[FeedSource]]): Feeds to poll. Defaults to `load_sources`.
+
+        Raises:
+            PollutionException: If the feeds or the schema cannot be read.
+        """
+        try:
+            self.config = feed_ingestion_config
+            self.sources = sources if sources is not None else load_sources(feed_ingestion_config)
+            self.collection = collection
+            self.normalizer = ReadingNormalizer(
+                read_yaml_file(SCHEMA_FILE_PATH), feed_ingestion_config.station_column,
+                feed_ingestion_config.timestamp_column, feed_ingestion_config.datetime_format,
+            )
+            self.metrics = IngestMetrics(feed_ingestion_config.metrics_window)
+            self.dedup = DedupWindow(feed_ingestion_config.dedup_window)
+            # newest timestamp received from each feed, sent back as its `since_param`
+            self.cursors: Dict[str, datetime] = {}
+            # event loop state, created by run_async
+            self._loop: Optional[asyncio.AbstractEventLoop] = None
+            self._stop: Optional[asyncio.Event] = None
+            self._queue: Optional[asyncio.Queue] = None
+            self._requests: Optional[asyncio.Semaphore] = None
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def get_collection(self):
+        if self.collection is None:
+            from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
+            self.collection = get_mongo_client()[self.config.database_name][self.config.collection_name]
+        return self.collection
+
+    def request_url(self, source: FeedSource) -> str:
+        cursor = self.cursors.get(source.name)
+        if cursor is None or not source.since_param:
+            return source.url
+        parts = urlparse(source.url)
+        query = dict(parse_qsl(parts.query))
+        query[source.since_param] = cursor.strftime(self.config.datetime_format)
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    def _fetch_blocking(self, url: str):
+        request = urllib.request.Request(url, headers={"Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.config.request_timeout_s) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            raise FetchError(
+                f"{url} returned {e.code}", retryable=e.code in RETRYABLE_STATUS,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        except (urllib.error.URLError, OSError) as e:
+            # refused connections, DNS failures and timeouts
+            raise FetchError(f"{url} failed: {e}", retryable=True)
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise FetchError(f"{url} returned invalid JSON: {e}", retryable=False)
+
+    async def _sleep(self, seconds: float) -> None:
+        # returns early when the service is stopped
+        if seconds <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def fetch(self, source: FeedSource, limiter: RateLimiter) -> List[dict]:
+        """
+        Readings currently served by a feed, retried with exponential backoff and full jitter.
+
+        Raises:
+            FetchError: If the request fails for good or the response is not a list of readings.
+        """
+        url = self.request_url(source)
+        for attempt in range(self.config.max_retries + 1):
+            await limiter.acquire()
+            try:
+                async with self._requests:
+                    payload = await self._loop.run_in_executor(self._http_executor, self._fetch_blocking, url)
+                return records_of(payload)
+            except FetchError as e:
+                if not e.retryable or attempt == self.config.max_retries or self._stop.is_set():
+                    raise
+                self.metrics.count("retries", source=source.name)
+                delay = random.uniform(0, min(self.config.backoff_max_s, self.config.backoff_base_s * 2 ** attempt))
+                await self._sleep(max(delay, e.retry_after or 0.0))
+        return []
+
+    async def poll(self, source: FeedSource, max_polls: Optional[int] = None) -> None:
+        """
+        Poll one feed every `poll_interval_s` until the service stops or `max_polls` is reached.
+        """
+        limiter = RateLimiter(source.rate_limit_per_s)
+        station_column, timestamp_column = self.config.station_column, self.config.timestamp_column
+        polls = 0
+        while not self._stop.is_set() and (max_polls is None or polls < max_polls):
+            started = self._loop.time()
+            polls += 1
+            try:
+                records = await self.fetch(source, limiter)
+                self.metrics.count("polls", source=source.name)
+                self.metrics.mark(source.name, "last_success", datetime.now().isoformat(timespec="seconds"))
+            except Exception as e:
+                self.metrics.count("poll_failures", source=source.name)
+                self.metrics.mark(source.name, "last_error", str(e))
+                logging.warning(f"Polling feed {source.name} failed: {e}")
+                records = []
+
+            for record in records:
+                self.metrics.count("received", source=source.name)
+                document = self.normalizer.normalize(record, source.name)
+                if document is None:
+                    self.metrics.count("invalid", source=source.name)
+                    continue
+                if not self.dedup.add((document[station_column], document[timestamp_column])):
+                    self.metrics.count("duplicates", source=source.name)
+                    continue
+                timestamp = document[timestamp_column]
+                if source.name not in self.cursors or timestamp > self.cursors[source.name]:
+                    self.cursors[source.name] = timestamp
+                # blocks while the queue is full, which is the backpressure on the feeds
+                await self._queue.put((document, source.name))
+
+            if max_polls is None or polls < max_polls:
+                await self._sleep(source.poll_interval_s - (self._loop.time() - started))
+
+    async def _bulk_write(self, operations: list):
+        from pymongo.errors import BulkWriteError, ConnectionFailure
+
+        attempt = 0
+        while True:
+            try:
+                return await self._loop.run_in_executor(
+                    self._write_executor, partial(self.get_collection().bulk_write, operations, ordered=False)
+                )
+            except BulkWriteError as e:
+                # duplicate keys from a concurrent writer are already stored, anything else is not retried
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+                return None
+            except ConnectionFailure as e:
+                # keep the batch while MongoDB is away, the queue holds back the pollers meanwhile
+                self.metrics.count("write_retries")
+                delay = random.uniform(0, min(self.config.backoff_max_s, self.config.backoff_base_s * 2 ** attempt))
+                logging.warning(f"Writing {len(operations)} readings failed, retrying in {delay:.1f}s: {e}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def flush(self, batch: List[Tuple[dict, str]]) -> None:
+        """
+        Upsert one batch of readings and record their ingest lag.
+        """
+        from pymongo import ReplaceOne
+
+        station_column, timestamp_column = self.config.station_column, self.config.timestamp_column
+        operations = [
+            # a replacement rather than $set, since "PM2.5" would be read as a dotted path
+            ReplaceOne(
+                {station_column: document[station_column], timestamp_column: document[timestamp_column]},
+                document,
+                upsert=True,
+            )
+            for document, _ in batch
+        ]
+        try:
+            result = await self._bulk_write(operations)
+        except Exception as e:
+            self.metrics.count("write_failures", len(batch))
+            logging.error(f"Dropped a batch of {len(batch)} readings: {e}")
+            return
+        written_at = datetime.now()
+        self.metrics.count("batches")
+        if result is not None:
+            self.metrics.count("upserted", result.upserted_count)
+        for source_name, written in Counter(source_name for _, source_name in batch).items():
+            self.metrics.count("written", written, source=source_name)
+        self.metrics.record_lags(np.array([
+            (written_at - (document.get("To Date") or document[timestamp_column] + READING_PERIOD)).total_seconds()
+            for document, _ in batch
+        ]))
+
+    async def write(self) -> None:
+        """
+        Drain the queue into batches of `batch_size`, flushing a partial batch after
+        `flush_interval_s`, until the `None` sentinel arrives.
+        """
+        batch: List[Tuple[dict, str]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - self._loop.time())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = _FLUSH
+            if item is not None and item is not _FLUSH:
+                batch.append(item)
+                if deadline is None:
+                    deadline = self._loop.time() + self.config.flush_interval_s
+            if batch and (item is None or item is _FLUSH or len(batch) >= self.config.batch_size):
+                await self.flush(batch)
+                batch, deadline = [], None
+            if item is None:
+                return
+
+    def write_metrics(self) -> dict:
+        snapshot = self.metrics.snapshot(self._queue.qsize() if self._queue is not None else 0)
+        os.makedirs(os.path.dirname(self.config.metrics_file_path), exist_ok=True)
+        temporary_file_path = f"{self.config.metrics_file_path}.tmp"
+        with open(temporary_file_path, "w") as file:
+            json.dump(snapshot, file, indent=2, default=str)
+        os.replace(temporary_file_path, self.config.metrics_file_path)
+        return snapshot
+
+    async def _report(self) -> None:
+        while not self._stop.is_set():
+            await self._sleep(self.config.metrics_interval_s)
+            snapshot = self.write_metrics()
+            logging.info(
+                f"Feed ingestion: {snapshot['written']} written, {snapshot['duplicates']} duplicates, "
+                f"{snapshot['poll_failures']} failed polls, queue {snapshot['queue_depth']}, "
+                f"lag {snapshot.get('ingest_lag_s', {}).get('p50')}s"
+            )
+
+    async def run_async(self, max_polls: Optional[int] = None, duration_s: Optional[float] = None) -> dict:
+        """
+        Poll every feed until stopped, `duration_s` has passed or each feed was polled
+        `max_polls` times, then write out what is still queued.
+
+        Returns:
+            dict: Final metrics snapshot, also written to `metrics_file_path`.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._requests = asyncio.Semaphore(self.config.max_concurrent_requests)
+        self._http_executor = ThreadPoolExecutor(self.config.max_concurrent_requests, thread_name_prefix="feed-http")
+        # one writer thread keeps the batches in order
+        self._write_executor = ThreadPoolExecutor(1, thread_name_prefix="feed-write")
+        try:
+            self._loop.add_signal_handler(signal.SIGINT, self._stop.set)
+            self._loop.add_signal_handler(signal.SIGTERM, self._stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
+        if duration_s is not None:
+            self._loop.call_later(duration_s, self._stop.set)
+
+        try:
+            station_column, timestamp_column = self.config.station_column, self.config.timestamp_column
+            await self._loop.run_in_executor(self._write_executor, partial(
+                self.get_collection().create_index, [(station_column, 1), (timestamp_column, 1)], unique=True
+            ))
+            writer = asyncio.create_task(self.write())
+            reporter = asyncio.create_task(self._report())
+            logging.info(f"Polling {len(self.sources)} feeds")
+            try:
+                await asyncio.gather(*(self.poll(source, max_polls) for source in self.sources))
+            finally:
+                self._stop.set()
+                await self._queue.put(None)
+                await writer
+                await reporter
+            return self.write_metrics()
+        finally:
+            for handled in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    self._loop.remove_signal_handler(handled)
+                except (NotImplementedError, RuntimeError, ValueError):
+                    pass
+            self._http_executor.shutdown(wait=False, cancel_futures=True)
+            self._write_executor.shutdown(wait=True)
+
+    def run(self, max_polls: Optional[int] = None, duration_s: Optional[float] = None) -> dict:
+        """
+        Run the service on a new event loop, see `run_async`.
+
+        Raises:
+            PollutionException: If the service fails.
+        """
+        try:
+            return asyncio.run(self.run_async(max_polls=max_polls, duration_s=duration_s))
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def stop(self) -> None:
+        """
+        Stop polling from another thread; queued readings are still written.
+        """
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Poll station feeds and write their readings into MongoDB.")
+    parser.add_argument("--sources", default=None, help="YAML list of feeds, data_schema/feeds.yaml by default")
+    parser.add_argument("--max-polls", type=int, default=None, help="stop after polling each feed this many times")
+    parser.add_argument("--duration-s", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--poll-interval-s", type=float, default=None, help="default poll interval of the feeds")
+    parser.add_argument("--mongo-url", default=None, help="MongoDB URL, MONGO_DB_URL by default")
+    parser.add_argument("--mock-mongo", action="store_true", help="write into an in-process mongomock stand-in")
+    args = parser.parse_args(argv)
+
+    feed_ingestion_config = FeedIngestionConfig(args.sources) if args.sources else FeedIngestionConfig()
+    if args.poll_interval_s is not None:
+        feed_ingestion_config.poll_interval_s = args.poll_interval_s
+    collection = None
+    if args.mock_mongo:
+        import mongomock
+        collection = mongomock.MongoClient()[feed_ingestion_config.database_name][feed_ingestion_config.collection_name]
+    elif args.mongo_url:
+        from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
+        client = get_mongo_client(args.mongo_url)
+        collection = client[feed_ingestion_config.database_name][feed_ingestion_config.collection_name]
+
+    service = FeedIngestionService(feed_ingestion_config, collection=collection)
+    print(json.dumps(service.run(max_polls=args.max_polls, duration_s=args.duration_s), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+import numpy as np
+
+from pollution_forecasting.benchmark.synthetic_data import POLLUTANT_PROFILES, station_names
+from pollution_forecasting.constant.training_pipeline import DATA_INGESTION_DATETIME_FORMAT
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.utils.main.utils import write_yaml_file
+
+
+class StubFeedServer(ThreadingHTTPServer):
+    """
+    Local stand-in for CPCB station feeds, for running the feed ingestion service offline.
+
+    GET /feeds/<station>?since=<dd-mm-YYYY HH:MM>  {"station": ..., "records": [...]}, the hourly
+                                                   readings of the last `history_hours` hours
+                                                   newer than `since`, as CPCB exports them
+    GET /health                                    request and failure counters
+
+    A reading's values depend only on its station and hour, so polling again re-serves
+    identical readings. A share `failure_rate` of the requests is answered with a 503,
+    `latency_s` delays every response, and `honor_since=False` ignores `since` so every poll
+    re-serves the whole window.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, stations: int = 4, history_hours: int = 48,
+                 failure_rate: float = 0.0, latency_s: float = 0.0, none_fraction: float = 0.05,
+                 honor_since: bool = True, seed: int = 0):
+        try:
+            self.stations = station_names(stations)
+            self.history_hours = history_hours
+            self.failure_rate = failure_rate
+            self.latency_s = latency_s
+            self.none_fraction = none_fraction
+            self.honor_since = honor_since
+            self.seed = seed
+            self.requests = 0
+            self.failures = 0
+            self._lock = threading.Lock()
+            self._rng = np.random.default_rng(seed)
+            super().__init__((host, port), _StubFeedRequestHandler)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sources(self, **overrides) -> List[dict]:
+        """
+        Feed entries of every station, in the format of the feeds YAML.
+        """
+        return [
+            {"name": station, "url": f"{self.url}/feeds/{quote(station)}", **overrides}
+            for station in self.stations
+        ]
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            failed = bool(self._rng.random() < self.failure_rate)
+            self.failures += failed
+            return failed
+
+    def readings(self, station: str, since: Optional[datetime] = None) -> List[dict]:
+        """
+        Hourly readings of a station up to the current hour, newer than `since`.
+        """
+        station_index = self.stations.index(station)
+        latest = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        readings = []
+        for offset in range(self.history_hours - 1, -1, -1):
+            hour = latest - timedelta(hours=offset)
+            if since is not None and hour <= since:
+                continue
+            rng = np.random.default_rng([self.seed, station_index, int(hour.timestamp()) // 3600])
+            reading = {
+                "From Date": hour.strftime(DATA_INGESTION_DATETIME_FORMAT),
+                "To Date": (hour + timedelta(hours=1)).strftime(DATA_INGESTION_DATETIME_FORMAT),
+            }
+            for column, profile in POLLUTANT_PROFILES.items():
+                value = profile["level"] * rng.lognormal(0.0, 0.3)
+                # outages show up as the strings CPCB exports, not as nulls
+                missing = rng.random() < self.none_fraction
+                reading[column] = ("None" if rng.random() < 0.5 else "na") if missing else str(round(value, 2))
+            readings.append(reading)
+        return readings
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True, name="stub-feed-server")
+        thread.start()
+        return thread
+
+
+class _StubFeedRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubFeedServer
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        parts = urlparse(self.path)
+        if parts.path == "/health":
+            self._send_json(200, {"requests": self.server.requests, "failures": self.server.failures})
+            return
+        station = unquote(parts.path[len("/feeds/"):]) if parts.path.startswith("/feeds/") else None
+        if station not in self.server.stations:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        if self.server.should_fail():
+            self._send_json(503, {"error": "feed temporarily unavailable"})
+            return
+        since = None
+        values = parse_qs(parts.query).get("since")
+        if values and self.server.honor_since:
+            try:
+                since = datetime.strptime(values[0], DATA_INGESTION_DATETIME_FORMAT)
+            except ValueError:
+                self._send_json(400, {"error": f"since must look like {DATA_INGESTION_DATETIME_FORMAT}"})
+                return
+        self._send_json(200, {"station": station, "records": self.server.readings(station, since)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve synthetic station feeds for offline runs of the feed ingestion service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stations", type=int, default=24)
+    parser.add_argument("--history-hours", type=int, default=48)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--latency-s", type=float, default=0.0)
+    parser.add_argument("--ignore-since", action="store_true", help="re-serve the whole window on every poll")
+    parser.add_argument("--write-sources", default=None, help="write the feeds YAML for these stations to this file")
+    args = parser.parse_args(argv)
+
+    server = StubFeedServer(
+        args.host, args.port, stations=args.stations, history_hours=args.history_hours,
+        failure_rate=args.failure_rate, latency_s=args.latency_s, honor_since=not args.ignore_since,
+    )
+    if args.write_sources:
+        write_yaml_file(args.write_sources, {"feeds": server.sources()}, replace=True)
+    print(f"Serving {args.stations} station feeds on {server.url}/feeds/<station>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,28 @@ from datetime import datetime
 
 LOG_FILE = f"{datetime.now().strftime('%Y-%m-%d_%H_%M_%S')}.log"
 
-logs_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
-os.makedirs(logs_path, exist_ok=True)
+logs_path = os.path.join(os.getcwd(), "logs")
 
 LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
+
+class LazyFileHandler(logging.FileHandler):
+    """
+    File handler that creates the logs directory and the log file with the first record,
+    so importing the package (or a run that logs nothing) leaves no files behind.
+    """
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
+    handlers=[LazyFileHandler(LOG_FILE_PATH)],
     format="[ %(asctime)s ] %(lineno)d - %(name)s - %(levelname)s - %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S",
     level=logging.INFO,
-)
\ No newline at end of file
+)
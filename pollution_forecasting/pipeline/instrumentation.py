@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import time
+import signal
+import cProfile
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from pollution_forecasting.entity.config_entity import InstrumentationConfig
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import peak_rss_bytes
+
+_MB = 1024 ** 2
+
+
+def _read_proc(file_name: str) -> Dict[str, int]:
+    # Linux only, empty elsewhere
+    try:
+        with open(os.path.join("/proc/self", file_name)) as file:
+            values = {}
+            for line in file:
+                name, _, value = line.partition(":")
+                value = value.split()
+                if value and value[0].isdigit():
+                    values[name.strip()] = int(value[0])
+            return values
+    except OSError:
+        return {}
+
+
+def _reset_peak_rss() -> bool:
+    # writing 5 to clear_refs resets VmHWM, so the peak can be measured per stage
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _children_peak_rss_bytes() -> int:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    except ImportError:
+        return 0
+
+
+def _file_paths(paths: Iterable[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        if os.path.isdir(path):
+            files.extend(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files.append(path)
+    return files
+
+
+def count_rows(paths: Iterable[str]) -> Optional[int]:
+    """
+    Rows of the tables among `paths`: parquet files and 2-D .npy arrays, read from their
+    metadata and headers only. None when there is no table to count.
+    """
+    rows = None
+    for file_path in _file_paths(paths):
+        if file_path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            count = pq.read_metadata(file_path).num_rows
+        elif file_path.endswith(".npy"):
+            array = np.load(file_path, mmap_mode="r", allow_pickle=False)
+            # 1-D arrays are the timestamps next to a table, not a table
+            if array.ndim < 2:
+                continue
+            count = array.shape[0]
+        else:
+            continue
+        rows = (rows or 0) + int(count)
+    return rows
+
+
+def artifact_paths(artifact) -> List[str]:
+    if is_dataclass(artifact):
+        fields = asdict(artifact)
+    elif isinstance(artifact, SimpleNamespace):
+        fields = vars(artifact)
+    else:
+        # None, or a stage result that is not an artifact of files
+        return []
+    return [value for value in fields.values() if isinstance(value, str) and os.path.exists(value)]
+
+
+class StackSampler:
+    """
+    Statistical profiler writing folded stacks, the format of `py-spy record --format raw`.
+
+    A CPU-time interval timer interrupts the main thread every `interval` seconds and the
+    current Python stack is counted. The output feeds flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._previous_handler = None
+
+    def _sample(self, signum, frame) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    def write(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class StageRecord:
+    """
+    Measurements of one stage, filled in by `PipelineInstrumentation.stage`.
+    """
+
+    def __init__(self, stage_name: str, input_paths: Iterable[str], instrumentation: "PipelineInstrumentation"):
+        self.stage_name = stage_name
+        self.input_paths = [path for path in input_paths if path]
+        self.instrumentation = instrumentation
+        self.built = False
+        self.artifact = None
+        self.profile_file_path: Optional[str] = None
+
+    def wrap(self, build: Callable) -> Callable:
+        """
+        Wrap a stage's `initiate_*` method to note that it ran (not a cache hit) and to
+        profile it when it is the configured stage. Keeps the wrapped method's module, which
+        the stage cache hashes into its key.
+        """
+        @functools.wraps(build)
+        def wrapped():
+            self.built = True
+            return self.instrumentation.profile(self, build)
+        return wrapped
+
+    def finish(self, artifact) -> None:
+        self.artifact = artifact
+
+
+class PipelineInstrumentation:
+    """
+    Records every pipeline stage and writes the machine-readable run report.
+
+    For each stage: wall and CPU time (of this process and of the worker processes it
+    reaped), peak RSS of this process during the stage, rows and bytes of its input and
+    output files, the bytes this process actually read and wrote, and throughput. The peak
+    RSS of the worker processes is only known for the run as a whole. The report is
+    rewritten as JSON after every stage, so a failed run still shows where it stopped, and
+    is optionally logged to MLflow when the run ends. One stage can be run under cProfile
+    or a folded-stack sampler.
+    """
+
+    def __init__(self, instrumentation_config: InstrumentationConfig, run_info: Optional[dict] = None):
+        self.config = instrumentation_config
+        self.run_info = dict(run_info or {})
+        self.stages: List[dict] = []
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+
+    @contextmanager
+    def stage(self, stage_name: str, input_paths: Iterable[str] = ()) -> Iterator[StageRecord]:
+        record = StageRecord(stage_name, input_paths, self)
+        peak_reset = _reset_peak_rss()
+        rss_before = _read_proc("status").get("VmRSS", 0) * 1024
+        io_before = _read_proc("io")
+        times_before = os.times()
+        wall_started = time.perf_counter()
+        status, error = "succeeded", None
+        try:
+            yield record
+        except Exception as e:
+            status, error = "failed", str(e)
+            raise
+        finally:
+            self._record(record, wall_started, times_before, io_before, rss_before, peak_reset, status, error)
+
+    def _record(self, record: StageRecord, wall_started: float, times_before, io_before: dict,
+                rss_before: int, peak_reset: bool, status: str, error: Optional[str]) -> None:
+        try:
+            wall = time.perf_counter() - wall_started
+            times_after = os.times()
+            io_after = _read_proc("io")
+            output_paths = artifact_paths(record.artifact)
+            input_files, output_files = _file_paths(record.input_paths), _file_paths(output_paths)
+            rows_in, rows_out = count_rows(record.input_paths), count_rows(output_paths)
+            bytes_in = sum(os.path.getsize(path) for path in input_files)
+            bytes_out = sum(os.path.getsize(path) for path in output_files)
+            peak = _read_proc("status").get("VmHWM", 0) * 1024 if peak_reset else peak_rss_bytes()
+
+            stage = {
+                "stage": record.stage_name,
+                "status": status,
+                "cached": status == "succeeded" and not record.built,
+                "wall_s": round(wall, 4),
+                "cpu_s": round((times_after.user - times_before.user) + (times_after.system - times_before.system), 4),
+                "children_cpu_s": round(
+                    (times_after.children_user - times_before.children_user)
+                    + (times_after.children_system - times_before.children_system), 4
+                ),
+                # without clear_refs this is the peak of the process so far, not of the stage
+                "peak_rss_mb": round(peak / _MB, 1),
+                "peak_rss_scope": "stage" if peak_reset else "process",
+                # resident memory when the stage started, the peak minus this is what the stage added
+                "rss_start_mb": round(rss_before / _MB, 1),
+                "rows_in": rows_in,
+                "rows_out": rows_out,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "io_read_bytes": io_after.get("rchar", 0) - io_before.get("rchar", 0) if io_after else None,
+                "io_write_bytes": io_after.get("wchar", 0) - io_before.get("wchar", 0) if io_after else None,
+                "rows_per_s": round((rows_in if rows_in is not None else rows_out or 0) / wall, 1) if wall > 0 else None,
+                "mb_per_s": round((bytes_in + bytes_out) / _MB / wall, 2) if wall > 0 else None,
+            }
+            if record.profile_file_path:
+                stage["profile_file_path"] = record.profile_file_path
+            if error:
+                stage["error"] = error
+            self.stages.append(stage)
+            logging.info(
+                f"Stage {record.stage_name} {status}{' (cached)' if stage['cached'] else ''}: "
+                f"{stage['wall_s']}s wall, {stage['cpu_s']}s CPU, peak RSS {stage['peak_rss_mb']}MB, "
+                f"rows {rows_in} -> {rows_out}"
+            )
+            self.write_report()
+        except Exception as e:
+            # instrumentation never fails the pipeline
+            logging.warning(f"Could not record stage {record.stage_name}: {e}")
+
+    def profile(self, record: StageRecord, build: Callable):
+        """
+        Run `build`, under the configured profiler when it is the stage to profile.
+        """
+        if record.stage_name != self.config.profile_stage:
+            return build()
+        os.makedirs(self.config.profile_dir, exist_ok=True)
+        if self.config.profile_mode == "sample" and threading.current_thread() is threading.main_thread():
+            sampler = StackSampler(self.config.sample_interval_s)
+            sampler.start()
+            try:
+                return build()
+            finally:
+                sampler.stop()
+                record.profile_file_path = os.path.join(self.config.profile_dir, f"{record.stage_name}.folded")
+                sampler.write(record.profile_file_path)
+                logging.info(f"Wrote folded stacks of {record.stage_name} to {record.profile_file_path}")
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(build)
+        finally:
+            record.profile_file_path = os.path.join(self.config.profile_dir, f"{record.stage_name}.prof")
+            profiler.dump_stats(record.profile_file_path)
+            logging.info(f"Wrote the cProfile stats of {record.stage_name} to {record.profile_file_path}")
+
+    def report(self) -> dict:
+        succeeded = [stage for stage in self.stages if stage["status"] == "succeeded"]
+        return {
+            **self.run_info,
+            "started_at": self.started_at,
+            "wall_s": round(time.perf_counter() - self.started, 4),
+            "cpu_s": round(sum(stage["cpu_s"] + stage["children_cpu_s"] for stage in self.stages), 4),
+            "peak_rss_mb": max((stage["peak_rss_mb"] for stage in self.stages), default=0.0),
+            # RUSAGE_CHILDREN is the largest reaped worker over the whole process lifetime and
+            # cannot be reset, so it is reported for the run and not attributed to a stage
+            "children_peak_rss_mb": round(_children_peak_rss_bytes() / _MB, 1),
+            "stages_succeeded": len(succeeded),
+            "stages_cached": sum(stage["cached"] for stage in succeeded),
+            "stages": self.stages,
+        }
+
+    def write_report(self) -> str:
+        report_file_path = self.config.report_file_path
+        os.makedirs(os.path.dirname(report_file_path), exist_ok=True)
+        temporary_path = f"{report_file_path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+        os.replace(temporary_path, report_file_path)
+        return report_file_path
+
+    def finish_run(self) -> str:
+        """
+        Write the final report and log it to MLflow when enabled.
+
+        Returns:
+            str: Path of the JSON run report.
+        """
+        report_file_path = self.write_report()
+        self.log_to_mlflow()
+        logging.info(f"Run report written to {report_file_path}")
+        return report_file_path
+
+    def log_to_mlflow(self) -> None:
+        """
+        Log the per-stage measurements as metrics of one MLflow run, with the report attached.
+        """
+        if not self.config.mlflow:
+            return
+        try:
+            import mlflow
+        except ImportError:
+            logging.warning("INSTRUMENTATION_MLFLOW is on but mlflow is not installed, skipping")
+            return
+        try:
+            report = self.report()
+            mlflow.set_experiment(self.config.experiment_name)
+            run_name = "_".join(str(value) for value in self.run_info.values() if value)
+            with mlflow.start_run(run_name=run_name or None):
+                mlflow.log_params({name: value for name, value in self.run_info.items() if value is not None})
+                metrics = {
+                    name: report[name] for name in ("wall_s", "cpu_s", "peak_rss_mb", "children_peak_rss_mb")
+                }
+                for stage in self.stages:
+                    for name in ("wall_s", "cpu_s", "children_cpu_s", "peak_rss_mb", "rows_in", "rows_out",
+                                 "bytes_in", "bytes_out", "rows_per_s", "mb_per_s"):
+                        if isinstance(stage.get(name), (int, float)):
+                            metrics[f"{stage['stage']}.{name}"] = stage[name]
+                mlflow.log_metrics(metrics)
+                mlflow.log_artifact(self.write_report())
+        except Exception as e:
+            logging.warning(f"Could not log the run report to MLflow: {e}")
@@ -0,0 +1,209 @@
+import sys
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import pyarrow.parquet as pq
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+from pollution_forecasting.constant.training_pipeline import DATA_INGESTION_DEFAULT_STATION
+from pollution_forecasting.entity.config_entity import (
+    TrainingPipelineConfig,
+    StageCacheConfig,
+    DataIngestionConfig,
+    ShardingConfig,
+)
+from pollution_forecasting.entity.artifact_entity import ShardedPipelineArtifact
+from pollution_forecasting.pipeline.stage_cache import StageCache
+from pollution_forecasting.pipeline.training_pipeline import TrainingPipeline
+from pollution_forecasting.utils.main.utils import write_yaml_file
+
+
+def run_station_shard(task: dict) -> dict:
+    """
+    Run the whole training pipeline for one station and report how it went.
+
+    Runs inside a worker process. Failures are caught and reported instead of raised, so
+    one bad station never takes the other shards down with it.
+    """
+    started = time.perf_counter()
+    station = task["station"]
+    result = {"station": station, "status": "succeeded", "stage_seconds": {}, "rows": {}, "error": None}
+    try:
+        pipeline = TrainingPipeline(TrainingPipelineConfig(task["timestamp"], station), max_workers=task["max_workers"])
+        timings = result["stage_seconds"]
+
+        def timed(stage_name, start_stage, *args):
+            stage_started = time.perf_counter()
+            artifact = start_stage(*args)
+            timings[stage_name] = round(time.perf_counter() - stage_started, 3)
+            return artifact
+
+        data_ingestion_artifact = timed("data_ingestion", pipeline.start_data_ingestion)
+        result["rows"] = {
+            "train": pq.read_metadata(data_ingestion_artifact.trained_file_path).num_rows,
+            "test": pq.read_metadata(data_ingestion_artifact.test_file_path).num_rows,
+        }
+        data_validation_artifact = timed("data_validation", pipeline.start_data_validation, data_ingestion_artifact)
+        feature_engineering_artifact = timed("feature_engineering", pipeline.start_feature_engineering, data_validation_artifact)
+        model_tuner_artifact = timed("model_tuner", pipeline.start_model_tuner, feature_engineering_artifact)
+        if model_tuner_artifact is None:
+            timings.pop("model_tuner")
+        data_transformation_artifact = timed(
+            "data_transformation", pipeline.start_data_transformation, feature_engineering_artifact, model_tuner_artifact
+        )
+        model_trainer_artifact = timed("model_trainer", pipeline.start_model_trainer, data_transformation_artifact, model_tuner_artifact)
+        if timed("backtest", pipeline.start_backtester, data_transformation_artifact, model_tuner_artifact) is None:
+            timings.pop("backtest")
+        result["artifact_dir"] = pipeline.training_pipeline_config.artifact_dir
+        result["model_report_file_path"] = model_trainer_artifact.model_report_file_path
+        result["run_report_file_path"] = pipeline.instrumentation.finish_run()
+    except Exception as e:
+        logging.error(f"Station shard {station} failed: {e}")
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+class ShardedTrainingPipeline:
+    """
+    Runs the training pipeline once per station, as shards spread over a process pool.
+
+    Every shard reads only its station's documents and keeps its own feature store,
+    artifacts under `Artifacts/<timestamp>/<station>/` and served models under
+    `final_model/<station>/`. At most `workers` shards run at once and the CPU cores are
+    split between them, so the model trainer pools of concurrent shards never add up to more
+    processes than the machine has cores.
+    """
+
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig = None,
+                 sharding_config: ShardingConfig = None):
+        try:
+            self.training_pipeline_config = training_pipeline_config or TrainingPipelineConfig()
+            self.sharding_config = sharding_config or ShardingConfig(self.training_pipeline_config)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def list_stations(self) -> List[Optional[str]]:
+        """
+        Stations to run: the configured list, else every station key in the collection.
+
+        Returns:
+            List[Optional[str]]: Station names, or `[None]` for one unsharded run when the
+                documents carry no station key.
+        """
+        try:
+            if self.sharding_config.stations:
+                return list(self.sharding_config.stations)
+            from pollution_forecasting.components.data_ingestion import DataIngestion
+            data_ingestion = DataIngestion(DataIngestionConfig(self.training_pipeline_config))
+            stations = data_ingestion.list_stations()
+            # worker processes open their own connections, do not fork with this one open
+            if getattr(data_ingestion, "mongo_client", None) is not None:
+                data_ingestion.mongo_client.close()
+            if not stations:
+                logging.warning("No station key in the collection, running a single unsharded pipeline")
+                return [None]
+            return stations
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def run_pipeline(self) -> ShardedPipelineArtifact:
+        """
+        Train every station shard and write the summary over all of them.
+
+        Returns:
+            ShardedPipelineArtifact: Summary file path and the stations that succeeded or failed.
+
+        Raises:
+            PollutionException: If the stations cannot be listed or the summary cannot be written.
+        """
+        try:
+            started = time.perf_counter()
+            stations = self.list_stations()
+            workers = max(1, min(self.sharding_config.workers, len(stations)))
+            max_workers = max(1, self.sharding_config.cpu_count // workers)
+            timestamp = datetime.strptime(self.training_pipeline_config.timestamp, "%m_%d_%Y_%H_%M_%S")
+            tasks = [{"station": station, "timestamp": timestamp, "max_workers": max_workers} for station in stations]
+            logging.info(f"Running {len(tasks)} station shards, {workers} at a time with {max_workers} workers each")
+
+            if workers == 1:
+                results = [run_station_shard(task) for task in tasks]
+            else:
+                results = []
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {executor.submit(run_station_shard, task): task["station"] for task in tasks}
+                    for future in as_completed(futures):
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            # the worker process itself died, e.g. killed for running out of memory
+                            results.append({"station": futures[future], "status": "failed", "error": str(e)})
+            for result in results:
+                if result["station"] is None:
+                    result["station"] = DATA_INGESTION_DEFAULT_STATION
+
+            summary = self.summarize(results, time.perf_counter() - started, workers, max_workers)
+            write_yaml_file(self.sharding_config.summary_file_path, summary, replace=True)
+            StageCache(StageCacheConfig(self.training_pipeline_config)).evict()
+
+            sharded_pipeline_artifact = ShardedPipelineArtifact(
+                summary_file_path=self.sharding_config.summary_file_path,
+                succeeded_stations=sorted(r["station"] for r in results if r["status"] == "succeeded"),
+                failed_stations=sorted(r["station"] for r in results if r["status"] != "succeeded"),
+            )
+            logging.info(f"Sharded pipeline artifact: {sharded_pipeline_artifact}")
+            return sharded_pipeline_artifact
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    @staticmethod
+    def summarize(results: List[dict], seconds: float, workers: int, max_workers: int) -> dict:
+        """
+        Rows, timings and failures aggregated over the shard results.
+        """
+        succeeded = [result for result in results if result["status"] == "succeeded"]
+        stage_seconds = {}
+        for result in succeeded:
+            for stage_name, stage_time in result["stage_seconds"].items():
+                stage_seconds[stage_name] = round(stage_seconds.get(stage_name, 0.0) + stage_time, 3)
+        return {
+            "stations": len(results),
+            "succeeded": len(succeeded),
+            "failed": len(results) - len(succeeded),
+            "workers": workers,
+            "workers_per_shard": max_workers,
+            "seconds": round(seconds, 3),
+            "shard_seconds": round(sum(result.get("seconds", 0.0) for result in results), 3),
+            "stage_seconds": stage_seconds,
+            "rows": {
+                split: sum(result["rows"].get(split, 0) for result in succeeded) for split in ("train", "test")
+            },
+            "failures": {result["station"]: result["error"] for result in results if result["status"] != "succeeded"},
+            "shards": {result["station"]: result for result in sorted(results, key=lambda r: r["station"])},
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train one pipeline shard per monitoring station.")
+    parser.add_argument("--stations", nargs="*", default=None, help="defaults to every station in the collection")
+    parser.add_argument("--workers", type=int, default=None, help="station shards running at once")
+    args = parser.parse_args(argv)
+
+    training_pipeline_config = TrainingPipelineConfig(datetime.now())
+    sharding_config = ShardingConfig(training_pipeline_config)
+    if args.stations:
+        sharding_config.stations = args.stations
+    if args.workers is not None:
+        sharding_config.workers = args.workers
+    print(ShardedTrainingPipeline(training_pipeline_config, sharding_config).run_pipeline())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import os
+import sys
+import json
+import time
+import errno
+import stat
+import shutil
+import hashlib
+import inspect
+from types import ModuleType
+from dataclasses import asdict, is_dataclass
+from typing import Callable, Iterable, Optional, Type, TypeVar
+
+from pollution_forecasting.entity.config_entity import StageCacheConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+Artifact = TypeVar("Artifact")
+
+_HASH_CHUNK_SIZE = 1 << 20
+_PACKAGE = __name__.split(".")[0]
+
+
+def _is_under(path: str, directory: str) -> bool:
+    path, directory = os.path.abspath(path), os.path.abspath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+class StageCache:
+    """
+    Memoizing runner for pipeline stages.
+
+    A stage is keyed on the content hash of its input files, its parameters and the
+    source of the code that builds it, i.e. the module of `build` and every package
+    module it imports, directly or transitively. On a hit the cached output files are
+    hardlinked into the current run directory and the artifact is rebuilt with the new
+    paths, so the stage itself never runs; side effects outside the run directory, such
+    as publishing to the model store, are replayed through `on_hit`. A hardlink shares
+    one file between runs, so cached outputs are made read-only. Old run directories are
+    evicted least recently used first once they exceed the configured size budget.
+    """
+
+    def __init__(self, stage_cache_config: StageCacheConfig):
+        try:
+            self.stage_cache_config = stage_cache_config
+            os.makedirs(stage_cache_config.cache_dir, exist_ok=True)
+            self._file_hashes = self._load_file_hashes()
+            # module name -> hash of its source and of the package modules it imports
+            self._code_hashes = {}
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _load_file_hashes(self) -> dict:
+        path = self.stage_cache_config.file_hashes_file_path
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except ValueError:
+            return {}
+
+    def _save_file_hashes(self) -> None:
+        path = self.stage_cache_config.file_hashes_file_path
+        # station shards save concurrently, each through its own temporary file
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self._file_hashes, file)
+        os.replace(temporary_path, path)
+
+    def hash_file(self, file_path: str) -> str:
+        """
+        Content hash of a file, memoized on (device, inode, size, mtime) so hardlinked
+        copies of an already hashed artifact are never read again.
+        """
+        stat = os.stat(file_path)
+        identity = f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+        digest = self._file_hashes.get(identity)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=20)
+            with open(file_path, "rb") as file:
+                for block in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            self._file_hashes[identity] = digest
+        return digest
+
+    def hash_path(self, path: str) -> str:
+        """
+        Content hash of a file or of every file below a directory.
+        """
+        if not os.path.isdir(path):
+            return self.hash_file(path)
+        hasher = hashlib.blake2b(digest_size=20)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                hasher.update(os.path.relpath(file_path, path).encode())
+                hasher.update(self.hash_file(file_path).encode())
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _imported_modules(module: ModuleType) -> set:
+        """
+        Names of the package modules a module refers to at import time, through
+        `import x` as well as `from x import name`.
+        """
+        names = set()
+        for value in vars(module).values():
+            name = value.__name__ if isinstance(value, ModuleType) else getattr(value, "__module__", None)
+            if isinstance(name, str) and (name == _PACKAGE or name.startswith(f"{_PACKAGE}.")):
+                names.add(name)
+        names.discard(module.__name__)
+        return names
+
+    def code_hash(self, module: ModuleType) -> str:
+        """
+        Hash of the source of `module` and of every package module it depends on, so
+        editing e.g. the imputer invalidates the stages whose components import it.
+        """
+        digest = self._code_hashes.get(module.__name__)
+        if digest is not None:
+            return digest
+        seen, pending = set(), [module.__name__]
+        while pending:
+            name = pending.pop()
+            if name in seen or name not in sys.modules:
+                continue
+            seen.add(name)
+            pending.extend(self._imported_modules(sys.modules[name]))
+        hasher = hashlib.blake2b(digest_size=20)
+        for name in sorted(seen):
+            file_path = getattr(sys.modules[name], "__file__", None)
+            if file_path and os.path.exists(file_path):
+                hasher.update(name.encode())
+                hasher.update(self.hash_file(file_path).encode())
+        digest = hasher.hexdigest()
+        self._code_hashes[module.__name__] = digest
+        return digest
+
+    def stage_key(self, stage_name: str, input_paths: Iterable[str], params: Optional[dict], build: Callable) -> str:
+        """
+        Cache key of a stage: its name, input contents, parameters, the configured code
+        version and the source of `build`'s module and of the package modules it imports.
+        """
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(stage_name.encode())
+        hasher.update(self.stage_cache_config.code_version.encode())
+        for path in input_paths:
+            hasher.update(self.hash_path(path).encode() if path and os.path.exists(path) else b"-")
+        hasher.update(json.dumps(params or {}, sort_keys=True, default=repr).encode())
+        module = inspect.getmodule(build)
+        if module is not None:
+            hasher.update(self.code_hash(module).encode())
+        return hasher.hexdigest()
+
+    def _entry_path(self, stage_name: str, key: str) -> str:
+        return os.path.join(self.stage_cache_config.cache_dir, stage_name, f"{key}.json")
+
+    def _materialize(self, source: str, target: str) -> None:
+        if os.path.abspath(source) == os.path.abspath(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, copy_function=self._link_or_copy, dirs_exist_ok=True)
+        else:
+            self._link_or_copy(source, target)
+
+    @staticmethod
+    def _make_read_only(path: str) -> None:
+        """
+        Clear the write bits of a cached output file or of every file below a directory. The
+        mode belongs to the inode, so the cached file and all its hardlinks change together.
+        """
+        file_paths = [path] if not os.path.isdir(path) else [
+            os.path.join(base, name) for base, _, files in os.walk(path) for name in files
+        ]
+        for file_path in file_paths:
+            mode = os.stat(file_path).st_mode
+            os.chmod(file_path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+    @staticmethod
+    def _link_or_copy(source: str, target: str) -> None:
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copy2(source, target)
+
+    def lookup(self, stage_name: str, key: str, artifact_cls: Type[Artifact]) -> Optional[Artifact]:
+        """
+        Return the cached artifact re-rooted in the current run dir, or None on a miss.
+        """
+        entry_path = self._entry_path(stage_name, key)
+        if not os.path.exists(entry_path):
+            return None
+        with open(entry_path) as file:
+            entry = json.load(file)
+
+        cached_dir = entry["artifact_dir"]
+        current_dir = self.stage_cache_config.artifact_dir
+        fields, links = {}, []
+        for name, value in entry["fields"].items():
+            if isinstance(value, str) and _is_under(value, cached_dir):
+                if not os.path.exists(value):
+                    # the run holding this output was evicted
+                    os.remove(entry_path)
+                    return None
+                target = os.path.join(current_dir, os.path.relpath(value, cached_dir))
+                links.append((value, target))
+                value = target
+            fields[name] = value
+
+        for source, target in links:
+            self._materialize(source, target)
+        artifact = artifact_cls(**fields)
+        self.store(stage_name, key, artifact)
+        return artifact
+
+    def store(self, stage_name: str, key: str, artifact) -> None:
+        """
+        Record the artifact produced by a stage under its cache key.
+        """
+        entry_path = self._entry_path(stage_name, key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fields = asdict(artifact) if is_dataclass(artifact) else dict(vars(artifact))
+        # a later hit links these files into another run, where writing one would change both
+        for value in fields.values():
+            if isinstance(value, str) and _is_under(value, self.stage_cache_config.artifact_dir) and os.path.exists(value):
+                self._make_read_only(value)
+        entry = {
+            "stage": stage_name,
+            "key": key,
+            "artifact_dir": self.stage_cache_config.artifact_dir,
+            "fields": fields,
+            "last_used": time.time(),
+        }
+        with open(entry_path, "w") as file:
+            json.dump(entry, file, default=str)
+
+    def run(
+        self,
+        stage_name: str,
+        build: Callable[[], Artifact],
+        artifact_cls: Type[Artifact],
+        input_paths: Iterable[str] = (),
+        params: Optional[dict] = None,
+        refresh: bool = False,
+        on_hit: Optional[Callable[[Artifact], None]] = None,
+    ) -> Artifact:
+        """
+        Run a stage through the cache.
+
+        Args:
+            stage_name (str): Stable name of the stage, e.g. "data_validation".
+            build (Callable[[], Artifact]): Runs the stage and returns its artifact dataclass.
+            artifact_cls (Type[Artifact]): Artifact dataclass used to rebuild a cached artifact.
+            input_paths (Iterable[str]): Files or directories the stage reads.
+            params (Optional[dict]): Configuration and constants the stage output depends on.
+            refresh (bool): Build the stage even on a cache hit and store the new artifact,
+                e.g. when the stage is being profiled.
+            on_hit (Optional[Callable[[Artifact], None]]): Replays the side effects of `build`
+                outside the run dir, e.g. publishing to the model store, for a cached artifact.
+
+        Returns:
+            Artifact: The fresh or cached artifact.
+
+        Raises:
+            PollutionException: If the stage or the cache fails.
+        """
+        try:
+            if not self.stage_cache_config.enabled:
+                return build()
+
+            key = self.stage_key(stage_name, list(input_paths), params, build)
+            artifact = None if refresh else self.lookup(stage_name, key, artifact_cls)
+            if artifact is not None:
+                logging.info(f"Stage cache hit for {stage_name} ({key[:12]})")
+                if on_hit is not None:
+                    on_hit(artifact)
+            else:
+                logging.info(f"Stage cache miss for {stage_name} ({key[:12]})")
+                artifact = build()
+                self.store(stage_name, key, artifact)
+            self._save_file_hashes()
+            return artifact
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _last_used(self, runs: list) -> dict:
+        """
+        When each run was last used: the latest `last_used` of the cache entries whose
+        outputs live in it, which a cache hit refreshes. A run no entry refers to any more
+        falls back to its modification time, and a run without entries sorts before
+        every run that still has one.
+        """
+        last_used = {path: (0, os.path.getmtime(path)) for path in runs}
+        cache_dir = self.stage_cache_config.cache_dir
+        for stage_name in os.listdir(cache_dir):
+            stage_dir = os.path.join(cache_dir, stage_name)
+            if not os.path.isdir(stage_dir):
+                continue
+            for entry_name in os.listdir(stage_dir):
+                try:
+                    with open(os.path.join(stage_dir, entry_name)) as file:
+                        entry = json.load(file)
+                except (OSError, ValueError):
+                    continue
+                for path in runs:
+                    if _is_under(entry.get("artifact_dir", ""), path):
+                        last_used[path] = max(last_used[path], (1, entry.get("last_used", 0)))
+        return last_used
+
+    def evict(self) -> None:
+        """
+        Delete the least recently used run directories until all runs fit in `max_bytes`.
+
+        The current run, the feature store and the cache itself are never evicted. Files
+        shared between runs through hardlinks are only counted once. Memoized hashes of the
+        deleted files are dropped.
+        """
+        try:
+            root = self.stage_cache_config.artifact_root
+            current = os.path.abspath(self.stage_cache_config.run_dir)
+            cache_dir = os.path.abspath(self.stage_cache_config.cache_dir)
+            runs = []
+            for name in os.listdir(root):
+                path = os.path.abspath(os.path.join(root, name))
+                if os.path.isdir(path) and path not in (current, cache_dir) and name[:1].isdigit():
+                    runs.append(path)
+            last_used = self._last_used(runs)
+            runs.sort(key=last_used.get)
+
+            def run_files(path):
+                for base, _, files in os.walk(path):
+                    for file_name in files:
+                        stat = os.stat(os.path.join(base, file_name))
+                        yield (stat.st_dev, stat.st_ino), stat.st_size
+
+            # inode -> [size, runs holding a link to it]
+            owners = {}
+            for path in runs + [current]:
+                if os.path.isdir(path):
+                    for inode, size in run_files(path):
+                        owners.setdefault(inode, [size, set()])[1].add(path)
+            total = sum(size for size, _ in owners.values())
+
+            removed = set()
+            for path in runs:
+                if total <= self.stage_cache_config.max_bytes:
+                    break
+                shutil.rmtree(path)
+                for inode, (size, holders) in owners.items():
+                    if path in holders:
+                        holders.discard(path)
+                        if not holders:
+                            total -= size
+                            removed.add("%d:%d:" % inode)
+                logging.info(f"Evicted artifact run {path}")
+
+            # the inodes of deleted files are reused, a stale memo entry could match a new file
+            if removed:
+                self._file_hashes = {
+                    identity: digest for identity, digest in self._file_hashes.items()
+                    if ":".join(identity.split(":", 2)[:2]) + ":" not in removed
+                }
+                self._save_file_hashes()
+
+        except Exception as e:
+            raise PollutionException(e, sys)
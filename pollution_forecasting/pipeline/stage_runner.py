@@ -0,0 +1,173 @@
+import os
+import sys
+import argparse
+from dataclasses import fields
+from datetime import datetime
+from typing import List, Optional
+
+from pollution_forecasting.constant.training_pipeline import ARTIFACT_DIR
+from pollution_forecasting.entity.artifact_entity import (
+    DataIngestionArtifact,
+    DataValidationArtifact,
+    FeatureEngineeringArtifact,
+    DataTransformationArtifact,
+    ModelTunerArtifact,
+)
+from pollution_forecasting.entity.config_entity import (
+    TrainingPipelineConfig,
+    DataIngestionConfig,
+    DataValidationConfig,
+    FeatureEngineeringConfig,
+    DataTransformationConfig,
+    ModelTunerConfig,
+)
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.pipeline.training_pipeline import TrainingPipeline
+
+STAGES = [
+    "data_ingestion",
+    "data_validation",
+    "feature_engineering",
+    "model_tuner",
+    "data_transformation",
+    "model_trainer",
+    "backtest",
+]
+# run directory names, see TrainingPipelineConfig
+RUN_DIR_FORMAT = "%m_%d_%Y_%H_%M_%S"
+
+
+def latest_run(artifact_root: str = ARTIFACT_DIR) -> Optional[str]:
+    if not os.path.isdir(artifact_root):
+        return None
+    runs = []
+    for name in os.listdir(artifact_root):
+        try:
+            runs.append((datetime.strptime(name, RUN_DIR_FORMAT), name))
+        except ValueError:
+            continue
+    return max(runs)[1] if runs else None
+
+
+def artifact_from_config(artifact_cls, config, upstream_stage: str, optional: tuple = (), **values):
+    """
+    Artifact of an earlier stage of the run, rebuilt from the paths its config points at.
+    Fields not passed in `values` are read from the config attribute of the same name.
+
+    Raises:
+        FileNotFoundError: If that stage has not written its files in this run.
+    """
+    for field in fields(artifact_cls):
+        if field.name not in values:
+            values[field.name] = getattr(config, field.name)
+    missing = [
+        value for name, value in values.items()
+        if name not in optional and isinstance(value, str) and not os.path.exists(value)
+    ]
+    if missing:
+        raise FileNotFoundError(f"Run the {upstream_stage} stage first, missing {missing}")
+    return artifact_cls(**values)
+
+
+def data_ingestion_artifact(pipeline_config: TrainingPipelineConfig) -> DataIngestionArtifact:
+    config = DataIngestionConfig(pipeline_config)
+    return artifact_from_config(
+        DataIngestionArtifact, config, "data_ingestion",
+        trained_file_path=config.training_file_path, test_file_path=config.testing_file_path,
+    )
+
+
+def data_validation_artifact(pipeline_config: TrainingPipelineConfig) -> DataValidationArtifact:
+    config = DataValidationConfig(pipeline_config)
+    return artifact_from_config(
+        DataValidationArtifact, config, "data_validation",
+        # invalid rows are only written when there are any
+        optional=("invalid_train_file_path", "invalid_test_file_path"),
+        validation_status=True,
+    )
+
+
+def model_tuner_artifact(pipeline_config: TrainingPipelineConfig) -> Optional[ModelTunerArtifact]:
+    config = ModelTunerConfig(pipeline_config)
+    if not os.path.exists(config.tuned_params_file_path):
+        return None
+    return artifact_from_config(ModelTunerArtifact, config, "model_tuner")
+
+
+def run_stage(stage: str, run: Optional[str] = None, station: Optional[str] = None,
+              max_workers: Optional[int] = None):
+    """
+    Run one stage of a pipeline run, reading its inputs from the earlier stages' files.
+
+    Only the requested stage's component is imported, so e.g. validating a new split does
+    not load sklearn, and a short-lived scheduler job starts in a fraction of a second.
+
+    Args:
+        stage (str): One of `STAGES`.
+        run (Optional[str]): Run directory under Artifacts/, e.g. "10_17_2026_02_53_45".
+            Defaults to a new run for data_ingestion and to the latest run otherwise.
+        station (Optional[str]): Station shard of the run.
+        max_workers (Optional[int]): Cap on the stage's worker processes.
+
+    Returns:
+        The stage's artifact, None for a disabled model_tuner or backtest.
+
+    Raises:
+        PollutionException: If an input is missing or the stage fails.
+    """
+    try:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage}, expected one of {STAGES}")
+        if run is None and stage != "data_ingestion":
+            run = latest_run()
+            if run is None:
+                raise FileNotFoundError(f"No pipeline run under {ARTIFACT_DIR}, run data_ingestion first")
+        timestamp = datetime.strptime(run, RUN_DIR_FORMAT) if run else datetime.now()
+        pipeline_config = TrainingPipelineConfig(timestamp, station)
+        pipeline = TrainingPipeline(pipeline_config, max_workers=max_workers)
+        # a report of its own, the run's full report is left as it is
+        pipeline.instrumentation.config.report_file_path = os.path.join(
+            pipeline_config.artifact_dir, f"run_report_{stage}.json"
+        )
+        logging.info(f"Running the {stage} stage of run {pipeline_config.timestamp}")
+
+        if stage == "data_ingestion":
+            artifact = pipeline.start_data_ingestion()
+        elif stage == "data_validation":
+            artifact = pipeline.start_data_validation(data_ingestion_artifact(pipeline_config))
+        elif stage == "feature_engineering":
+            artifact = pipeline.start_feature_engineering(data_validation_artifact(pipeline_config))
+        elif stage in ("model_tuner", "data_transformation"):
+            feature_engineering_artifact = artifact_from_config(
+                FeatureEngineeringArtifact, FeatureEngineeringConfig(pipeline_config), "feature_engineering"
+            )
+            if stage == "model_tuner":
+                artifact = pipeline.start_model_tuner(feature_engineering_artifact)
+            else:
+                artifact = pipeline.start_data_transformation(feature_engineering_artifact, model_tuner_artifact(pipeline_config))
+        else:
+            data_transformation_artifact = artifact_from_config(
+                DataTransformationArtifact, DataTransformationConfig(pipeline_config), "data_transformation"
+            )
+            start = pipeline.start_model_trainer if stage == "model_trainer" else pipeline.start_backtester
+            artifact = start(data_transformation_artifact, model_tuner_artifact(pipeline_config))
+
+        pipeline.instrumentation.finish_run()
+        return artifact
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a single stage of the training pipeline.")
+    parser.add_argument("stage", choices=STAGES)
+    parser.add_argument("--run", default=None, help="run directory under Artifacts/, the latest run by default")
+    parser.add_argument("--station", default=None, help="station shard of the run")
+    parser.add_argument("--max-workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    print(run_stage(args.stage, args.run, args.station, args.max_workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import os
+import sys
+from typing import Optional
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+from pollution_forecasting.constant.training_pipeline import SCHEMA_FILE_PATH
+from pollution_forecasting.entity.config_entity import (
+    TrainingPipelineConfig,
+    StageCacheConfig,
+    InstrumentationConfig,
+    DataIngestionConfig,
+    DataValidationConfig,
+    FeatureEngineeringConfig,
+    DataTransformationConfig,
+    ModelTrainerConfig,
+    ModelTunerConfig,
+    BacktestConfig,
+)
+from pollution_forecasting.entity.artifact_entity import (
+    DataIngestionArtifact,
+    DataValidationArtifact,
+    FeatureEngineeringArtifact,
+    DataTransformationArtifact,
+    ModelTrainerArtifact,
+    ModelTunerArtifact,
+    BacktestArtifact,
+)
+from pollution_forecasting.pipeline.instrumentation import PipelineInstrumentation
+from pollution_forecasting.pipeline.stage_cache import StageCache
+from pollution_forecasting.utils.main.utils import read_yaml_file
+
+
+class TrainingPipeline:
+    """
+    Runs the training pipeline stages in order, each one through the content-hash stage cache
+    and measured into the run report.
+
+    Every stage imports its component when it starts, so running one stage (or only
+    building the configs) does not load sklearn, scipy or pymongo for the others.
+    """
+
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig = None, max_workers: int = None):
+        try:
+            self.training_pipeline_config = training_pipeline_config or TrainingPipelineConfig()
+            # caps the process pools of the stages, e.g. when several pipelines share the machine
+            self.max_workers = max_workers
+            self.stage_cache = StageCache(StageCacheConfig(self.training_pipeline_config))
+            self.instrumentation = PipelineInstrumentation(
+                InstrumentationConfig(self.training_pipeline_config),
+                run_info={
+                    "pipeline": self.training_pipeline_config.pipeline_name,
+                    "station": self.training_pipeline_config.station,
+                    "artifact_dir": self.training_pipeline_config.artifact_dir,
+                },
+            )
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def stage_params(self, config, **extra) -> dict:
+        """
+        Parameters of a stage for the cache key: every config attribute except the
+        paths inside the current run dir, which change on every run.
+        """
+        artifact_dir = os.path.abspath(self.training_pipeline_config.artifact_dir)
+        params = {
+            name: value for name, value in vars(config).items()
+            if not (isinstance(value, str) and os.path.abspath(value).startswith(artifact_dir))
+        }
+        params.update(extra)
+        return params
+
+    def _run_stage(self, stage_name: str, build, artifact_cls, input_paths=(), params: dict = None, on_hit=None):
+        """
+        Run a stage through the stage cache and record it in the run report. The stage being
+        profiled is always rebuilt, a cache hit would leave nothing to profile. `on_hit`
+        replays what the stage publishes outside the run dir when its artifact is cached.
+        """
+        input_paths = list(input_paths)
+        with self.instrumentation.stage(stage_name, input_paths) as record:
+            artifact = self.stage_cache.run(
+                stage_name=stage_name,
+                build=record.wrap(build),
+                artifact_cls=artifact_cls,
+                input_paths=input_paths,
+                params=params,
+                refresh=stage_name == self.instrumentation.config.profile_stage,
+                on_hit=on_hit,
+            )
+            record.finish(artifact)
+        return artifact
+
+    def start_data_ingestion(self) -> DataIngestionArtifact:
+        try:
+            from pollution_forecasting.components.data_ingestion import DataIngestion
+            data_ingestion_config = DataIngestionConfig(self.training_pipeline_config)
+            data_ingestion = DataIngestion(data_ingestion_config)
+            logging.info("Start data ingestion.")
+            data_ingestion_artifact = self._run_stage(
+                stage_name="data_ingestion",
+                build=data_ingestion.initiate_data_ingestion,
+                artifact_cls=DataIngestionArtifact,
+                params=self.stage_params(
+                    data_ingestion_config, collection=data_ingestion.collection_fingerprint()
+                ),
+            )
+            logging.info(f"Data ingestion completed and artifact: {data_ingestion_artifact}")
+            return data_ingestion_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def start_data_validation(self, data_ingestion_artifact: DataIngestionArtifact) -> DataValidationArtifact:
+        try:
+            from pollution_forecasting.components.data_validation import DataValidation
+            data_validation_config = DataValidationConfig(self.training_pipeline_config)
+            data_validation = DataValidation(data_ingestion_artifact, data_validation_config)
+            logging.info("Initiate the data validation.")
+            data_validation_artifact = self._run_stage(
+                stage_name="data_validation",
+                build=data_validation.initiate_data_validation,
+                artifact_cls=DataValidationArtifact,
+                input_paths=[
+                    data_ingestion_artifact.trained_file_path,
+                    data_ingestion_artifact.test_file_path,
+                    SCHEMA_FILE_PATH,
+                ],
+                params=self.stage_params(data_validation_config),
+            )
+            logging.info(f"Data validation completed and artifact: {data_validation_artifact}")
+            return data_validation_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def start_feature_engineering(self, data_validation_artifact: DataValidationArtifact) -> FeatureEngineeringArtifact:
+        try:
+            from pollution_forecasting.components.feature_engineering import FeatureEngineering
+            feature_engineering_config = FeatureEngineeringConfig(self.training_pipeline_config)
+            feature_engineering = FeatureEngineering(data_validation_artifact, feature_engineering_config)
+            logging.info("Initiate the feature engineering.")
+            feature_engineering_artifact = self._run_stage(
+                stage_name="feature_engineering",
+                build=feature_engineering.initiate_feature_engineering,
+                artifact_cls=FeatureEngineeringArtifact,
+                input_paths=[
+                    data_validation_artifact.valid_train_file_path,
+                    data_validation_artifact.valid_test_file_path,
+                    feature_engineering_config.holidays_file_path,
+                ],
+                params=self.stage_params(feature_engineering_config),
+            )
+            logging.info(f"Feature engineering completed and artifact: {feature_engineering_artifact}")
+            return feature_engineering_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def start_model_tuner(self, feature_engineering_artifact: FeatureEngineeringArtifact) -> Optional[ModelTunerArtifact]:
+        """
+        Tune the imputer and model parameters, or return None when tuning is disabled.
+        """
+        try:
+            model_tuner_config = ModelTunerConfig(self.training_pipeline_config)
+            if not model_tuner_config.enabled:
+                return None
+            if self.max_workers is not None:
+                model_tuner_config.workers = max(1, min(model_tuner_config.workers, self.max_workers))
+            from pollution_forecasting.components.model_tuner import ModelTuner
+            model_tuner = ModelTuner(feature_engineering_artifact, model_tuner_config)
+            logging.info("Initiate the model tuner.")
+            model_tuner_artifact = self._run_stage(
+                stage_name="model_tuner",
+                build=model_tuner.initiate_model_tuner,
+                artifact_cls=ModelTunerArtifact,
+                input_paths=[feature_engineering_artifact.engineered_train_file_path],
+                # the worker count changes wall-clock time only, never the search
+                params={
+                    name: value for name, value in self.stage_params(model_tuner_config).items()
+                    if name != "workers"
+                },
+            )
+            logging.info(f"Model tuning completed and artifact: {model_tuner_artifact}")
+            return model_tuner_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def start_data_transformation(self, feature_engineering_artifact: FeatureEngineeringArtifact,
+                                  model_tuner_artifact: Optional[ModelTunerArtifact] = None) -> DataTransformationArtifact:
+        try:
+            data_transformation_config = DataTransformationConfig(self.training_pipeline_config)
+            if model_tuner_artifact is not None:
+                data_transformation_config.imputer_params = read_yaml_file(model_tuner_artifact.tuned_params_file_path)["imputer_params"]
+            from pollution_forecasting.components.data_transformation import DataTransformation
+            data_transformation = DataTransformation(feature_engineering_artifact, data_transformation_config)
+            logging.info("Initiate the data transformation.")
+            data_transformation_artifact = self._run_stage(
+                stage_name="data_transformation",
+                build=data_transformation.initiate_data_transformation,
+                artifact_cls=DataTransformationArtifact,
+                input_paths=[
+                    feature_engineering_artifact.engineered_train_file_path,
+                    feature_engineering_artifact.engineered_test_file_path,
+                ],
+                params=self.stage_params(data_transformation_config),
+                on_hit=data_transformation.publish_preprocessor,
+            )
+            logging.info(f"Data transformation completed and artifact: {data_transformation_artifact}")
+            return data_transformation_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact,
+                            model_tuner_artifact: Optional[ModelTunerArtifact] = None) -> ModelTrainerArtifact:
+        try:
+            model_trainer_config = ModelTrainerConfig(self.training_pipeline_config)
+            if model_tuner_artifact is not None:
+                model_trainer_config.model_params = read_yaml_file(model_tuner_artifact.tuned_params_file_path)["model_params"]
+            if self.max_workers is not None:
+                model_trainer_config.workers = max(1, min(model_trainer_config.workers, self.max_workers))
+            from pollution_forecasting.components.model_trainer import ModelTrainer
+            model_trainer = ModelTrainer(data_transformation_artifact, model_trainer_config)
+            logging.info("Initiate the model trainer.")
+            model_trainer_artifact = self._run_stage(
+                stage_name="model_trainer",
+                build=model_trainer.initiate_model_trainer,
+                artifact_cls=ModelTrainerArtifact,
+                input_paths=[
+                    data_transformation_artifact.transformed_train_file_path,
+                    data_transformation_artifact.transformed_test_file_path,
+                    data_transformation_artifact.transformed_train_timestamps_file_path,
+                    data_transformation_artifact.transformed_test_timestamps_file_path,
+                    data_transformation_artifact.transformed_train_stations_file_path,
+                    data_transformation_artifact.transformed_test_stations_file_path,
+                    data_transformation_artifact.transformed_columns_file_path,
+                ],
+                # the worker count changes wall-clock time only, never the models
+                params={
+                    name: value for name, value in self.stage_params(model_trainer_config).items()
+                    if name != "workers"
+                },
+                on_hit=model_trainer.publish_models,
+            )
+            logging.info(f"Model training completed and artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def start_backtester(self, data_transformation_artifact: DataTransformationArtifact,
+                         model_tuner_artifact: Optional[ModelTunerArtifact] = None) -> Optional[BacktestArtifact]:
+        """
+        Backtest the model setup over rolling origins, or return None when backtesting is disabled.
+        """
+        try:
+            backtest_config = BacktestConfig(self.training_pipeline_config)
+            if not backtest_config.enabled:
+                return None
+            if self.max_workers is not None:
+                backtest_config.workers = max(1, min(backtest_config.workers, self.max_workers))
+            if model_tuner_artifact is not None:
+                backtest_config.model_params = read_yaml_file(model_tuner_artifact.tuned_params_file_path)["model_params"]
+            from pollution_forecasting.components.backtester import Backtester
+            backtester = Backtester(data_transformation_artifact, backtest_config)
+            logging.info("Initiate the backtest.")
+            backtest_artifact = self._run_stage(
+                stage_name="backtest",
+                build=backtester.initiate_backtest,
+                artifact_cls=BacktestArtifact,
+                input_paths=[
+                    data_transformation_artifact.transformed_train_file_path,
+                    data_transformation_artifact.transformed_test_file_path,
+                    data_transformation_artifact.transformed_train_timestamps_file_path,
+                    data_transformation_artifact.transformed_test_timestamps_file_path,
+                    data_transformation_artifact.transformed_train_stations_file_path,
+                    data_transformation_artifact.transformed_test_stations_file_path,
+                    data_transformation_artifact.transformed_columns_file_path,
+                ],
+                params={
+                    name: value for name, value in self.stage_params(backtest_config).items()
+                    if name not in ("workers", "block_rows")
+                },
+            )
+            logging.info(f"Backtest completed and artifact: {backtest_artifact}")
+            return backtest_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def run_pipeline(self, evict: bool = True) -> ModelTrainerArtifact:
+        try:
+            data_ingestion_artifact = self.start_data_ingestion()
+            data_validation_artifact = self.start_data_validation(data_ingestion_artifact)
+            feature_engineering_artifact = self.start_feature_engineering(data_validation_artifact)
+            model_tuner_artifact = self.start_model_tuner(feature_engineering_artifact)
+            data_transformation_artifact = self.start_data_transformation(feature_engineering_artifact, model_tuner_artifact)
+            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact, model_tuner_artifact)
+            self.start_backtester(data_transformation_artifact, model_tuner_artifact)
+            # shards of a sharded run leave eviction to the parent, which knows the whole run
+            if evict:
+                self.stage_cache.evict()
+            self.instrumentation.finish_run()
+            return model_trainer_artifact
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -0,0 +1,393 @@
+import sys
+import math
+import json
+import time
+import queue
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.constant.training_pipeline import (
+    TARGET_COLUMN,
+    DATA_INGESTION_DATETIME_FORMAT,
+    DATA_INGESTION_WATERMARK_COLUMN,
+    MODEL_STORE_PREPROCESSOR_NAME,
+)
+from pollution_forecasting.entity.config_entity import ServingConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.ml_utils.model.compiled_forest import CompiledForest
+from pollution_forecasting.utils.ml_utils.model.model_store import ModelStore
+
+
+class LatencyMetrics:
+    """
+    Ring buffer of the most recent request latencies, summarised as percentiles and throughput.
+    """
+
+    def __init__(self, window: int):
+        self._latencies = np.zeros(window)
+        self._finished = np.zeros(window)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._batches = 0
+        self._batched_rows = 0
+        self._input_cells = 0
+        self._missing_cells = 0
+        self._started = time.perf_counter()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            slot = self._count % len(self._latencies)
+            self._latencies[slot] = seconds
+            self._finished[slot] = time.perf_counter()
+            self._count += 1
+
+    def record_batch(self, values: np.ndarray) -> None:
+        with self._lock:
+            self._batches += 1
+            self._batched_rows += len(values)
+            self._input_cells += values.size
+            self._missing_cells += int(np.isnan(values).sum())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            filled = min(self._count, len(self._latencies))
+            latencies = self._latencies[:filled].copy()
+            finished = self._finished[:filled].copy()
+            count, batches, batched_rows = self._count, self._batches, self._batched_rows
+            input_cells, missing_cells = self._input_cells, self._missing_cells
+        summary = {
+            "requests": count,
+            "batches": batches,
+            "mean_batch_rows": round(batched_rows / batches, 2) if batches else 0.0,
+            # share of request values sent empty or left out, which the imputer had to fill
+            "missing_input_share": round(missing_cells / input_cells, 4) if input_cells else 0.0,
+            "uptime_s": round(time.perf_counter() - self._started, 3),
+        }
+        if filled:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000.0
+            span = finished.max() - finished.min()
+            summary.update({
+                "window": int(filled),
+                "p50_ms": round(float(p50), 3),
+                "p90_ms": round(float(p90), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(latencies.max()) * 1000.0, 3),
+                "throughput_rps": round(filled / span, 1) if span > 0 else None,
+            })
+        return summary
+
+
+class ForecastModel:
+    """
+    The preprocessor and the served (pollutant, horizon) models, loaded once and kept in memory.
+
+    Both come from the model store, where only the newest version of each served name is
+    unpickled; the array payloads are memory-mapped rather than read, so startup takes
+    milliseconds whatever the size of the preprocessor.
+    """
+
+    def __init__(self, model_store_dir: str, model_dir: str, compiled_max_rows: int = 64,
+                 model_names: Optional[List[str]] = None,
+                 preprocessor_name: str = MODEL_STORE_PREPROCESSOR_NAME):
+        try:
+            self.preprocessor = ModelStore(model_store_dir).load(preprocessor_name)
+            self.feature_columns: List[str] = [str(name) for name in self.preprocessor.feature_names_in_]
+            self.handles = ModelStore(model_dir).handles(model_names)
+            if not self.handles:
+                raise Exception(f"No trained models found in {model_dir}")
+            self.models = {name: handle.get() for name, handle in self.handles.items()}
+            imputer = self.preprocessor[-1] if hasattr(self.preprocessor, "steps") else self.preprocessor
+            self._transform_rows = getattr(imputer, "transform_rows", None)
+            try:
+                self.forest = CompiledForest(self.models, max_rows=compiled_max_rows)
+            except PollutionException as e:
+                logging.warning(f"Serving models without compiling them: {e}")
+                self.forest = None
+            logging.info(f"Loaded preprocessor and models {self.versions}")
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    @property
+    def versions(self) -> Dict[str, str]:
+        return {name: handle.version for name, handle in self.handles.items()}
+
+    @property
+    def input_columns(self) -> List[str]:
+        """
+        Columns of one request row: the preprocessor features, then the current target reading.
+        """
+        return self.feature_columns + [TARGET_COLUMN]
+
+    def predict(self, values: np.ndarray, timestamps: np.ndarray, model_names: Optional[List[str]] = None,
+                groups: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Predict stacked request rows. `groups` labels the request of every row, so readings are
+        only carried forward between rows of the same request.
+        """
+        features = values[:, :-1]
+        if self._transform_rows is not None:
+            imputed = self._transform_rows(features, timestamps, groups)
+        else:
+            frame = pd.DataFrame(features, columns=self.feature_columns, index=pd.DatetimeIndex(timestamps))
+            imputed = self.preprocessor.transform(frame)
+        model_input = np.column_stack([imputed, values[:, -1]])
+        if self.forest is not None:
+            return self.forest.predict(model_input, model_names)
+        return {name: self.models[name].predict(model_input) for name in (model_names or self.models)}
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into one vectorised prediction.
+
+    Request threads submit their rows and wait on a Future. A single worker thread takes the
+    first waiting request, collects whatever else arrives within `max_wait_ms` (up to
+    `max_batch_size` rows), predicts the stacked rows once and hands each request its slice.
+    """
+
+    def __init__(self, model: ForecastModel, max_batch_size: int, max_wait_ms: float, metrics: LatencyMetrics):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = metrics
+        self._queue: "queue.Queue[Tuple[np.ndarray, np.ndarray, Optional[List[str]], Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, values: np.ndarray, timestamps: np.ndarray, model_names: Optional[List[str]] = None) -> Future:
+        future = Future()
+        self._queue.put((values, timestamps, model_names, future))
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                values = np.concatenate([item[0] for item in batch])
+                timestamps = np.concatenate([item[1] for item in batch])
+                requested = [item[2] for item in batch]
+                model_names = None if any(names is None for names in requested) else sorted(set().union(*requested))
+                groups = np.repeat(np.arange(len(batch)), [len(item[0]) for item in batch])
+                predictions = self.model.predict(values, timestamps, model_names, groups)
+                self.metrics.record_batch(values)
+
+                start = 0
+                for item_values, _, names, future in batch:
+                    stop = start + len(item_values)
+                    future.set_result({
+                        name: predictions[name][start:stop] for name in (names or predictions)
+                    })
+                    start = stop
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+def parse_timestamp(value) -> np.datetime64:
+    if isinstance(value, str):
+        try:
+            return np.datetime64(datetime.strptime(value, DATA_INGESTION_DATETIME_FORMAT), "s")
+        except ValueError:
+            return np.datetime64(value, "s")
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), "s")
+
+
+def parse_instances(payload: dict, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rows of a request body as a float matrix in `columns` order plus their timestamps.
+
+    The body holds one reading under "instance" or several under "instances". Each reading
+    maps column names to values and must carry its "From Date". Missing columns become NaN
+    and are imputed.
+
+    The server keeps no history, so the engineered lag, rolling and AQI columns (see
+    /health) are not built here: the client sends them, as computed by FeatureEngineering or
+    StationState from the station's earlier readings. Left out, they are imputed from the
+    request's own rows or the hour-of-week profile, which is a much weaker forecast; the
+    /metrics "missing_input_share" shows how much of the input was filled in this way.
+    """
+    instances = payload.get("instances")
+    if instances is None:
+        instances = [payload.get("instance", payload)]
+    if not isinstance(instances, list) or not instances:
+        raise ValueError("the request needs an 'instance' object or a non-empty 'instances' list")
+
+    values = np.full((len(instances), len(columns)), np.nan)
+    timestamps = np.empty(len(instances), dtype="datetime64[s]")
+    for i, instance in enumerate(instances):
+        if DATA_INGESTION_WATERMARK_COLUMN not in instance:
+            raise ValueError(f"every instance needs a '{DATA_INGESTION_WATERMARK_COLUMN}' timestamp")
+        timestamps[i] = parse_timestamp(instance[DATA_INGESTION_WATERMARK_COLUMN])
+        for j, column in enumerate(columns):
+            value = instance.get(column)
+            if value is not None:
+                values[i, j] = float(value)
+    return values, timestamps
+
+
+def json_safe(value):
+    """
+    Copy of a response body that strict JSON can encode: NumPy arrays and scalars become
+    Python values and NaN or infinite floats become null.
+    """
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class InferenceServer(ThreadingHTTPServer):
+    """
+    Local HTTP forecast service.
+
+    POST /predict  {"instance": {...}} or {"instances": [...], "models": ["PM2.5_24h", ...]}
+    GET  /metrics  p50/p90/p99 latency, throughput and batching statistics
+    GET  /health   served models and the columns a request row may carry
+
+    Request rows must carry the engineered features, see `parse_instances`; the streaming
+    service (`pollution_forecasting.streaming`) is the way to forecast from raw readings.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, serving_config: ServingConfig):
+        try:
+            self.serving_config = serving_config
+            self.model = ForecastModel(
+                serving_config.model_store_dir, serving_config.model_dir, serving_config.compiled_max_rows,
+                serving_config.model_names or None, serving_config.preprocessor_name,
+            )
+            self.metrics = LatencyMetrics(serving_config.metrics_window)
+            self.batcher = MicroBatcher(self.model, serving_config.max_batch_size, serving_config.max_wait_ms, self.metrics)
+            super().__init__((serving_config.host, serving_config.port), _InferenceRequestHandler)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+
+class _InferenceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes, Nagle plus delayed ACKs would add ~40ms to each response
+    disable_nagle_algorithm = True
+    server: InferenceServer
+
+    def _send_json(self, status: int, body: dict) -> None:
+        # json.dumps writes NaN and Infinity by default, which no JSON parser has to accept
+        data = json.dumps(json_safe(body), allow_nan=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.server.metrics.snapshot())
+        elif self.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "models": self.server.model.versions,
+                "columns": self.server.model.input_columns,
+            })
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model_names = payload.get("models")
+            unknown = set(model_names or ()) - set(self.server.model.models)
+            if unknown:
+                raise ValueError(f"unknown models {sorted(unknown)}")
+            values, timestamps = parse_instances(payload, self.server.model.input_columns)
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            result = self.server.batcher.submit(values, timestamps, model_names).result(
+                timeout=self.server.serving_config.request_timeout_s
+            )
+        except Exception as e:
+            logging.error(f"Prediction failed: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        predictions = [
+            {name: float(series[i]) for name, series in result.items()} for i in range(len(values))
+        ]
+        self.server.metrics.record(time.perf_counter() - started)
+        self._send_json(200, {"predictions": predictions})
+
+    def log_message(self, format, *args):
+        # per-request access logs would dominate the latency budget
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the trained pollution forecast models over HTTP.")
+    parser.add_argument("--model-dir", default="final_model", help="model store holding the preprocessor and models/")
+    parser.add_argument("--models", nargs="*", default=None, help="models to serve, every stored model by default")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--max-batch-size", type=int, default=None)
+    parser.add_argument("--max-wait-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    serving_config = ServingConfig(args.model_dir)
+    if args.models:
+        serving_config.model_names = args.models
+    for name in ("host", "port", "max_batch_size", "max_wait_ms"):
+        if getattr(args, name) is not None:
+            setattr(serving_config, name, getattr(args, name))
+
+    server = InferenceServer(serving_config)
+    logging.info(f"Serving forecasts on http://{serving_config.host}:{serving_config.port}")
+    print(f"Serving forecasts on http://{serving_config.host}:{serving_config.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from pollution_forecasting.constant.training_pipeline import DATA_INGESTION_WATERMARK_COLUMN
+from pollution_forecasting.exception.exception import PollutionException
+
+
+def _request(connection: http.client.HTTPConnection, method: str, path: str, body: Optional[dict] = None) -> dict:
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if data is not None else {}
+    connection.request(method, path, body=data, headers=headers)
+    response = connection.getresponse()
+    payload = json.loads(response.read() or b"{}")
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path} returned {response.status}: {payload}")
+    return payload
+
+
+def synthetic_instance(columns: List[str], rng: np.random.Generator) -> dict:
+    """
+    One plausible reading: every column filled with a random positive value, a few left out
+    so the imputer has work to do.
+    """
+    instance = {
+        column: round(float(rng.gamma(2.0, 40.0)), 2)
+        for column in columns if rng.random() > 0.05
+    }
+    hour = np.datetime64("2024-01-01T00") + np.timedelta64(int(rng.integers(0, 24 * 365)), "h")
+    instance[DATA_INGESTION_WATERMARK_COLUMN] = str(hour)
+    return instance
+
+
+def run_load(url: str, clients: int, requests_per_client: int, batch_rows: int = 1,
+             models: Optional[List[str]] = None, seed: int = 0) -> dict:
+    """
+    Hit a running inference server from `clients` concurrent keep-alive connections.
+
+    Args:
+        url (str): Base URL of the server, e.g. http://127.0.0.1:8000.
+        clients (int): Concurrent client threads.
+        requests_per_client (int): Requests sent by each client, one after the other.
+        batch_rows (int): Readings per request.
+        models (Optional[List[str]]): Models to ask for, all of them when None.
+        seed (int): Seed of the synthetic readings.
+
+    Returns:
+        dict: Client-side latency percentiles and throughput, plus the server's own /metrics.
+
+    Raises:
+        PollutionException: If the server cannot be reached or a request fails.
+    """
+    try:
+        target = urlparse(url)
+        probe = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        columns = _request(probe, "GET", "/health")["columns"]
+        rng = np.random.default_rng(seed)
+        bodies = []
+        for _ in range(64):
+            body = {"instances": [synthetic_instance(columns, rng) for _ in range(batch_rows)]}
+            if models:
+                body["models"] = models
+            bodies.append(body)
+
+        latencies = np.zeros((clients, requests_per_client))
+        errors: List[BaseException] = []
+        start_gate = threading.Barrier(clients + 1)
+
+        def client(index: int) -> None:
+            connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+            try:
+                start_gate.wait()
+                for i in range(requests_per_client):
+                    started = time.perf_counter()
+                    _request(connection, "POST", "/predict", bodies[(index + i) % len(bodies)])
+                    latencies[index, i] = time.perf_counter() - started
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        start_gate.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000.0
+        return {
+            "clients": clients,
+            "requests": int(latencies.size),
+            "rows_per_request": batch_rows,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(latencies.size / elapsed, 1),
+            "client_p50_ms": round(float(p50), 3),
+            "client_p90_ms": round(float(p90), 3),
+            "client_p99_ms": round(float(p99), 3),
+            "server": _request(probe, "GET", "/metrics"),
+        }
+
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test a running forecast inference server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--rows", type=int, default=1, help="readings per request")
+    parser.add_argument("--models", nargs="*", default=None)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_load(args.url, args.clients, args.requests, args.rows, args.models), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.utils.ml_utils.aqi.aqi_calculator import (
+    MIN_COVERAGE,
+    MIN_SUB_INDICES,
+    PARTICULATE_POLLUTANTS,
+    POLLUTANT_BREAKPOINTS,
+    HOURS_PER_DAY,
+    sub_index,
+)
+from pollution_forecasting.utils.ml_utils.drift.drift_engine import psi_from_proportions
+from pollution_forecasting.utils.ml_utils.features.feature_builder import FeatureBuilder
+
+
+class RollingWindow:
+    """
+    NaN-aware statistics of the readings in the hours (end - window, end].
+
+    Readings are pushed in increasing hour order. Sums are updated on push and on eviction
+    and the maximum comes from a monotonic deque, so every operation is amortised O(1).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._entries: deque = deque()
+        self._maxima: deque = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def push(self, hour: int, value: float) -> None:
+        if math.isnan(value):
+            return
+        self._entries.append((hour, value))
+        self._sum += value
+        self._sum_sq += value * value
+        while self._maxima and self._maxima[-1][1] <= value:
+            self._maxima.pop()
+        self._maxima.append((hour, value))
+
+    def _evict(self, end_hour: int) -> None:
+        lower = end_hour - self.window
+        while self._entries and self._entries[0][0] <= lower:
+            _, value = self._entries.popleft()
+            self._sum -= value
+            self._sum_sq -= value * value
+        while self._maxima and self._maxima[0][0] <= lower:
+            self._maxima.popleft()
+        if not self._entries:
+            self._sum = self._sum_sq = 0.0
+
+    def stats(self, end_hour: int) -> Tuple[int, float, float, float]:
+        """
+        (count, mean, population std, max) of the window ending at `end_hour` inclusive.
+        """
+        self._evict(end_hour)
+        count = len(self._entries)
+        if not count:
+            return 0, math.nan, math.nan, math.nan
+        mean = self._sum / count
+        variance = max(self._sum_sq / count - mean * mean, 0.0) if count > 1 else 0.0
+        return count, mean, math.sqrt(variance), self._maxima[0][1]
+
+
+class HourRing:
+    """
+    The last `size` hourly rows of a few columns, addressed by hour.
+    """
+
+    def __init__(self, size: int, n_columns: int):
+        self._values = np.full((size, n_columns), np.nan)
+        self._hours = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+
+    def set(self, hour: int, values: np.ndarray) -> None:
+        slot = hour % len(self._hours)
+        self._hours[slot] = hour
+        self._values[slot] = values
+
+    def get(self, hour: int, column: int) -> float:
+        slot = hour % len(self._hours)
+        return float(self._values[slot, column]) if self._hours[slot] == hour else math.nan
+
+
+class DriftSketch:
+    """
+    Exponentially decayed histogram of recent readings on the reference quantile bins.
+
+    Each update is O(number of bins) and the population stability index against the
+    reference distribution can be read at any time.
+    """
+
+    def __init__(self, edges: np.ndarray, expected: np.ndarray, half_life: float):
+        self.edges = edges
+        self.expected = expected
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.counts = np.zeros(len(expected))
+        self.total = 0.0
+
+    def update(self, value: float) -> None:
+        if math.isnan(value):
+            return
+        self.counts *= self.decay
+        self.total *= self.decay
+        self.counts[np.searchsorted(self.edges, value, side="right")] += 1.0
+        self.total += 1.0
+
+    def psi(self) -> float:
+        if not self.total:
+            return math.nan
+        return psi_from_proportions(self.expected, self.counts / self.total)
+
+
+class StationState:
+    """
+    Everything needed to build one station's feature row for a new hour in constant time.
+
+    Mirrors the batch FeatureBuilder and the AQI lag features: lags come from an hour ring,
+    rolling statistics over the hours before the reading from RollingWindow, and the CPCB
+    AQI of every hour (24h means, highest 8h mean of the day) from inclusive windows of the
+    same kind. Missing readings are carried forward from the last observation for up to
+    `max_gap_hours`.
+    """
+
+    def __init__(self, feature_builder: FeatureBuilder, pollutants: List[str], aqi_lags: List[int],
+                 max_gap_hours: int, drift_references: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None,
+                 drift_half_life: float = 168.0):
+        self.builder = feature_builder
+        self.pollutants = pollutants
+        self.aqi_lags = list(aqi_lags)
+        self.max_gap_hours = max_gap_hours
+        self.aqi_pollutants = [pollutant for pollutant in POLLUTANT_BREAKPOINTS if pollutant in pollutants]
+        self.columns = sorted(set(pollutants) | set(feature_builder.lags) | set(feature_builder.rolling_columns))
+        self._column_index = {column: j for j, column in enumerate(self.columns)}
+
+        ring_size = max(feature_builder.required_history_hours, max(self.aqi_lags, default=0)) + 1
+        self._ring = HourRing(ring_size, len(self.columns))
+        self._aqi_ring = HourRing(ring_size, 1)
+        self._windows: Dict[Tuple[str, int], RollingWindow] = {}
+        for column in feature_builder.rolling_columns:
+            for window in feature_builder.rolling_windows.values():
+                self._windows[(column, window)] = RollingWindow(window)
+        for pollutant in self.aqi_pollutants:
+            window = POLLUTANT_BREAKPOINTS[pollutant][1]
+            self._windows.setdefault((pollutant, window), RollingWindow(window))
+        # highest 8h mean of the last day for CO and Ozone
+        self._daily_max = {
+            pollutant: RollingWindow(HOURS_PER_DAY)
+            for pollutant in self.aqi_pollutants if POLLUTANT_BREAKPOINTS[pollutant][2] == "max"
+        }
+        self._last_observed: Dict[str, Tuple[int, float]] = {}
+        self.last_hour: Optional[int] = None
+        self.drift_half_life = drift_half_life
+        self.reset_drift(drift_references or {})
+        self.updates = 0
+
+    def reset_drift(self, drift_references: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> None:
+        """
+        Start new drift sketches against (edges, expected proportions) reference histograms.
+        """
+        self.sketches = {
+            column: DriftSketch(edges, expected, self.drift_half_life)
+            for column, (edges, expected) in drift_references.items()
+        }
+
+    def _fill(self, hour: int, readings: Dict[str, float]) -> Dict[str, float]:
+        filled = {}
+        for column in self.columns:
+            value = readings.get(column, math.nan)
+            if not math.isnan(value):
+                self._last_observed[column] = (hour, value)
+            elif column in self._last_observed and hour - self._last_observed[column][0] <= self.max_gap_hours:
+                value = self._last_observed[column][1]
+            filled[column] = value
+        return filled
+
+    def _aqi(self, hour: int) -> float:
+        sub_indices, particulate = [], False
+        for pollutant in self.aqi_pollutants:
+            _, window, statistic = POLLUTANT_BREAKPOINTS[pollutant]
+            count, mean, _, _ = self._windows[(pollutant, window)].stats(hour)
+            average = mean if count >= math.ceil(window * MIN_COVERAGE) else math.nan
+            if statistic == "max":
+                self._daily_max[pollutant].push(hour, average)
+                average = self._daily_max[pollutant].stats(hour)[3]
+            if not math.isnan(average):
+                sub_indices.append(float(sub_index(pollutant, average)))
+                particulate |= pollutant in PARTICULATE_POLLUTANTS
+        if len(sub_indices) >= MIN_SUB_INDICES and particulate:
+            return max(sub_indices)
+        return math.nan
+
+    def _features(self, hour: int, timestamp: pd.Timestamp) -> Dict[str, float]:
+        row = {}
+        # lags and rolling statistics only look at the hours before this one
+        for column, lags in self.builder.lags.items():
+            if column in self._column_index:
+                for lag in lags:
+                    row[f"{column}_lag_{lag}h"] = self._ring.get(hour - lag, self._column_index[column])
+        for window_name, window in self.builder.rolling_windows.items():
+            for column in self.builder.rolling_columns:
+                if column not in self._column_index:
+                    continue
+                _, mean, std, maximum = self._windows[(column, window)].stats(hour - 1)
+                values = {"mean": mean, "std": std, "max": maximum}
+                for stat in self.builder.rolling_stats:
+                    row[f"{column}_roll_{window_name}_{stat}"] = values[stat]
+        for lag in self.aqi_lags:
+            row[f"AQI_lag_{lag}h"] = self._aqi_ring.get(hour - lag, 0)
+        for name, values in self.builder.calendar_features(pd.Series([pd.Timestamp(timestamp)])).items():
+            row[name] = float(values[0])
+        return row
+
+    def update(self, timestamp: pd.Timestamp, readings: Dict[str, float],
+               build_features: bool = True) -> Optional[Dict[str, float]]:
+        """
+        Fold in one hourly reading and return its feature row, or None for a late reading.
+
+        Args:
+            timestamp (pd.Timestamp): Hour of the reading.
+            readings (Dict[str, float]): Pollutant values, NaN or absent when not measured.
+            build_features (bool): False when only warming up the state, the row is then empty.
+
+        Returns:
+            Optional[Dict[str, float]]: Feature name -> value for this hour, including the
+                current (carried-forward) pollutant readings, like a row of the engineered data.
+        """
+        hour = int(np.datetime64(timestamp, "h").astype(np.int64))
+        if self.last_hour is not None and hour <= self.last_hour:
+            return None
+
+        # hours without a reading still have an AQI in the batch features, from the readings before them
+        if self.last_hour is not None and self.aqi_lags:
+            for missing_hour in range(max(self.last_hour + 1, hour - max(self.aqi_lags)), hour):
+                self._aqi_ring.set(missing_hour, np.array([self._aqi(missing_hour)]))
+
+        row = self._features(hour, timestamp) if build_features else {}
+        raw = {column: float(readings.get(column, math.nan)) for column in self.columns}
+        filled = self._fill(hour, raw)
+        if build_features:
+            row.update({column: filled[column] for column in self.pollutants})
+            # the drift sketches only follow live readings, not the warm-up history
+            for column, sketch in self.sketches.items():
+                sketch.update(raw.get(column, math.nan))
+
+        # the batch features are built from the stored readings, not the carried-forward ones
+        self._ring.set(hour, np.array([raw[column] for column in self.columns]))
+        for (column, _), window in self._windows.items():
+            window.push(hour, raw[column])
+        self._aqi_ring.set(hour, np.array([self._aqi(hour)]))
+        self.last_hour = hour
+        self.updates += 1
+        return row
+
+    def drift(self) -> Dict[str, float]:
+        """
+        Current PSI of every sketched column against its reference distribution.
+        """
+        return {column: sketch.psi() for column, sketch in self.sketches.items()}
+
+    def effective_samples(self) -> float:
+        return min((sketch.total for sketch in self.sketches.values()), default=0.0)
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import queue
+from typing import Iterator, Optional
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import read_yaml_file, write_yaml_file
+
+
+class QueueSource:
+    """
+    In-process stand-in for a feed: readings are put on a queue and `None` ends the stream.
+    """
+
+    def __init__(self, readings: Optional[queue.Queue] = None):
+        self.queue = readings if readings is not None else queue.Queue()
+
+    def put(self, reading: Optional[dict]) -> None:
+        self.queue.put(reading)
+
+    def close(self) -> None:
+        self.queue.put(None)
+
+    def __iter__(self) -> Iterator[dict]:
+        while True:
+            reading = self.queue.get()
+            if reading is None:
+                return
+            yield reading
+
+
+class JsonLinesSource:
+    """
+    Readings appended to a JSON-lines file, one object per line.
+
+    With `follow` the file is tailed like `tail -f`, polling every `poll_interval_s` seconds
+    for new lines; otherwise the stream ends at the end of the file.
+    """
+
+    def __init__(self, file_path: str, follow: bool = False, poll_interval_s: float = 1.0):
+        self.file_path = file_path
+        self.follow = follow
+        self.poll_interval_s = poll_interval_s
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            with open(self.file_path, "r") as file:
+                pending = ""
+                while True:
+                    line = file.readline()
+                    if not line:
+                        if not self.follow:
+                            return
+                        time.sleep(self.poll_interval_s)
+                        continue
+                    pending += line
+                    # a line still being written has no newline yet
+                    if not pending.endswith("\n"):
+                        continue
+                    text, pending = pending.strip(), ""
+                    if text:
+                        yield json.loads(text)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+
+class MongoChangeStreamSource:
+    """
+    Readings inserted into or replaced in the MongoDB collection, from its change stream.
+
+    The resume token of the last reading handed out is persisted to `resume_token_file_path`,
+    so a restarted consumer continues where it stopped instead of missing or replaying hours.
+    Change streams need a replica set or sharded cluster.
+    """
+
+    def __init__(self, collection, resume_token_file_path: Optional[str] = None):
+        self.collection = collection
+        self.resume_token_file_path = resume_token_file_path
+
+    def _read_resume_token(self) -> Optional[dict]:
+        if self.resume_token_file_path and os.path.exists(self.resume_token_file_path):
+            return (read_yaml_file(self.resume_token_file_path) or {}).get("resume_token")
+        return None
+
+    def _write_resume_token(self, token: dict) -> None:
+        if self.resume_token_file_path:
+            write_yaml_file(self.resume_token_file_path, {"resume_token": dict(token)}, replace=True)
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            pipeline = [{"$match": {"operationType": {"$in": ["insert", "replace", "update"]}}}]
+            resume_token = self._read_resume_token()
+            if resume_token:
+                logging.info("Resuming the change stream from the saved token")
+            with self.collection.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                for change in stream:
+                    document = change.get("fullDocument")
+                    if document:
+                        document.pop("_id", None)
+                        yield document
+                    self._write_resume_token(change["_id"])
+        except Exception as e:
+            raise PollutionException(e, sys)
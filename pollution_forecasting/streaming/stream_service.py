@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.constant.training_pipeline import (
+    SCHEMA_FILE_PATH,
+    DATA_INGESTION_DEFAULT_STATION,
+    DATA_INGESTION_WATERMARK_FILE_NAME,
+    DATA_TRANSFORMATION_IMPUTER_PARAMS,
+)
+from pollution_forecasting.components.feature_engineering import FeatureEngineering
+from pollution_forecasting.entity.config_entity import FeatureEngineeringConfig, StreamingConfig, TrainingPipelineConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.serving.inference_server import ForecastModel, parse_timestamp
+from pollution_forecasting.streaming.online_state import StationState
+from pollution_forecasting.streaming.sources import JsonLinesSource, MongoChangeStreamSource
+from pollution_forecasting.utils.feature_store.feature_store import FeatureStore
+from pollution_forecasting.utils.main.utils import read_yaml_file
+from pollution_forecasting.utils.ml_utils.drift.drift_engine import reference_histogram
+
+
+def _to_float(value) -> float:
+    # raw feeds carry missing readings as None, "None" or "NA"
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _run_training_pipeline() -> None:
+    from pollution_forecasting.pipeline.training_pipeline import TrainingPipeline
+    TrainingPipeline().run_pipeline()
+
+
+class StreamingService:
+    """
+    Consumes hourly readings one at a time and re-emits every station's forecasts.
+
+    Each station keeps a StationState, so a reading costs a constant amount of work
+    however long the stream has been running: update the ring buffers and windows, build the
+    feature row, predict all models through the compiled forest and append the forecasts to
+    a JSON-lines file. Drift sketches of the monitored pollutants are checked every
+    `drift_check_every` readings; when the PSI of one crosses the threshold the training
+    pipeline is started in a background thread and the new models are swapped in once it
+    has finished.
+    """
+
+    def __init__(self, streaming_config: StreamingConfig,
+                 retrain: Optional[Callable[[], object]] = _run_training_pipeline,
+                 feature_engineering_config: Optional[FeatureEngineeringConfig] = None):
+        """
+        Args:
+            streaming_config (StreamingConfig): Model, feature store, output and drift settings.
+            retrain (Optional[Callable[[], object]]): Called in a background thread when drift
+                is detected, the training pipeline by default. None disables retraining.
+            feature_engineering_config (Optional[FeatureEngineeringConfig]): Feature settings
+                the models were trained with, the current constants by default.
+
+        Raises:
+            PollutionException: If the models or the feature store cannot be loaded.
+        """
+        try:
+            self.config = streaming_config
+            self.retrain = retrain
+            self.feature_engineering_config = feature_engineering_config or FeatureEngineeringConfig(TrainingPipelineConfig())
+            self.feature_builder = FeatureEngineering.feature_builder_from_config(self.feature_engineering_config)
+            schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self.pollutants: List[str] = schema_config["numerical_columns"]
+            self.feature_store = FeatureStore(
+                root_dir=streaming_config.feature_store_file_path,
+                schema_config=schema_config,
+                timestamp_column=self.feature_engineering_config.timestamp_column,
+                datetime_format=schema_config["timestamp_format"],
+            )
+            self.model = self.load_model()
+            self.drift_references = self.build_drift_references()
+            self.states: Dict[str, StationState] = {}
+            self.latest: Dict[str, dict] = {}
+            self.readings = 0
+            self.skipped = 0
+            self.retrains = 0
+            self._retrain_thread: Optional[threading.Thread] = None
+            self._retrain_finished = threading.Event()
+            self._last_retrain = -math.inf
+            os.makedirs(streaming_config.streaming_dir, exist_ok=True)
+            self._forecasts_file = open(streaming_config.forecasts_file_path, "a")
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    @property
+    def max_gap_hours(self) -> int:
+        # carried-forward gaps follow the served imputer, which may have been tuned
+        preprocessor = self.model.preprocessor
+        imputer = preprocessor[-1] if hasattr(preprocessor, "steps") else preprocessor
+        return getattr(imputer, "max_gap_hours", DATA_TRANSFORMATION_IMPUTER_PARAMS["max_gap_hours"])
+
+    def load_model(self) -> ForecastModel:
+        return ForecastModel(
+            self.config.model_store_dir, self.config.model_dir, self.config.compiled_max_rows,
+            self.config.model_names or None, self.config.preprocessor_name,
+        )
+
+    def build_drift_references(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Reference histogram of each monitored pollutant over the stored history.
+        """
+        if not self.feature_store.exists():
+            logging.warning("No feature store to take drift references from, drift monitoring is off")
+            return {}
+        history = self.feature_store.read(columns=self.config.drift_columns)
+        return {
+            column: reference_histogram(history[column].to_numpy(dtype=np.float64), self.config.drift_bins)
+            for column in self.config.drift_columns
+        }
+
+    def station_state(self, station: str) -> StationState:
+        state = self.states.get(station)
+        if state is None:
+            state = StationState(
+                self.feature_builder, self.pollutants, self.feature_engineering_config.aqi_lags,
+                self.max_gap_hours, self.drift_references,
+                self.config.drift_half_life_hours,
+            )
+            self.states[station] = state
+        return state
+
+    def warm_start(self) -> int:
+        """
+        Replay the newest stored hours into the station states so the first live reading
+        already has its full lag and rolling-window history.
+
+        Returns:
+            int: Number of stored readings replayed.
+        """
+        try:
+            watermark_file_path = os.path.join(
+                os.path.dirname(self.config.feature_store_file_path), DATA_INGESTION_WATERMARK_FILE_NAME
+            )
+            if not (self.feature_store.exists() and os.path.exists(watermark_file_path)):
+                logging.info("No feature store watermark, starting the station states empty")
+                return 0
+            watermark = pd.Timestamp((read_yaml_file(watermark_file_path) or {})["watermark"])
+            history_hours = max(self.feature_builder.required_history_hours, max(self.feature_engineering_config.aqi_lags, default=0))
+            # one extra day for the AQI averaging windows behind the oldest lag
+            start = watermark - pd.Timedelta(hours=history_hours + 24)
+            history = self.feature_store.read(start=start, end=watermark + pd.Timedelta(hours=1))
+            timestamp_column = self.feature_engineering_config.timestamp_column
+            station_column = self.feature_engineering_config.station_column
+            for record in history.to_dict("records"):
+                station = str(record.get(station_column) or DATA_INGESTION_DEFAULT_STATION)
+                readings = {column: _to_float(record.get(column)) for column in self.pollutants}
+                self.station_state(station).update(record[timestamp_column], readings, build_features=False)
+            logging.info(f"Warm-started {len(self.states)} stations from {len(history)} stored readings")
+            return len(history)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def process(self, reading: dict) -> Optional[dict]:
+        """
+        Fold one reading into its station's state and forecast from it.
+
+        Args:
+            reading (dict): Raw reading with its timestamp, pollutant values and optionally
+                the station it comes from.
+
+        Returns:
+            Optional[dict]: The emitted forecast, or None for a late or duplicate reading.
+
+        Raises:
+            PollutionException: If the reading cannot be parsed or predicted.
+        """
+        try:
+            started = time.perf_counter()
+            self._swap_retrained_model()
+            timestamp_column = self.feature_engineering_config.timestamp_column
+            station = str(reading.get(self.feature_engineering_config.station_column) or DATA_INGESTION_DEFAULT_STATION)
+            timestamp = pd.Timestamp(parse_timestamp(reading[timestamp_column]))
+            readings = {column: _to_float(reading.get(column)) for column in self.pollutants}
+
+            row = self.station_state(station).update(timestamp, readings)
+            if row is None:
+                self.skipped += 1
+                logging.warning(f"Skipping late reading {timestamp} of station {station}")
+                return None
+
+            values = np.array([[row.get(column, math.nan) for column in self.model.input_columns]])
+            predictions = self.model.predict(values, np.array([timestamp.to_datetime64()]))
+            forecast = {
+                "station": station,
+                timestamp_column: timestamp.isoformat(),
+                "forecasts": {name: float(series[0]) for name, series in predictions.items()},
+                "latency_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            }
+            self._forecasts_file.write(json.dumps(forecast) + "\n")
+            self._forecasts_file.flush()
+            self.latest[station] = forecast
+
+            self.readings += 1
+            if self.readings % self.config.drift_check_every == 0:
+                self.check_drift()
+            return forecast
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def drift(self) -> Dict[str, float]:
+        """
+        Worst PSI of each monitored pollutant over the stations with enough recent readings.
+        """
+        worst: Dict[str, float] = {}
+        for state in self.states.values():
+            if state.effective_samples() < self.config.drift_min_samples:
+                continue
+            for column, psi in state.drift().items():
+                if not math.isnan(psi):
+                    worst[column] = max(psi, worst.get(column, 0.0))
+        return worst
+
+    def check_drift(self) -> bool:
+        """
+        Start a background retrain if a monitored pollutant has drifted past the threshold.
+
+        Returns:
+            bool: True if a retrain was started.
+        """
+        drift = self.drift()
+        drifted = {column: round(psi, 4) for column, psi in drift.items() if psi > self.config.drift_psi_threshold}
+        if not drifted or self.retrain is None:
+            return False
+        if self._retrain_thread is not None and self._retrain_thread.is_alive():
+            return False
+        if time.monotonic() - self._last_retrain < self.config.retrain_cooldown_s:
+            return False
+
+        logging.info(f"Drift above PSI {self.config.drift_psi_threshold} in {drifted}, retraining")
+        self._last_retrain = time.monotonic()
+        self._retrain_finished.clear()
+        self._retrain_thread = threading.Thread(target=self._run_retrain, name="streaming-retrain", daemon=True)
+        self._retrain_thread.start()
+        return True
+
+    def _run_retrain(self) -> None:
+        try:
+            self.retrain()
+            self._retrain_finished.set()
+        except Exception as e:
+            logging.error(f"Retraining after drift failed, keeping the current models: {e}")
+
+    def _swap_retrained_model(self) -> None:
+        # the swap happens on the consuming thread, between two readings
+        if not self._retrain_finished.is_set():
+            return
+        self._retrain_finished.clear()
+        self.model = self.load_model()
+        self.drift_references = self.build_drift_references()
+        for state in self.states.values():
+            state.reset_drift(self.drift_references)
+        self.retrains += 1
+        logging.info(f"Swapped in the retrained models {list(self.model.models)}")
+
+    def run(self, source: Iterable[dict], limit: Optional[int] = None) -> dict:
+        """
+        Consume a source until it ends or `limit` readings have been processed.
+
+        Returns:
+            dict: Counts of processed and skipped readings and retrains.
+        """
+        try:
+            for reading in source:
+                self.process(reading)
+                if limit is not None and self.readings >= limit:
+                    break
+            return self.summary()
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def summary(self) -> dict:
+        return {
+            "readings": self.readings,
+            "skipped": self.skipped,
+            "stations": len(self.states),
+            "retrains": self.retrains,
+            "drift": {column: round(psi, 4) for column, psi in self.drift().items()},
+        }
+
+    def close(self) -> None:
+        if self._retrain_thread is not None:
+            self._retrain_thread.join()
+        self._forecasts_file.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Forecast from a stream of hourly readings, retraining on drift.")
+    parser.add_argument("--source", choices=["mongo", "file"], default="mongo")
+    parser.add_argument("--file", default=None, help="JSON-lines file of readings for --source file")
+    parser.add_argument("--follow", action="store_true", help="keep tailing the file for new readings")
+    parser.add_argument("--model-dir", default="final_model")
+    parser.add_argument("--no-retrain", action="store_true")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many readings")
+    args = parser.parse_args(argv)
+
+    streaming_config = StreamingConfig(args.model_dir)
+    service = StreamingService(streaming_config, retrain=None if args.no_retrain else _run_training_pipeline)
+    service.warm_start()
+    if args.source == "file":
+        if not args.file:
+            parser.error("--source file needs --file")
+        source = JsonLinesSource(args.file, follow=args.follow, poll_interval_s=streaming_config.poll_interval_s)
+    else:
+        from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
+        collection = get_mongo_client()[streaming_config.database_name][streaming_config.collection_name]
+        source = MongoChangeStreamSource(collection, streaming_config.resume_token_file_path)
+    try:
+        print(json.dumps(service.run(source, limit=args.limit), indent=2))
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import sys
+import uuid
+import shutil
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+PARTITION_COLUMNS: List[str] = ["year", "month"]
+
+
+class FeatureStore:
+    """
+    Parquet feature store partitioned by year/month of the timestamp column.
+
+    Columns are typed according to `data_schema/schema.yaml`: datetime columns are
+    stored as native timestamps and numerical columns as float64. Every write adds
+    new part files, so appending a delta never rewrites the history.
+    """
+
+    def __init__(self, root_dir: str, schema_config: dict, timestamp_column: str, datetime_format: str):
+        """
+        Initialize the FeatureStore.
+
+        Args:
+            root_dir (str): Directory holding the `year=YYYY/month=MM` partitions.
+            schema_config (dict): Parsed `schema.yaml`.
+            timestamp_column (str): Column used for partitioning and range filters.
+            datetime_format (str): Format used to parse datetime columns stored as strings.
+        """
+        self.root_dir = root_dir
+        self.schema_config = schema_config
+        self.timestamp_column = timestamp_column
+        self.datetime_format = datetime_format
+
+    def exists(self) -> bool:
+        """
+        Returns:
+            bool: True if the feature store contains at least one partition.
+        """
+        return os.path.isdir(self.root_dir) and any(
+            name.startswith(f"{PARTITION_COLUMNS[0]}=") for name in os.listdir(self.root_dir)
+        )
+
+    def coerce_schema(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast the schema columns of a DataFrame to their declared types.
+
+        Args:
+            dataframe (pd.DataFrame): Raw rows, e.g. as exported from MongoDB.
+
+        Returns:
+            pd.DataFrame: The same DataFrame with datetime64 and float64 schema columns.
+
+        Raises:
+            PollutionException: If a column cannot be converted.
+        """
+        try:
+            for column in self.schema_config.get("datetime_columns", []):
+                if column in dataframe.columns and not pd.api.types.is_datetime64_any_dtype(dataframe[column]):
+                    values = dataframe[column]
+                    if pd.api.types.infer_dtype(values, skipna=True) in ("datetime", "datetime64", "date"):
+                        dataframe[column] = pd.to_datetime(values, errors="coerce")
+                    else:
+                        dataframe[column] = pd.to_datetime(values, format=self.datetime_format, errors="coerce")
+
+            for column in self.schema_config.get("numerical_columns", []):
+                if column in dataframe.columns and dataframe[column].dtype != np.float64:
+                    dataframe[column] = pd.to_numeric(dataframe[column], errors="coerce").astype(np.float64)
+
+            return dataframe
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def write(self, dataframe: pd.DataFrame, append: bool = False) -> None:
+        """
+        Write rows into year/month partitions.
+
+        Args:
+            dataframe (pd.DataFrame): Rows to store.
+            append (bool, optional): Add part files next to the existing ones instead of
+                replacing the whole store. Defaults to False.
+
+        Raises:
+            PollutionException: If writing fails.
+        """
+        try:
+            if not append and os.path.isdir(self.root_dir):
+                shutil.rmtree(self.root_dir)
+            os.makedirs(self.root_dir, exist_ok=True)
+
+            dataframe = self.coerce_schema(dataframe)
+            if dataframe.empty:
+                return
+
+            timestamps = dataframe[self.timestamp_column]
+            # rows without a parseable timestamp are kept in a dedicated partition
+            years = timestamps.dt.year.fillna(0).astype(np.int64).to_numpy()
+            months = timestamps.dt.month.fillna(0).astype(np.int64).to_numpy()
+            keys = years * 100 + months
+            token = uuid.uuid4().hex[:8]
+
+            for key in np.unique(keys):
+                year, month = divmod(int(key), 100)
+                partition = dataframe[keys == key]
+                first = partition[self.timestamp_column].min()
+                stamp = first.strftime("%Y%m%d%H%M%S") if not pd.isna(first) else "00000000000000"
+                partition_dir = os.path.join(
+                    self.root_dir, f"{PARTITION_COLUMNS[0]}={year:04d}", f"{PARTITION_COLUMNS[1]}={month:02d}"
+                )
+                os.makedirs(partition_dir, exist_ok=True)
+                table = pa.Table.from_pandas(partition, preserve_index=False)
+                pq.write_table(table, os.path.join(partition_dir, f"part-{stamp}-{token}.parquet"))
+
+            logging.info(f"Wrote {len(dataframe)} rows to feature store {self.root_dir}")
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _partition_filter(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]):
+        year, month = ds.field(PARTITION_COLUMNS[0]), ds.field(PARTITION_COLUMNS[1])
+        expression = None
+        if start is not None:
+            expression = (year > start.year) | ((year == start.year) & (month >= start.month))
+        if end is not None:
+            upper = (year < end.year) | ((year == end.year) & (month <= end.month))
+            expression = upper if expression is None else expression & upper
+        return expression
+
+    def read(
+        self,
+        columns: Optional[List[str]] = None,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
+        """
+        Read rows from the feature store.
+
+        Only the requested columns are decoded, and the `[start, end)` timestamp range is
+        pushed down both to the partition directories and to the Parquet row-group statistics.
+
+        Args:
+            columns (Optional[List[str]]): Columns to read. Defaults to all stored columns.
+            start (Optional[pd.Timestamp]): Inclusive lower bound on the timestamp column.
+            end (Optional[pd.Timestamp]): Exclusive upper bound on the timestamp column.
+
+        Returns:
+            pd.DataFrame: Rows ordered by the timestamp column.
+
+        Raises:
+            PollutionException: If reading fails.
+        """
+        try:
+            partitioning = ds.partitioning(
+                pa.schema([(PARTITION_COLUMNS[0], pa.int32()), (PARTITION_COLUMNS[1], pa.int32())]),
+                flavor="hive",
+            )
+            dataset = ds.dataset(self.root_dir, format="parquet", partitioning=partitioning)
+            if columns is None:
+                columns = [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+
+            start = pd.Timestamp(start) if start is not None else None
+            end = pd.Timestamp(end) if end is not None else None
+            expression = self._partition_filter(start, end)
+            field = ds.field(self.timestamp_column)
+            if start is not None:
+                expression = expression & (field >= pa.scalar(start.to_pydatetime(), pa.timestamp("ns")))
+            if end is not None:
+                expression = expression & (field < pa.scalar(end.to_pydatetime(), pa.timestamp("ns")))
+
+            dataframe = dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+            if self.timestamp_column in dataframe.columns and not dataframe[self.timestamp_column].is_monotonic_increasing:
+                dataframe = dataframe.sort_values(self.timestamp_column, kind="stable", ignore_index=True)
+            return dataframe
+
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -3,11 +3,9 @@ from pollution_forecasting.exception.exception import PollutionException
 from pollution_forecasting.logging.logger import logging
 import os,sys
 import numpy as np
-import dill
+import pandas as pd
 import pickle
 
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
 
 def read_yaml_file(file_path: str) -> dict:
     try:
@@ -28,6 +26,226 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
     except Exception as e:
         raise PollutionException(e, sys)
     
+def read_dataframe(file_path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Read a tabular artifact, dispatching on the file extension.
+
+    Parquet artifacts are read with column projection; CSV is kept for legacy artifacts.
+    """
+    try:
+        if file_path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            # Arrow buffers are released column by column while converting, instead of
+            # holding the whole table twice
+            table = pq.read_table(file_path, columns=columns)
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        return pd.read_csv(file_path, usecols=columns)
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+def write_dataframe(file_path: str, dataframe: pd.DataFrame) -> None:
+    """
+    Write a tabular artifact, dispatching on the file extension.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if file_path.endswith(".parquet"):
+            dataframe.to_parquet(file_path, index=False)
+        else:
+            dataframe.to_csv(file_path, index=False, header=True)
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+def iter_dataframe_chunks(file_path: str, chunk_rows: int, columns: list = None):
+    """
+    Yield a tabular artifact as DataFrames of at most `chunk_rows` rows, in file order.
+
+    Parquet artifacts are read one record batch at a time, so only the current chunk is
+    held in memory; CSV is kept for legacy artifacts.
+    """
+    try:
+        chunk_rows = max(1, int(chunk_rows))
+        if file_path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file_path)
+            for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+                yield batch.to_pandas(split_blocks=True, self_destruct=True)
+        else:
+            yield from pd.read_csv(file_path, usecols=columns, chunksize=chunk_rows)
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+def dataframe_row_count(file_path: str):
+    """
+    Number of rows of a Parquet artifact from its footer, None for CSV.
+    """
+    try:
+        if file_path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            return pq.read_metadata(file_path).num_rows
+        return None
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+class DataFrameChunkWriter:
+    """
+    Writes a tabular artifact one chunk of rows at a time, the counterpart of `iter_dataframe_chunks`.
+
+    Parquet chunks go into a single file through one `ParquetWriter`, each chunk cast to the
+    schema of the first non-empty one. The file is only created once rows were written, or on
+    `close` with the columns of the last (empty) chunk seen, so an all-empty result still
+    leaves an empty table behind while an artifact nothing was ever appended to is not created.
+
+    Example:
+        with DataFrameChunkWriter(path) as writer:
+            for chunk in iter_dataframe_chunks(source, 250_000):
+                writer.append(chunk)
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.rows_written = 0
+        self._writer = None
+        self._schema = None
+        self._empty = None
+
+    def append(self, dataframe: pd.DataFrame) -> None:
+        try:
+            if not len(dataframe):
+                if self._writer is None and not self.rows_written:
+                    self._empty = dataframe
+                return
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            if self.file_path.endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(dataframe, preserve_index=False)
+                if self._writer is None:
+                    # an object column that is all null in the first chunk would otherwise be typed
+                    # null, which no later chunk with values could be cast to
+                    fields = [
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in table.schema
+                    ]
+                    self._schema = pa.schema(fields, metadata=table.schema.metadata)
+                    self._writer = pq.ParquetWriter(self.file_path, self._schema)
+                if not table.schema.equals(self._schema, check_metadata=False):
+                    table = table.cast(self._schema)
+                self._writer.write_table(table)
+            else:
+                dataframe.to_csv(self.file_path, mode="a" if self.rows_written else "w", header=not self.rows_written, index=False)
+            self.rows_written += len(dataframe)
+            self._empty = None
+
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def close(self) -> None:
+        try:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            elif self._empty is not None:
+                write_dataframe(self.file_path, self._empty)
+                self._empty = None
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def __enter__(self) -> "DataFrameChunkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+def schema_dtypes(schema_config: dict, compact: bool = False, key_columns: tuple = ()) -> dict:
+    """
+    Column dtypes declared by `schema.yaml`.
+
+    Pollutants are float64 and timestamps datetime64. In compact mode pollutants are float32
+    and the `key_columns` (e.g. the station) categorical, which halves the numeric memory.
+    """
+    dtypes = {column: "datetime64[ns]" for column in schema_config.get("datetime_columns", [])}
+    dtypes.update({column: np.float32 if compact else np.float64 for column in schema_config.get("numerical_columns", [])})
+    if compact:
+        dtypes.update({column: "category" for column in key_columns})
+    return dtypes
+
+def apply_dtypes(dataframe: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """
+    Cast the given columns in place, one column at a time, so at most one extra column is held.
+    """
+    try:
+        for column, dtype in dtypes.items():
+            if column not in dataframe.columns or dataframe[column].dtype == dtype:
+                continue
+            if dtype == "category":
+                dataframe[column] = dataframe[column].astype("category")
+            elif np.issubdtype(np.dtype(dtype), np.datetime64):
+                dataframe[column] = pd.to_datetime(dataframe[column], errors="coerce")
+            else:
+                dataframe[column] = pd.to_numeric(dataframe[column], errors="coerce").astype(dtype, copy=False)
+        return dataframe
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+def compact_float_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast every float64 column to float32 in place.
+    """
+    for column in dataframe.columns[(dataframe.dtypes == np.float64).to_numpy()]:
+        dataframe[column] = dataframe[column].astype(np.float32)
+    return dataframe
+
+def log_memory_savings(stage: str, dataframe: pd.DataFrame) -> dict:
+    """
+    Log how much memory a compact DataFrame takes compared with float64/object columns.
+
+    Returns:
+        dict: Current and float64-equivalent sizes in MB, their ratio and the process peak RSS.
+    """
+    try:
+        current = float(dataframe.memory_usage(deep=True, index=False).sum())
+        baseline = 0.0
+        for column in dataframe.columns:
+            series = dataframe[column]
+            if series.dtype == np.float32:
+                baseline += series.memory_usage(index=False) * 2
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                baseline += series.astype(object).memory_usage(deep=True, index=False)
+            else:
+                baseline += series.memory_usage(deep=True, index=False)
+        report = {
+            "stage": stage,
+            "memory_mb": round(current / 2 ** 20, 2),
+            "float64_memory_mb": round(baseline / 2 ** 20, 2),
+            "ratio": round(baseline / current, 2) if current else None,
+            "peak_rss_mb": round(peak_rss_bytes() / 2 ** 20, 1),
+        }
+        logging.info(
+            f"Compact dtypes in {stage}: {report['memory_mb']} MB instead of {report['float64_memory_mb']} MB "
+            f"({report['ratio']}x), peak RSS {report['peak_rss_mb']} MB"
+        )
+        return report
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+def peak_rss_bytes() -> int:
+    """
+    Peak resident set size of the current process (0 where the platform does not report it).
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    except ImportError:
+        return 0
+
 def save_numpy_array_data(file_path: str, array: np.array):
 
     try:
@@ -39,13 +257,145 @@ def save_numpy_array_data(file_path: str, array: np.array):
     except Exception as e:
         raise PollutionException(e, sys) from e
     
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.ndarray:
+    """
+    Load a .npy artifact, optionally memory-mapped so several processes share one copy in the page cache.
+    """
+    try:
+        return np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+class NumpyArrayWriter:
+    """
+    Writes a 2-D .npy artifact one block of rows at a time, never holding the whole matrix.
+    With `n_columns=None` the artifact is 1-D (e.g. the timestamps of the rows) and blocks
+    are 1-D runs of values.
+
+    With `rows` known up front the file is preallocated and memory-mapped, and blocks are
+    copied into it in place. Without it blocks are appended to the file behind a header sized
+    for the largest possible row count, and the header is rewritten with the real shape on
+    `close`. Either way the result is a plain .npy that `load_numpy_array_data` can memory-map.
+
+    Example:
+        with NumpyArrayWriter(path, n_columns=75, dtype=np.float32) as writer:
+            for block in blocks:
+                writer.append(block)
+    """
+
+    def __init__(self, file_path: str, n_columns: int, dtype=np.float64, rows: int = None):
+        try:
+            self.file_path = file_path
+            self.n_columns = None if n_columns is None else int(n_columns)
+            self.dtype = np.dtype(dtype)
+            self.rows = rows
+            self.rows_written = 0
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            if rows is not None:
+                self._array = np.lib.format.open_memmap(file_path, mode="w+", dtype=self.dtype, shape=self._shape(rows))
+                self._file = None
+            else:
+                self._array = None
+                self._file = open(file_path, "wb")
+                # the largest row count has the longest header, any real shape fits in its place
+                self._header_size = len(self._header(np.iinfo(np.int64).max))
+                self._file.write(self._header(0, self._header_size))
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def _shape(self, rows: int) -> tuple:
+        return (rows,) if self.n_columns is None else (rows, self.n_columns)
+
+    def _header(self, rows: int, size: int = None) -> bytes:
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": self._shape(rows)}
+        text = repr(header)
+        # magic (6) + version (2) + header length (2), then the header padded to a 64 byte boundary
+        total = size if size is not None else -(-(10 + len(text) + 1) // 64) * 64
+        text = text.ljust(total - 10 - 1) + "\n"
+        return np.lib.format.magic(1, 0) + np.uint16(len(text)).tobytes() + text.encode("latin1")
+
+    def append(self, block: np.ndarray) -> None:
+        """
+        Write the next rows. 1-D blocks of a 2-D artifact are taken as a single row.
+        """
+        try:
+            block = np.asarray(block, dtype=self.dtype)
+            if self.n_columns is None:
+                if block.ndim != 1:
+                    raise ValueError(f"Block has {block.ndim} dimensions, expected the values of a 1-D artifact")
+            elif block.ndim == 1:
+                block = block[None, :]
+            if self.n_columns is not None and block.shape[1] != self.n_columns:
+                raise ValueError(f"Block has {block.shape[1]} columns, expected {self.n_columns}")
+            if self._array is not None:
+                if self.rows_written + len(block) > self.rows:
+                    raise ValueError(f"Writing past the {self.rows} preallocated rows of {self.file_path}")
+                self._array[self.rows_written:self.rows_written + len(block)] = block
+            else:
+                self._file.write(np.ascontiguousarray(block).tobytes())
+            self.rows_written += len(block)
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def close(self) -> None:
+        try:
+            if self._array is not None:
+                if self.rows_written != self.rows:
+                    raise ValueError(f"Wrote {self.rows_written} of the {self.rows} preallocated rows of {self.file_path}")
+                self._array.flush()
+                self._array = None
+            elif self._file is not None:
+                self._file.seek(0)
+                self._file.write(self._header(self.rows_written, self._header_size))
+                self._file.close()
+                self._file = None
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def __enter__(self) -> "NumpyArrayWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # the block failed part way, release the file without the row count check masking the error
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._array = None
+
+def iter_row_blocks(array: np.ndarray, block_rows: int, rows: np.ndarray = None):
+    """
+    Yield (start, block) over the rows of an array in blocks of at most `block_rows` rows.
+
+    Plain slices of a memory-mapped array are views, so only the block being worked on is
+    paged in. With `rows` the given row indices are gathered block by block instead, which
+    copies one block at a time rather than the whole selection.
+    """
+    total = len(array) if rows is None else len(rows)
+    for start in range(0, total, max(1, int(block_rows))):
+        stop = min(start + block_rows, total)
+        yield start, (array[start:stop] if rows is None else array[rows[start:stop]])
+
 def save_object(file_path: str, obj: object) -> None:
     try:
         logging.info("Entered the save_object method of MainUtils class")
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, "wb") as file_obj:
-            pickle.dump(obj, file_obj)
+            pickle.dump(obj, file_obj, protocol=pickle.HIGHEST_PROTOCOL)
         logging.info("Exited the save_object method of MainUtils class")
     
     except Exception as e:
-        raise PollutionException(e, sys) from e
\ No newline at end of file
+        raise PollutionException(e, sys) from e
+
+def load_object(file_path: str) -> object:
+    try:
+        if not os.path.exists(file_path):
+            raise Exception(f"The file: {file_path} does not exist")
+        with open(file_path, "rb") as file_obj:
+            return pickle.load(file_obj)
+
+    except Exception as e:
+        raise PollutionException(e, sys) from e
@@ -0,0 +1,175 @@
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.utils.ml_utils.features.rolling import trailing_max, trailing_mean
+
+# CPCB National AQI: sub-index breakpoints shared by every pollutant
+AQI_BREAKPOINTS = np.array([0, 50, 100, 200, 300, 400, 500], dtype=np.float64)
+AQI_CATEGORIES = ["Good", "Satisfactory", "Moderate", "Poor", "Very Poor", "Severe"]
+
+# pollutant -> (concentration breakpoints matching AQI_BREAKPOINTS, averaging hours, statistic).
+# Concentrations are in ug/m3 except CO in mg/m3. The last breakpoint closes the open-ended
+# "Severe" band, anything above it is capped at an AQI of 500.
+POLLUTANT_BREAKPOINTS = {
+    "PM10": ([0, 50, 100, 250, 350, 430, 510], 24, "mean"),
+    "PM2.5": ([0, 30, 60, 90, 120, 250, 380], 24, "mean"),
+    "NO2": ([0, 40, 80, 180, 280, 400, 520], 24, "mean"),
+    "Ozone": ([0, 50, 100, 168, 208, 748, 940], 8, "max"),
+    "CO": ([0, 1, 2, 10, 17, 34, 51], 8, "max"),
+    "SO2": ([0, 40, 80, 380, 800, 1600, 2400], 24, "mean"),
+    "NH3": ([0, 200, 400, 800, 1200, 1800, 3600], 24, "mean"),
+}
+
+# readings needed in a window before its average counts (16 of 24 hours, 6 of 8 hours)
+MIN_COVERAGE = 2 / 3
+# the overall AQI needs this many sub-indices, one of them PM2.5 or PM10
+MIN_SUB_INDICES = 3
+PARTICULATE_POLLUTANTS = ("PM2.5", "PM10")
+HOURS_PER_DAY = 24
+
+_STATION_BLOCK = 64
+
+
+def sub_index(pollutant: str, concentration) -> np.ndarray:
+    """
+    CPCB sub-index of a pollutant by linear interpolation inside its breakpoint band.
+
+    Args:
+        pollutant (str): Key of POLLUTANT_BREAKPOINTS.
+        concentration (array-like): Concentrations already averaged over the pollutant's window.
+
+    Returns:
+        np.ndarray: Sub-indices in [0, 500], NaN where the concentration is NaN.
+    """
+    breakpoints = np.asarray(POLLUTANT_BREAKPOINTS[pollutant][0], dtype=np.float64)
+    slope = np.diff(AQI_BREAKPOINTS) / np.diff(breakpoints)
+    intercept = AQI_BREAKPOINTS[:-1] - slope * breakpoints[:-1]
+    values = np.clip(np.asarray(concentration, dtype=np.float64), 0.0, breakpoints[-1])
+    band = np.searchsorted(breakpoints[1:-1], values, side="right")
+    return intercept[band] + slope[band] * values
+
+
+def average_concentration(pollutant: str, grid: np.ndarray) -> np.ndarray:
+    """
+    CPCB averaging of an hourly (hours x stations) grid: the 24-hour running mean, or for CO
+    and Ozone the highest 8-hour running mean of the last 24 hours.
+    """
+    _, window, statistic = POLLUTANT_BREAKPOINTS[pollutant]
+    averaged = trailing_mean(grid, window, min_periods=int(np.ceil(window * MIN_COVERAGE)))
+    if statistic == "max":
+        averaged = trailing_max(averaged, HOURS_PER_DAY)
+    return averaged
+
+
+class _GridLayout:
+    """
+    Where every row lands on the hours x stations grid, split into blocks of stations so a
+    decade of hourly data for hundreds of stations never needs one huge grid. Built once and
+    reused for every pollutant.
+    """
+
+    def __init__(self, positions: np.ndarray, station_codes: np.ndarray, n_stations: int):
+        self.n_hours = int(positions.max()) + 1 if len(positions) else 0
+        order = np.argsort(station_codes, kind="stable")
+        bounds = np.searchsorted(station_codes[order], np.arange(0, n_stations + _STATION_BLOCK, _STATION_BLOCK))
+        self.blocks = []
+        for block, block_start in enumerate(range(0, n_stations, _STATION_BLOCK)):
+            rows = order[bounds[block]:bounds[block + 1]]
+            width = min(_STATION_BLOCK, n_stations - block_start)
+            # offset in a station-major buffer, so each station's hours are contiguous
+            offsets = (station_codes[rows] - block_start) * self.n_hours + positions[rows]
+            self.blocks.append((rows, width, offsets, positions[rows]))
+
+    def average(self, pollutant: str, values: np.ndarray, lag_hours: int = 0) -> np.ndarray:
+        averaged = np.full(len(values), np.nan)
+        for rows, width, offsets, positions in self.blocks:
+            buffer = np.full(width * self.n_hours, np.nan)
+            buffer[offsets] = values[rows]
+            # hours x stations view of the station-major buffer
+            grid = buffer.reshape(width, self.n_hours).T
+            block_average = np.asfortranarray(average_concentration(pollutant, grid)).T.reshape(-1)
+            inside = positions >= lag_hours
+            averaged[rows[inside]] = block_average[offsets[inside] - lag_hours]
+        return averaged
+
+
+def compute_aqi(
+    data: pd.DataFrame,
+    timestamp_column: Optional[str] = None,
+    station_column: Optional[str] = None,
+    averaged: bool = False,
+    lag_hours: int = 0,
+) -> pd.DataFrame:
+    """
+    Sub-indices, overall AQI, AQI category and dominant pollutant for every row.
+
+    Hourly readings are laid on an hours x stations grid, so the running averages of every
+    station are computed together in O(n) and gaps never shift a window. Without a timestamp
+    column the rows are taken as consecutive hours, which fits the pollutant columns of the
+    arrays written by DataTransformation.
+
+    Args:
+        data (pd.DataFrame): Pollutant columns named as in POLLUTANT_BREAKPOINTS (others are ignored).
+        timestamp_column (Optional[str]): Column with the reading hour.
+        station_column (Optional[str]): Column identifying the station, if several are mixed.
+        averaged (bool): The concentrations already are CPCB window averages, e.g. forecasts of
+            daily means, so they are converted to sub-indices directly.
+        lag_hours (int): Report the AQI of `lag_hours` earlier for each row, so it can be used as a
+            training feature without looking at the current hour.
+
+    Returns:
+        pd.DataFrame: `<pollutant>_SubIndex` columns, `AQI`, `AQI_Bucket` and `dominant_pollutant`,
+            aligned with the rows of `data`.
+
+    Raises:
+        PollutionException: If the computation fails.
+    """
+    try:
+        pollutants = [pollutant for pollutant in POLLUTANT_BREAKPOINTS if pollutant in data.columns]
+        n_rows = len(data)
+        if not averaged:
+            if timestamp_column is not None:
+                hours = pd.to_datetime(data[timestamp_column]).to_numpy().astype("datetime64[h]").astype(np.int64)
+                positions = hours - hours.min() if n_rows else hours
+            else:
+                positions = np.arange(n_rows, dtype=np.int64)
+            if station_column is not None and station_column in data.columns:
+                station_codes, stations = pd.factorize(data[station_column])
+                n_stations = len(stations)
+            else:
+                station_codes, n_stations = np.zeros(n_rows, dtype=np.int64), 1
+            layout = _GridLayout(positions, station_codes, n_stations)
+
+        result = pd.DataFrame(index=data.index)
+        aqi = np.full(n_rows, -np.inf)
+        dominant = np.zeros(n_rows, dtype=np.int64)
+        available = np.zeros(n_rows, dtype=np.int64)
+        has_particulate = np.zeros(n_rows, dtype=bool)
+        for j, pollutant in enumerate(pollutants):
+            values = pd.to_numeric(data[pollutant], errors="coerce").to_numpy(dtype=np.float64)
+            if not averaged and n_rows:
+                values = layout.average(pollutant, values, lag_hours)
+            index = sub_index(pollutant, values)
+            result[f"{pollutant}_SubIndex"] = index
+            present = ~np.isnan(index)
+            available += present
+            if pollutant in PARTICULATE_POLLUTANTS:
+                has_particulate |= present
+            higher = present & (index > aqi)
+            aqi[higher] = index[higher]
+            dominant[higher] = j
+
+        valid = (available >= MIN_SUB_INDICES) & has_particulate
+        aqi = np.where(valid, aqi, np.nan)
+        bucket = np.clip(np.searchsorted(AQI_BREAKPOINTS, aqi, side="left") - 1, 0, len(AQI_CATEGORIES) - 1)
+        result["AQI"] = aqi
+        result["AQI_Bucket"] = pd.Categorical.from_codes(np.where(valid, bucket, -1), categories=AQI_CATEGORIES)
+        result["dominant_pollutant"] = pd.Categorical.from_codes(np.where(valid, dominant, -1), categories=pollutants)
+        return result
+
+    except Exception as e:
+        raise PollutionException(e, sys)
@@ -0,0 +1,341 @@
+import sys
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from pollution_forecasting.exception.exception import PollutionException
+
+SUPPORTED_METRICS = ("ks", "psi", "wasserstein")
+
+
+def sample_size_for_error(epsilon: float, confidence: float) -> int:
+    """
+    Number of rows needed so that an empirical CDF is within `epsilon` of the true
+    CDF everywhere with probability `confidence` (Dvoretzky-Kiefer-Wolfowitz bound).
+    """
+    return int(math.ceil(math.log(2.0 / (1.0 - confidence)) / (2.0 * epsilon ** 2)))
+
+
+class ReservoirSampler:
+    """
+    Uniform fixed-size sample over a stream of row blocks (Algorithm R, vectorized per block).
+    """
+
+    def __init__(self, size: int, random_state: Optional[int] = None):
+        self.size = size
+        self.seen = 0
+        self.reservoir: Optional[np.ndarray] = None
+        self._rng = np.random.default_rng(random_state)
+
+    def update(self, block: np.ndarray) -> None:
+        block = np.asarray(block)
+        if self.reservoir is None:
+            self.reservoir = np.empty((self.size,) + block.shape[1:], dtype=block.dtype)
+        fill = min(max(self.size - self.seen, 0), len(block))
+        if fill:
+            self.reservoir[self.seen:self.seen + fill] = block[:fill]
+        rest = block[fill:]
+        if len(rest):
+            positions = self.seen + fill + np.arange(len(rest))
+            slots = (self._rng.random(len(rest)) * (positions + 1)).astype(np.int64)
+            accepted = slots < self.size
+            # fancy assignment keeps the last write per slot, matching the sequential algorithm
+            self.reservoir[slots[accepted]] = rest[accepted]
+        self.seen += len(block)
+
+    @property
+    def sample(self) -> np.ndarray:
+        if self.reservoir is None:
+            return np.empty((0,))
+        return self.reservoir[:min(self.seen, self.size)]
+
+
+def stratified_sample_indices(strata: np.ndarray, size: int, random_state: Optional[int] = None) -> np.ndarray:
+    """
+    Row indices of a sample of `size` rows allocated to each stratum proportionally to its size.
+    """
+    strata = np.asarray(strata)
+    if size >= len(strata):
+        return np.arange(len(strata))
+    rng = np.random.default_rng(random_state)
+    _, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    quotas = np.maximum(np.round(counts * size / len(strata)).astype(np.int64), 1)
+    order = np.lexsort((rng.random(len(strata)), inverse))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(strata)) - starts[inverse[order]]
+    return np.sort(order[rank < quotas[inverse[order]]])
+
+
+def _ks_wasserstein(base: np.ndarray, current: np.ndarray):
+    """
+    KS statistic, asymptotic p-value and Wasserstein-1 distance for every column in one pass.
+
+    Both samples are stacked, every column is sorted once, and the difference of the
+    two empirical CDFs is obtained as a cumulative sum of signed per-row weights.
+    NaNs get zero weight and sort to the end of each column.
+    """
+    n1 = np.sum(~np.isnan(base), axis=0).astype(np.float64)
+    n2 = np.sum(~np.isnan(current), axis=0).astype(np.float64)
+    # work on a contiguous (columns, rows) block so each column is sorted over contiguous memory
+    values = np.ascontiguousarray(np.vstack([base, current]).T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.hstack([
+            np.where(np.isnan(base.T), 0.0, (1.0 / n1)[:, None]),
+            np.where(np.isnan(current.T), 0.0, (-1.0 / n2)[:, None]),
+        ])
+
+    order = np.argsort(values, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    cdf_diff = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+    del order, weights
+
+    # evaluate the CDFs only after the last of a run of tied values
+    step = np.diff(values, axis=1)
+    last_of_run = np.hstack([step != 0, np.ones((values.shape[0], 1), dtype=bool)])
+    last_of_run &= ~np.isnan(values)
+    statistic = np.max(np.where(last_of_run, np.abs(cdf_diff), 0.0), axis=1)
+
+    gaps = np.nan_to_num(step, nan=0.0)
+    wasserstein = np.sum(np.abs(cdf_diff[:, :-1]) * gaps, axis=1)
+
+    # scipy is imported on first use, importing the drift engine stays cheap
+    from scipy.special import kolmogorov
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective_n = n1 * n2 / (n1 + n2)
+    p_value = np.clip(kolmogorov(np.sqrt(effective_n) * statistic), 0.0, 1.0)
+    empty = (n1 == 0) | (n2 == 0)
+    statistic[empty], p_value[empty], wasserstein[empty] = np.nan, np.nan, np.nan
+    return statistic, p_value, wasserstein
+
+
+def reference_histogram(base: np.ndarray, bins: int):
+    """
+    Inner quantile edges of a base sample and the share of the base falling in each bin.
+    """
+    base = base[~np.isnan(base)]
+    edges = np.unique(np.quantile(base, np.linspace(0.0, 1.0, bins + 1))[1:-1]) if len(base) else np.array([])
+    expected = np.bincount(np.searchsorted(edges, base, side="right"), minlength=len(edges) + 1) / max(len(base), 1)
+    return edges, expected
+
+
+def psi_from_proportions(expected: np.ndarray, actual: np.ndarray) -> float:
+    expected, actual = np.clip(expected, 1e-6, None), np.clip(actual, 1e-6, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _psi(base: np.ndarray, current: np.ndarray, bins: int) -> np.ndarray:
+    """
+    Population stability index per column over quantile bins of the base sample.
+    """
+    psi = np.full(base.shape[1], np.nan)
+    for j in range(base.shape[1]):
+        c = current[:, j][~np.isnan(current[:, j])]
+        if not len(c) or np.isnan(base[:, j]).all():
+            continue
+        edges, expected = reference_histogram(base[:, j], bins)
+        actual = np.bincount(np.searchsorted(edges, c, side="right"), minlength=len(edges) + 1) / len(c)
+        psi[j] = psi_from_proportions(expected, actual)
+    return psi
+
+
+def _report_entries(columns: Sequence[str], statistic: np.ndarray, p_value: np.ndarray, wasserstein: np.ndarray,
+                    psi: Optional[np.ndarray], metrics: Sequence[str], threshold: float,
+                    batch_seconds: float) -> Dict[str, dict]:
+    report = {}
+    for j, column in enumerate(columns):
+        entry = {
+            "p_value": float(p_value[j]),
+            "ks_statistic": float(statistic[j]),
+            "drift_status": bool(p_value[j] < threshold),
+            # wall time of the batched pass over the `batch_columns` columns this one was computed with
+            "batch_seconds": round(batch_seconds, 6),
+            "batch_columns": len(columns),
+        }
+        if "wasserstein" in metrics:
+            entry["wasserstein"] = float(wasserstein[j])
+        if psi is not None:
+            entry["psi"] = float(psi[j])
+        report[column] = entry
+    return report
+
+
+def _column_report(base: np.ndarray, current: np.ndarray, columns: Sequence[str],
+                   metrics: Sequence[str], threshold: float, psi_bins: int) -> Dict[str, dict]:
+    start = time.perf_counter()
+    statistic, p_value, wasserstein = _ks_wasserstein(base, current)
+    psi = _psi(base, current, psi_bins) if "psi" in metrics else None
+    # every column is computed in the same vectorized pass, so only the pass as a whole has a timing
+    batch_seconds = time.perf_counter() - start
+    return _report_entries(columns, statistic, p_value, wasserstein, psi, metrics, threshold, batch_seconds)
+
+
+class StreamingHistogram:
+    """
+    Counts of the `columns` of a stream of row blocks on `bins` equal-width bins over
+    [low, high], the bounded-memory summary the chunked validation tests drift on.
+
+    Values outside the range are counted in the first or last bin and NaNs are skipped.
+    Two histograms on the same bins compare like their full data up to the bin width:
+    the KS statistic is off by at most the share of readings in one bin and the
+    Wasserstein distance by at most one bin width.
+    """
+
+    def __init__(self, columns: Sequence[str], lows: Sequence[float], highs: Sequence[float], bins: int):
+        self.columns = list(columns)
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.bins = bins
+        self.widths = np.where(self.highs > self.lows, self.highs - self.lows, 1.0) / bins
+        self.counts = np.zeros((len(self.lows), bins), dtype=np.int64)
+
+    def update(self, block: np.ndarray) -> None:
+        block = np.asarray(block, dtype=np.float64)
+        for j in range(block.shape[1]):
+            values = block[:, j]
+            values = values[~np.isnan(values)]
+            positions = np.clip(((values - self.lows[j]) / self.widths[j]).astype(np.int64), 0, self.bins - 1)
+            self.counts[j] += np.bincount(positions, minlength=self.bins)
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+
+def _histogram_psi(base: np.ndarray, current: np.ndarray, bins: int) -> float:
+    """
+    PSI of one column's histograms over `bins` quantile bins of the base histogram, the
+    histogram counterpart of `_psi`.
+    """
+    counts = np.cumsum(base)
+    # the quantile edges of `reference_histogram` interpolate between the readings of these two ranks
+    ranks = (counts[-1] - 1) * np.linspace(0.0, 1.0, bins + 1)[1:-1]
+    below = np.searchsorted(counts, np.floor(ranks), side="right")
+    above = np.searchsorted(counts, np.ceil(ranks), side="right")
+    # a reading equal to an edge counts in the bin above it, so an edge inside a histogram bin starts there
+    stops = np.where(below < above, below, below - 1)
+    starts = np.unique(np.r_[0, stops + 1])
+    starts = starts[starts < len(base)]
+    expected = np.add.reduceat(base, starts) / base.sum()
+    actual = np.add.reduceat(current, starts) / current.sum()
+    return psi_from_proportions(expected, actual)
+
+
+def detect_histogram_drift(
+    base: StreamingHistogram,
+    current: StreamingHistogram,
+    threshold: float = 0.05,
+    metrics: Sequence[str] = ("ks",),
+    psi_bins: int = 10,
+) -> Dict[str, dict]:
+    """
+    `detect_drift` on two streaming histograms over the same bins instead of on samples.
+
+    Args:
+        base (StreamingHistogram): Histogram of the reference data.
+        current (StreamingHistogram): Histogram of the data to test, on the bins of `base`.
+        threshold (float, optional): KS p-value below which a column is flagged as drifted. Defaults to 0.05.
+        metrics (Sequence[str], optional): Any of "ks", "psi", "wasserstein". KS is always computed.
+        psi_bins (int, optional): Number of base-quantile bins for PSI. Defaults to 10.
+
+    Returns:
+        Dict[str, dict]: The entries of `detect_drift` for every column of `base`.
+
+    Raises:
+        PollutionException: If an unknown metric is requested or the histograms do not share their bins.
+    """
+    try:
+        unknown = set(metrics) - set(SUPPORTED_METRICS)
+        if unknown:
+            raise ValueError(f"Unsupported drift metrics: {sorted(unknown)}")
+        if base.columns != current.columns or base.counts.shape != current.counts.shape or not (
+            np.array_equal(base.lows, current.lows) and np.array_equal(base.highs, current.highs)
+        ):
+            raise ValueError("drift histograms must share their bins")
+        start = time.perf_counter()
+        n1, n2 = base.rows.astype(np.float64), current.rows.astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cdf_diff = np.cumsum(base.counts, axis=1) / n1[:, None] - np.cumsum(current.counts, axis=1) / n2[:, None]
+            statistic = np.abs(cdf_diff).max(axis=1)
+            wasserstein = np.abs(cdf_diff[:, :-1]).sum(axis=1) * base.widths
+            effective_n = n1 * n2 / (n1 + n2)
+
+        from scipy.special import kolmogorov
+
+        p_value = np.clip(kolmogorov(np.sqrt(effective_n) * statistic), 0.0, 1.0)
+        empty = (n1 == 0) | (n2 == 0)
+        statistic[empty], p_value[empty], wasserstein[empty] = np.nan, np.nan, np.nan
+        psi = None
+        if "psi" in metrics:
+            psi = np.array([
+                np.nan if empty[j] else _histogram_psi(base.counts[j], current.counts[j], psi_bins)
+                for j in range(len(base.columns))
+            ])
+        batch_seconds = time.perf_counter() - start
+        return _report_entries(base.columns, statistic, p_value, wasserstein, psi, metrics, threshold, batch_seconds)
+
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def detect_drift(
+    base: np.ndarray,
+    current: np.ndarray,
+    columns: Sequence[str],
+    threshold: float = 0.05,
+    metrics: Sequence[str] = ("ks",),
+    psi_bins: int = 10,
+    workers: int = 1,
+    parallel_min_rows: int = 100_000,
+) -> Dict[str, dict]:
+    """
+    Compare two numeric samples column by column.
+
+    Args:
+        base (np.ndarray): Reference sample of shape (n1, len(columns)), NaN for missing.
+        current (np.ndarray): Sample to test of shape (n2, len(columns)).
+        columns (Sequence[str]): Column names, in array order.
+        threshold (float, optional): KS p-value below which a column is flagged as drifted. Defaults to 0.05.
+        metrics (Sequence[str], optional): Any of "ks", "psi", "wasserstein". KS is always computed.
+        psi_bins (int, optional): Number of base-quantile bins for PSI. Defaults to 10.
+        workers (int, optional): Process pool size used when the data is large. Defaults to 1.
+        parallel_min_rows (int, optional): Rows of base plus current, i.e. of the samples when the caller
+            samples, from which columns are fanned out to the pool.
+
+    Returns:
+        Dict[str, dict]: Per-column p_value, ks_statistic, drift_status and the optional metrics, plus the
+        batch_seconds and batch_columns of the batched pass (one per pool worker) that computed the column.
+
+    Raises:
+        PollutionException: If an unknown metric is requested or the computation fails.
+    """
+    try:
+        unknown = set(metrics) - set(SUPPORTED_METRICS)
+        if unknown:
+            raise ValueError(f"Unsupported drift metrics: {sorted(unknown)}")
+        base = np.asarray(base, dtype=np.float64)
+        current = np.asarray(current, dtype=np.float64)
+        columns = list(columns)
+
+        if workers <= 1 or len(columns) <= 1 or len(base) + len(current) < parallel_min_rows:
+            return _column_report(base, current, columns, metrics, threshold, psi_bins)
+
+        groups: List[np.ndarray] = [g for g in np.array_split(np.arange(len(columns)), min(workers, len(columns))) if len(g)]
+        report: Dict[str, dict] = {}
+        with ProcessPoolExecutor(max_workers=len(groups)) as executor:
+            futures = [
+                executor.submit(
+                    _column_report, base[:, group], current[:, group], [columns[j] for j in group],
+                    metrics, threshold, psi_bins,
+                )
+                for group in groups
+            ]
+            for future in futures:
+                report.update(future.result())
+        return {column: report[column] for column in columns}
+
+    except Exception as e:
+        raise PollutionException(e, sys)
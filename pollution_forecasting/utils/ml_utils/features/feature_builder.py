@@ -0,0 +1,229 @@
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.utils.ml_utils.features.rolling import trailing_max
+
+
+def _hours_since_epoch(timestamps: pd.Series) -> np.ndarray:
+    return timestamps.to_numpy().astype("datetime64[h]").astype(np.int64)
+
+
+def _past_window_moments(grid: np.ndarray, positions: np.ndarray, window: int):
+    """
+    Mean and population std of the `window` grid rows strictly before each position, from
+    cumulative sums, so every window costs O(1) whatever its length. Values are centred on
+    the column mean first to keep the running sum of squares from losing precision.
+    """
+    valid = ~np.isnan(grid)
+    with np.errstate(invalid="ignore"):
+        centre = np.nan_to_num(np.nanmean(grid, axis=0)) if valid.any() else np.zeros(grid.shape[1])
+    filled = np.where(valid, grid - centre, 0.0)
+    zeros = np.zeros((1, grid.shape[1]))
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    sums = np.concatenate([zeros, np.cumsum(filled, axis=0)])
+    squares = np.concatenate([zeros, np.cumsum(filled * filled, axis=0)])
+    lower = np.maximum(positions - window, 0)
+    count = counts[positions] - counts[lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shifted_mean = np.where(count > 0, (sums[positions] - sums[lower]) / count, np.nan)
+        variance = (squares[positions] - squares[lower]) / count - shifted_mean * shifted_mean
+    variance = np.where(count > 1, variance, np.where(count == 1, 0.0, np.nan))
+    return shifted_mean + centre, np.sqrt(np.clip(variance, 0.0, None))
+
+
+class FeatureBuilder:
+    """
+    Vectorized lag, rolling-window, calendar, Fourier and holiday features for hourly readings.
+
+    Rows are placed on a regular hourly grid per station, so lags and windows are measured in
+    hours rather than rows and gaps in the data never shift a feature onto the wrong hour.
+    Lags and rolling statistics only look at hours strictly before the current one.
+    """
+
+    def __init__(
+        self,
+        timestamp_column: str,
+        lags: Dict[str, List[int]],
+        rolling_columns: List[str],
+        rolling_windows: Dict[str, int],
+        rolling_stats: List[str],
+        fourier_terms: Dict[int, int],
+        holidays: Optional[dict] = None,
+        diwali_window_days: tuple = (-3, 3),
+        station_column: Optional[str] = None,
+        dtype=np.float64,
+    ):
+        self.timestamp_column = timestamp_column
+        self.lags = lags
+        self.rolling_columns = rolling_columns
+        self.rolling_windows = rolling_windows
+        self.rolling_stats = rolling_stats
+        self.fourier_terms = fourier_terms
+        self.station_column = station_column
+        self.diwali_window_days = diwali_window_days
+        # dtype of the feature columns; windows are always computed in float64
+        self.dtype = dtype
+        holidays = holidays or {}
+        self._diwali_days = np.sort(
+            pd.to_datetime(pd.Series(holidays.get("diwali", []), dtype=str)).to_numpy().astype("datetime64[D]").astype(np.int64)
+        )
+        self._national_holidays = np.array(
+            [int(str(day).replace("-", "")) for day in holidays.get("national_holidays", [])], dtype=np.int64
+        )
+
+    @property
+    def required_history_hours(self) -> int:
+        """
+        Hours of history needed before the first new reading to compute every feature.
+        """
+        longest_lag = max((max(lags) for lags in self.lags.values() if lags), default=0)
+        longest_window = max(self.rolling_windows.values(), default=0)
+        return max(longest_lag, longest_window)
+
+    def _series_features(self, frame: pd.DataFrame, hours: np.ndarray, features: Dict[str, np.ndarray], rows: np.ndarray):
+        start = hours.min()
+        positions = hours - start
+        columns = sorted(set(self.lags) | set(self.rolling_columns))
+        columns = [column for column in columns if column in frame.columns]
+        grid = np.full((positions.max() + 1, len(columns)), np.nan)
+        grid[positions] = frame[columns].to_numpy(dtype=np.float64)
+
+        for j, column in enumerate(columns):
+            for lag in self.lags.get(column, []):
+                source = positions - lag
+                values = np.full(len(positions), np.nan)
+                inside = source >= 0
+                values[inside] = grid[source[inside], j]
+                features[f"{column}_lag_{lag}h"][rows] = values
+
+        rolling_index = [columns.index(column) for column in self.rolling_columns if column in columns]
+        if not rolling_index:
+            return
+        rolling_grid = grid[:, rolling_index]
+        rolling_names = [columns[j] for j in rolling_index]
+        for window_name, window in self.rolling_windows.items():
+            mean, std = _past_window_moments(rolling_grid, positions, window)
+            if "max" in self.rolling_stats:
+                trailing = trailing_max(rolling_grid, window)
+                previous = positions - 1
+                maximum = np.full((len(positions), len(rolling_names)), np.nan)
+                maximum[previous >= 0] = trailing[previous[previous >= 0]]
+            for k, column in enumerate(rolling_names):
+                if "mean" in self.rolling_stats:
+                    features[f"{column}_roll_{window_name}_mean"][rows] = mean[:, k]
+                if "std" in self.rolling_stats:
+                    features[f"{column}_roll_{window_name}_std"][rows] = std[:, k]
+                if "max" in self.rolling_stats:
+                    features[f"{column}_roll_{window_name}_max"][rows] = maximum[:, k]
+
+    def feature_names(self, columns) -> List[str]:
+        names = []
+        for column, lags in self.lags.items():
+            if column in columns:
+                names += [f"{column}_lag_{lag}h" for lag in lags]
+        for window_name in self.rolling_windows:
+            for column in self.rolling_columns:
+                if column in columns:
+                    names += [f"{column}_roll_{window_name}_{stat}" for stat in self.rolling_stats]
+        return names
+
+    def calendar_features(self, timestamps: pd.Series) -> Dict[str, np.ndarray]:
+        """
+        Hour/day-of-week/month, Fourier seasonality terms and holiday flags for each timestamp.
+        """
+        hours = _hours_since_epoch(timestamps).astype(np.float64)
+        dates = pd.DatetimeIndex(timestamps)
+        features = {
+            "hour": dates.hour.to_numpy(dtype=np.float64),
+            "day_of_week": dates.dayofweek.to_numpy(dtype=np.float64),
+            "month": dates.month.to_numpy(dtype=np.float64),
+        }
+        for period, order in self.fourier_terms.items():
+            for k in range(1, order + 1):
+                angle = 2.0 * np.pi * k * hours / period
+                features[f"fourier_{period}h_sin_{k}"] = np.sin(angle)
+                features[f"fourier_{period}h_cos_{k}"] = np.cos(angle)
+
+        days = timestamps.to_numpy().astype("datetime64[D]").astype(np.int64)
+        month_day = dates.month.to_numpy() * 100 + dates.day.to_numpy()
+        features["is_national_holiday"] = np.isin(month_day, self._national_holidays).astype(np.float64)
+        if len(self._diwali_days):
+            following = np.searchsorted(self._diwali_days, days)
+            last = len(self._diwali_days) - 1
+            after_previous = days - self._diwali_days[np.clip(following - 1, 0, last)]
+            before_next = days - self._diwali_days[np.clip(following, 0, last)]
+            # signed distance in days to the nearest Diwali, negative before it
+            offset = np.where(np.abs(after_previous) <= np.abs(before_next), after_previous, before_next)
+            before, after = self.diwali_window_days
+            features["is_diwali"] = (offset == 0).astype(np.float64)
+            features["diwali_window"] = ((offset >= before) & (offset <= after)).astype(np.float64)
+        else:
+            features["is_diwali"] = np.zeros(len(days))
+            features["diwali_window"] = np.zeros(len(days))
+        return features
+
+    def build(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Append every feature column to the DataFrame, computed per station.
+
+        Args:
+            dataframe (pd.DataFrame): Readings with the timestamp column, any row order.
+
+        Returns:
+            pd.DataFrame: The input rows, in the same order, with the feature columns appended.
+
+        Raises:
+            PollutionException: If feature generation fails.
+        """
+        try:
+            dataframe = dataframe.reset_index(drop=True)
+            timestamps = pd.to_datetime(dataframe[self.timestamp_column])
+            valid_time = timestamps.notna().to_numpy()
+            features = {name: np.full(len(dataframe), np.nan, dtype=self.dtype) for name in self.feature_names(dataframe.columns)}
+
+            if self.station_column and self.station_column in dataframe.columns:
+                groups = dataframe[valid_time].groupby(self.station_column, sort=False, observed=True).indices
+                groups = {key: np.flatnonzero(valid_time)[rows] for key, rows in groups.items()}
+            else:
+                groups = {None: np.flatnonzero(valid_time)}
+            hours = _hours_since_epoch(timestamps.where(valid_time, pd.Timestamp(0)))
+            for rows in groups.values():
+                if len(rows):
+                    self._series_features(dataframe.iloc[rows], hours[rows], features, rows)
+
+            calendar = self.calendar_features(timestamps.where(valid_time, pd.Timestamp(0)))
+            for name, values in calendar.items():
+                features[name] = np.where(valid_time, values, np.nan).astype(self.dtype, copy=False)
+            return pd.concat([dataframe, pd.DataFrame(features, index=dataframe.index)], axis=1)
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def build_incremental(self, history: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Features for newly appended readings using only the tail of the history they depend on.
+
+        Args:
+            history (pd.DataFrame): Previously seen readings (only the last `required_history_hours` are used).
+            new_rows (pd.DataFrame): Newly appended readings.
+
+        Returns:
+            pd.DataFrame: `new_rows` with the feature columns appended.
+
+        Raises:
+            PollutionException: If feature generation fails.
+        """
+        try:
+            first_new = pd.to_datetime(new_rows[self.timestamp_column]).min()
+            history_timestamps = pd.to_datetime(history[self.timestamp_column])
+            cutoff = first_new - pd.Timedelta(hours=self.required_history_hours)
+            tail = history[(history_timestamps >= cutoff) & (history_timestamps < first_new)]
+            combined = pd.concat([tail, new_rows], ignore_index=True)
+            return self.build(combined).iloc[len(tail):].reset_index(drop=True)
+
+        except Exception as e:
+            raise PollutionException(e, sys)
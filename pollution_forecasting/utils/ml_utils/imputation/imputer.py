@@ -0,0 +1,204 @@
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from pollution_forecasting.exception.exception import PollutionException
+
+HOURS_PER_WEEK = 7 * 24
+_NANOSECONDS_PER_HOUR = 3_600_000_000_000
+
+STRATEGIES = ("carry_forward", "knn_window")
+# preprocessors pickled before the imputer became causal name the carry-forward strategy "interpolate"
+_STRATEGY_ALIASES = {"interpolate": "carry_forward"}
+# columns imputed together, bounds the row x column temporaries of the gap search
+_COLUMN_BLOCK = 8
+
+
+def _hours_since_epoch(index: pd.DatetimeIndex) -> np.ndarray:
+    return (index.asi8 // _NANOSECONDS_PER_HOUR).astype(np.int64)
+
+
+def _week_hour(index: pd.DatetimeIndex) -> np.ndarray:
+    return (index.dayofweek.to_numpy() * 24 + index.hour.to_numpy()).astype(np.int64)
+
+
+class SeasonalInterpolationImputer(BaseEstimator, TransformerMixin):
+    """
+    Imputer for hourly pollutant series indexed by timestamp.
+
+    Imputation is causal: a missing reading is only filled from readings at or before its
+    hour, so no model input carries information from the hours the targets are forecast
+    for. Short gaps carry the last reading forward for up to `max_gap_hours`. Longer gaps,
+    series starts and rows without a timestamp fall back to the hour-of-week (day-of-week x
+    hour-of-day) mean learned in `fit`, then to the column median. With
+    `strategy="knn_window"` gaps are instead filled from the k nearest complete rows of the
+    `knn_window_hours` before the missing reading.
+
+    `transform` and `transform_rows` apply the same rules, the latter within each group of
+    rows (e.g. the readings of one station, or of one serving request), so training and
+    serving impute alike.
+
+    The fitted state is only the 168 x n_features seasonal profile and the medians,
+    so the pickled object stays a few kilobytes whatever the training size.
+    """
+
+    def __init__(self, strategy: str = "carry_forward", max_gap_hours: int = 6,
+                 n_neighbors: int = 3, knn_window_hours: int = 24):
+        self.strategy = strategy
+        self.max_gap_hours = max_gap_hours
+        self.n_neighbors = n_neighbors
+        self.knn_window_hours = knn_window_hours
+
+    def fit(self, X, y=None):
+        try:
+            if _STRATEGY_ALIASES.get(self.strategy, self.strategy) not in STRATEGIES:
+                raise ValueError(f"Unknown imputation strategy {self.strategy!r}, expected one of {STRATEGIES}")
+            values = self._as_float_array(X)
+            self.n_features_in_ = values.shape[1]
+            if isinstance(X, pd.DataFrame):
+                self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            with np.errstate(all="ignore"):
+                self.medians_ = np.nan_to_num(np.nanmedian(values, axis=0), nan=0.0)
+
+            self.seasonal_profile_ = np.full((HOURS_PER_WEEK, self.n_features_in_), np.nan)
+            if isinstance(X, pd.DataFrame) and isinstance(X.index, pd.DatetimeIndex):
+                week_hour = _week_hour(X.index)
+                for j in range(self.n_features_in_):
+                    valid = ~np.isnan(values[:, j])
+                    sums = np.bincount(week_hour[valid], weights=values[valid, j], minlength=HOURS_PER_WEEK)
+                    counts = np.bincount(week_hour[valid], minlength=HOURS_PER_WEEK)
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        self.seasonal_profile_[:, j] = sums / counts
+            return self
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _seasonal_fill(self, values: np.ndarray, week_hour: Optional[np.ndarray], columns: slice = slice(None)) -> np.ndarray:
+        missing = np.isnan(values)
+        if not missing.any():
+            return values
+        if week_hour is not None:
+            fallback = self.seasonal_profile_[:, columns].astype(values.dtype, copy=False)[week_hour]
+            values = np.where(missing, fallback, values)
+            missing = np.isnan(values)
+        return np.where(missing, self.medians_[columns].astype(values.dtype, copy=False)[None, :], values)
+
+    @staticmethod
+    def _as_float_array(X) -> np.ndarray:
+        # float32 input (compact mode) stays float32, anything else is imputed in float64
+        if isinstance(X, pd.DataFrame):
+            compact = len(X.columns) > 0 and bool((X.dtypes == np.float32).all())
+        else:
+            compact = getattr(X, "dtype", None) == np.float32
+        return np.array(X, dtype=np.float32 if compact else np.float64)
+
+    def _carry_forward(self, values: np.ndarray, hours: np.ndarray, group_starts: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(values))[:, None]
+        valid = ~np.isnan(values)
+        previous = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        # the last reading of another group (an unrelated request) is never carried over
+        inside = ~valid & (previous >= group_starts[:, None])
+        previous_safe = np.where(inside, previous, 0)
+        columns = np.arange(values.shape[1])[None, :]
+        fill = inside & (hours[:, None] - hours[previous_safe] <= self.max_gap_hours)
+        return np.where(fill, values[previous_safe, columns], values)
+
+    def _knn_window(self, values: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        result = values.copy()
+        complete = ~np.isnan(values).any(axis=1)
+        complete_rows = np.flatnonzero(complete)
+        complete_hours = hours[complete_rows]
+        starts = np.searchsorted(complete_hours, hours - self.knn_window_hours, side="left")
+        # complete rows up to the same hour, never later ones
+        stops = np.searchsorted(complete_hours, hours, side="right")
+
+        for row in np.flatnonzero(~complete):
+            candidates = complete_rows[starts[row]:stops[row]]
+            if not len(candidates):
+                continue
+            observed = ~np.isnan(values[row])
+            if observed.any():
+                distances = np.sqrt(np.mean((values[candidates][:, observed] - values[row, observed]) ** 2, axis=1))
+            else:
+                distances = np.abs(complete_hours[starts[row]:stops[row]] - hours[row]).astype(np.float64)
+            nearest = candidates[np.argsort(distances, kind="stable")[:self.n_neighbors]]
+            result[row, ~observed] = values[nearest][:, ~observed].mean(axis=0)
+        return result
+
+    def _impute(self, values: np.ndarray, index: pd.DatetimeIndex, groups: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Impute rows in chronological order within each group, then restore the input order.
+        """
+        order = None
+        if groups is not None:
+            order = np.lexsort((index.asi8, groups))
+        elif not index.is_monotonic_increasing:
+            order = np.argsort(index.asi8, kind="stable")
+        if order is not None:
+            values, index = values[order], index[order]
+        # position of the first row of each row's group
+        group_starts = np.zeros(len(values), dtype=np.int64)
+        if groups is not None and len(values):
+            sorted_groups = np.asarray(groups)[order]
+            first = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+            group_starts = np.maximum.accumulate(np.where(first, np.arange(len(values)), 0))
+
+        strategy = _STRATEGY_ALIASES.get(self.strategy, self.strategy)
+        hours = _hours_since_epoch(index)
+        week_hour = _week_hour(index)
+        if strategy == "knn_window" and np.isnan(values).any():
+            bounds = np.r_[np.unique(group_starts), len(values)]
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                values[start:stop] = self._knn_window(values[start:stop], hours[start:stop])
+        # columns are independent, so a block at a time keeps the temporaries small
+        for start in range(0, values.shape[1], _COLUMN_BLOCK):
+            block = slice(start, start + _COLUMN_BLOCK)
+            part = values[:, block]
+            if strategy == "carry_forward" and np.isnan(part).any():
+                part = self._carry_forward(part, hours, group_starts)
+            values[:, block] = self._seasonal_fill(part, week_hour, block)
+
+        if order is not None:
+            restored = np.empty_like(values)
+            restored[order] = values
+            values = restored
+        return values
+
+    def transform_rows(self, X, timestamps=None, groups=None) -> np.ndarray:
+        """
+        Impute a batch of rows with the same causal rules as `transform`, carrying readings
+        forward only between rows of the same group.
+
+        At serving time rows of unrelated requests are stacked into one batch, so each request
+        is passed as its own group and no value is borrowed from another request. Without
+        timestamps rows fall back to the column medians.
+
+        Args:
+            X: Feature rows.
+            timestamps: Timestamp of every row.
+            groups: Group label of every row, all rows form one group when None.
+
+        Returns:
+            np.ndarray: Imputed rows, in input order.
+        """
+        try:
+            values = self._as_float_array(X)
+            if timestamps is None:
+                return self._seasonal_fill(values, None)
+            groups = np.zeros(len(values), dtype=np.int64) if groups is None else np.asarray(groups)
+            return self._impute(values, pd.DatetimeIndex(timestamps), groups)
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def transform(self, X):
+        try:
+            values = self._as_float_array(X)
+            index = X.index if isinstance(X, pd.DataFrame) and isinstance(X.index, pd.DatetimeIndex) else None
+            if index is None:
+                return self._seasonal_fill(values, None)
+            return self._impute(values, index)
+        except Exception as e:
+            raise PollutionException(e, sys)
@@ -0,0 +1,239 @@
+import os
+import sys
+import mmap
+import zlib
+import time
+import shutil
+import pickle
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+from pollution_forecasting.utils.main.utils import read_yaml_file, write_yaml_file
+
+OBJECT_FILE_NAME = "object.pkl"
+BUFFERS_FILE_NAME = "buffers.bin"
+METADATA_FILE_NAME = "metadata.yaml"
+
+# buffers are placed on 64 byte boundaries so memory-mapped arrays stay aligned
+_BUFFER_ALIGNMENT = 64
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(file_path: str) -> str:
+    """
+    Content hash of a file, recorded as the data hash of the entries trained from it.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def dump_object(dir_path: str, obj: object, compress: int = 0, min_buffer_bytes: int = 65536) -> List[dict]:
+    """
+    Pickle an object with its large array payloads written out of band.
+
+    The object is pickled with protocol 5. Every contiguous buffer of at least
+    `min_buffer_bytes` (NumPy array data, mostly) is written raw and aligned to
+    `buffers.bin` instead of being copied into the pickle stream, so it can be memory-mapped
+    back on load. With `compress` (zlib level 1-9) the buffers are compressed instead, which
+    trades the memory map for a smaller file.
+
+    Returns:
+        List[dict]: Offset, size and compression of every out-of-band buffer.
+    """
+    try:
+        os.makedirs(dir_path, exist_ok=True)
+        layout: List[dict] = []
+        with open(os.path.join(dir_path, BUFFERS_FILE_NAME), "wb") as buffers_file:
+            def write_buffer(buffer: pickle.PickleBuffer) -> bool:
+                data = buffer.raw()
+                if data.nbytes < min_buffer_bytes:
+                    # small buffers stay in the pickle stream
+                    return True
+                buffers_file.write(b"\0" * (-buffers_file.tell() % _BUFFER_ALIGNMENT))
+                offset = buffers_file.tell()
+                payload = zlib.compress(data, compress) if compress else data
+                buffers_file.write(payload)
+                layout.append({"offset": offset, "size": len(payload), "compressed": bool(compress)})
+                return False
+
+            with open(os.path.join(dir_path, OBJECT_FILE_NAME), "wb") as object_file:
+                pickle.dump(obj, object_file, protocol=5, buffer_callback=write_buffer)
+        return layout
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+
+def load_dumped_object(dir_path: str, layout: List[dict], mmap_buffers: bool = True) -> object:
+    """
+    Load an object written by `dump_object`.
+
+    Uncompressed buffers are memory-mapped read-only when `mmap_buffers` is set, so the
+    arrays are paged in from the file on first access instead of being read up front.
+    """
+    try:
+        buffers = []
+        if layout:
+            with open(os.path.join(dir_path, BUFFERS_FILE_NAME), "rb") as buffers_file:
+                if mmap_buffers:
+                    mapped = memoryview(mmap.mmap(buffers_file.fileno(), 0, access=mmap.ACCESS_READ))
+                else:
+                    mapped = memoryview(buffers_file.read())
+            for buffer in layout:
+                data = mapped[buffer["offset"]:buffer["offset"] + buffer["size"]]
+                buffers.append(bytearray(zlib.decompress(data)) if buffer["compressed"] else data)
+        with open(os.path.join(dir_path, OBJECT_FILE_NAME), "rb") as object_file:
+            return pickle.load(object_file, buffers=buffers)
+    except Exception as e:
+        raise PollutionException(e, sys) from e
+
+
+class ModelHandle:
+    """
+    One stored version of an object, loaded on first use.
+
+    The metadata is read when the handle is created, the object itself only by `get`, and
+    then kept. Safe to share between request threads.
+    """
+
+    def __init__(self, name: str, version: str, dir_path: str, mmap_buffers: bool = True):
+        self.name = name
+        self.version = version
+        self.dir_path = dir_path
+        self.mmap_buffers = mmap_buffers
+        self.metadata: dict = read_yaml_file(os.path.join(dir_path, METADATA_FILE_NAME))
+        self._object = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._object is not None
+
+    def get(self) -> object:
+        if self._object is None:
+            with self._lock:
+                if self._object is None:
+                    started = time.perf_counter()
+                    self._object = load_dumped_object(self.dir_path, self.metadata.get("buffers", []), self.mmap_buffers)
+                    logging.info(
+                        f"Loaded {self.name} {self.version} in {(time.perf_counter() - started) * 1000.0:.1f}ms"
+                    )
+        return self._object
+
+
+class ModelStore:
+    """
+    Versioned store of fitted models and preprocessors.
+
+    Every save creates `<root_dir>/<name>/v<NNNN>/` holding the pickle stream, the
+    out-of-band array buffers and a metadata file with the data hash, parameters and
+    metrics it was trained with. Versions are written to a temporary directory and renamed
+    into place, so a reader never sees half a version, and only the newest `keep_versions`
+    of each name are kept.
+    """
+
+    def __init__(self, root_dir: str, compress: int = 0, keep_versions: int = 5, min_buffer_bytes: int = 65536):
+        self.root_dir = root_dir
+        self.compress = compress
+        self.keep_versions = keep_versions
+        self.min_buffer_bytes = min_buffer_bytes
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(name for name in os.listdir(self.root_dir) if self.versions(name))
+
+    def versions(self, name: str) -> List[str]:
+        """
+        Stored versions of `name`, oldest first.
+        """
+        entry_dir = os.path.join(self.root_dir, name)
+        if not os.path.isdir(entry_dir):
+            return []
+        return sorted(
+            version for version in os.listdir(entry_dir)
+            if version.startswith("v") and version[1:].isdigit()
+            and os.path.exists(os.path.join(entry_dir, version, METADATA_FILE_NAME))
+        )
+
+    def save(self, name: str, obj: object, data_hash: Optional[str] = None,
+             params: Optional[dict] = None, metrics: Optional[dict] = None) -> str:
+        """
+        Store a new version of `name`.
+
+        Args:
+            name (str): Entry name, e.g. "preprocessor" or "PM2.5_24h".
+            obj (object): The fitted object.
+            data_hash (Optional[str]): Hash of the data it was fitted on.
+            params (Optional[dict]): Parameters it was fitted with.
+            metrics (Optional[dict]): Evaluation metrics.
+
+        Returns:
+            str: The new version, e.g. "v0003".
+
+        Raises:
+            PollutionException: If the object cannot be written.
+        """
+        try:
+            entry_dir = os.path.join(self.root_dir, name)
+            os.makedirs(entry_dir, exist_ok=True)
+            versions = self.versions(name)
+            version = f"v{(int(versions[-1][1:]) + 1 if versions else 1):04d}"
+            temporary_dir = os.path.join(entry_dir, f".{version}.{os.getpid()}.tmp")
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+            layout = dump_object(temporary_dir, obj, self.compress, self.min_buffer_bytes)
+            write_yaml_file(os.path.join(temporary_dir, METADATA_FILE_NAME), {
+                "name": name,
+                "version": version,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "class": f"{type(obj).__module__}.{type(obj).__qualname__}",
+                "data_hash": data_hash,
+                "params": params or {},
+                "metrics": metrics or {},
+                "buffers": layout,
+            })
+            os.rename(temporary_dir, os.path.join(entry_dir, version))
+            self.prune(name)
+            logging.info(f"Stored {name} {version} in {self.root_dir}")
+            return version
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def prune(self, name: str) -> None:
+        versions = self.versions(name)
+        for version in versions[:max(0, len(versions) - self.keep_versions)]:
+            shutil.rmtree(os.path.join(self.root_dir, name, version), ignore_errors=True)
+
+    def handle(self, name: str, version: Optional[str] = None, mmap_buffers: bool = True) -> ModelHandle:
+        """
+        Lazy handle of a stored version, the newest by default. Nothing is unpickled yet.
+        """
+        try:
+            versions = self.versions(name)
+            if not versions:
+                raise FileNotFoundError(f"No stored versions of {name} in {self.root_dir}")
+            version = version or versions[-1]
+            if version not in versions:
+                raise FileNotFoundError(f"{name} has no version {version}, stored versions are {versions}")
+            return ModelHandle(name, version, os.path.join(self.root_dir, name, version), mmap_buffers)
+        except Exception as e:
+            raise PollutionException(e, sys) from e
+
+    def handles(self, names: Optional[List[str]] = None) -> Dict[str, ModelHandle]:
+        """
+        Handles of the newest version of `names`, or of every stored name.
+        """
+        return {name: self.handle(name) for name in (names or self.names())}
+
+    def load(self, name: str, version: Optional[str] = None, mmap_buffers: bool = True) -> object:
+        return self.handle(name, version, mmap_buffers).get()
+
+    def metadata(self, name: str, version: Optional[str] = None) -> dict:
+        return self.handle(name, version).metadata
@@ -0,0 +1,405 @@
+import sys
+import time
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from pollution_forecasting.constant.training_pipeline import (
+    DATA_INGESTION_COLLECTION_NAME,
+    DATA_INGESTION_DATABASE_NAME,
+    DATA_INGESTION_DATETIME_FORMAT,
+    DATA_INGESTION_STATION_COLUMN,
+    DATA_INGESTION_WATERMARK_COLUMN,
+)
+from pollution_forecasting.entity.config_entity import MongoConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+# date parts of the group key of each resampling unit
+PERIOD_PARTS: Dict[str, List[str]] = {
+    "hour": ["year", "month", "day", "hour"],
+    "day": ["year", "month", "day"],
+    "month": ["year", "month"],
+}
+PART_OPERATORS: Dict[str, str] = {"year": "$year", "month": "$month", "day": "$dayOfMonth", "hour": "$hour"}
+# group accumulator of each statistic, applied to the numeric values only
+STATISTICS: Dict[str, str] = {"mean": "$avg", "min": "$min", "max": "$max", "std": "$stdDevPop"}
+
+
+def field_alias(column: str) -> str:
+    """
+    Name a column is carried under inside a pipeline. Aggregation expressions read "$PM2.5"
+    as the field "5" of an embedded "PM2" document, so dots are replaced.
+    """
+    return column.replace(".", "_")
+
+
+class AirQualityQuery:
+    """
+    Query layer that pushes filtering, projection and resampling of the hourly readings into
+    MongoDB aggregation pipelines, so only the rows and columns a caller needs leave the server.
+
+    A daily dashboard over N hourly readings transfers N / 24 documents per station instead of N,
+    and a projection of a few pollutants drops the rest of each document on the server. The
+    pipelines use operators available since MongoDB 4.4; `'None'`/`'na'` strings left in
+    pollutant fields by raw CSV loads are ignored by every statistic.
+    """
+
+    def __init__(self, collection, timestamp_column: str = DATA_INGESTION_WATERMARK_COLUMN,
+                 station_column: str = DATA_INGESTION_STATION_COLUMN,
+                 datetime_format: str = DATA_INGESTION_DATETIME_FORMAT,
+                 batch_size: Optional[int] = None):
+        """
+        Initialize the AirQualityQuery.
+
+        Args:
+            collection (pymongo.collection.Collection): Collection of hourly readings.
+            timestamp_column (str): Reading timestamp, a BSON date or a `datetime_format` string.
+            station_column (str): Station key of the readings.
+            datetime_format (str): Format of timestamps stored as strings.
+            batch_size (Optional[int]): Documents per cursor batch. Defaults to `MongoConfig`.
+        """
+        self.collection = collection
+        self.timestamp_column = timestamp_column
+        self.station_column = station_column
+        self.datetime_format = datetime_format
+        self.batch_size = batch_size or MongoConfig().query_batch_size
+        self._string_timestamps: Optional[bool] = None
+        self._server_parses_timestamps: Optional[bool] = None
+
+    def has_string_timestamps(self) -> bool:
+        """
+        Whether some readings still carry the CPCB `dd-mm-YYYY HH:MM` string instead of a BSON
+        date. Such readings are parsed on the server and cannot use the timestamp index.
+
+        Returns:
+            bool: True if any document has a string timestamp.
+        """
+        if self._string_timestamps is None:
+            self._string_timestamps = self.collection.find_one(
+                {self.timestamp_column: {"$type": "string"}}, projection={"_id": 1}
+            ) is not None
+        return self._string_timestamps
+
+    def server_parses_timestamps(self) -> bool:
+        """
+        Whether the server evaluates the `$type` and `$dateFromString` expressions string
+        timestamps are parsed with. MongoDB does; the mongomock stand-in of the benchmarks
+        and the offline feed service does not, and queries over string timestamps then run
+        on the client instead.
+
+        Returns:
+            bool: True if a probe pipeline parsing a timestamp succeeds.
+        """
+        if self._server_parses_timestamps is None:
+            from pymongo.errors import OperationFailure
+            sample = {"$literal": datetime(2024, 1, 1).strftime(self.datetime_format)}
+            probe = [{"$limit": 1}, {"$project": {"_id": 0, "parsed": self._parsed_timestamp(sample)}}]
+            try:
+                list(self.collection.aggregate(probe))
+                self._server_parses_timestamps = True
+            except (OperationFailure, NotImplementedError):
+                self._server_parses_timestamps = False
+        return self._server_parses_timestamps
+
+    def _parse_on_client(self) -> bool:
+        return self.has_string_timestamps() and not self.server_parses_timestamps()
+
+    def _parsed_timestamp(self, value) -> dict:
+        return {
+            "$cond": [
+                {"$eq": [{"$type": value}, "string"]},
+                {"$dateFromString": {"dateString": value, "format": self.datetime_format, "onError": None}},
+                value,
+            ]
+        }
+
+    def match_filter(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     station: Optional[str] = None, after: Optional[datetime] = None) -> dict:
+        """
+        Filter document selecting the readings of a station in a time range.
+
+        With BSON dates it is a plain range query served by the (station, timestamp) index;
+        string timestamps are compared through `$dateFromString` instead.
+
+        Args:
+            start (Optional[datetime]): First reading included.
+            end (Optional[datetime]): Readings before this time are included.
+            station (Optional[str]): Station key, all stations when None.
+            after (Optional[datetime]): Only readings strictly after this time, e.g. a watermark.
+
+        Returns:
+            dict: Filter for `find` or a `$match` stage.
+        """
+        query = {} if station is None else {self.station_column: station}
+        bounds = [
+            (operator, pd.Timestamp(value).to_pydatetime())
+            for operator, value in (("$gte", start), ("$lt", end), ("$gt", after)) if value is not None
+        ]
+        if not bounds:
+            return query
+        if not self.has_string_timestamps():
+            query[self.timestamp_column] = dict(bounds)
+            return query
+        parsed = self._parsed_timestamp(f"${self.timestamp_column}")
+        query["$expr"] = {"$and": [{operator: [parsed, value]} for operator, value in bounds]}
+        return query
+
+    def projection_stage(self, columns: Sequence[str]) -> dict:
+        """
+        `$replaceRoot` stage keeping only the given columns (plus station and timestamp) under
+        their `field_alias` names. A `$project` cannot name "PM2.5", hence the key/value arrays.
+
+        Args:
+            columns (Sequence[str]): Columns to keep.
+
+        Returns:
+            dict: Pipeline stage.
+        """
+        keep = list(dict.fromkeys([self.station_column, self.timestamp_column, *columns]))
+        renamed = [column for column in keep if field_alias(column) != column]
+        key = "$$field.k"
+        if renamed:
+            key = {"$switch": {
+                "branches": [{"case": {"$eq": ["$$field.k", column]}, "then": field_alias(column)} for column in renamed],
+                "default": "$$field.k",
+            }}
+        return {
+            "$replaceRoot": {
+                "newRoot": {
+                    "$arrayToObject": {
+                        "$map": {
+                            "input": {
+                                "$filter": {
+                                    "input": {"$objectToArray": "$$ROOT"},
+                                    "as": "field",
+                                    "cond": {"$in": ["$$field.k", keep]},
+                                }
+                            },
+                            "as": "field",
+                            "in": {"k": key, "v": "$$field.v"},
+                        }
+                    }
+                }
+            }
+        }
+
+    def group_stage(self, columns: Sequence[str], unit: str = "day",
+                    statistics: Sequence[str] = ("mean", "max")) -> dict:
+        """
+        `$group` stage resampling the projected hourly readings per station and period.
+
+        Every statistic only sees numeric values, so `'None'`/`'na'` strings and nulls are
+        skipped, and a `<column>_count` of the valid hours is added for each column.
+
+        Args:
+            columns (Sequence[str]): Pollutant columns to aggregate.
+            unit (str): Period of the group, one of `PERIOD_PARTS`.
+            statistics (Sequence[str]): Statistics of each column, from `STATISTICS`.
+
+        Returns:
+            dict: Pipeline stage.
+        """
+        timestamp = f"${field_alias(self.timestamp_column)}"
+        if self.has_string_timestamps():
+            timestamp = self._parsed_timestamp(timestamp)
+        group = {
+            "_id": {
+                "station": f"${field_alias(self.station_column)}",
+                "period": {"$dateFromParts": {part: {PART_OPERATORS[part]: timestamp} for part in PERIOD_PARTS[unit]}},
+            },
+            "readings": {"$sum": 1},
+        }
+        for column in columns:
+            value = f"${field_alias(column)}"
+            numeric = {"$cond": [{"$isNumber": value}, value, None]}
+            for statistic in statistics:
+                group[f"{field_alias(column)}_{statistic}"] = {STATISTICS[statistic]: numeric}
+            group[f"{field_alias(column)}_count"] = {"$sum": {"$cond": [{"$isNumber": value}, 1, 0]}}
+        return {"$group": group}
+
+    def aggregate(self, pipeline: List[dict]) -> pd.DataFrame:
+        """
+        Run a pipeline and collect the result as a DataFrame, one cursor batch at a time.
+
+        Args:
+            pipeline (List[dict]): Aggregation pipeline.
+
+        Returns:
+            pd.DataFrame: Result documents, without `_id`.
+
+        Raises:
+            PollutionException: If the aggregation fails.
+        """
+        try:
+            start_time = time.perf_counter()
+            cursor = self.collection.aggregate(pipeline, allowDiskUse=True, batchSize=self.batch_size)
+            dataframe = pd.DataFrame.from_records(list(cursor))
+            logging.info(
+                f"Aggregation returned {len(dataframe)} documents in {time.perf_counter() - start_time:.2f}s"
+            )
+            return dataframe.drop(columns=["_id"], errors="ignore")
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _client_readings(self, columns: Sequence[str], start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         station: Optional[str] = None) -> pd.DataFrame:
+        """
+        Readings of a station and time range filtered, parsed and sorted on the client, for
+        servers that cannot parse string timestamps. Only the station filter runs on the server.
+        """
+        keep = list(dict.fromkeys([self.station_column, self.timestamp_column, *columns]))
+        # a find projection would read "PM2.5" as a dotted path as well, so whole documents are fetched
+        cursor = self.collection.find(
+            {} if station is None else {self.station_column: station},
+            projection={"_id": 0},
+            batch_size=self.batch_size,
+        )
+        dataframe = pd.DataFrame.from_records(list(cursor)).reindex(columns=keep)
+        raw = dataframe[self.timestamp_column]
+        text = raw.map(lambda value: isinstance(value, str))
+        timestamps = pd.to_datetime(raw.where(~text), errors="coerce")
+        timestamps[text] = pd.to_datetime(raw[text], format=self.datetime_format, errors="coerce")
+        dataframe[self.timestamp_column] = timestamps
+        selected = pd.Series(True, index=dataframe.index)
+        if start is not None:
+            selected &= timestamps >= pd.Timestamp(start)
+        if end is not None:
+            selected &= timestamps < pd.Timestamp(end)
+        return dataframe[selected].sort_values(self.timestamp_column, kind="stable").reset_index(drop=True)
+
+    def hourly(self, columns: Sequence[str], start: Optional[datetime] = None, end: Optional[datetime] = None,
+               station: Optional[str] = None) -> pd.DataFrame:
+        """
+        Hourly readings of the given columns in a time range, filtered and projected on the server.
+
+        Args:
+            columns (Sequence[str]): Pollutant columns to fetch.
+            start (Optional[datetime]): First reading included.
+            end (Optional[datetime]): Readings before this time are included.
+            station (Optional[str]): Station key, all stations when None.
+
+        Returns:
+            pd.DataFrame: Station, timestamp and the requested columns, in time order.
+
+        Raises:
+            PollutionException: If the aggregation fails.
+        """
+        if self._parse_on_client():
+            return self._client_readings(columns, start, end, station)
+        pipeline = [{"$match": self.match_filter(start, end, station)}]
+        if self.has_string_timestamps():
+            # "dd-mm-YYYY HH:MM" strings sort as text, so the parsed date replaces them before sorting
+            pipeline.append({"$addFields": {self.timestamp_column: self._parsed_timestamp(f"${self.timestamp_column}")}})
+        pipeline += [
+            {"$sort": {self.timestamp_column: 1}},
+            self.projection_stage(columns),
+        ]
+        dataframe = self.aggregate(pipeline)
+        aliases = {field_alias(column): column for column in (self.station_column, self.timestamp_column, *columns)}
+        return dataframe.rename(columns=aliases)
+
+    def resample(self, columns: Sequence[str], unit: str = "day", statistics: Sequence[str] = ("mean", "max"),
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 station: Optional[str] = None) -> pd.DataFrame:
+        """
+        Resample the hourly readings per station to `unit` periods on the server, e.g. daily means
+        and maxima for a dashboard.
+
+        Args:
+            columns (Sequence[str]): Pollutant columns to aggregate.
+            unit (str): "hour", "day" or "month".
+            statistics (Sequence[str]): Any of "mean", "min", "max", "std".
+            start (Optional[datetime]): First reading included.
+            end (Optional[datetime]): Readings before this time are included.
+            station (Optional[str]): Station key, all stations when None.
+
+        Returns:
+            pd.DataFrame: One row per station and period with `<column>_<statistic>`,
+            `<column>_count` and `readings` columns, sorted by station and period.
+
+        Raises:
+            PollutionException: If `unit` or a statistic is unknown, or the aggregation fails.
+        """
+        try:
+            if unit not in PERIOD_PARTS:
+                raise ValueError(f"Unknown unit {unit}, expected one of {list(PERIOD_PARTS)}")
+            unknown = [statistic for statistic in statistics if statistic not in STATISTICS]
+            if unknown:
+                raise ValueError(f"Unknown statistics {unknown}, expected any of {list(STATISTICS)}")
+            if self._parse_on_client():
+                return self._client_resample(columns, unit, statistics, start, end, station)
+            pipeline = [
+                {"$match": self.match_filter(start, end, station)},
+                self.projection_stage(columns),
+                self.group_stage(columns, unit, statistics),
+                {"$sort": {"_id.station": 1, "_id.period": 1}},
+            ]
+            columns_out = {field_alias(self.station_column): "$_id.station", field_alias(self.timestamp_column): "$_id.period"}
+            columns_out.update({name: 1 for name in pipeline[2]["$group"] if name != "_id"})
+            pipeline.append({"$project": {"_id": 0, **columns_out}})
+            dataframe = self.aggregate(pipeline)
+            aliases = {field_alias(self.station_column): self.station_column, field_alias(self.timestamp_column): self.timestamp_column}
+            for column in columns:
+                for suffix in (*statistics, "count"):
+                    aliases[f"{field_alias(column)}_{suffix}"] = f"{column}_{suffix}"
+            # also gives an empty result its columns
+            return dataframe.rename(columns=aliases).reindex(columns=[*aliases.values(), "readings"])
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    def _client_resample(self, columns: Sequence[str], unit: str, statistics: Sequence[str],
+                         start: Optional[datetime], end: Optional[datetime], station: Optional[str]) -> pd.DataFrame:
+        """
+        `resample` computed with pandas over `_client_readings`, with the same columns and the
+        same rule that only numeric values count.
+        """
+        dataframe = self._client_readings(columns, start, end, station)
+        timestamps = dataframe[self.timestamp_column]
+        if unit == "month":
+            period = timestamps.dt.to_period("M").dt.to_timestamp()
+        else:
+            period = timestamps.dt.floor("h" if unit == "hour" else "D")
+        keys = [dataframe[self.station_column].rename(self.station_column), period.rename(self.timestamp_column)]
+        result = {"readings": dataframe.groupby(keys, dropna=False).size()}
+        for column in columns:
+            raw = dataframe[column]
+            # strings such as 'None' or '12.5' are not numbers to the server either
+            numeric = raw.map(lambda value: isinstance(value, (int, float)) and not isinstance(value, bool))
+            values = raw.where(numeric).astype(float)
+            grouped = values.groupby(keys, dropna=False)
+            aggregations = {"mean": grouped.mean, "min": grouped.min, "max": grouped.max, "std": lambda: grouped.std(ddof=0)}
+            for statistic in statistics:
+                result[f"{column}_{statistic}"] = aggregations[statistic]()
+            result[f"{column}_count"] = grouped.count()
+        ordered = [f"{column}_{suffix}" for column in columns for suffix in (*statistics, "count")] + ["readings"]
+        resampled = pd.DataFrame(result)[ordered].reset_index()
+        return resampled.sort_values([self.station_column, self.timestamp_column], kind="stable").reset_index(drop=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Resample the hourly readings on the MongoDB server, e.g. for a daily dashboard.")
+    parser.add_argument("--unit", choices=list(PERIOD_PARTS), default="day")
+    parser.add_argument("--columns", nargs="+", default=["PM2.5", "PM10", "NO2"])
+    parser.add_argument("--statistics", nargs="+", choices=list(STATISTICS), default=["mean", "max"])
+    parser.add_argument("--start", default=None, help="first day included, e.g. 2024-01-01")
+    parser.add_argument("--end", default=None, help="first day excluded")
+    parser.add_argument("--station", default=None)
+    parser.add_argument("--output", default=None, help="CSV file to write, printed when omitted")
+    args = parser.parse_args(argv)
+
+    from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
+    collection = get_mongo_client()[DATA_INGESTION_DATABASE_NAME][DATA_INGESTION_COLLECTION_NAME]
+    dataframe = AirQualityQuery(collection).resample(
+        args.columns, unit=args.unit, statistics=args.statistics, start=args.start, end=args.end, station=args.station
+    )
+    if args.output:
+        dataframe.to_csv(args.output, index=False)
+    else:
+        print(dataframe.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import atexit
+import threading
+from typing import Dict, Optional, Tuple
+
+from pollution_forecasting.constant.training_pipeline import MONGO_URL_ENV_VAR
+from pollution_forecasting.entity.config_entity import MongoConfig
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.logging.logger import logging
+
+# (process id, url) -> client; pymongo clients must not be shared across a fork
+_clients: Dict[Tuple[int, Optional[str]], object] = {}
+_clients_lock = threading.Lock()
+
+
+def mongo_db_url(url_env_var: str = MONGO_URL_ENV_VAR) -> Optional[str]:
+    """
+    MongoDB URL from the environment, with `.env` read when a client is first needed
+    rather than when a module is imported.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv(url_env_var)
+
+
+def client_options(url: Optional[str], mongo_config: MongoConfig) -> dict:
+    """
+    Keyword arguments of `pymongo.MongoClient` for the configured pool, timeouts and retries.
+
+    TLS connections (Atlas `mongodb+srv://` URLs or `tls=true`) verify the server against the
+    certifi CA bundle when certifi is installed, which avoids missing system CAs on Windows.
+
+    Args:
+        url (Optional[str]): Connection string the options are for.
+        mongo_config (MongoConfig): Pool and timeout settings.
+
+    Returns:
+        dict: Client options.
+    """
+    options = {
+        "appname": mongo_config.app_name,
+        "maxPoolSize": mongo_config.max_pool_size,
+        "minPoolSize": mongo_config.min_pool_size,
+        "maxIdleTimeMS": mongo_config.max_idle_time_ms,
+        "connectTimeoutMS": mongo_config.connect_timeout_ms,
+        "serverSelectionTimeoutMS": mongo_config.server_selection_timeout_ms,
+        "socketTimeoutMS": mongo_config.socket_timeout_ms,
+        "waitQueueTimeoutMS": mongo_config.wait_queue_timeout_ms,
+        "retryReads": mongo_config.retry_reads,
+        "retryWrites": mongo_config.retry_writes,
+    }
+    if mongo_config.compressors:
+        options["compressors"] = mongo_config.compressors
+    lowered = (url or "").lower()
+    if lowered.startswith("mongodb+srv://") or "tls=true" in lowered or "ssl=true" in lowered:
+        try:
+            import certifi
+            options["tlsCAFile"] = certifi.where()
+        except ImportError:
+            pass
+    return options
+
+
+def get_mongo_client(url: Optional[str] = None, mongo_config: Optional[MongoConfig] = None):
+    """
+    Shared MongoDB client of this process for the given URL, created on first use.
+
+    Every caller (data ingestion, the streaming service, the bulk loader and its worker
+    threads) borrows connections from the same pool instead of opening a client per call.
+    A forked worker gets a client of its own, and all clients are closed at exit.
+
+    Args:
+        url (Optional[str]): Connection string. Defaults to the URL in the environment.
+        mongo_config (Optional[MongoConfig]): Pool and timeout settings, used when the client
+            is created.
+
+    Returns:
+        pymongo.MongoClient: The shared client.
+
+    Raises:
+        PollutionException: If the client cannot be created.
+    """
+    try:
+        mongo_config = mongo_config or MongoConfig()
+        if url is None:
+            url = mongo_db_url(mongo_config.url_env_var)
+        key = (os.getpid(), url)
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import pymongo
+                client = pymongo.MongoClient(url, **client_options(url, mongo_config))
+                if not _clients:
+                    atexit.register(close_mongo_clients)
+                _clients[key] = client
+                logging.info(f"Created a MongoDB client with a pool of up to {mongo_config.max_pool_size} connections")
+            return client
+    except Exception as e:
+        raise PollutionException(e, sys)
+
+
+def close_mongo_clients() -> None:
+    """
+    Close the shared clients created by this process. The next `get_mongo_client` call
+    creates a new one.
+    """
+    with _clients_lock:
+        pid = os.getpid()
+        for key in [key for key in _clients if key[0] == pid]:
+            try:
+                _clients.pop(key).close()
+            except Exception as e:
+                logging.warning(f"Closing a MongoDB client failed: {e}")
@@ -0,0 +1,268 @@
+import sys
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.exception.exception import PollutionException
+from pollution_forecasting.utils.main.utils import read_yaml_file
+
+## bit flags stored in the `validation_errors` column of quarantined rows
+INVALID_NUMBER: int = 1
+OUT_OF_RANGE: int = 2
+INVALID_TIMESTAMP: int = 4
+DUPLICATE_HOUR: int = 8
+
+VALIDATION_ERRORS_COLUMN: str = "validation_errors"
+
+
+@dataclass
+class SchemaValidationResult:
+    valid_mask: np.ndarray
+    errors: np.ndarray
+    missing_columns: List[str] = field(default_factory=list)
+    dtype_mismatches: Dict[str, str] = field(default_factory=dict)
+    error_counts: Dict[str, int] = field(default_factory=dict)
+    is_monotonic: bool = True
+
+    @property
+    def structure_ok(self) -> bool:
+        return not self.missing_columns
+
+
+def count_errors(errors: np.ndarray) -> Dict[str, int]:
+    """
+    Number of rows carrying each error flag.
+    """
+    return {
+        name: int(np.count_nonzero(errors & flag))
+        for name, flag in (
+            ("invalid_number", INVALID_NUMBER),
+            ("out_of_range", OUT_OF_RANGE),
+            ("invalid_timestamp", INVALID_TIMESTAMP),
+            ("duplicate_hour", DUPLICATE_HOUR),
+        )
+    }
+
+
+class CompiledSchema:
+    """
+    `schema.yaml` compiled into flat lookup tables so a DataFrame can be checked
+    with one vectorized pass per column: names, dtypes, numeric ranges, timestamp
+    parseability and monotonicity, and duplicate hours.
+    """
+
+    def __init__(self, schema_config: dict, key_columns: Optional[List[str]] = None):
+        """
+        Args:
+            schema_config (dict): Parsed `schema.yaml`.
+            key_columns (Optional[List[str]]): Extra columns that, together with the hour of the
+                timestamp, identify a reading (e.g. a station column). Only used when present.
+        """
+        self.column_types: Dict[str, str] = {
+            name: dtype for column in schema_config["columns"] for name, dtype in column.items()
+        }
+        self.numerical_columns: List[str] = list(schema_config.get("numerical_columns", []))
+        self.datetime_columns: List[str] = list(schema_config.get("datetime_columns", []))
+        self.timestamp_column: Optional[str] = schema_config.get("timestamp_column")
+        self.timestamp_format: Optional[str] = schema_config.get("timestamp_format")
+        self.missing_values: List[str] = [str(value) for value in schema_config.get("missing_values", [])]
+        ranges = schema_config.get("numerical_ranges", {})
+        self.ranges: Dict[str, Tuple[float, float]] = {
+            column: (float(bounds[0]), float(bounds[1])) for column, bounds in ranges.items()
+        }
+        self.key_columns: List[str] = list(key_columns or [])
+
+    def _coerce_numeric(self, values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        if pd.api.types.is_numeric_dtype(values):
+            dtype = np.float32 if values.dtype == np.float32 else np.float64
+            return values.to_numpy(dtype=dtype), np.zeros(len(values), dtype=bool)
+        numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+        raw_missing = values.isna().to_numpy() | values.astype(str).isin(self.missing_values).to_numpy()
+        return numbers, np.isnan(numbers) & ~raw_missing
+
+    def _coerce_datetime(self, values: pd.Series) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        return pd.to_datetime(values, format=self.timestamp_format, errors="coerce")
+
+    def hour_keys(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        The hour of the (already parsed) timestamp plus the key columns present, which identify a reading.
+        """
+        keys = {"hour": dataframe[self.timestamp_column].to_numpy().astype("datetime64[h]").astype(np.int64)}
+        for column in self.key_columns:
+            if column in dataframe.columns:
+                keys[column] = dataframe[column].to_numpy()
+        return pd.DataFrame(keys)
+
+    def validate(self, dataframe: pd.DataFrame) -> Tuple[pd.DataFrame, SchemaValidationResult]:
+        """
+        Validate a DataFrame against the schema.
+
+        Args:
+            dataframe (pd.DataFrame): Rows to validate.
+
+        Returns:
+            Tuple[pd.DataFrame, SchemaValidationResult]: The DataFrame with schema columns cast to
+            their declared types, and the per-row validity mask plus error bit flags.
+
+        Raises:
+            PollutionException: If validation cannot be performed.
+        """
+        try:
+            rows = len(dataframe)
+            errors = np.zeros(rows, dtype=np.uint8)
+            missing_columns = [column for column in self.column_types if column not in dataframe.columns]
+            dtype_mismatches: Dict[str, str] = {}
+
+            for column in self.numerical_columns:
+                if column not in dataframe.columns:
+                    continue
+                if not pd.api.types.is_numeric_dtype(dataframe[column]):
+                    dtype_mismatches[column] = str(dataframe[column].dtype)
+                # compact float32 columns stay float32, everything else is cast to float64
+                float_dtype = np.float32 if dataframe[column].dtype == np.float32 else np.float64
+                values, unparseable = self._coerce_numeric(dataframe[column])
+                errors[unparseable] |= INVALID_NUMBER
+                if column in self.ranges:
+                    low, high = self.ranges[column]
+                    # NaN compares False on both sides, so missing readings stay valid
+                    errors[(values < low) | (values > high)] |= OUT_OF_RANGE
+                dataframe[column] = values.astype(float_dtype, copy=False)
+
+            for column in self.datetime_columns:
+                if column not in dataframe.columns:
+                    continue
+                if not pd.api.types.is_datetime64_any_dtype(dataframe[column]):
+                    dtype_mismatches[column] = str(dataframe[column].dtype)
+                dataframe[column] = self._coerce_datetime(dataframe[column])
+
+            is_monotonic = True
+            if self.timestamp_column in dataframe.columns:
+                timestamps = dataframe[self.timestamp_column]
+                not_a_time = timestamps.isna().to_numpy()
+                errors[not_a_time] |= INVALID_TIMESTAMP
+                # unparseable timestamps are quarantined on their own, they do not make the order fail
+                is_monotonic = bool(timestamps[~not_a_time].is_monotonic_increasing)
+
+                duplicated = self.hour_keys(dataframe).duplicated(keep="first").to_numpy()
+                errors[duplicated & ~not_a_time] |= DUPLICATE_HOUR
+
+            result = SchemaValidationResult(
+                valid_mask=errors == 0,
+                errors=errors,
+                missing_columns=missing_columns,
+                dtype_mismatches=dtype_mismatches,
+                error_counts=count_errors(errors),
+                is_monotonic=is_monotonic,
+            )
+            return dataframe, result
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+    @staticmethod
+    def split(dataframe: pd.DataFrame, result: SchemaValidationResult) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Slice the DataFrame into valid rows and quarantined rows with their error flags.
+        """
+        valid = dataframe[result.valid_mask]
+        invalid = dataframe[~result.valid_mask].assign(
+            **{VALIDATION_ERRORS_COLUMN: result.errors[~result.valid_mask]}
+        )
+        return valid, invalid
+
+
+class ChunkedSchemaValidator:
+    """
+    Validates a split that arrives in row chunks, for the out-of-core mode of data validation.
+
+    Every chunk is checked with `CompiledSchema.validate`, and the state that crosses chunk
+    boundaries is carried along instead of the rows: a reading repeating an hour of an earlier
+    chunk is flagged as a duplicate, monotonicity covers the order between chunks, and error
+    counts and dtype mismatches are summed into `result`. Only the keys of the latest hour are
+    carried over, which finds every duplicate in chronologically sorted splits (as ingestion
+    writes them) in constant memory; in unsorted splits a repeated reading is only caught when
+    it falls into the same chunk or the latest hour seen so far.
+    """
+
+    def __init__(self, schema: CompiledSchema):
+        self.schema = schema
+        self.rows = 0
+        self.valid_rows = 0
+        self.result = SchemaValidationResult(
+            valid_mask=np.empty(0, dtype=bool),
+            errors=np.empty(0, dtype=np.uint8),
+            error_counts=count_errors(np.empty(0, dtype=np.uint8)),
+        )
+        self._last_timestamp = None
+        self._latest_hour: Optional[int] = None
+        self._latest_hour_keys = np.empty(0, dtype=np.uint64)
+
+    def validate(self, chunk: pd.DataFrame) -> Tuple[pd.DataFrame, SchemaValidationResult]:
+        """
+        Validate the next chunk of the split.
+
+        Args:
+            chunk (pd.DataFrame): The next rows, in file order.
+
+        Returns:
+            Tuple[pd.DataFrame, SchemaValidationResult]: The chunk with schema columns cast to
+            their declared types, and its validity mask and error flags including duplicates of
+            readings in earlier chunks.
+
+        Raises:
+            PollutionException: If validation cannot be performed.
+        """
+        try:
+            chunk, result = self.schema.validate(chunk)
+            timestamp_column = self.schema.timestamp_column
+            if timestamp_column in chunk.columns and len(chunk):
+                timestamps = chunk[timestamp_column]
+                with_time = timestamps.notna().to_numpy()
+                keys = self.schema.hour_keys(chunk)
+                hours = keys["hour"].to_numpy()
+                hashed = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+                repeated = np.isin(hashed, self._latest_hour_keys) & with_time
+                if repeated.any():
+                    result.errors[repeated] |= DUPLICATE_HOUR
+                    result.valid_mask = result.errors == 0
+                    result.error_counts = count_errors(result.errors)
+
+                if with_time.any():
+                    timed = timestamps[with_time]
+                    if self._last_timestamp is not None and timed.iloc[0] < self._last_timestamp:
+                        result.is_monotonic = False
+                    self._last_timestamp = timed.iloc[-1]
+
+                    latest = int(hours[with_time].max())
+                    latest_keys = hashed[with_time & (hours == latest)]
+                    if self._latest_hour is None or latest > self._latest_hour:
+                        self._latest_hour, self._latest_hour_keys = latest, np.unique(latest_keys)
+                    elif latest == self._latest_hour:
+                        self._latest_hour_keys = np.union1d(self._latest_hour_keys, latest_keys)
+
+            self.rows += len(chunk)
+            self.valid_rows += int(np.count_nonzero(result.valid_mask))
+            if self.rows == len(chunk):
+                self.result.missing_columns = list(result.missing_columns)
+            self.result.dtype_mismatches.update(result.dtype_mismatches)
+            for name, count in result.error_counts.items():
+                self.result.error_counts[name] += count
+            self.result.is_monotonic = self.result.is_monotonic and result.is_monotonic
+            return chunk, result
+
+        except Exception as e:
+            raise PollutionException(e, sys)
+
+
+@lru_cache(maxsize=None)
+def load_compiled_schema(schema_file_path: str, key_columns: Tuple[str, ...] = ()) -> CompiledSchema:
+    """
+    Read and compile a schema file once per process.
+    """
+    return CompiledSchema(read_yaml_file(schema_file_path), key_columns=list(key_columns))
@@ -1,6 +1,10 @@
 import os
 import sys
 import json
+import time
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -11,22 +15,64 @@ if MONGO_DB_URL:
 else:
     print("MONGO_DB_URL is not set.")
 
-import certifi
-ca = certifi.where()
-
 import pandas as pd
 import numpy as np
 import pymongo
+from pymongo import ReplaceOne
+from pymongo.errors import AutoReconnect, BulkWriteError, NetworkTimeout
 from pollution_forecasting.exception.exception import PollutionException
 from pollution_forecasting.logging import logger
+from pollution_forecasting.utils.mongo.mongo_client import get_mongo_client
+from pollution_forecasting.constant.training_pipeline import (
+    DATA_INGESTION_DATETIME_FORMAT,
+    DATA_INGESTION_DEFAULT_STATION,
+    DATA_INGESTION_STATION_COLUMN,
+    DATA_INGESTION_WATERMARK_COLUMN,
+)
+
+BULK_LOAD_CHUNK_SIZE = 50000
+BULK_LOAD_BATCH_SIZE = 5000
+BULK_LOAD_WORKERS = 4
+BULK_LOAD_MAX_RETRIES = 5
+
+DATETIME_COLUMNS = ["From Date", "To Date"]
+
+
+@dataclass
+class BulkLoadStats:
+    rows_read: int = 0
+    # rows without a parseable From Date, which would all upsert onto one (station, null) key
+    dropped_rows: int = 0
+    batches: int = 0
+    upserted: int = 0
+    modified: int = 0
+    matched: int = 0
+    # replayed bulk writes, counted whether or not the batch succeeded in the end
+    retries: int = 0
+    retried_batches: int = 0
+    failed_batches: int = 0
+    failed_rows: int = 0
+    elapsed_seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
 
 class PollutionDataExtract():
     def __init__(self):
         try:
-            pass
+            self.mongo_client = None
         except Exception as e:
             raise PollutionException(e,sys)
-        
+
+    def get_client(self):
+        # the process-wide client, its connection pool is shared by all worker threads
+        if self.mongo_client is None:
+            self.mongo_client = get_mongo_client(MONGO_DB_URL)
+        return self.mongo_client
+
     def csv_to_json_convertor(self, file_path):
         try:
             data = pd.read_csv(file_path)
@@ -36,7 +82,159 @@ class PollutionDataExtract():
             return records
         except Exception as e:
             raise PollutionException(e,sys)
-        
+
+    def dataframe_to_documents(self, data: pd.DataFrame, station: str):
+        """
+        Convert a CSV chunk into BSON-ready documents without a JSON round trip.
+
+        Datetime columns become native datetimes, pollutant columns floats with
+        'None'/'na' mapped to null, and every document is tagged with its station.
+        Rows whose From Date is missing or unparseable are dropped, since they have
+        no upsert key.
+
+        Returns:
+            tuple: The documents, and the number of rows dropped for lacking a From Date.
+        """
+        try:
+            for column in data.columns:
+                if column in DATETIME_COLUMNS:
+                    data[column] = pd.to_datetime(data[column], format=DATA_INGESTION_DATETIME_FORMAT, errors="coerce")
+                elif column != DATA_INGESTION_STATION_COLUMN:
+                    data[column] = pd.to_numeric(data[column], errors="coerce")
+            if DATA_INGESTION_STATION_COLUMN not in data.columns:
+                data[DATA_INGESTION_STATION_COLUMN] = station
+
+            if DATA_INGESTION_WATERMARK_COLUMN in data.columns:
+                keyed = data[DATA_INGESTION_WATERMARK_COLUMN].notna().to_numpy()
+            else:
+                keyed = np.zeros(len(data), dtype=bool)
+            dropped = int(len(data) - keyed.sum())
+            if dropped:
+                data = data[keyed]
+
+            columns = {}
+            for column in data.columns:
+                values = data[column]
+                # Timestamps are datetime subclasses, so bson encodes them as native dates
+                array = values.to_numpy(dtype=object)
+                array[pd.isna(values).to_numpy()] = None
+                columns[column] = array
+            names = list(columns)
+            return [dict(zip(names, row)) for row in zip(*columns.values())], dropped
+        except Exception as e:
+            raise PollutionException(e,sys)
+
+    def _write_batch(self, collection, documents, max_retries: int, on_retry=None):
+        operations = [
+            # a replacement rather than $set, since "PM2.5" would be read as a dotted path
+            ReplaceOne(
+                {
+                    DATA_INGESTION_STATION_COLUMN: document[DATA_INGESTION_STATION_COLUMN],
+                    DATA_INGESTION_WATERMARK_COLUMN: document[DATA_INGESTION_WATERMARK_COLUMN],
+                },
+                document,
+                upsert=True,
+            )
+            for document in documents
+        ]
+        for attempt in range(max_retries + 1):
+            try:
+                return collection.bulk_write(operations, ordered=False)
+            except (AutoReconnect, NetworkTimeout, BulkWriteError) as e:
+                if isinstance(e, BulkWriteError) and any(
+                    error.get("code") != 11000 for error in e.details.get("writeErrors", [])
+                ):
+                    raise
+                # upserts are idempotent, so the whole batch can simply be replayed
+                if attempt == max_retries:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt + 1)
+                time.sleep(min(2 ** attempt * 0.1, 5))
+
+    def bulk_load(self, file_path, database, collection, station=DATA_INGESTION_DEFAULT_STATION,
+                  chunk_size=BULK_LOAD_CHUNK_SIZE, batch_size=BULK_LOAD_BATCH_SIZE,
+                  workers=BULK_LOAD_WORKERS, max_retries=BULK_LOAD_MAX_RETRIES):
+        """
+        Stream a CPCB CSV dump into MongoDB as idempotent upserts.
+
+        The CSV is read `chunk_size` rows at a time and sent as unordered `bulk_write`
+        batches of `batch_size` upserts keyed on (station, From Date) from a pool of
+        `workers` threads. At most `2 * workers` batches are in flight, so memory
+        stays bounded regardless of the size of the dump. Rows without a parseable
+        From Date are dropped and counted, and a batch that still fails after
+        `max_retries` replays is counted with its rows rather than aborting the load.
+
+        Returns:
+            BulkLoadStats: Throughput, dropped-row, write, retry and failure counters for the run.
+        """
+        try:
+            stats = BulkLoadStats()
+            start_time = time.perf_counter()
+            target = self.get_client()[database][collection]
+            target.create_index(
+                [(DATA_INGESTION_STATION_COLUMN, pymongo.ASCENDING), (DATA_INGESTION_WATERMARK_COLUMN, pymongo.ASCENDING)],
+                unique=True,
+            )
+
+            retry_lock = threading.Lock()
+
+            def record_retry(attempt):
+                # called from the worker threads, before the replay is attempted
+                with retry_lock:
+                    stats.retries += 1
+                    if attempt == 1:
+                        stats.retried_batches += 1
+
+            batch_rows = {}
+
+            def collect(done):
+                for future in done:
+                    rows = batch_rows.pop(future)
+                    try:
+                        result = future.result()
+                        stats.upserted += result.upserted_count
+                        stats.modified += result.modified_count
+                        stats.matched += result.matched_count
+                    except Exception as e:
+                        stats.failed_batches += 1
+                        stats.failed_rows += rows
+                        stats.errors.append(str(e))
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = set()
+                for chunk in pd.read_csv(file_path, chunksize=chunk_size, dtype=str, encoding="utf-8-sig"):
+                    stats.rows_read += len(chunk)
+                    documents, dropped = self.dataframe_to_documents(chunk, station)
+                    stats.dropped_rows += dropped
+                    for offset in range(0, len(documents), batch_size):
+                        if len(pending) >= 2 * workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(done)
+                        batch = documents[offset:offset + batch_size]
+                        future = executor.submit(self._write_batch, target, batch, max_retries, record_retry)
+                        batch_rows[future] = len(batch)
+                        pending.add(future)
+                        stats.batches += 1
+                done, _ = wait(pending)
+                collect(done)
+
+            stats.elapsed_seconds = time.perf_counter() - start_time
+            logger.logging.info(
+                f"Bulk loaded {stats.rows_read} rows in {stats.elapsed_seconds:.2f}s "
+                f"({stats.rows_per_second:.0f} rows/sec), dropped={stats.dropped_rows} upserted={stats.upserted} "
+                f"modified={stats.modified} retries={stats.retries} retried_batches={stats.retried_batches} "
+                f"failed_batches={stats.failed_batches} failed_rows={stats.failed_rows}"
+            )
+            if stats.dropped_rows:
+                logger.logging.warning(
+                    f"Dropped {stats.dropped_rows} rows of {file_path} without a parseable "
+                    f"{DATA_INGESTION_WATERMARK_COLUMN}"
+                )
+            return stats
+        except Exception as e:
+            raise PollutionException(e,sys)
+
     def insert_data_mongodb(self, records, database, collection):
 
         try:
@@ -44,23 +242,21 @@ class PollutionDataExtract():
             self.collection = collection
             self.records = records
 
-            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
-            self.database = self.mongo_client[self.database]
+            self.database = self.get_client()[self.database]
 
             self.collection = self.database[self.collection]
             self.collection.insert_many(self.records)
-        
+
             return (len(self.records), "records inserted successfully")
-        
+
         except Exception as e:
             raise PollutionException(e,sys)
 
 if __name__=='__main__':
-    FILE_PATH = "Pollution_Data\delhi_pollution_data.csv"
+    FILE_PATH = os.path.join("Pollution_Data", "delhi_pollution_data.csv")
     DATABASE = "delhi_pollution"
     Collection="air_quality"
     networkobj = PollutionDataExtract()
-    records = networkobj.csv_to_json_convertor(FILE_PATH)
-    print(records)
-    no_of_records = networkobj.insert_data_mongodb(records, DATABASE, Collection)
-    print(no_of_records)
\ No newline at end of file
+    stats = networkobj.bulk_load(FILE_PATH, DATABASE, Collection)
+    print(stats)
+    print(f"{stats.rows_per_second:.0f} rows/sec")
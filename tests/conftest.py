@@ -0,0 +1,36 @@
+import os
+from datetime import datetime
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    """
+    Run every test from the repository root, where the pipeline finds `data_schema/`.
+    """
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
+
+
+@pytest.fixture
+def mongo_client():
+    """
+    In-memory mongomock client standing in for MongoDB.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def training_pipeline_config(tmp_path):
+    from pollution_forecasting.entity.config_entity import TrainingPipelineConfig
+
+    config = TrainingPipelineConfig(datetime(2024, 1, 1))
+    # the feature store and stage cache live under artifact_name, outside the run dir
+    config.artifact_name = str(tmp_path / "Artifacts")
+    config.run_dir = config.artifact_dir = str(tmp_path / "Artifacts" / config.timestamp)
+    config.model_dir = str(tmp_path / "final_model")
+    return config
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from pollution_forecasting.utils.ml_utils.model.compiled_forest import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def models():
+    rng = np.random.default_rng(0)
+    X = rng.gamma(2.0, 40.0, (2000, 6))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return {
+        f"model_{horizon}": HistGradientBoostingRegressor(max_iter=20, random_state=0).fit(X, np.nan_to_num(X[:, 0] * horizon + X[:, 1] % 7))
+        for horizon in (1, 6, 24)
+    }, X
+
+
+@pytest.mark.parametrize("missing", [True, False])
+def test_compiled_predictions_match_sklearn(models, missing):
+    models, X = models
+    rows = X[:40] if missing else np.nan_to_num(X[:40])
+    forest = CompiledForest(models, max_rows=64)
+
+    predictions = forest.predict(rows)
+
+    for name, model in models.items():
+        np.testing.assert_allclose(predictions[name], model.predict(rows))
+
+
+def test_only_requested_models_are_predicted(models):
+    models, X = models
+    forest = CompiledForest(models, max_rows=64)
+
+    predictions = forest.predict(X[:5], ["model_24", "model_1"])
+
+    assert list(predictions) == ["model_24", "model_1"]
+    for name in predictions:
+        np.testing.assert_allclose(predictions[name], models[name].predict(X[:5]))
+    assert list(forest.predict(X[:100], ["model_6"])) == ["model_6"]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pollution_forecasting.components.data_transformation import POLLUTANT_COLUMNS, DataTransformation
+from pollution_forecasting.entity.artifact_entity import FeatureEngineeringArtifact
+from pollution_forecasting.entity.config_entity import DataTransformationConfig
+from pollution_forecasting.utils.main.utils import load_numpy_array_data, read_yaml_file
+
+HOURS = 6
+
+
+def engineered_split(path, start):
+    """
+    Two stations reporting the same hours, station A around 10 and station B around 100,
+    each with a gap the other station has a reading for.
+    """
+    rows = []
+    for hour in range(HOURS):
+        for station, level in (("A", 10.0), ("B", 100.0)):
+            timestamp = pd.Timestamp(start) + pd.Timedelta(hours=hour)
+            row = {"From Date": timestamp, "To Date": timestamp + pd.Timedelta(hours=1), "station": station}
+            row.update({column: level + hour for column in POLLUTANT_COLUMNS})
+            rows.append(row)
+    frame = pd.DataFrame(rows)
+    frame.loc[(frame["station"] == "B") & (frame["From Date"] == pd.Timestamp(start) + pd.Timedelta(hours=2)), "NO2"] = np.nan
+    frame.loc[(frame["station"] == "A") & (frame["From Date"] == pd.Timestamp(start) + pd.Timedelta(hours=3)), "NO2"] = np.nan
+    frame.to_parquet(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_gaps_are_filled_from_the_same_station(tmp_path, training_pipeline_config, chunked):
+    artifact = FeatureEngineeringArtifact(
+        engineered_train_file_path=engineered_split(tmp_path / "train.parquet", "2024-01-01"),
+        engineered_test_file_path=engineered_split(tmp_path / "test.parquet", "2024-02-01"),
+    )
+    config = DataTransformationConfig(training_pipeline_config)
+    config.chunked, config.chunk_rows, config.fit_sample_rows = chunked, 5, 1_000
+
+    result = DataTransformation(artifact, config).initiate_data_transformation()
+
+    columns = read_yaml_file(result.transformed_columns_file_path)["columns"]
+    assert "station" not in columns
+    for file_path, stations_file_path in (
+        (result.transformed_train_file_path, result.transformed_train_stations_file_path),
+        (result.transformed_test_file_path, result.transformed_test_stations_file_path),
+    ):
+        array = load_numpy_array_data(file_path)
+        no2 = array[:, columns.index("NO2")]
+        pm10 = array[:, columns.index("PM10")]
+        # B's 2nd hour carries B's 1st hour forward, A's 3rd hour carries A's 2nd hour forward
+        station_b = pm10 >= 100
+        stations = load_numpy_array_data(stations_file_path)
+        assert len(set(stations[station_b])) == len(set(stations[~station_b])) == 1
+        assert stations[station_b][0] != stations[~station_b][0]
+        assert no2[station_b].tolist() == [100.0, 101.0, 101.0, 103.0, 104.0, 105.0]
+        assert no2[~station_b].tolist() == [10.0, 11.0, 12.0, 12.0, 14.0, 15.0]
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pollution_forecasting.components.data_validation import DataValidation
+from pollution_forecasting.components.data_transformation import POLLUTANT_COLUMNS
+from pollution_forecasting.entity.artifact_entity import DataIngestionArtifact
+from pollution_forecasting.entity.config_entity import DataValidationConfig, TrainingPipelineConfig
+from pollution_forecasting.utils.main.utils import read_yaml_file
+from pollution_forecasting.utils.schema.schema_validator import (
+    DUPLICATE_HOUR,
+    INVALID_NUMBER,
+    INVALID_TIMESTAMP,
+    OUT_OF_RANGE,
+    VALIDATION_ERRORS_COLUMN,
+)
+
+
+def reading(station, from_date, **values):
+    row = {"From Date": from_date, "To Date": from_date, "station": station}
+    row.update({column: "40" for column in POLLUTANT_COLUMNS})
+    row.update(values)
+    return row
+
+
+# (reading, expected error flags), in the text form of a legacy CSV split
+CASES = [
+    (reading("A", "01-01-2024 00:00"), 0),
+    (reading("A", "01-01-2024 01:00", **{"PM2.5": "1500"}), OUT_OF_RANGE),
+    (reading("A", "01-01-2024 02:00", NO2="abc"), INVALID_NUMBER),
+    # the schema's missing-value markers are missing readings, not unparseable ones
+    (reading("A", "01-01-2024 03:00", NO2="None", SO2="na", CO=""), 0),
+    (reading("A", "01-01-2024 04:00", PM10="-5", NH3="x"), OUT_OF_RANGE | INVALID_NUMBER),
+    # the hour of the first reading again: a duplicate at the same station, a reading at another
+    (reading("A", "01-01-2024 00:00"), DUPLICATE_HOUR),
+    (reading("B", "01-01-2024 00:00"), 0),
+    (reading("B", "not a date"), INVALID_TIMESTAMP),
+    (reading("B", "01-01-2024 00:00", CO="51"), OUT_OF_RANGE | DUPLICATE_HOUR),
+]
+
+
+@pytest.fixture
+def data_validation(training_pipeline_config):
+    return DataValidation(
+        DataIngestionArtifact(trained_file_path=None, test_file_path=None),
+        DataValidationConfig(training_pipeline_config),
+    )
+
+
+def cases_frame():
+    # reading_id is not a schema column, it rides along so written rows can be told apart
+    return pd.DataFrame([row for row, _ in CASES]).assign(reading_id=range(len(CASES)))
+
+
+def test_compiled_schema_sets_the_error_flags(data_validation):
+    dataframe, result = data_validation._compiled_schema.validate(cases_frame())
+
+    np.testing.assert_array_equal(result.errors, [flags for _, flags in CASES])
+    assert result.error_counts == {"invalid_number": 2, "out_of_range": 3, "invalid_timestamp": 1, "duplicate_hour": 2}
+    assert dataframe.loc[3, ["NO2", "SO2", "CO"]].isna().all()
+    assert dataframe["PM2.5"].dtype == np.float64
+    assert not result.is_monotonic
+
+
+def test_quarantine_holds_exactly_the_flagged_rows(data_validation, tmp_path):
+    valid_file_path, invalid_file_path = str(tmp_path / "valid.parquet"), str(tmp_path / "invalid.parquet")
+
+    valid, _, quarantine_file_path = data_validation.validate_rows(cases_frame(), valid_file_path, invalid_file_path)
+
+    flagged = [i for i, (_, flags) in enumerate(CASES) if flags]
+    quarantined = pd.read_parquet(quarantine_file_path)
+    assert quarantine_file_path == invalid_file_path
+    assert quarantined["reading_id"].tolist() == flagged
+    assert quarantined[VALIDATION_ERRORS_COLUMN].tolist() == [CASES[i][1] for i in flagged]
+    stored = pd.read_parquet(valid_file_path)
+    assert stored["reading_id"].tolist() == valid["reading_id"].tolist() == [i for i, (_, flags) in enumerate(CASES) if not flags]
+    assert VALIDATION_ERRORS_COLUMN not in stored.columns
+
+
+def test_no_quarantine_file_without_flagged_rows(data_validation, tmp_path):
+    invalid_file_path = tmp_path / "invalid.parquet"
+
+    _, result, quarantine_file_path = data_validation.validate_rows(
+        cases_frame().iloc[[0, 3, 6]], str(tmp_path / "valid.parquet"), str(invalid_file_path)
+    )
+
+    assert result.valid_mask.all()
+    assert quarantine_file_path is None and not invalid_file_path.exists()
+
+
+def test_unknown_columns_are_kept_and_missing_ones_reported(data_validation):
+    dataframe = cases_frame().assign(sensor_firmware="v2")
+
+    validated, result = data_validation._compiled_schema.validate(dataframe.copy())
+    _, without_ozone = data_validation._compiled_schema.validate(dataframe.drop(columns=["Ozone"]))
+
+    # columns outside the schema, like the station tag, pass through without flagging rows
+    assert validated["sensor_firmware"].tolist() == ["v2"] * len(CASES)
+    assert result.structure_ok and result.errors.tolist() == [flags for _, flags in CASES]
+    assert without_ozone.missing_columns == ["Ozone"] and not without_ozone.structure_ok
+    assert data_validation.validate_number_of_columns(dataframe)
+    assert not data_validation.validate_number_of_columns(dataframe.drop(columns=["Ozone"]))
+
+
+def split_frame(seed, hours=120, stations=("A", "B", "C"), shift=0.0, out_of_order=False):
+    """
+    Hourly readings of a few stations in ingestion order, with quarantined rows mixed in.
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2024-01-01", periods=hours, freq="h").repeat(len(stations))
+    frame = pd.DataFrame({"From Date": times, "station": np.tile(stations, hours)})
+    frame["To Date"] = frame["From Date"]
+    for column in POLLUTANT_COLUMNS:
+        frame[column] = np.round(rng.gamma(2.0, 1.0 if column == "CO" else 20.0, len(frame)), 1)
+    frame["NO2"] += shift
+    frame.loc[[5, 70], "PM2.5"] = 1500.0
+    frame.loc[[40], "CO"] = -1.0
+    # a repeat of the reading before it, which the chunked mode finds across the chunk boundary at row 100
+    frame = pd.concat([frame.iloc[:100], frame.iloc[[99]], frame.iloc[100:]], ignore_index=True)
+    if out_of_order:
+        frame = pd.concat([frame.iloc[200:], frame.iloc[:200]], ignore_index=True)
+    frame["From Date"] = frame["From Date"].dt.strftime("%d-%m-%Y %H:%M")
+    frame["To Date"] = frame["From Date"]
+    return frame.assign(reading_id=range(len(frame)))
+
+
+def run_validation(tmp_path, name, train_file_path, test_file_path, chunked):
+    pipeline_config = TrainingPipelineConfig()
+    pipeline_config.artifact_dir = str(tmp_path / name)
+    config = DataValidationConfig(pipeline_config)
+    config.chunked, config.chunk_rows = chunked, 100
+    artifact = DataValidation(DataIngestionArtifact(train_file_path, test_file_path), config).initiate_data_validation()
+    return artifact, read_yaml_file(artifact.drift_report_file_path)
+
+
+@pytest.mark.parametrize(
+    "shift, out_of_order, expected_status",
+    [(0.0, False, True), (15.0, False, False), (0.0, True, False)],
+)
+def test_chunked_and_whole_frame_validation_agree(tmp_path, shift, out_of_order, expected_status):
+    train_file_path, test_file_path = str(tmp_path / "train.parquet"), str(tmp_path / "test.parquet")
+    split_frame(0).to_parquet(train_file_path, index=False)
+    split_frame(0, shift=shift, out_of_order=out_of_order).to_parquet(test_file_path, index=False)
+
+    whole, whole_report = run_validation(tmp_path, "whole", train_file_path, test_file_path, chunked=False)
+    chunked, chunked_report = run_validation(tmp_path, "chunked", train_file_path, test_file_path, chunked=True)
+
+    for split in ("valid_train_file_path", "valid_test_file_path", "invalid_train_file_path", "invalid_test_file_path"):
+        pd.testing.assert_frame_equal(pd.read_parquet(getattr(chunked, split)), pd.read_parquet(getattr(whole, split)))
+    assert pd.read_parquet(whole.invalid_train_file_path)["reading_id"].tolist() == [5, 40, 70, 100]
+    # a drifted column or a split out of chronological order fails validation in both modes
+    assert whole.validation_status == chunked.validation_status == expected_status
+    assert [column for column, entry in whole_report.items() if entry["drift_status"]] == (["NO2"] if shift else [])
+    assert chunked_report.keys() == whole_report.keys()
+    for column, entry in whole_report.items():
+        assert chunked_report[column]["drift_status"] == entry["drift_status"]
+        assert chunked_report[column]["ks_statistic"] == pytest.approx(entry["ks_statistic"], abs=0.01)
+        assert chunked_report[column]["wasserstein"] == pytest.approx(entry["wasserstein"], abs=0.2)
+        assert chunked_report[column]["psi"] == pytest.approx(entry["psi"], abs=0.01)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from pollution_forecasting.entity.config_entity import DataValidationConfig, TrainingPipelineConfig
+from pollution_forecasting.utils.ml_utils.drift.drift_engine import detect_drift, sample_size_for_error
+
+
+def test_report_times_the_batched_pass_not_each_column():
+    rng = np.random.default_rng(0)
+    base = rng.normal(0.0, 1.0, (5_000, 3))
+    current = np.column_stack([rng.normal(0.0, 1.0, 5_000), rng.normal(2.0, 1.0, 5_000), rng.normal(0.0, 1.0, 5_000)])
+
+    report = detect_drift(base, current, ["a", "b", "c"], metrics=("ks", "psi", "wasserstein"))
+
+    assert [entry["drift_status"] for entry in report.values()] == [False, True, False]
+    assert all("seconds" not in entry for entry in report.values())
+    assert {entry["batch_columns"] for entry in report.values()} == {3}
+    assert len({entry["batch_seconds"] for entry in report.values()}) == 1
+
+
+def test_pool_and_single_pass_agree():
+    rng = np.random.default_rng(1)
+    base = rng.normal(0.0, 1.0, (2_000, 4))
+    current = base + np.array([0.0, 0.5, 0.0, 1.0])
+    columns = ["a", "b", "c", "d"]
+
+    single = detect_drift(base, current, columns, metrics=("ks", "psi"))
+    pooled = detect_drift(base, current, columns, metrics=("ks", "psi"), workers=2, parallel_min_rows=0)
+
+    assert {entry["batch_columns"] for entry in pooled.values()} == {2}
+    for column in columns:
+        for field in ("p_value", "ks_statistic", "drift_status", "psi"):
+            assert pooled[column][field] == single[column][field]
+
+
+def test_default_samples_reach_the_pool():
+    config = DataValidationConfig(TrainingPipelineConfig())
+    sample_rows = sample_size_for_error(config.drift_sample_error, config.drift_sample_confidence)
+
+    # the pool is only used above this many rows of the base and current samples together
+    assert 2 * sample_rows >= config.drift_parallel_min_rows
@@ -0,0 +1,153 @@
+from datetime import datetime
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from pollution_forecasting.entity.config_entity import FeedIngestionConfig
+from pollution_forecasting.ingestion import feed_service
+from pollution_forecasting.ingestion.feed_service import FeedIngestionService
+from pollution_forecasting.ingestion.stub_feed_server import StubFeedServer
+from pollution_forecasting.utils.main.utils import write_yaml_file
+
+DATABASE = "delhi_pollution"
+COLLECTION = "air_quality"
+
+
+class FlakyCollection:
+    """
+    Collection whose `bulk_write` drops the connection for the first `failures` calls.
+    """
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Starts stub feeds of 2 stations and 12 hours on a free local port, with other StubFeedServer options.
+    """
+    servers = []
+
+    def start(**options):
+        server = StubFeedServer(**{"stations": 2, "history_hours": 12, "seed": 0, **options})
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def feed_config(tmp_path):
+    config = FeedIngestionConfig(str(tmp_path / "feeds.yaml"))
+    config.metrics_file_path = str(tmp_path / "feed_ingestion" / "metrics.json")
+    config.poll_interval_s, config.rate_limit_per_s = 0.0, 1000.0
+    config.backoff_base_s, config.backoff_max_s = 0.001, 0.01
+    config.flush_interval_s = 0.01
+    return config
+
+
+def service_for(server, config, collection):
+    write_yaml_file(config.sources_file_path, {"feeds": server.sources()}, replace=True)
+    return FeedIngestionService(config, collection=collection)
+
+
+def stored_keys(collection):
+    return [(document["station"], document["From Date"]) for document in collection.find()]
+
+
+def test_re_served_readings_are_stored_once(stub_server, feed_config, mongo_client):
+    server = stub_server(honor_since=False)
+    collection = mongo_client[DATABASE][COLLECTION]
+
+    first = service_for(server, feed_config, collection).run(max_polls=3)
+    # a restarted service has an empty dedup window, the upsert key still holds
+    second = service_for(server, feed_config, collection).run(max_polls=1)
+
+    readings = 2 * 12
+    keys = stored_keys(collection)
+    assert len(keys) == len(set(keys)) == readings
+    assert (first["written"], first["duplicates"], first["upserted"]) == (readings, 2 * readings, readings)
+    assert (second["written"], second["upserted"]) == (readings, 0)
+
+
+def test_missing_value_markers_are_stored_as_null(stub_server, feed_config, mongo_client):
+    server = stub_server(none_fraction=0.3)
+    collection = mongo_client[DATABASE][COLLECTION]
+    service = service_for(server, feed_config, collection)
+
+    service.run(max_polls=1)
+
+    stored = {(document["station"], document["From Date"]): document for document in collection.find({}, {"_id": 0})}
+    served = {
+        (station, datetime.strptime(reading["From Date"], feed_config.datetime_format)): reading
+        for station in server.stations for reading in server.readings(station)
+    }
+    # readings of an hour that rolled over between the poll and now only exist on one side
+    compared = stored.keys() & served.keys()
+    assert len(compared) >= len(stored) - 2
+    markers = 0
+    for key in compared:
+        for column in service.normalizer.numerical_columns:
+            raw = served[key][column]
+            if raw in ("None", "na"):
+                markers += 1
+                assert stored[key][column] is None
+            else:
+                assert stored[key][column] == float(raw)
+        assert isinstance(stored[key]["To Date"], datetime)
+    assert markers
+
+
+def test_a_reading_without_timestamp_is_dropped(feed_config):
+    normalizer = FeedIngestionService(feed_config, sources=[]).normalizer
+
+    document = normalizer.normalize({"From Date": "01-01-2024 00:00", "PM2.5": " NA ", "NO2": "", "CO": "abc", "SO2": "7.5"}, "A")
+
+    assert document == {"From Date": datetime(2024, 1, 1), "PM2.5": None, "NO2": None, "CO": None, "SO2": 7.5, "station": "A"}
+    assert normalizer.normalize({"From Date": "None", "PM2.5": "10"}, "A") is None
+
+
+def test_failed_polls_back_off_exponentially(stub_server, feed_config, mongo_client, monkeypatch):
+    server = stub_server(stations=1, failure_rate=1.0)
+    feed_config.max_retries, feed_config.backoff_base_s, feed_config.backoff_max_s = 3, 0.01, 0.03
+    delays = []
+
+    def full_jitter(low, high):
+        # the bound the backoff delay is drawn under, which the draw then takes
+        delays.append(high)
+        return high
+
+    monkeypatch.setattr(feed_service.random, "uniform", full_jitter)
+
+    metrics = service_for(server, feed_config, mongo_client[DATABASE][COLLECTION]).run(max_polls=1)
+
+    assert delays == [0.01, 0.02, 0.03]
+    assert server.requests == 4
+    assert (metrics["retries"], metrics["poll_failures"], metrics["written"]) == (3, 1, 0)
+
+
+def test_retried_polls_and_writes_lose_no_reading(stub_server, feed_config, mongo_client):
+    server = stub_server(failure_rate=0.5)
+    feed_config.max_retries = 12
+    collection = FlakyCollection(mongo_client[DATABASE][COLLECTION], failures=2)
+
+    metrics = service_for(server, feed_config, collection).run(max_polls=1)
+
+    assert server.failures and metrics["retries"] == server.failures
+    assert metrics["write_retries"] == 2 and metrics["poll_failures"] == metrics["write_failures"] == 0
+    assert len(stored_keys(collection)) == metrics["written"] == 2 * 12
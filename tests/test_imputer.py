@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pollution_forecasting.utils.ml_utils.imputation.imputer import HOURS_PER_WEEK, SeasonalInterpolationImputer
+
+MONDAY = pd.Timestamp("2024-01-01")
+
+
+def hourly(values, start=MONDAY, columns=("NO2",)):
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    return pd.DataFrame(values, index=pd.date_range(start, periods=len(values), freq="h"), columns=list(columns))
+
+
+def week_hour_series(weeks=2):
+    """
+    A series whose reading is its own hour of week, so the learned profile is that hour.
+    """
+    return hourly(np.arange(weeks * HOURS_PER_WEEK) % HOURS_PER_WEEK)
+
+
+def test_carry_forward_stops_at_the_gap_limit():
+    imputer = SeasonalInterpolationImputer(strategy="carry_forward", max_gap_hours=3).fit(week_hour_series())
+    series = hourly([50.0, 51.0, 52.0] + [np.nan] * 7)
+
+    imputed = imputer.transform(series)[:, 0]
+
+    # hours 3 to 5 are at most 3 hours after the last reading, the rest fall back to the profile
+    np.testing.assert_array_equal(imputed[:6], [50, 51, 52, 52, 52, 52])
+    np.testing.assert_array_equal(imputed[6:], [6, 7, 8, 9])
+
+
+def test_carry_forward_never_fills_from_a_later_reading():
+    imputer = SeasonalInterpolationImputer(max_gap_hours=6).fit(week_hour_series())
+
+    imputed = imputer.transform(hourly([np.nan, np.nan, 40.0]))[:, 0]
+
+    # a series start has nothing before it, so it takes the hour-of-week profile
+    np.testing.assert_array_equal(imputed, [0, 1, 40])
+
+
+def test_hour_of_week_fallback_then_median():
+    # fitted on Mondays only, so the profile knows hours 0-23 of the week and nothing else
+    monday = hourly(np.arange(24) + 100.0)
+    imputer = SeasonalInterpolationImputer(max_gap_hours=0).fit(monday)
+    gaps = pd.DataFrame({"NO2": [np.nan, np.nan]}, index=pd.DatetimeIndex([MONDAY + pd.Timedelta(hours=5), MONDAY + pd.Timedelta(days=1)]))
+
+    imputed = imputer.transform(gaps)[:, 0]
+
+    assert imputed[0] == 105.0
+    assert imputed[1] == np.median(np.arange(24) + 100.0)
+
+
+def test_rows_without_timestamps_take_the_median():
+    imputer = SeasonalInterpolationImputer().fit(week_hour_series())
+
+    imputed = imputer.transform_rows(np.array([[np.nan]]))
+
+    assert imputed[0, 0] == np.median(np.arange(HOURS_PER_WEEK))
+
+
+@pytest.mark.parametrize("n_neighbors, expected", [(1, 10.0), (2, 15.0)])
+def test_knn_window_uses_nearest_complete_rows_inside_the_window(n_neighbors, expected):
+    readings = pd.DataFrame(
+        {"NO2": [1.1, 1.0, 5.0, 2.0, 1.1, 1.1], "SO2": [999.0, 10.0, 50.0, 20.0, np.nan, 777.0]},
+        index=MONDAY + pd.to_timedelta([0, 30, 31, 32, 33, 34], unit="h"),
+    )
+    imputer = SeasonalInterpolationImputer(strategy="knn_window", n_neighbors=n_neighbors, knn_window_hours=24).fit(readings)
+
+    imputed = imputer.transform(readings)
+
+    # the exact NO2 match at hour 0 is outside the 24 hour window and the one at hour 34 is later
+    assert imputed[4, 1] == expected
+    np.testing.assert_array_equal(imputed[[0, 1, 2, 3, 5]], readings.to_numpy()[[0, 1, 2, 3, 5]])
+
+
+def test_knn_window_without_complete_rows_falls_back_to_the_profile():
+    readings = hourly([[1.0, np.nan], [2.0, np.nan]], columns=("NO2", "SO2"))
+    history = hourly(np.c_[np.arange(HOURS_PER_WEEK), np.arange(HOURS_PER_WEEK) + 0.5], columns=("NO2", "SO2"))
+    imputer = SeasonalInterpolationImputer(strategy="knn_window").fit(history)
+
+    imputed = imputer.transform(readings)
+
+    np.testing.assert_array_equal(imputed[:, 1], [0.5, 1.5])
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(Exception, match="Unknown imputation strategy"):
+        SeasonalInterpolationImputer(strategy="linear").fit(week_hour_series())
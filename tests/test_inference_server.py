@@ -0,0 +1,25 @@
+import json
+import math
+
+import numpy as np
+
+from pollution_forecasting.serving.inference_server import json_safe
+
+
+def test_non_finite_values_are_sent_as_null():
+    body = {
+        "predictions": [{"model": float("nan")}, {"model": 41.5}],
+        "latency_ms": {"p50": np.float64("inf"), "p99": np.float32(2.5)},
+        "batch": np.array([1.0, -np.inf]),
+        "count": np.int64(3),
+    }
+
+    decoded = json.loads(json.dumps(json_safe(body), allow_nan=False))
+
+    assert decoded == {
+        "predictions": [{"model": None}, {"model": 41.5}],
+        "latency_ms": {"p50": None, "p99": 2.5},
+        "batch": [1.0, None],
+        "count": 3,
+    }
+    assert math.isnan(body["predictions"][0]["model"])
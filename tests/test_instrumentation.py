@@ -0,0 +1,25 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from pollution_forecasting.entity.config_entity import InstrumentationConfig
+from pollution_forecasting.pipeline.instrumentation import PipelineInstrumentation
+
+
+def test_worker_peak_rss_is_reported_once_for_the_run(training_pipeline_config):
+    pytest.importorskip("resource")
+    instrumentation = PipelineInstrumentation(InstrumentationConfig(training_pipeline_config))
+
+    with instrumentation.stage("spawns_a_worker"):
+        subprocess.run([sys.executable, "-c", "block = bytearray(64 * 1024 ** 2)"], check=True)
+    with instrumentation.stage("runs_in_process"):
+        pass
+
+    with open(instrumentation.finish_run()) as file:
+        report = json.load(file)
+    # the lifetime peak of reaped workers would otherwise be repeated for every later stage
+    assert all("children_peak_rss_mb" not in stage for stage in report["stages"])
+    assert report["children_peak_rss_mb"] >= 64
+    assert report["stages"][0]["children_cpu_s"] > 0
@@ -0,0 +1,40 @@
+import numpy as np
+
+from pollution_forecasting.components.model_trainer import horizon_pairs
+
+
+def hours(*offsets):
+    return np.datetime64("2024-01-01T00", "h") + np.array(offsets, dtype="timedelta64[h]")
+
+
+def test_targets_are_paired_within_a_station():
+    # A@0, B@0, A@1, B@1
+    timestamps = hours(0, 0, 1, 1)
+    stations = np.array([7, 9, 7, 9])
+
+    rows, future = horizon_pairs(timestamps, 1, stations)
+
+    assert rows.tolist() == [0, 1]
+    assert future.tolist() == [2, 3]
+    assert (stations[rows] == stations[future]).all()
+
+
+def test_a_station_missing_the_target_hour_has_no_pair():
+    # B has no reading at hour 1, so A's next reading must not become B's target
+    timestamps = hours(0, 0, 1, 2)
+    stations = np.array([7, 9, 7, 9])
+
+    rows, future = horizon_pairs(timestamps, 1, stations)
+
+    assert rows.tolist() == [0]
+    assert future.tolist() == [2]
+
+
+def test_without_groups_the_rows_are_one_series():
+    timestamps = hours(0, 1, 3, 4, 5)
+
+    rows, future = horizon_pairs(timestamps, 1)
+
+    assert rows.tolist() == [0, 2, 3]
+    assert future.tolist() == [1, 3, 4]
+    assert [array.tolist() for array in horizon_pairs(hours(), 1)] == [[], []]
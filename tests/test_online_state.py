@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from pollution_forecasting.components.data_transformation import POLLUTANT_COLUMNS
+from pollution_forecasting.components.feature_engineering import FeatureEngineering
+from pollution_forecasting.constant.training_pipeline import DATA_TRANSFORMATION_IMPUTER_PARAMS
+from pollution_forecasting.entity.artifact_entity import DataValidationArtifact
+from pollution_forecasting.entity.config_entity import FeatureEngineeringConfig
+from pollution_forecasting.streaming.online_state import StationState
+
+
+def station_series(hours=24 * 21, seed=0):
+    """
+    Validated hourly readings of one station with missing hours, missing readings and a
+    gap longer than the carry-forward limit.
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2024-10-20", periods=hours, freq="h")
+    frame = pd.DataFrame({"From Date": times, "To Date": times, "station": "A"})
+    for column in POLLUTANT_COLUMNS:
+        frame[column] = np.round(rng.gamma(2.0, 1.0 if column == "CO" else 40.0, hours), 2)
+        frame.loc[rng.random(hours) < 0.05, column] = np.nan
+    frame.loc[200:211, ["PM2.5", "NO2"]] = np.nan
+    return frame[rng.random(hours) > 0.05].reset_index(drop=True)
+
+
+def test_online_rows_match_the_batch_features(training_pipeline_config, tmp_path):
+    readings = station_series()
+    train_file_path, test_file_path = str(tmp_path / "train.parquet"), str(tmp_path / "test.parquet")
+    readings.iloc[:400].to_parquet(train_file_path, index=False)
+    readings.iloc[400:].to_parquet(test_file_path, index=False)
+    config = FeatureEngineeringConfig(training_pipeline_config)
+    artifact = FeatureEngineering(
+        DataValidationArtifact(
+            validation_status=True, valid_train_file_path=train_file_path, valid_test_file_path=test_file_path,
+            invalid_train_file_path=None, invalid_test_file_path=None, drift_report_file_path=None,
+        ),
+        config,
+    ).initiate_feature_engineering()
+    batch = pd.concat(
+        [pd.read_parquet(artifact.engineered_train_file_path), pd.read_parquet(artifact.engineered_test_file_path)],
+        ignore_index=True,
+    )
+
+    state = StationState(
+        FeatureEngineering.feature_builder_from_config(config), POLLUTANT_COLUMNS, config.aqi_lags,
+        DATA_TRANSFORMATION_IMPUTER_PARAMS["max_gap_hours"],
+    )
+    online = pd.DataFrame([
+        state.update(record["From Date"], {column: record[column] for column in POLLUTANT_COLUMNS})
+        for record in readings.to_dict("records")
+    ])
+
+    features = [column for column in online.columns if column not in POLLUTANT_COLUMNS]
+    assert len(online) == len(batch) and set(features) <= set(batch.columns)
+    for column in features:
+        # a feature missing in the batch data, e.g. a lag into a missing hour, is missing online too
+        np.testing.assert_allclose(online[column], batch[column], rtol=1e-6, atol=1e-4, equal_nan=True, err_msg=column)
+    # online readings are carried forward, the batch ones are left to the imputer
+    measured = batch[POLLUTANT_COLUMNS].notna().to_numpy()
+    np.testing.assert_array_equal(online[POLLUTANT_COLUMNS].to_numpy()[measured], batch[POLLUTANT_COLUMNS].to_numpy()[measured])
+    assert online.loc[batch["PM2.5"].isna().to_numpy(), "PM2.5"].notna().any()
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+from pymongo.errors import AutoReconnect
+
+import push_data
+from pollution_forecasting.constant.training_pipeline import (
+    DATA_INGESTION_STATION_COLUMN,
+    DATA_INGESTION_WATERMARK_COLUMN,
+)
+
+DATABASE = "delhi_pollution"
+COLLECTION = "air_quality"
+
+
+class FlakyCollection:
+    """
+    Collection whose `bulk_write` drops the connection for the first `failures` calls.
+    """
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "dump.csv"
+    pd.DataFrame({
+        "From Date": ["01-01-2024 00:00", "01-01-2024 01:00", "not a date", "", "01-01-2024 02:00"],
+        "To Date": ["01-01-2024 01:00", "01-01-2024 02:00", "01-01-2024 03:00", "01-01-2024 04:00", "01-01-2024 03:00"],
+        "PM2.5": ["10", "None", "30", "40", "50"],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def extractor(collection):
+    extract = push_data.PollutionDataExtract()
+    extract.mongo_client = {DATABASE: {COLLECTION: collection}}
+    return extract
+
+
+def test_rows_without_a_from_date_are_dropped_and_counted(mongo_client, csv_path):
+    collection = mongo_client[DATABASE][COLLECTION]
+
+    stats = extractor(collection).bulk_load(csv_path, DATABASE, COLLECTION, workers=1)
+
+    assert (stats.rows_read, stats.dropped_rows, stats.upserted) == (5, 2, 3)
+    assert collection.count_documents({DATA_INGESTION_WATERMARK_COLUMN: None}) == 0
+    assert collection.count_documents({DATA_INGESTION_STATION_COLUMN: "delhi"}) == 3
+
+
+def test_retries_are_counted_for_recovered_and_failed_batches(monkeypatch, mongo_client, csv_path):
+    monkeypatch.setattr(push_data.time, "sleep", lambda seconds: None)
+
+    recovered = extractor(FlakyCollection(mongo_client[DATABASE]["recovered"], failures=2))
+    stats = recovered.bulk_load(csv_path, DATABASE, COLLECTION, workers=1, max_retries=3)
+    assert (stats.retries, stats.retried_batches, stats.failed_batches, stats.upserted) == (2, 1, 0, 3)
+
+    failed = extractor(FlakyCollection(mongo_client[DATABASE]["failed"], failures=10))
+    stats = failed.bulk_load(csv_path, DATABASE, COLLECTION, batch_size=2, workers=1, max_retries=1)
+    assert (stats.batches, stats.retries, stats.retried_batches) == (2, 2, 2)
+    assert (stats.failed_batches, stats.failed_rows, stats.upserted) == (2, 3, 0)
+    assert len(stats.errors) == 2
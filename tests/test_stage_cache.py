@@ -0,0 +1,113 @@
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import pytest
+
+from pollution_forecasting.components import data_transformation
+from pollution_forecasting.entity.config_entity import StageCacheConfig, TrainingPipelineConfig
+from pollution_forecasting.pipeline.stage_cache import StageCache
+from pollution_forecasting.utils.ml_utils.imputation import imputer
+
+
+@dataclass
+class OutputArtifact:
+    output_file_path: str
+
+
+@pytest.fixture
+def artifact_root(tmp_path, monkeypatch):
+    root = str(tmp_path / "Artifacts")
+    monkeypatch.setattr(TrainingPipelineConfig, "__init__", _rooted_config(root))
+    return root
+
+
+def _rooted_config(root):
+    original = TrainingPipelineConfig.__init__
+
+    def __init__(self, timestamp=datetime.now(), station=None):
+        original(self, timestamp, station)
+        self.artifact_name = root
+        self.run_dir = self.artifact_dir = os.path.join(root, self.timestamp)
+    return __init__
+
+
+def run_stage(hour, stage_name, size, on_hit=None):
+    """
+    Run a stage in the run of `hour`, writing `size` bytes when it is not a cache hit.
+    """
+    config = StageCacheConfig(TrainingPipelineConfig(datetime(2024, 1, 1, hour)))
+    cache = StageCache(config)
+
+    def build():
+        path = os.path.join(config.artifact_dir, stage_name, "output.bin")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+        return OutputArtifact(path)
+
+    return cache, cache.run(stage_name, build, OutputArtifact, on_hit=on_hit)
+
+
+def test_key_covers_the_modules_the_stage_imports(artifact_root):
+    cache = StageCache(StageCacheConfig(TrainingPipelineConfig(datetime(2024, 1, 1))))
+    build = data_transformation.DataTransformation.initiate_data_transformation
+    key = cache.stage_key("data_transformation", [], {}, build)
+
+    hash_file = cache.hash_file
+    cache._code_hashes.clear()
+    cache.hash_file = lambda path: "edited" if path == imputer.__file__ else hash_file(path)
+    assert cache.stage_key("data_transformation", [], {}, build) != key
+
+    cache.hash_file = hash_file
+    cache._code_hashes.clear()
+    cache.stage_cache_config.code_version = "bumped"
+    assert cache.stage_key("data_transformation", [], {}, build) != key
+
+
+def test_evict_follows_cache_use_rather_than_directory_times(artifact_root):
+    run_stage(0, "used_first", 100)
+    time.sleep(0.01)
+    run_stage(1, "used_last", 100)
+    # writing into the older run later does not make its cached outputs any more recent
+    later = time.time() + 60
+    os.utime(os.path.join(artifact_root, "01_01_2024_00_00_00"), (later, later))
+    cache, _ = run_stage(2, "current", 100)
+
+    cache.stage_cache_config.max_bytes = 250
+    cache.evict()
+
+    assert sorted(os.listdir(artifact_root)) == ["01_01_2024_01_00_00", "01_01_2024_02_00_00", "stage_cache"]
+
+
+
+def test_hit_replays_side_effects_on_read_only_links(artifact_root):
+    replayed = []
+    _, first = run_stage(0, "model_trainer", 100, on_hit=replayed.append)
+    assert replayed == []
+
+    _, second = run_stage(1, "model_trainer", 100, on_hit=replayed.append)
+
+    assert replayed == [second]
+    assert second.output_file_path != first.output_file_path
+    assert os.path.samefile(second.output_file_path, first.output_file_path)
+    # the one file behind both runs cannot be written through either path
+    assert not os.stat(first.output_file_path).st_mode & 0o222
+
+
+def test_evict_drops_the_hashes_of_deleted_files(artifact_root):
+    cache, old = run_stage(0, "old", 100)
+    cache.hash_file(old.output_file_path)
+    old_inode = "%d:%d:" % (os.stat(old.output_file_path).st_dev, os.stat(old.output_file_path).st_ino)
+    cache, current = run_stage(1, "current", 100)
+    cache.hash_file(old.output_file_path)
+    cache.hash_file(current.output_file_path)
+
+    cache.stage_cache_config.max_bytes = 150
+    cache.evict()
+
+    assert not os.path.exists(old.output_file_path)
+    remaining = StageCache(cache.stage_cache_config)._file_hashes
+    assert not [identity for identity in remaining if identity.startswith(old_inode)]
+    assert len(remaining) == len(cache._file_hashes) >= 1